@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import telemetria
+
+# --- Configurações ---
+intervalo_amostragem_s = 0.5           # Uma leitura de todas as qdiscs/classes por roteador a cada intervalo
+timeout_leitura_s = 2.0                # Leitura de um roteador que demore mais é descartada
+nome_arquivo_canais = "tc_canais.json"  # canal da telemetria -> (roteador, interface, tipo, handle, kind)
+
+# Contadores lidos de cada qdisc/classe e métrica da telemetria onde ficam
+CONTADORES = {
+    'bytes': telemetria.TC_BYTES,
+    'packets': telemetria.TC_PACOTES,
+    'drops': telemetria.TC_DESCARTES,
+    'overlimits': telemetria.TC_OVERLIMITS,
+    'backlog': telemetria.TC_BACKLOG_BYTES,
+    'qlen': telemetria.TC_BACKLOG_PACOTES,
+}
+
+# Formato de texto do 'tc -s' (o iproute2 6.1 ignora -j em 'class show')
+_RE_CABECALHO = re.compile(r'^(qdisc|class) (\S+) (\S+)')
+_RE_SENT = re.compile(r'Sent (\d+) bytes (\d+) pkt \(dropped (\d+), overlimits (\d+)')
+_RE_BACKLOG = re.compile(r'backlog (\d+(?:\.\d+)?)([KMG]?)b (\d+)p')
+_MULTIPLOS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def _segmentos(saida):
+    """Divide a saída de 'tc -s -j -batch' em listas JSON e blocos de texto, pela ordem."""
+    decodificador = json.JSONDecoder()
+    segmentos, pos = [], 0
+    while pos < len(saida):
+        if saida[pos].isspace():
+            pos += 1
+        elif saida[pos] == '[':
+            objeto, pos = decodificador.raw_decode(saida, pos)
+            segmentos.append(objeto)
+        else:
+            fim = saida.find('\n[', pos)
+            fim = len(saida) if fim < 0 else fim + 1
+            segmentos.append(saida[pos:fim])
+            pos = fim
+    return segmentos
+
+
+def _do_texto(bloco):
+    """Elementos (tipo, handle, kind, contadores) de um bloco de texto do 'tc -s'."""
+    elementos = []
+    for linha in bloco.splitlines():
+        cabecalho = _RE_CABECALHO.match(linha)
+        if cabecalho:
+            tipo, kind, handle = cabecalho.groups()
+            elementos.append((tipo, handle, kind, {}))
+            continue
+        if not elementos:
+            continue
+        contadores = elementos[-1][3]
+        sent = _RE_SENT.search(linha)
+        if sent:
+            contadores.update(zip(['bytes', 'packets', 'drops', 'overlimits'], map(int, sent.groups())))
+        backlog = _RE_BACKLOG.search(linha)
+        if backlog and 'backlog' not in contadores:
+            valor, unidade, pacotes = backlog.groups()
+            contadores.update(backlog=int(float(valor) * _MULTIPLOS[unidade]), qlen=int(pacotes))
+    return elementos
+
+
+def _do_json(objetos, tipo):
+    """Elementos de uma lista JSON do 'tc -s -j' (estatísticas no topo ou em 'stats')."""
+    elementos = []
+    for objeto in objetos:
+        estatisticas = objeto.get('stats', objeto)
+        contadores = {chave: int(estatisticas[chave]) for chave in CONTADORES if chave in estatisticas}
+        elementos.append((tipo, objeto['handle'], objeto.get('kind', objeto.get('class')), contadores))
+    return elementos
+
+
+def interpretar_lote(saida, interfaces):
+    """
+    Interpreta a saída de um lote 'qdisc show dev X' + 'class show dev X' por interface.
+
+    Cada 'qdisc show' produz sempre uma lista JSON não vazia (há sempre qdisc raiz), o
+    que delimita as interfaces; o 'class show' que se segue pode vir em JSON (iproute2
+    recente), em texto, ou vazio. Devolve {interface: [(tipo, handle, kind, contadores)]}.
+    """
+    segmentos = _segmentos(saida)
+    resultado, i = {}, 0
+    for iface in interfaces:
+        elementos = []
+        if i < len(segmentos) and isinstance(segmentos[i], list):
+            elementos += _do_json(segmentos[i], 'qdisc')
+            i += 1
+        if i < len(segmentos):
+            seguinte = segmentos[i]
+            if isinstance(seguinte, str):
+                elementos += _do_texto(seguinte)
+                i += 1
+            elif not seguinte or 'class' in seguinte[0]:
+                elementos += _do_json(seguinte, 'class')
+                i += 1
+        resultado[iface] = elementos
+    return resultado
+
+
+class AmostradorTc:
+    """
+    Lê periodicamente os contadores de todas as qdiscs e classes das interfaces do
+    interfaces_map e escreve-os na telemetria, ao lado das amostras de latência.
+
+    Um só processo 'tc -s -j -batch' por roteador e por amostra (no namespace do roteador,
+    sem passar pela shell do nó, que o controlador usa em simultâneo). Cada (roteador,
+    interface, qdisc/classe) recebe um canal da telemetria; a correspondência fica em
+    nome_arquivo_canais. bytes, packets, drops e overlimits são contadores acumulados
+    (recomeçam quando a árvore é recriada); backlog e qlen são o estado da fila.
+
+    observadores: funções chamadas após cada leitura de um roteador com
+    (roteador, {interface: [(tipo, handle, kind, contadores)]}, t_ns), na thread da leitura
+    (ex. o previsor do controlador_qos, que segue o backlog em memória).
+    """
+
+    def __init__(self, roteadores, interfaces_map, project_dir, intervalo_s=None, observadores=()):
+        self.roteadores = [r for r in roteadores if r.name in interfaces_map]
+        self.intervalo_s = intervalo_amostragem_s if intervalo_s is None else intervalo_s
+        self.interfaces = {r.name: [i for direcao in ('forward', 'backward')
+                                    for i in interfaces_map[r.name].get(direcao, [])]
+                           for r in self.roteadores}
+        self.caminho_canais = os.path.join(project_dir, nome_arquivo_canais)
+        caminho_telemetria = os.path.join(project_dir, telemetria.nome_arquivo_telemetria)
+        self._escritores = {r.name: telemetria.EscritorTelemetria(caminho_telemetria, r.name)
+                            for r in self.roteadores}
+        self._lotes = {}
+        for roteador in self.roteadores:
+            with tempfile.NamedTemporaryFile('w', prefix=f'tc_stats_{roteador.name}_', suffix='.batch',
+                                             delete=False) as f:
+                for iface in self.interfaces[roteador.name]:
+                    f.write(f'qdisc show dev {iface}\nclass show dev {iface}\n')
+                self._lotes[roteador.name] = f.name
+        self.observadores = list(observadores)
+        # Capacidade de cada ligação (parâmetro bw do TCLink), para converter backlog em atraso
+        self._bw_mbit = {(r.name, iface): r.intf(iface).params.get('bw')
+                         for r in self.roteadores for iface in self.interfaces[r.name]}
+        self.canais = {}
+        self._trinco_canais = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _canal(self, roteador, iface, tipo, handle, kind):
+        chave = (roteador, iface, tipo, handle)
+        with self._trinco_canais:
+            if chave not in self.canais:
+                self.canais[chave] = (len(self.canais), kind)
+                with open(self.caminho_canais, 'w') as f:
+                    json.dump([dict(canal=c, roteador=r, interface=i, tipo=t, handle=h, kind=k,
+                                    bw_mbit=self._bw_mbit.get((r, i)))
+                               for (r, i, t, h), (c, k) in self.canais.items()], f, indent=2)
+            return self.canais[chave][0]
+
+    def _ler(self, roteador):
+        inicio = time.monotonic_ns()
+        processo = roteador.popen(['tc', '-s', '-j', '-batch', self._lotes[roteador.name]])
+        try:
+            saida, _ = processo.communicate(timeout=timeout_leitura_s)
+        except Exception:
+            processo.kill()
+            processo.wait()
+            return 0
+        # Instante a meio da leitura: o tc lê as interfaces em sequência
+        t_ns = (inicio + time.monotonic_ns()) // 2
+        escritor, n = self._escritores[roteador.name], 0
+        por_interface = interpretar_lote(saida.decode(errors='replace'), self.interfaces[roteador.name])
+        for iface, elementos in por_interface.items():
+            for tipo, handle, kind, contadores in elementos:
+                canal = self._canal(roteador.name, iface, tipo, handle, kind)
+                for chave, valor in contadores.items():
+                    escritor.registrar(CONTADORES[chave], valor, canal=canal, t_ns=t_ns)
+                n += 1
+        for observador in self.observadores:
+            observador(roteador, por_interface, t_ns)
+        return n
+
+    def amostrar(self):
+        """Uma leitura de todos os roteadores em paralelo. Devolve o número de qdiscs/classes lidas."""
+        if not self.roteadores:
+            return 0
+        with ThreadPoolExecutor(max_workers=len(self.roteadores)) as executor:
+            return sum(executor.map(self._ler, self.roteadores))
+
+    def _loop(self):
+        proxima = time.monotonic()
+        while not self._parar.is_set():
+            self.amostrar()
+            proxima += self.intervalo_s
+            # Sem recuperar atrasos: se uma leitura demorar mais que o intervalo, segue-se logo a próxima
+            proxima = max(proxima, time.monotonic())
+            self._parar.wait(proxima - time.monotonic())
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        for escritor in self._escritores.values():
+            escritor.fechar()
+        for caminho in self._lotes.values():
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+def carregar_canais(project_dir):
+    """canal -> dicionário (roteador, interface, tipo, handle, kind) de uma execução."""
+    with open(os.path.join(project_dir, nome_arquivo_canais)) as f:
+        return {c['canal']: c for c in json.load(f)}
+
+
+def taxa(t_ns, contador):
+    """
+    Converte um contador acumulado em taxa por segundo entre amostras consecutivas.
+
+    Quando o contador desce (árvore recriada) o intervalo conta a partir de zero.
+    Devolve (t_ns do fim de cada intervalo, taxa).
+    """
+    if len(t_ns) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    delta = np.diff(contador)
+    delta = np.where(delta < 0, contador[1:], delta)
+    return t_ns[1:], delta / (np.diff(t_ns) / 1e9)
+
+
+def resumo_execucao(project_dir):
+    """Por qdisc/classe: bytes, pacotes e descartes no período e backlog máximo observado."""
+    registros = telemetria.mapear(os.path.join(project_dir, telemetria.nome_arquivo_telemetria))
+    canais = carregar_canais(project_dir)
+    linhas = []
+    for canal, info in sorted(canais.items()):
+        do_canal = registros[(registros['origem'] == info['roteador'].encode()) & (registros['canal'] == canal)]
+        linha = dict(info)
+        for chave, metrica in CONTADORES.items():
+            serie = do_canal[do_canal['metrica'] == metrica]
+            if len(serie) == 0:
+                continue
+            if chave in ('backlog', 'qlen'):
+                linha[f'{chave}_max'] = int(serie['valor'].max())
+            else:
+                # Soma dos incrementos, para atravessar as recriações da árvore
+                valores = serie['valor']
+                incrementos = np.diff(valores)
+                linha[chave] = int(np.where(incrementos < 0, valores[1:], incrementos).sum())
+        linhas.append(linha)
+    return linhas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resumo dos contadores tc amostrados numa execução")
+    parser.add_argument('dir', help="Diretório da execução (telemetria.bin e tc_canais.json)")
+    parser.add_argument('--todas', action='store_true', help="Inclui qdiscs/classes sem tráfego")
+    args = parser.parse_args()
+
+    print(f"{'roteador':<12} {'interface':<16} {'elemento':<18} {'bytes':>12} {'pacotes':>9} "
+          f"{'descartes':>9} {'overlimits':>10} {'backlog máx':>12}")
+    for linha in resumo_execucao(args.dir):
+        if not args.todas and not linha.get('packets'):
+            continue
+        elemento = f"{linha['tipo']} {linha['kind']} {linha['handle']}"
+        print(f"{linha['roteador']:<12} {linha['interface']:<16} {elemento:<18} {linha.get('bytes', 0):>12} "
+              f"{linha.get('packets', 0):>9} {linha.get('drops', 0):>9} {linha.get('overlimits', 0):>10} "
+              f"{linha.get('backlog_max', 0):>11}b")
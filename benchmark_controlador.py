@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import controlador_qos
+import gerador_trafego_embb
+import iperf_json
+import telemetria
+
+# --- Configurações ---
+origem_latencia = "h_uRLLC1"
+janela_recuperacao_s = 1.0  # A latência tem de ficar abaixo do limiar durante esta janela
+aquecimento_s = 10          # Período sem carga antes do primeiro degrau (linha de base)
+tolerancia_regressao = 0.2  # Piora relativa aceite nos percentis antes de acusar regressão
+
+# Métricas por degrau (todas: quanto menor, melhor)
+METRICAS = ['deteccao_ms', 'atuacao_ms', 'recuperacao_ms', 'violacao_pct', 'vazao_cedida_mbps']
+PERCENTIS = [50, 90, 99]
+
+
+def degraus_da_telemetria(registros):
+    """Lista de (índice, carga, t_inicio_ns, t_fim_ns) dos degraus registados pelo benchmark."""
+    inicios = registros[registros['metrica'] == telemetria.DEGRAU_INICIO]
+    fins = {int(r['canal']): int(r['t_ns']) for r in registros[registros['metrica'] == telemetria.DEGRAU_FIM]}
+    return [(int(r['canal']), float(r['valor']), int(r['t_ns']), fins.get(int(r['canal'])))
+            for r in np.sort(inicios, order='t_ns')]
+
+
+def _amostras_monitor(registros, limiar_ms):
+    """(t_ns, violação) de cada sonda do monitor, por ordem temporal; sondas perdidas contam como violação."""
+    do_monitor = registros[registros['origem'] == origem_latencia.encode()]
+    latencias = do_monitor[do_monitor['metrica'] == telemetria.LATENCIA_MS]
+    perdas = do_monitor[do_monitor['metrica'] == telemetria.PERDA]
+    t = np.concatenate([latencias['t_ns'], perdas['t_ns']])
+    violacao = np.concatenate([latencias['valor'] > limiar_ms, np.ones(len(perdas), dtype=bool)])
+    ordem = np.argsort(t, kind='stable')
+    return t[ordem], violacao[ordem]
+
+
+def _primeira_recuperacao(t, violacao, janela_ns, fim_ns):
+    """Índice da primeira amostra a partir da qual não há violações durante janela_ns (ou None)."""
+    # Instante da próxima violação a partir de cada amostra (inclusive)
+    proxima = np.where(violacao, t, np.iinfo(np.int64).max)
+    proxima = np.minimum.accumulate(proxima[::-1])[::-1]
+    candidatos = np.flatnonzero(~violacao & (proxima - t > janela_ns) & (t + janela_ns <= fim_ns))
+    return int(candidatos[0]) if len(candidatos) else None
+
+
+def _vazao_entregue(caminho_log_embb, ancora):
+    """(t_ns, Mbit/s) dos intervalos do servidor iperf3 eMBB, no relógio da telemetria."""
+    if ancora is None or not os.path.exists(caminho_log_embb):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    with open(caminho_log_embb) as f:
+        intervalos = [r for r in iperf_json.ParserIperf().processar_linhas(f) if r.t_parede is not None]
+    t_ns0, parede0 = ancora
+    t = np.array([t_ns0 + (r.t_parede - parede0) * 1e9 for r in intervalos], dtype=np.int64)
+    return t, np.array([r.mbps for r in intervalos])
+
+
+def analisar(caminho_telemetria, caminho_log_embb, limiar_ms):
+    """
+    Mede cada degrau de congestionamento registado na telemetria.
+
+    Tempos em ms a contar do início do degrau:
+      deteccao_ms    primeira sonda acima do limiar (ou perdida)
+      atuacao_ms     primeira atuação do controlador depois da deteção (árvore aplicada ou ajuste)
+      recuperacao_ms início da primeira janela de janela_recuperacao_s sem violações
+    violacao_pct é a fração de sondas em violação até ao degrau seguinte e
+    vazao_cedida_mbps a carga oferecida menos a vazão eMBB entregue enquanto o degrau dura.
+    """
+    registros = np.array(telemetria.mapear(caminho_telemetria))
+    t, violacao = _amostras_monitor(registros, limiar_ms)
+    atuacoes = np.sort(registros['t_ns'][np.isin(registros['metrica'],
+                                                  [telemetria.QOS_APLICADO, telemetria.TETO_EMBB_MBIT])])
+    t_embb, vazao_embb = _vazao_entregue(caminho_log_embb, telemetria.ancora_relogio(registros))
+
+    degraus = degraus_da_telemetria(registros)
+    resultados = []
+    for n, (indice, carga, inicio, fim) in enumerate(degraus):
+        limite = degraus[n + 1][2] if n + 1 < len(degraus) else (int(t[-1]) + 1 if len(t) else inicio)
+        fim = fim if fim is not None else limite
+        janela = (t >= inicio) & (t < limite)
+        t_j, v_j = t[janela], violacao[janela]
+        resultado = {'degrau': indice, 'carga_mbps': carga, 'amostras': int(len(t_j)),
+                     'deteccao_ms': None, 'atuacao_ms': None, 'recuperacao_ms': None,
+                     'violacao_pct': round(100.0 * v_j.mean(), 3) if len(t_j) else None,
+                     'vazao_cedida_mbps': None}
+
+        no_degrau = (t_embb >= inicio) & (t_embb < fim)
+        if np.any(no_degrau):
+            resultado['vazao_cedida_mbps'] = round(carga - float(vazao_embb[no_degrau].mean()), 3)
+
+        violacoes = np.flatnonzero(v_j)
+        if len(violacoes):
+            t_deteccao = t_j[violacoes[0]]
+            resultado['deteccao_ms'] = round((t_deteccao - inicio) / 1e6, 3)
+            seguintes = atuacoes[(atuacoes >= t_deteccao) & (atuacoes < limite)]
+            if len(seguintes):
+                resultado['atuacao_ms'] = round((seguintes[0] - inicio) / 1e6, 3)
+            depois = violacoes[0]
+            recuperacao = _primeira_recuperacao(t_j[depois:], v_j[depois:], janela_recuperacao_s * 1e9, limite)
+            if recuperacao is not None:
+                resultado['recuperacao_ms'] = round((t_j[depois + recuperacao] - inicio) / 1e6, 3)
+        resultados.append(resultado)
+    return resultados
+
+
+def resumir(resultados, metricas=METRICAS):
+    """Percentis de cada métrica sobre os degraus (degraus sem valor são ignorados)."""
+    resumo = {}
+    for metrica in metricas:
+        valores = np.array([r[metrica] for r in resultados if r[metrica] is not None], dtype=float)
+        entrada = {'n': int(len(valores))}
+        if len(valores):
+            for p, v in zip(PERCENTIS, np.percentile(valores, PERCENTIS)):
+                entrada[f'p{p}'] = round(float(v), 3)
+            entrada.update(media=round(float(valores.mean()), 3), max=round(float(valores.max()), 3))
+        resumo[metrica] = entrada
+    return resumo
+
+
+def comparar(atual, base, tolerancia=tolerancia_regressao):
+    """Lista de regressões (texto) do resumo atual face a um resumo de referência."""
+    regressoes = []
+    for metrica in METRICAS:
+        for chave in [f'p{p}' for p in PERCENTIS]:
+            a, b = atual.get(metrica, {}).get(chave), base.get(metrica, {}).get(chave)
+            if a is None or b is None:
+                continue
+            if a > b * (1 + tolerancia) and a - b > 1e-3:
+                regressoes.append(f"{metrica} {chave}: {b:g} -> {a:g} (+{(a / b - 1) * 100 if b else float('inf'):.0f}%)")
+    return regressoes
+
+
+def executar_degraus(dir_saida, degraus, parametros, espec=None):
+    """
+    Sobe a topologia, injeta os degraus de carga eMBB e derruba a rede.
+
+    degraus: lista de (carga em Mbit/s, segundos com carga, segundos sem carga). O início
+    e o fim de cada degrau ficam na telemetria (origem 'benchmark'), no mesmo relógio
+    monotónico das sondas e dos eventos do controlador.
+    """
+    # Só aqui se precisa do Mininet: analisar() corre em qualquer máquina
+    import topologia_parametrica
+    import mininet_topologia_completa_v3 as topologia
+
+    parametros = dict(topologia.PARAMETROS_PADRAO, **parametros, gerar_graficos=False)
+    dir_saida = os.path.abspath(dir_saida)
+    rede = topologia.preparar_rede(espec or topologia_parametrica.ESPEC_PADRAO, dir_saida, parametros)
+    escritor = telemetria.EscritorTelemetria(os.path.join(dir_saida, telemetria.nome_arquivo_telemetria), 'benchmark')
+    try:
+        print(f">>> Linha de base sem carga ({aquecimento_s} s)...")
+        time.sleep(aquecimento_s)
+        for indice, (carga, ligado_s, desligado_s) in enumerate(degraus):
+            print(f">>> Degrau {indice}: {carga} Mbit/s eMBB durante {ligado_s} s, pausa de {desligado_s} s")
+            escritor.registrar(telemetria.DEGRAU_INICIO, carga, canal=indice)
+            gerador_trafego_embb.iniciar_trafego_embb(
+                rede['h_eMBB1'], rede['h_cloud'].IP(), controlador_qos.porta_embb, carga, ligado_s,
+                os.path.join(rede['embb_log_dir'], f"degrau_{indice:02d}"))
+            time.sleep(ligado_s)
+            escritor.registrar(telemetria.DEGRAU_FIM, carga, canal=indice)
+            time.sleep(desligado_s)
+    finally:
+        escritor.fechar()
+        topologia.parar_rede(rede)
+
+
+def gravar_relatorio(dir_saida, limiar_ms, parametros=None):
+    resultados = analisar(os.path.join(dir_saida, telemetria.nome_arquivo_telemetria),
+                          os.path.join(dir_saida, "logs_embb", "iperf_embb_servidor.txt"), limiar_ms)
+    relatorio = {'limiar_latencia_ms': limiar_ms, 'parametros': parametros or {},
+                 'degraus': resultados, 'resumo': resumir(resultados)}
+    with open(os.path.join(dir_saida, "benchmark.json"), "w") as f:
+        json.dump(relatorio, f, indent=2)
+    return relatorio
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de tempo de reação e SLA do controlador de QoS")
+    parser.add_argument('--saida', default='benchmark', help="Diretório da execução (telemetria, logs, benchmark.json)")
+    parser.add_argument('--degraus', type=int, default=5)
+    parser.add_argument('--carga', type=float, default=60, help="Carga eMBB de cada degrau (Mbit/s)")
+    parser.add_argument('--ligado', type=float, default=20, help="Segundos com carga por degrau")
+    parser.add_argument('--desligado', type=float, default=40, help="Segundos sem carga após cada degrau")
+    parser.add_argument('--limiar', type=float, default=5.0, help="limiar_latencia_ms")
+    parser.add_argument('--modo', default=controlador_qos.modo_controle, choices=['adaptativo', 'binario'])
+    parser.add_argument('--estrategia', default=controlador_qos.estrategia_qdisc,
+                        help="Estratégia de qdisc (ver estrategias_qdisc.ESTRATEGIAS)")
+    parser.add_argument('--espec', help="Especificação da topologia (JSON/YAML)")
+    parser.add_argument('--analisar', action='store_true', help="Só analisa a telemetria já existente em --saida")
+    parser.add_argument('--comparar', help="benchmark.json de referência: termina com código 1 se houver regressão")
+    args = parser.parse_args()
+
+    parametros = {'limiar_latencia_ms': args.limiar, 'modo_controle': args.modo, 'estrategia_qdisc': args.estrategia}
+    if not args.analisar:
+        import topologia_parametrica
+        espec = topologia_parametrica.carregar_espec(args.espec) if args.espec else None
+        executar_degraus(args.saida, [(args.carga, args.ligado, args.desligado)] * args.degraus, parametros, espec)
+
+    relatorio = gravar_relatorio(args.saida, args.limiar, parametros)
+    for metrica, entrada in relatorio['resumo'].items():
+        percentis = ', '.join(f"{k} {v}" for k, v in entrada.items() if k != 'n')
+        print(f"    - {metrica:<18} n={entrada['n']:<3} {percentis}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regressoes = comparar(relatorio['resumo'], json.load(f)['resumo'])
+        for regressao in regressoes:
+            print(f"[REGRESSÃO] {regressao}")
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,96 @@
+import json
+import os
+import select
+import socket
+import time
+
+# --- Configurações ---
+nome_socket_alerta = "latencia.sock"  # Criado no diretório do projeto pelo controlador
+
+# Tipos de evento
+ALERTA = "alerta"
+NORMAL = "normal"
+AMOSTRA = "amostra"  # Latência periódica, para o controlo em malha fechada
+
+
+class EmissorAlerta:
+    """
+    Lado do monitor: envia eventos de alerta para o controlador por um socket Unix datagram.
+
+    O socket vive no sistema de ficheiros, por isso funciona entre namespaces de rede
+    diferentes (o monitor corre em h_uRLLC1, o controlador no namespace raiz).
+    """
+
+    def __init__(self, caminho=nome_socket_alerta):
+        self.caminho = caminho
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def enviar(self, tipo, latencia_ms=None, origem=None):
+        """
+        Envia um evento. origem é o ponto de observação do caminho que o motivou (None: sem
+        caminho). Devolve False se o controlador não estiver a escutar.
+        """
+        evento = {
+            'tipo': tipo,
+            'latencia_ms': latencia_ms,
+            'origem': origem,
+            't_deteccao': time.time(),
+            't_deteccao_mono': time.monotonic(),
+        }
+        try:
+            self._sock.sendto(json.dumps(evento).encode(), self.caminho)
+            return True
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
+            return False
+
+    def fechar(self):
+        self._sock.close()
+
+
+class CanalAlerta:
+    """Lado do controlador: recebe os eventos e acorda o loop de controlo imediatamente."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(caminho)
+        # O monitor pode correr como outro utilizador (sudo dentro do host Mininet).
+        os.chmod(caminho, 0o666)
+        self._sock.setblocking(False)
+
+    def receber(self, timeout):
+        """
+        Espera até timeout segundos por eventos.
+
+        Devolve a lista de todos os eventos pendentes, por ordem de chegada, ou uma
+        lista vazia se o tempo esgotar.
+        """
+        prontos, _, _ = select.select([self._sock], [], [], timeout)
+        if not prontos:
+            return []
+        eventos = []
+        while True:
+            try:
+                dados = self._sock.recv(4096)
+            except BlockingIOError:
+                return eventos
+            try:
+                eventos.append(json.loads(dados))
+            except ValueError:
+                continue
+
+    @staticmethod
+    def ultimo_estado(eventos):
+        """Último evento de alerta/normal da lista (ignora amostras), ou None."""
+        for evento in reversed(eventos):
+            if evento['tipo'] in (ALERTA, NORMAL):
+                return evento
+        return None
+
+    def fechar(self):
+        self._sock.close()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
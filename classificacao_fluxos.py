@@ -0,0 +1,215 @@
+import argparse
+import os
+import socket
+import subprocess
+import tempfile
+import time
+
+# --- Configurações ---
+# 'linear': um filtro u32 por porta, percorridos em sequência (custo por pacote cresce com as portas)
+# 'hash':   tabelas de hash u32 em dois níveis (byte alto, byte baixo da porta): custo constante
+# 'dscp':   as bordas marcam o DSCP da fatia à entrada (clsact + hash); os restantes saltos
+#           comparam um único filtro por fatia no dsfield
+modo_classificacao = 'hash'
+dscp_fatias = {'urllc': 46, 'embb': 34}  # EF e AF41
+prio_portas = 2                          # Prioridade dos filtros por porta (ICMP em 1, ARP em 3)
+primeira_tabela = 0x10                   # Handles u32 das tabelas de hash (as raízes automáticas usam 0x800+)
+
+# Fatias da experiência: o ICMP e o ARP seguem a fatia uRLLC (sondas do monitor e resolução de vizinhos)
+URLLC, EMBB = 'urllc', 'embb'
+MODOS = ['linear', 'hash', 'dscp']
+
+# Palavra de 32 bits com as portas TCP/UDP (cabeçalho IPv4 sem opções): sport nos 16 bits altos
+_DESLOCAMENTO_PORTAS = 20
+_MASCARAS = {'dport': (0x0000ff00, 0x000000ff), 'sport': (0xff000000, 0x00ff0000)}  # (byte alto, byte baixo)
+
+
+def _prefixo(iface, parent):
+    # 'ingress' é o gancho de entrada da qdisc clsact (marcação nas bordas)
+    if parent == 'ingress':
+        return f'filter add dev {iface} ingress'
+    return f'filter add dev {iface} parent {parent}'
+
+
+def _portas(fluxos, destinos):
+    """(porta, fatia) de todas as fatias com destino; uma porta só pode pertencer a uma fatia."""
+    vistas = {}
+    for fatia, portas in fluxos.items():
+        if fatia not in destinos:
+            continue
+        for porta in portas:
+            if porta in vistas:
+                raise ValueError(f"Porta {porta} atribuída às fatias '{vistas[porta]}' e '{fatia}'.")
+            vistas[porta] = fatia
+    return sorted(vistas.items())
+
+
+def comandos_linear(iface, parent, direcao_filtro, portas, alvo):
+    """Um filtro por porta; as da fatia uRLLC em prio 1, as restantes em prio_portas."""
+    prefixo = _prefixo(iface, parent)
+    return [f'{prefixo} protocol ip prio {1 if fatia == URLLC else prio_portas} u32 '
+            f'match ip {direcao_filtro} {porta} 0xffff {alvo(fatia)}'
+            for porta, fatia in portas]
+
+
+def comandos_hash(iface, parent, direcao_filtro, portas, alvo):
+    """
+    Tabelas de hash u32 em dois níveis indexadas pela porta.
+
+    A raiz liga à tabela do byte alto (divisor 256); cada balde usado liga a uma tabela
+    do byte baixo, onde fica um só filtro exato por porta. Cada pacote faz no máximo
+    três comparações, com 2 ou 65535 portas.
+    """
+    prefixo = f'{_prefixo(iface, parent)} protocol ip prio {prio_portas}'
+    mascara_alta, mascara_baixa = _MASCARAS[direcao_filtro]
+    por_byte_alto = {}
+    for porta, fatia in portas:
+        por_byte_alto.setdefault(porta >> 8, []).append((porta, fatia))
+
+    tabela_alta = primeira_tabela
+    cmds = [f'{prefixo} handle {tabela_alta:x}: u32 divisor 256']
+    for n, (alto, grupo) in enumerate(sorted(por_byte_alto.items()), start=1):
+        tabela = tabela_alta + n
+        cmds.append(f'{prefixo} handle {tabela:x}: u32 divisor 256')
+        cmds += [f'{prefixo} u32 ht {tabela:x}:{porta & 0xff:x}: '
+                 f'match ip {direcao_filtro} {porta} 0xffff {alvo(fatia)}' for porta, fatia in grupo]
+        cmds.append(f'{prefixo} u32 ht {tabela_alta:x}:{alto:x}: match u32 0 0 '
+                    f'hashkey mask 0x{mascara_baixa:08x} at {_DESLOCAMENTO_PORTAS} link {tabela:x}:')
+    # Sem 'ht': o filtro de entrada fica na raiz desta prioridade, seja qual for o handle que o kernel lhe deu
+    cmds.append(f'{prefixo} u32 match u32 0 0 hashkey mask 0x{mascara_alta:08x} at {_DESLOCAMENTO_PORTAS} '
+                f'link {tabela_alta:x}:')
+    return cmds
+
+
+def comandos_dscp(iface, parent, destinos, alvo):
+    """Um filtro por fatia no dsfield (os bits ECN são ignorados)."""
+    prefixo = _prefixo(iface, parent)
+    return [f'{prefixo} protocol ip prio {prio_portas} u32 match ip dsfield 0x{dscp_fatias[fatia] << 2:02x} 0xfc '
+            f'{alvo(fatia)}' for fatia in destinos if fatia in dscp_fatias]
+
+
+def comandos_filtros(iface, parent, direcao_filtro, fluxos, destinos, acao='flowid', modo=None):
+    """
+    Filtros que encaminham cada fatia para o seu destino, segundo modo_classificacao.
+
+    fluxos: fatia -> portas TCP/UDP (tabela fatia-fluxos do controlador_qos).
+    destinos: fatia -> classid (ex. {'urllc': '1:10', 'embb': '1:20'}); com acao='skbedit'
+    o destino é escrito na prioridade do pacote em vez de ser um flowid (usado pelo cake).
+    Fatias sem destino ficam na classe/banda por omissão da qdisc.
+    """
+    modo = modo or modo_classificacao
+
+    def alvo(fatia):
+        if acao == 'skbedit':
+            return f'action skbedit priority {destinos[fatia]}'
+        return f'flowid {destinos[fatia]}'
+
+    prefixo = _prefixo(iface, parent)
+    cmds = []
+    if URLLC in destinos:
+        cmds += [
+            f'{prefixo} protocol ip prio 1 u32 match ip protocol 1 0xff {alvo(URLLC)}',
+            # O ARP precisa de prioridade própria: cada prio aceita um único protocolo.
+            f'{prefixo} protocol arp prio 3 u32 match u32 0 0 {alvo(URLLC)}',
+        ]
+    if modo == 'dscp':
+        return cmds + comandos_dscp(iface, parent, destinos, alvo)
+    if modo == 'hash':
+        return cmds + comandos_hash(iface, parent, direcao_filtro, _portas(fluxos, destinos), alvo)
+    if modo == 'linear':
+        return cmds + comandos_linear(iface, parent, direcao_filtro, _portas(fluxos, destinos), alvo)
+    raise ValueError(f"Modo de classificação desconhecido: '{modo}'. Disponíveis: {', '.join(MODOS)}")
+
+
+def comandos_marcacao(iface, direcao_filtro, fluxos):
+    """
+    Marcação DSCP à entrada de uma borda (modo 'dscp'): qdisc clsact e a classificação
+    por hash das portas, com uma ação pedit que escreve o DSCP da fatia.
+    """
+    def marcar(fatia):
+        return (f'action pedit ex munge ip dsfield set 0x{dscp_fatias[fatia] << 2:02x} retain 0xfc '
+                f'pipe action csum ip')
+
+    destinos = {fatia: None for fatia in fluxos if fatia in dscp_fatias}
+    return ([f'qdisc del dev {iface} clsact', f'qdisc add dev {iface} clsact']
+            + comandos_hash(iface, 'ingress', direcao_filtro, _portas(fluxos, destinos), marcar))
+
+
+def _executar(comando):
+    return subprocess.run(comando, shell=True, capture_output=True, text=True)
+
+
+def medir_custo(modo, n_portas, pacotes, iface='cls0', vizinho='cls1'):
+    """
+    Mede o custo por pacote da classificação na saída de um par veth (requer root).
+
+    Instala a árvore HTB com n_portas na fatia uRLLC e envia `pacotes` datagramas UDP
+    para a última porta da tabela (o pior caso do modo linear). Devolve
+    (ns por pacote, pacotes contados na classe 1:10) para confirmar a classificação.
+    """
+    import amostrador_tc
+
+    _executar(f'ip link del {iface}')
+    _executar(f'ip link add {iface} type veth peer name {vizinho} && ip link set {iface} up && '
+              f'ip link set {vizinho} up && ip addr add 198.18.0.1/24 dev {iface} && '
+              f'ip neigh replace 198.18.0.2 lladdr 02:00:00:00:00:02 dev {iface}')
+    try:
+        portas = list(range(10000, 10000 + n_portas))
+        cmds = [
+            f'qdisc add dev {iface} root handle 1: htb default 30',
+            f'class add dev {iface} parent 1: classid 1:1 htb rate 10gbit',
+        ] + [f'class add dev {iface} parent 1:1 classid 1:{m} htb rate 1gbit ceil 10gbit' for m in (10, 20, 30)]
+        cmds += comandos_filtros(iface, '1:0', 'dport', {URLLC: portas, EMBB: [5201]},
+                                 {URLLC: '1:10', EMBB: '1:20'}, modo=modo)
+        with tempfile.NamedTemporaryFile('w', suffix='.batch', delete=False) as f:
+            f.write('\n'.join(cmds) + '\n')
+        erros = _executar(f'tc -batch {f.name}').stderr
+        os.remove(f.name)
+        if 'rror' in erros:
+            raise RuntimeError(f"tc recusou o lote ({modo}, {n_portas} portas):\n{erros}")
+
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, iface.encode())
+        if modo == 'dscp':
+            # Pacote já marcado por uma borda
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, dscp_fatias[URLLC] << 2)
+        destino, carga = ('198.18.0.2', portas[-1]), b'x' * 64
+        for _ in range(1000):  # Aquecimento
+            s.sendto(carga, destino)
+        inicio = time.perf_counter_ns()
+        for _ in range(pacotes):
+            s.sendto(carga, destino)
+        duracao = time.perf_counter_ns() - inicio
+        s.close()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.batch', delete=False) as f:
+            f.write(f'qdisc show dev {iface}\nclass show dev {iface}\n')
+        saida = _executar(f'tc -s -j -batch {f.name}').stdout
+        os.remove(f.name)
+        classes = {h: c for _, h, _, c in amostrador_tc.interpretar_lote(saida, [iface])[iface]}
+        return duracao / pacotes, classes.get('1:10', {}).get('packets', 0)
+    finally:
+        _executar(f'ip link del {iface}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Custo por pacote da classificação em função do número de portas")
+    parser.add_argument('--portas', default='1,10,100,1000,4000', help="Números de portas a testar")
+    parser.add_argument('--modos', default=','.join(MODOS))
+    parser.add_argument('--pacotes', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=3, help="Fica o melhor tempo (menos ruído do escalonador)")
+    args = parser.parse_args()
+
+    def melhor(modo, n):
+        medicoes = [medir_custo(modo, n, args.pacotes) for _ in range(args.repeticoes)]
+        return min(c for c, _ in medicoes), min(p for _, p in medicoes)
+
+    # A diferença para a linha de base (um só filtro) isola o custo dos filtros do resto do envio
+    base, _ = melhor('linear', 1)
+    print(f"Linha de base (1 filtro linear): {base:.0f} ns/pacote (envio UDP completo)")
+    print(f"{'modo':<8} {'portas':>7} {'ns/pacote':>10} {'acima da base':>14} {'na classe 1:10':>15}"
+          f"  (esperados {args.pacotes + 1000})")
+    for modo in args.modos.split(','):
+        for n in map(int, args.portas.split(',')):
+            custo, contados = melhor(modo, n)
+            print(f"{modo:<8} {n:>7} {custo:>10.0f} {custo - base:>14.0f} {contados:>15}")
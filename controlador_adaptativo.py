@@ -0,0 +1,125 @@
+import time
+from collections import namedtuple
+
+# --- Configurações ---
+limiar_latencia_ms = 5.0      # Acima disto: redução multiplicativa do teto eMBB
+fracao_alvo = 0.7             # Abaixo de limiar * fração: aumento aditivo (entre os dois mantém: histerese)
+teto_embb_min_mbit = 2.0
+teto_embb_max_mbit = 47.0     # Gargalo do percurso (acesso a 50 Mbit/s, 95% na classe pai)
+fator_reducao = 0.7           # Teto eMBB *= fator a cada violação
+passo_aumento_mbit = 2.0      # Teto eMBB += passo a cada período calmo
+garantia_embb_mbit = 10.0     # Rate da classe eMBB (limitado ao teto quando este desce abaixo)
+garantia_urllc_base_mbit = 5.0
+garantia_urllc_max_mbit = 20.0  # Não pode exceder o ceil da classe uRLLC
+fator_garantia = 1.5          # Garantia uRLLC *= fator a cada violação
+passo_garantia_mbit = 1.0     # Garantia uRLLC -= passo a cada período calmo
+intervalo_reducao_s = 0.5     # Espaçamento mínimo entre reduções (tempo para a fila escoar)
+intervalo_aumento_s = 1.0     # Espaçamento mínimo entre aumentos, e após qualquer ajuste
+periodo_liberacao_s = 30.0    # Calma com teto no máximo antes de remover a árvore HTB
+
+# Um ajuste decidido pelo controlador. motivo: 'reduzir', 'aumentar', 'liberar' ou 'antecipar'.
+Ajuste = namedtuple('Ajuste', ['t', 'motivo', 'latencia_ms', 'teto_embb_mbit', 'garantia_urllc_mbit'])
+
+
+class ControladorAIMD:
+    """
+    Controlo em malha fechada do teto eMBB e da garantia uRLLC (AIMD com histerese).
+
+    Cada amostra de latência (pior RTT de uma janela curta, ou None se tudo se perdeu)
+    é comparada com duas fronteiras:
+      - acima de limiar_ms: o teto eMBB é reduzido multiplicativamente e a garantia
+        uRLLC reforçada, no máximo a cada intervalo_reducao_s;
+      - abaixo de alvo_ms: o teto sobe passo_aumento_mbit e a garantia desce
+        passo_garantia_mbit (sem passar o valor base), no máximo a cada intervalo_aumento_s;
+      - entre as duas: nada muda.
+    Com o teto de novo no máximo e latência calma durante periodo_liberacao_s, pede
+    a remoção da árvore HTB. Só decide; quem aplica os ajustes é o controlador_qos.
+
+    antecipar() trata um cruzamento previsto (previsao_latencia) como a primeira violação,
+    antes de ela acontecer.
+    """
+
+    def __init__(self, limiar_ms=None, alvo_ms=None):
+        # Lidos na criação, para que a configuração do módulo possa ser alterada por execução
+        limiar_ms = limiar_latencia_ms if limiar_ms is None else limiar_ms
+        alvo_ms = limiar_ms * fracao_alvo if alvo_ms is None else alvo_ms
+        if alvo_ms >= limiar_ms:
+            raise ValueError("alvo_ms tem de ser inferior a limiar_ms (banda de histerese).")
+        self.limiar_ms = limiar_ms
+        self.alvo_ms = alvo_ms
+        self.ativo = False  # Árvore HTB instalada
+        self.teto_embb_mbit = teto_embb_max_mbit
+        self.garantia_urllc_mbit = garantia_urllc_base_mbit
+        self._ultimo_ajuste = None
+        self._inicio_calma = None
+
+    def _pode_ajustar(self, agora, intervalo_s):
+        return self._ultimo_ajuste is None or agora - self._ultimo_ajuste >= intervalo_s
+
+    def _ajuste(self, agora, motivo, latencia_ms):
+        self._ultimo_ajuste = agora
+        return Ajuste(agora, motivo, latencia_ms, self.teto_embb_mbit, self.garantia_urllc_mbit)
+
+    def atualizar(self, latencia_ms, agora=None):
+        """Processa uma amostra (ms, ou None para perda). Devolve um Ajuste, ou None se nada mudar."""
+        if agora is None:
+            agora = time.monotonic()
+
+        if latencia_ms is None or latencia_ms > self.limiar_ms:
+            self._inicio_calma = None
+            if not self._pode_ajustar(agora, intervalo_reducao_s):
+                return None
+            teto = max(teto_embb_min_mbit, self.teto_embb_mbit * fator_reducao)
+            garantia = min(garantia_urllc_max_mbit, self.garantia_urllc_mbit * fator_garantia)
+            if self.ativo and teto == self.teto_embb_mbit and garantia == self.garantia_urllc_mbit:
+                return None  # Já no limite
+            self.teto_embb_mbit, self.garantia_urllc_mbit = teto, garantia
+            self.ativo = True
+            return self._ajuste(agora, 'reduzir', latencia_ms)
+
+        if not self.ativo or latencia_ms >= self.alvo_ms:
+            self._inicio_calma = None
+            return None
+
+        if self._inicio_calma is None:
+            self._inicio_calma = agora
+        no_maximo = (self.teto_embb_mbit >= teto_embb_max_mbit
+                     and self.garantia_urllc_mbit <= garantia_urllc_base_mbit)
+        if no_maximo:
+            if agora - self._inicio_calma < periodo_liberacao_s:
+                return None
+            self.ativo = False
+            self._inicio_calma = None
+            return self._ajuste(agora, 'liberar', latencia_ms)
+
+        if not self._pode_ajustar(agora, intervalo_aumento_s):
+            return None
+        self.teto_embb_mbit = min(teto_embb_max_mbit, self.teto_embb_mbit + passo_aumento_mbit)
+        self.garantia_urllc_mbit = max(garantia_urllc_base_mbit, self.garantia_urllc_mbit - passo_garantia_mbit)
+        return self._ajuste(agora, 'aumentar', latencia_ms)
+
+    def estado(self):
+        """Árvore instalada, teto e garantia atuais, para repor() se um ajuste não chegar ao kernel."""
+        return self.ativo, self.teto_embb_mbit, self.garantia_urllc_mbit
+
+    def repor(self, estado):
+        """Volta ao estado de antes de um ajuste que o tc recusou (o intervalo até ao próximo mantém-se)."""
+        self.ativo, self.teto_embb_mbit, self.garantia_urllc_mbit = estado
+        self._inicio_calma = None
+
+    def antecipar(self, latencia_prevista_ms, agora=None):
+        """
+        Instala a árvore antes do cruzamento previsto, com a redução de uma primeira violação.
+
+        Só com a árvore desligada: instalada, o AIMD já segue a latência medida. Devolve
+        um Ajuste com motivo 'antecipar' (latencia_ms é a prevista), ou None.
+        """
+        if self.ativo:
+            return None
+        if agora is None:
+            agora = time.monotonic()
+        self.teto_embb_mbit = max(teto_embb_min_mbit, self.teto_embb_mbit * fator_reducao)
+        self.garantia_urllc_mbit = min(garantia_urllc_max_mbit, self.garantia_urllc_mbit * fator_garantia)
+        self.ativo = True
+        self._inicio_calma = None
+        return self._ajuste(agora, 'antecipar', latencia_prevista_ms)
@@ -1,37 +1,203 @@
 import time
 import os
+import queue
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import canal_alerta
+import classificacao_fluxos
+import controlador_adaptativo
+import estrategias_qdisc
+import previsao_latencia
+import telemetria
 
 # --- Configurações ---
-intervalo_verificacao = 5 # Segundos
+modo_controle = 'adaptativo' # 'adaptativo' (AIMD sobre a latência medida) ou 'binario' (liga/desliga a árvore fixa)
+# 'ativo': no modo adaptativo, instala a árvore quando o previsor (previsao_latencia) prevê que o
+# limiar vai ser cruzado dentro de horizonte_previsao_s, sem esperar pela violação
+modo_previsao = 'desligado'
+horizonte_previsao_s = previsao_latencia.horizonte_s
+intervalo_verificacao = 5 # Segundos (reserva: os alertas chegam pelo canal_alerta)
 porta_urllc = 5202
 porta_embb = 5201 # Porta padrão do iperf
+portas_embb_adicionais = list(range(5210, 5225))  # Servidores eMBB extra: sessões em simultâneo dos perfis de carga
+# Tabela fatia -> portas TCP/UDP de onde são gerados os filtros (ver classificacao_fluxos;
+# o ICMP e o ARP seguem sempre a fatia uRLLC). Acrescentar portas não aumenta o custo por
+# pacote nos modos 'hash' e 'dscp'.
+fluxos_fatias = {
+    estrategias_qdisc.URLLC: [porta_urllc],
+    estrategias_qdisc.EMBB: [porta_embb] + portas_embb_adicionais,
+}
+host_estabilizacao = 'h_uRLLC1'  # Host e destino do ping após aplicar as regras
+ip_estabilizacao = '172.18.1.1'
+
+# Disciplina de filas aplicada no alerta (ver estrategias_qdisc.ESTRATEGIAS): 'htb_sfq',
+# 'htb_fq_codel', 'fq_codel', 'prio_fq_codel' ou 'cake'
+estrategia_qdisc = 'htb_sfq'
+estrategias_interface = {}  # Nome da interface (ou do roteador) -> estratégia, sobrepõe estrategia_qdisc
+
+# Classes filhas da árvore HTB (minor do classid -> parâmetros). Nas estratégias HTB, 'folha'
+# escolhe a qdisc da fatia (ex. 'fq_codel'); por omissão a da estratégia.
+classes_htb = {
+    10: {'rate': '5mbit', 'ceil': '20mbit', 'prio': 1},   # uRLLC, ICMP e ARP
+    20: {'rate': '10mbit', 'ceil': '15mbit', 'prio': 2},  # eMBB
+    30: {'rate': '1mbit', 'ceil': '5mbit', 'prio': 3},    # Restante (classe por omissão)
+}
+
+# Interfaces onde as regras são aplicadas: 'forward' filtra por porta de destino, 'backward' por porta de origem.
+# 'marcacao': interfaces de entrada nas bordas (e campo da porta) onde o modo de classificação
+# 'dscp' marca os pacotes.
+# Valores da topologia original; a topologia substitui-os pelo mapa derivado da sua especificação
+# (topologia_parametrica.Topologia.mapa_interfaces).
+interfaces_map = {
+    'r_trans1': { 'forward': ['r_trans1-eth1'], 'backward': ['r_trans1-eth0'], 'marcacao': {'r_trans1-eth0': 'dport'} },
+    'r_trans2': { 'forward': ['r_trans2-eth1'], 'backward': ['r_trans2-eth0'], 'marcacao': {'r_trans2-eth0': 'dport'} },
+    'r_trans3': { 'forward': ['r_trans3-eth2'], 'backward': ['r_trans3-eth0', 'r_trans3-eth1'] },
+    'r_trans4': { 'forward': ['r_trans4-eth1'], 'backward': ['r_trans4-eth0'], 'marcacao': {'r_trans4-eth1': 'sport'} }
+}
+
+# 'todas': a árvore vai para todas as interfaces do interfaces_map; 'gargalo': só para as interfaces que o
+# localizador (localizacao_gargalo) aponta como congestionadas, e depois para as que o passem a estar
+alcance_qos = 'todas'
+localizador = None  # LocalizadorGargalo, criado pela topologia quando alcance_qos = 'gargalo'
 
 # Flag para saber se as regras de QoS já foram aplicadas
 regras_qos_ativas = False
+# Interfaces com a árvore instalada, por roteador
+interfaces_qos = {}
+# Custo de cada atuação: (tipo, interfaces) com tipo 0 aplicar, 1 alterar, 2 remover (ver QOS_INTERFACES)
+custos_atuacao = []
+
+# Tempos de reação (deteção no monitor -> regras aplicadas/removidas), em ms
+tempos_reacao_ms = {canal_alerta.ALERTA: [], canal_alerta.NORMAL: []}
+
+# Eventos do controlador no ficheiro de telemetria partilhado (aberto em iniciar_loop_controle)
+escritor_telemetria = None
+
+# Atraso de fila por interface vindo do amostrador_tc (outra thread): ((roteador, interface), t, ms)
+filas_observadas = queue.SimpleQueue()
+
+# Marca com que a shell devolve o código de saída do tc a seguir à sua saída
+marca_estado_tc = 'tc_estado='
+
+def executar_lote_tc(roteador, comandos, forcar=False):
+    """
+    Executa uma lista de comandos tc (sem o prefixo 'tc') numa única chamada 'tc -batch'.
+
+    Uma só ida e volta à shell do nó Mininet em vez de uma por comando. Sem forcar o lote
+    para no primeiro erro; forcar (-force) serve só às remoções best-effort, cujos erros são
+    esperados (ex.: apagar uma qdisc que não existe). Devolve (sucesso, saída do tc).
+    """
+    if not comandos:
+        return True, ''
+    with tempfile.NamedTemporaryFile('w', prefix=f'tc_{roteador.name}_', suffix='.batch', delete=False) as f:
+        f.write('\n'.join(comandos) + '\n')
+        caminho_lote = f.name
+    try:
+        saida = roteador.cmd(f'tc {"-force " if forcar else ""}-batch {caminho_lote} 2>&1; echo {marca_estado_tc}$?')
+    finally:
+        os.remove(caminho_lote)
+    saida, _, estado = saida.rpartition(marca_estado_tc)
+    return estado.strip() == '0', saida.strip()
+
+def remocoes_iniciais(comandos):
+    """Número de comandos 'del' no início de um lote (a limpeza best-effort antes de construir)."""
+    return next((i for i, comando in enumerate(comandos) if comando.split()[1] != 'del'), len(comandos))
+
+def executar_em_paralelo(roteadores, funcao):
+    """Executa funcao(roteador) em todos os roteadores em simultâneo e devolve {nome: resultado}."""
+    if not roteadores:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(roteadores)) as executor:
+        resultados = executor.map(funcao, roteadores)
+        return {roteador.name: resultado for roteador, resultado in zip(roteadores, resultados)}
+
+def estrategia_da_interface(nome_roteador, nome_iface):
+    """Estratégia de qdisc de uma interface: a da interface, a do roteador ou a global."""
+    nome = estrategias_interface.get(nome_iface, estrategias_interface.get(nome_roteador, estrategia_qdisc))
+    return estrategias_qdisc.obter_estrategia(nome)
+
+def interfaces_controladas(nome_roteador):
+    """Interfaces do roteador no interfaces_map com a direção do filtro de cada uma (forward primeiro)."""
+    mapa = interfaces_map.get(nome_roteador, {})
+    return [(i, 'dport') for i in mapa.get('forward', [])] + [(i, 'sport') for i in mapa.get('backward', [])]
+
+def interfaces_alvo():
+    """{roteador: {interfaces}} onde instalar a árvore, segundo alcance_qos."""
+    todas = {nome: {i for i, _ in interfaces_controladas(nome)} for nome in interfaces_map}
+    if alcance_qos != 'gargalo' or localizador is None:
+        return todas
+    alvo, fonte = localizador.localizar()
+    alvo = {nome: ifaces & todas[nome] for nome, ifaces in alvo.items() if ifaces & todas.get(nome, set())}
+    if not alvo:
+        print("    - Gargalo não localizado: a árvore vai para todas as interfaces.")
+        return todas
+    print(f"    - Gargalo localizado ({fonte}): {', '.join(sorted(i for ifaces in alvo.values() for i in ifaces))}")
+    return alvo
+
+def apontar_gargalo(evento):
+    """Passa ao localizador o caminho do monitor que motivou a atuação (de onde partem as sondas por salto)."""
+    if localizador is not None:
+        localizador.apontar(evento.get('origem') if evento else None)
+
+def registrar_custo(tipo, interfaces):
+    """Regista em quantas interfaces correu uma atuação (0 aplicar, 1 alterar, 2 remover)."""
+    custos_atuacao.append((tipo, interfaces))
+    registrar_evento(telemetria.QOS_INTERFACES, interfaces, tipo)
+
+def instalar_regras_qos(roteadores, alvo, marcar=True):
+    """
+    Instala a árvore nas interfaces de alvo ({roteador: {interfaces}}), em paralelo por roteador.
+
+    Tudo ou nada: se alguma interface falhar, as que esta chamada instalou são também
+    removidas e a função devolve False (o chamador não dá as regras por ativas).
+    """
+    marcar = marcar and classificacao_fluxos.modo_classificacao == 'dscp'
+    roteadores = [r for r in roteadores if r.name in interfaces_map
+                  and (alvo.get(r.name) or (marcar and interfaces_map[r.name].get('marcacao')))]
+    resultados = executar_em_paralelo(roteadores,
+                                      lambda r: aplicar_qdisc_em_roteador(r, alvo.get(r.name, set()), marcar))
+    for nome, (sucesso, _, duracao) in resultados.items():
+        print(f"    - {nome}: regras {'aplicadas' if sucesso else 'NÃO aplicadas'} em {duracao * 1000:.1f} ms")
+    if not all(sucesso for sucesso, _, _ in resultados.values()):
+        executar_em_paralelo(roteadores, lambda r: executar_lote_tc(r, resultados[r.name][1], forcar=True))
+        print("[ALERTA] Falha do tc: árvore desfeita em todas as interfaces desta atuação.")
+        return False
+    for nome, ifaces in alvo.items():
+        interfaces_qos.setdefault(nome, set()).update(ifaces)
+    instaladas = sum(len(ifaces) for ifaces in alvo.values())
+    total = sum(len(interfaces_controladas(nome)) for nome in interfaces_map)
+    print(f"    - Árvore em {instaladas} de {total} interfaces (alcance '{alcance_qos}')")
+    registrar_custo(0, instaladas)
+    return True
+
+def estender_regras_qos(roteadores):
+    """
+    Alcance 'gargalo' com a árvore já instalada: acrescenta-a às interfaces que o amostrador_tc
+    mostra congestionadas e ainda não a têm (sem sondas por salto, que atrasariam o ajuste).
+    """
+    if alcance_qos != 'gargalo' or localizador is None:
+        return
+    alvo, _ = localizador.localizar(sondas=False)
+    novas = {nome: ifaces - interfaces_qos.get(nome, set())
+             for nome, ifaces in alvo.items() if nome in interfaces_map}
+    novas = {nome: ifaces & {i for i, _ in interfaces_controladas(nome)} for nome, ifaces in novas.items()}
+    novas = {nome: ifaces for nome, ifaces in novas.items() if ifaces}
+    if novas:
+        print(f">>> Gargalo em novas interfaces: {', '.join(sorted(i for ifaces in novas.values() for i in ifaces))}")
+        instalar_regras_qos(roteadores, novas, marcar=False)
 
 def aplicar_regras_qos_bidirecional(roteadores, net):
-    """Aplica regras de QoS HTB+SFQ para garantir baixa latência."""
-    print(">>> ALERTA DETETADO! Aplicando regras de QoS FINAIS (HTB+SFQ)...")
-    
-    interfaces_map = {
-        'r_trans1': { 'forward': ['r_trans1-eth1'], 'backward': ['r_trans1-eth0'] },
-        'r_trans2': { 'forward': ['r_trans2-eth1'], 'backward': ['r_trans2-eth0'] },
-        'r_trans3': { 'forward': ['r_trans3-eth2'], 'backward': ['r_trans3-eth0', 'r_trans3-eth1'] },
-        'r_trans4': { 'forward': ['r_trans4-eth1'], 'backward': ['r_trans4-eth0'] }
-    }
-
-    for roteador in roteadores:
-        if roteador.name not in interfaces_map:
-            continue
-        for nome_iface in interfaces_map[roteador.name].get('forward', []):
-            aplicar_htb_sfq_em_interface(roteador, nome_iface, 'dport')
-        for nome_iface in interfaces_map[roteador.name].get('backward', []):
-            aplicar_htb_sfq_em_interface(roteador, nome_iface, 'sport')
+    """Aplica as regras de QoS (estratégia de qdisc configurada) para garantir baixa latência."""
+    print(f">>> ALERTA DETETADO! Aplicando regras de QoS FINAIS ({estrategia_qdisc})...")
+
+    if not instalar_regras_qos(roteadores, interfaces_alvo()):
+        return False
     
     print("    - Regras de QoS finais aplicadas. A estabilizar a rede...")
     try:
-        h_uRLLC1 = net.get('h_uRLLC1')
-        h_uRLLC1.cmdPrint('ping -c 1 172.18.1.1')
+        h_uRLLC1 = net.get(host_estabilizacao)
+        h_uRLLC1.cmdPrint(f'ping -c 1 {ip_estabilizacao}')
     except Exception as e:
         print(f"    - Aviso: Falha ao executar ping de estabilização: {e}")
         
@@ -39,76 +205,336 @@ def aplicar_regras_qos_bidirecional(roteadores, net):
             
     return True
 
-def aplicar_htb_sfq_em_interface(roteador, nome_iface, direcao_filtro):
-    """Função auxiliar para aplicar a lógica HTB+SFQ numa interface."""
+def aplicar_qdisc_em_roteador(roteador, interfaces=None, marcar=True):
+    """
+    Aplica a estratégia de cada interface do roteador (todas as do interfaces_map, ou só as de
+    interfaces). As remoções iniciais de todas vão num lote com -force; a construção de cada
+    interface num lote próprio que para no primeiro erro. Uma interface que falhe é reposta
+    (qdisc del) e reportada.
+
+    Returns:
+        tuple: (sucesso, comandos que removem o que ficou instalado, duração em segundos).
+    """
+    inicio = time.monotonic()
+    lotes = []  # (descrição, comandos, remoção)
+    for nome_iface, direcao_filtro in interfaces_controladas(roteador.name):
+        if interfaces is None or nome_iface in interfaces:
+            lotes.append((nome_iface, comandos_qdisc(roteador, nome_iface, direcao_filtro),
+                          f'qdisc del dev {nome_iface} root'))
+    if marcar and classificacao_fluxos.modo_classificacao == 'dscp':
+        for nome_iface, direcao_filtro in interfaces_map[roteador.name].get('marcacao', {}).items():
+            lotes.append((f'{nome_iface} (marcação)',
+                          classificacao_fluxos.comandos_marcacao(nome_iface, direcao_filtro, fluxos_fatias),
+                          f'qdisc del dev {nome_iface} clsact'))
+
+    executar_lote_tc(roteador, [c for _, comandos, _ in lotes for c in comandos[:remocoes_iniciais(comandos)]],
+                     forcar=True)
+    sucesso, instaladas = True, []
+    for descricao, comandos, remocao in lotes:
+        ok, saida = executar_lote_tc(roteador, comandos[remocoes_iniciais(comandos):])
+        if ok:
+            instaladas.append(remocao)
+            continue
+        sucesso = False
+        executar_lote_tc(roteador, [remocao], forcar=True)
+        print(f"[ALERTA] tc falhou em {roteador.name}-{descricao}; interface reposta: {saida or 'sem saída'}")
+    return sucesso, instaladas, time.monotonic() - inicio
+
+def comandos_qdisc(roteador, nome_iface, direcao_filtro):
+    """Gera o lote tc da estratégia de qdisc configurada para uma interface."""
     iface = roteador.intf(nome_iface)
-    if not iface: return
+    if not iface: return []
 
-    print(f"    - Aplicando regras em {roteador.name}-{iface.name} (filtro por {direcao_filtro})")
-    
-    bw = iface.params.get('bw', 100)
-    if bw is None: bw = 100
-    rate_mbit = int(bw * 0.95)
-
-    cmds = [
-        f'tc qdisc del dev {iface.name} root 2> /dev/null',
-        # 1. Adiciona a qdisc HTB principal
-        f'tc qdisc add dev {iface.name} root handle 1: htb default 30',
-        # 2. Adiciona a classe pai
-        f'tc class add dev {iface.name} parent 1: classid 1:1 htb rate {rate_mbit}mbit',
-        
-        # 3. Adiciona as classes filhas para cada tipo de tráfego
-        f'tc class add dev {iface.name} parent 1:1 classid 1:10 htb rate 5mbit ceil 20mbit prio 1',
-        f'tc class add dev {iface.name} parent 1:1 classid 1:20 htb rate 10mbit ceil 15mbit prio 2',
-        f'tc class add dev {iface.name} parent 1:1 classid 1:30 htb rate 1mbit ceil 5mbit prio 3',
-
-        # --- LÓGICA FINAL ---
-        # 4. Anexa uma qdisc SFQ a cada classe HTB para evitar bufferbloat dentro da classe.
-        f'tc qdisc add dev {iface.name} parent 1:10 handle 10: sfq perturb 10',
-        f'tc qdisc add dev {iface.name} parent 1:20 handle 20: sfq perturb 10',
-        f'tc qdisc add dev {iface.name} parent 1:30 handle 30: sfq perturb 10',
-        
-        # 5. Adiciona os filtros para direcionar o tráfego para as classes HTB corretas
-        f'tc filter add dev {iface.name} protocol ip parent 1:0 prio 1 u32 match ip protocol 1 0xff flowid 1:10',
-        f'tc filter add dev {iface.name} protocol arp parent 1:0 prio 1 flowid 1:10',
-        f'tc filter add dev {iface.name} protocol ip parent 1:0 prio 1 u32 match ip {direcao_filtro} {porta_urllc} 0xffff flowid 1:10',
-        f'tc filter add dev {iface.name} protocol ip parent 1:0 prio 2 u32 match ip {direcao_filtro} {porta_embb} 0xffff flowid 1:20'
-    ]
-    for cmd in cmds:
-        roteador.cmd(cmd)
+    estrategia = estrategia_da_interface(roteador.name, iface.name)
+    print(f"    - Aplicando regras em {roteador.name}-{iface.name} ({estrategia.nome}, filtro por {direcao_filtro})")
+
+    return estrategia.comandos(iface.name, iface.params.get('bw'), classes_htb, direcao_filtro, fluxos_fatias)
+
+def alterar_classes_htb(roteadores, alteracoes):
+    """
+    Altera rate/ceil de classes HTB já instaladas, sem recriar a árvore.
+
+    'tc class change' atua no lugar, preservando os pacotes em fila (apagar e
+    recriar a qdisc descarta-os). Interfaces cuja estratégia não tem as classes
+    de classes_htb (ex. cake, fq_codel) ficam como estão.
+
+    Args:
+        roteadores (list): Roteadores com a árvore HTB instalada.
+        alteracoes (dict): minor do classid -> parâmetros a mudar, ex. {20: {'ceil': '30mbit'}}.
 
+    Returns:
+        bool: True se o tc aceitou a alteração em todos os roteadores.
+        Senão as classes voltam aos valores anteriores e classes_htb fica como estava.
+    """
+    novas = {minor: dict(classes_htb[minor], **parametros) for minor, parametros in alteracoes.items()}
+
+    def ajustaveis(roteador):
+        return [nome_iface for nome_iface, _ in interfaces_controladas(roteador.name)
+                if nome_iface in interfaces_qos.get(roteador.name, ())
+                and estrategia_da_interface(roteador.name, nome_iface).ajustavel]
+
+    def comandos_change(roteador, classes):
+        return [f"class change dev {nome_iface} parent 1:1 classid 1:{minor} htb "
+                f"rate {classe['rate']} ceil {classe['ceil']} prio {classe['prio']}"
+                for nome_iface in ajustaveis(roteador) for minor, classe in classes.items()]
+
+    def alterar(roteador):
+        inicio = time.monotonic()
+        ok, saida = executar_lote_tc(roteador, comandos_change(roteador, novas))
+        if not ok:
+            print(f"[ALERTA] tc class change falhou em {roteador.name}: {saida or 'sem saída'}")
+        return ok, time.monotonic() - inicio
+
+    roteadores = [r for r in roteadores if r.name in interfaces_map]
+    registrar_custo(1, sum(len(ajustaveis(r)) for r in roteadores))
+    resultados = executar_em_paralelo(roteadores, alterar)
+    for nome, (ok, duracao) in resultados.items():
+        print(f"    - {nome}: classes {'alteradas' if ok else 'NÃO alteradas'} em {duracao * 1000:.1f} ms")
+    if not all(ok for ok, _ in resultados.values()):
+        # Os lotes param no primeiro erro, já com parte das classes mudadas: repõe os valores em vigor
+        anteriores = {minor: classes_htb[minor] for minor in alteracoes}
+        executar_em_paralelo(roteadores, lambda r: executar_lote_tc(r, comandos_change(r, anteriores), forcar=True))
+        print("[ALERTA] Falha do tc: classes repostas nos valores anteriores em todas as interfaces.")
+        return False
+    # Só depois de o kernel as aceitar: a próxima instalação completa parte destes valores
+    for minor, classe in novas.items():
+        classes_htb[minor].update(classe)
+    return True
+
+
+def interfaces_a_remover(roteador):
+    """No alcance 'gargalo' só as interfaces com a árvore; senão todas as do roteador, exceto loopback."""
+    if alcance_qos == 'gargalo':
+        return [nome for nome, _ in interfaces_controladas(roteador.name)
+                if nome in interfaces_qos.get(roteador.name, ())]
+    return [iface.name for iface in roteador.intfList() if 'lo' not in str(iface)]
 
 def remover_regras_qos(roteadores):
-    """Remove as regras de QoS de todas as interfaces, voltando ao padrão."""
+    """Remove as regras de QoS das interfaces onde podem estar, voltando ao padrão."""
     print("<<< LATÊNCIA NORMALIZADA. Removendo regras de QoS...")
-    for roteador in roteadores:
-        interfaces = [iface for iface in roteador.intfList() if 'lo' not in str(iface)]
-        for iface in interfaces:
-            print(f"    - Removendo regras de {roteador.name}-{iface.name}")
-            roteador.cmd(f'tc qdisc del dev {iface.name} root 2>/dev/null')
+
+    def remover(roteador):
+        inicio = time.monotonic()
+        interfaces = interfaces_a_remover(roteador)
+        for nome in interfaces:
+            print(f"    - Removendo regras de {roteador.name}-{nome}")
+        comandos = [f'qdisc del dev {nome} root' for nome in interfaces]
+        # Marcação DSCP das bordas (modo 'dscp')
+        comandos += [f'qdisc del dev {nome} clsact' for nome in interfaces_map.get(roteador.name, {}).get('marcacao', {})]
+        executar_lote_tc(roteador, comandos, forcar=True)
+        return time.monotonic() - inicio
+
+    registrar_custo(2, sum(len(interfaces_a_remover(r)) for r in roteadores))
+    for nome, duracao in executar_em_paralelo(roteadores, remover).items():
+        print(f"    - {nome}: regras removidas em {duracao * 1000:.1f} ms")
+    interfaces_qos.clear()
     return False
 
+def registrar_evento(metrica, valor, canal=0):
+    """Escreve um evento na telemetria, se o loop de controlo a tiver aberto."""
+    if escritor_telemetria is not None:
+        escritor_telemetria.registrar(metrica, valor, canal)
+
+def registrar_inicio_atuacao(tipo):
+    """Marca na telemetria o início de uma atuação tc (0 aplicar, 1 alterar, 2 remover) e devolve o instante."""
+    registrar_evento(telemetria.QOS_INICIO, 0.0, tipo)
+    return time.monotonic()
+
+def registrar_tempo_reacao(evento):
+    """Mede o tempo entre a deteção no monitor e a conclusão da atuação."""
+    if evento is None:
+        return  # Mudança detetada pelo ficheiro: não há instante de deteção
+    reacao_ms = (time.monotonic() - evento['t_deteccao_mono']) * 1000
+    tempos_reacao_ms[evento['tipo']].append(reacao_ms)
+    registrar_evento(telemetria.REACAO_MS, reacao_ms)
+    latencia = evento.get('latencia_ms')
+    latencia_txt = f" (latência medida: {latencia:.2f} ms)" if latencia is not None else ""
+    print(f"    - Tempo de reação ({evento['tipo']}): {reacao_ms:.1f} ms{latencia_txt}")
+
+def resumo_tempos_reacao():
+    for tipo, tempos in tempos_reacao_ms.items():
+        if tempos:
+            print(f"    - Reação a '{tipo}': {len(tempos)} eventos, "
+                  f"min {min(tempos):.1f} ms, média {sum(tempos) / len(tempos):.1f} ms, máx {max(tempos):.1f} ms")
+
+def resumo_custo_atuacao():
+    if custos_atuacao:
+        por_tipo = [sum(n for t, n in custos_atuacao if t == tipo) for tipo in range(3)]
+        print(f"    - Custo de atuação (alcance '{alcance_qos}'): {sum(por_tipo)} interfaces "
+              f"(aplicar {por_tipo[0]}, alterar {por_tipo[1]}, remover {por_tipo[2]})")
+
+def aplicar_ajuste(roteadores, net, ajuste, evento):
+    """
+    Aplica um Ajuste do controlador adaptativo: instala, altera no lugar ou remove a árvore.
+
+    Só as estratégias HTB (ajustavel) seguem o teto e a garantia; as restantes são
+    instaladas no primeiro ajuste e removidas na libertação. Devolve False se o tc
+    recusou a instalação ou a alteração: nada é registado e o chamador deve repor o
+    controlador no estado anterior.
+    """
+    global regras_qos_ativas
+
+    instante = time.time()
+    inicio = time.monotonic()
+    apontar_gargalo(evento)
+    sucesso = True
+    if ajuste.motivo == 'liberar':
+        registrar_inicio_atuacao(2)
+        regras_qos_ativas = remover_regras_qos(roteadores)
+        registrar_evento(telemetria.QOS_REMOVIDO, (time.monotonic() - inicio) * 1000)
+        registrar_tempo_reacao(dict(evento, tipo=canal_alerta.NORMAL))
+    else:
+        # O rate (garantia) de uma classe HTB não pode exceder o seu ceil
+        rate_embb = min(ajuste.teto_embb_mbit, controlador_adaptativo.garantia_embb_mbit)
+        classe_urllc = {'rate': f'{ajuste.garantia_urllc_mbit:.1f}mbit'}
+        classe_embb = {'rate': f'{rate_embb:.1f}mbit', 'ceil': f'{ajuste.teto_embb_mbit:.1f}mbit'}
+        if regras_qos_ativas:
+            registrar_inicio_atuacao(1)
+            estender_regras_qos(roteadores)
+            sucesso = alterar_classes_htb(roteadores, {10: classe_urllc, 20: classe_embb})
+            if sucesso:
+                registrar_evento(telemetria.QOS_ALTERADO, (time.monotonic() - inicio) * 1000)
+        else:
+            registrar_inicio_atuacao(0)
+            anteriores = {minor: dict(classes_htb[minor]) for minor in (10, 20)}
+            classes_htb[10].update(classe_urllc)
+            classes_htb[20].update(classe_embb)
+            regras_qos_ativas = sucesso = aplicar_regras_qos_bidirecional(roteadores, net)
+            if sucesso:
+                registrar_evento(telemetria.QOS_APLICADO, (time.monotonic() - inicio) * 1000)
+                registrar_tempo_reacao(dict(evento, tipo=canal_alerta.ALERTA))
+            else:
+                for minor, classe in anteriores.items():
+                    classes_htb[minor].update(classe)
+    duracao_ms = (time.monotonic() - inicio) * 1000
+
+    if not sucesso:
+        print(f"[ALERTA] Ajuste '{ajuste.motivo}' não aplicado (tc falhou em {duracao_ms:.1f} ms): "
+              f"teto e garantia anteriores mantidos.")
+        return False
+    registrar_evento(telemetria.TETO_EMBB_MBIT, ajuste.teto_embb_mbit)
+    registrar_evento(telemetria.GARANTIA_URLLC_MBIT, ajuste.garantia_urllc_mbit)
+    latencia = f"{ajuste.latencia_ms:.2f} ms" if ajuste.latencia_ms is not None else "perda"
+    if ajuste.motivo == 'antecipar':
+        latencia = f"prevista {latencia} a {horizonte_previsao_s:g} s"
+    carimbo = time.strftime('%H:%M:%S', time.localtime(instante)) + f".{int(instante * 1000) % 1000:03d}"
+    print(f"[{carimbo}] Ajuste '{ajuste.motivo}' (latência {latencia}): "
+          f"teto eMBB {ajuste.teto_embb_mbit:.1f} Mbit/s, garantia uRLLC {ajuste.garantia_urllc_mbit:.1f} Mbit/s "
+          f"(tc em {duracao_ms:.1f} ms)")
+    return True
+
+def observar_filas(roteador, por_interface, t_ns):
+    """
+    Observador do amostrador_tc: passa ao previsor o atraso de fila de cada interface
+    controlada (maior backlog das suas qdiscs, a raiz inclui as filhas, à taxa da ligação).
+    """
+    if modo_previsao != 'ativo':
+        return
+    controladas = interfaces_map.get(roteador.name, {})
+    for iface, elementos in por_interface.items():
+        bw = roteador.intf(iface).params.get('bw')
+        if not bw or iface not in controladas.get('forward', []) + controladas.get('backward', []):
+            continue
+        backlog = max((c.get('backlog', 0) for tipo, _, _, c in elementos if tipo == 'qdisc'), default=0)
+        filas_observadas.put(((roteador.name, iface), t_ns / 1e9, previsao_latencia.atraso_fila_ms(backlog, bw)))
+
+def alimentar_previsor(previsor, amostras):
+    """Passa ao previsor as janelas do monitor (as só com perdas ficam de fora) e as filas observadas."""
+    for e in amostras:
+        if e['latencia_ms'] is not None:
+            previsor.adicionar_rtt(e['t_deteccao_mono'], e['latencia_ms'])
+    while not filas_observadas.empty():
+        previsor.adicionar_fila(*filas_observadas.get())
+
+def antecipar(controlador, previsor):
+    """Ajuste 'antecipar' se o previsor prevê um cruzamento do limiar dentro do horizonte, senão None."""
+    prevista = previsor.avaliar()
+    if prevista is None:
+        return None
+    registrar_evento(telemetria.QOS_ANTECIPADO, prevista)
+    return controlador.antecipar(prevista)
+
+def loop_adaptativo(roteadores, net, canal):
+    """Alimenta o ControladorAIMD com as amostras de latência do monitor e aplica cada ajuste."""
+    controlador = controlador_adaptativo.ControladorAIMD()
+    previsor = None
+    if modo_previsao == 'ativo':
+        previsor = previsao_latencia.PrevisorLatencia(controlador.limiar_ms, horizonte_previsao_s)
+    while True:
+        amostras = [e for e in canal.receber(timeout=intervalo_verificacao)
+                    if e['tipo'] == canal_alerta.AMOSTRA]
+        if not amostras:
+            continue
+        # Várias janelas pendentes: decide pela pior (None = todas as sondas perdidas)
+        latencias = [e['latencia_ms'] for e in amostras]
+        pior = None if None in latencias else max(latencias)
+        origem = amostras[latencias.index(pior)].get('origem')
+        estado = controlador.estado()
+        ajuste = controlador.atualizar(pior)
+        if previsor is not None:
+            alimentar_previsor(previsor, amostras)
+            # Com a árvore instalada, o AIMD já segue a latência medida
+            if ajuste is None and not controlador.ativo:
+                ajuste = antecipar(controlador, previsor)
+        if ajuste is not None and not aplicar_ajuste(roteadores, net, ajuste, dict(amostras[-1], origem=origem)):
+            # O kernel ficou como estava: o controlador também (o próximo ajuste volta a tentar)
+            controlador.repor(estado)
+
+def loop_binario(roteadores_para_controlar, net, canal, arquivo_alerta):
+    """Aplica a árvore fixa no alerta e remove-a no fim do período de calma do monitor."""
+    global regras_qos_ativas
+
+    while True:
+        # Acorda assim que o monitor envia um evento; o ficheiro de alerta só é
+        # consultado quando nada chega (monitor sem canal, ou evento perdido).
+        evento = canal.ultimo_estado(canal.receber(timeout=intervalo_verificacao))
+        if evento is not None:
+            alerta = evento['tipo'] == canal_alerta.ALERTA
+        else:
+            alerta = os.path.exists(arquivo_alerta)
+
+        if alerta:
+            if not regras_qos_ativas:
+                inicio = registrar_inicio_atuacao(0)
+                apontar_gargalo(evento)
+                regras_qos_ativas = aplicar_regras_qos_bidirecional(roteadores_para_controlar, net)
+                if regras_qos_ativas:
+                    registrar_evento(telemetria.QOS_APLICADO, (time.monotonic() - inicio) * 1000)
+                    registrar_tempo_reacao(evento)
+        else:
+            if regras_qos_ativas:
+                inicio = registrar_inicio_atuacao(2)
+                regras_qos_ativas = remover_regras_qos(roteadores_para_controlar)
+                registrar_evento(telemetria.QOS_REMOVIDO, (time.monotonic() - inicio) * 1000)
+                registrar_tempo_reacao(evento)
+
 def iniciar_loop_controle(roteadores_para_controlar, project_dir, net):
     """Loop principal que monitoriza o alerta e aciona o controlo."""
-    global regras_qos_ativas
+    global escritor_telemetria
     
     arquivo_alerta = os.path.join(project_dir, "latencia.alerta")
+    canal = canal_alerta.CanalAlerta(os.path.join(project_dir, canal_alerta.nome_socket_alerta))
+    escritor_telemetria = telemetria.EscritorTelemetria(
+        os.path.join(project_dir, telemetria.nome_arquivo_telemetria), 'controlador')
     
-    print("Controlador de QoS iniciado.")
+    print(f"Controlador de QoS iniciado (modo {modo_controle}).")
+    if modo_previsao == 'ativo' and modo_controle != 'adaptativo':
+        print("[INFO] Previsão de latência só atua no modo adaptativo; ignorada.")
     try:
-        while True:
-            if os.path.exists(arquivo_alerta):
-                if not regras_qos_ativas:
-                    regras_qos_ativas = aplicar_regras_qos_bidirecional(roteadores_para_controlar, net)
-            else:
-                if regras_qos_ativas:
-                    regras_qos_ativas = remover_regras_qos(roteadores_para_controlar)
-            
-            time.sleep(intervalo_verificacao)
+        if modo_controle == 'adaptativo':
+            loop_adaptativo(roteadores_para_controlar, net, canal)
+        else:
+            loop_binario(roteadores_para_controlar, net, canal, arquivo_alerta)
     except KeyboardInterrupt:
         print("\nParando loop de controlo.")
         if regras_qos_ativas:
             remover_regras_qos(roteadores_para_controlar)
+    finally:
+        canal.fechar()
+        escritor_telemetria.fechar()
+        escritor_telemetria = None
+        resumo_tempos_reacao()
+        resumo_custo_atuacao()
 
 if __name__ == '__main__':
     print("Este script deve ser importado.")
@@ -0,0 +1,307 @@
+import time
+
+import numpy as np
+
+# --- Configurações ---
+bits_subbaldes = 7      # 128 baldes por oitava: erro relativo dos percentis < 1/128 (0,8%)
+maximo_us = 2 ** 24     # Valores acima (16,7 s) ficam no último balde
+fatias_por_janela = 20  # Resolução com que a janela desliza (janela de 2 s: fatias de 100 ms)
+
+_LINEAR = 2 ** (bits_subbaldes + 1)  # Abaixo disto cada valor em µs tem o seu balde (exato)
+_SUB = 2 ** bits_subbaldes
+
+
+def indice_balde(valor_us):
+    """Balde de um valor inteiro em µs (escala log-linear, como num histograma HDR)."""
+    if valor_us < _LINEAR:
+        return max(valor_us, 0)
+    valor_us = min(valor_us, maximo_us - 1)
+    expoente = valor_us.bit_length() - (bits_subbaldes + 1)
+    return _LINEAR + (expoente - 1) * _SUB + (valor_us >> expoente) - _SUB
+
+
+def _valores_baldes():
+    """Valor representativo (ponto médio, em ms) de cada balde."""
+    n = indice_balde(maximo_us - 1) + 1
+    indices = np.arange(n)
+    expoente = np.maximum((indices - _LINEAR) // _SUB + 1, 0)
+    mantissa = np.where(indices < _LINEAR, indices, (indices - _LINEAR) % _SUB + _SUB)
+    inferior = mantissa << expoente
+    return (inferior + ((1 << expoente) - 1) / 2) / 1000.0
+
+
+_VALORES_MS = _valores_baldes()
+N_BALDES = len(_VALORES_MS)
+
+
+class JanelaDeslizante:
+    """
+    Estatísticas de latência dos últimos duracao_s segundos em memória constante.
+
+    A janela é um anel de fatias_por_janela histogramas HDR (mais contadores de perda e
+    de jitter por fatia) e um histograma com a soma de todas as fatias. Cada amostra custa
+    O(1); quando o tempo passa para a fatia seguinte, a fatia mais antiga é subtraída da
+    soma e reutilizada. Os percentis vêm da soma acumulada dos baldes (O(baldes)).
+
+    O jitter é a média de |RTT(n) - RTT(n-1)| entre sondas consecutivas recebidas na janela.
+    """
+
+    def __init__(self, duracao_s, fatias=None):
+        self.duracao_s = duracao_s
+        self.fatias = fatias or fatias_por_janela
+        self.duracao_fatia_s = duracao_s / self.fatias
+        self._histogramas = np.zeros((self.fatias, N_BALDES), dtype=np.int32)
+        self._total = np.zeros(N_BALDES, dtype=np.int64)
+        # Por fatia: sondas, perdidas, soma de |diferenças| e número de diferenças
+        self._contadores = [[0, 0, 0.0, 0] for _ in range(self.fatias)]
+        self._soma_contadores = [0, 0, 0.0, 0]
+        self._fatia_atual = None  # Número absoluto da fatia corrente
+        self._ultimo_rtt = None
+
+    def _avancar(self, t):
+        fatia = int(t // self.duracao_fatia_s)
+        if self._fatia_atual is None:
+            self._fatia_atual = fatia
+        # Esvazia as fatias que saíram da janela (no máximo todas)
+        for n in range(self._fatia_atual + 1, min(fatia, self._fatia_atual + self.fatias) + 1):
+            posicao = n % self.fatias
+            self._total -= self._histogramas[posicao]
+            self._histogramas[posicao] = 0
+            for i, valor in enumerate(self._contadores[posicao]):
+                self._soma_contadores[i] -= valor
+            self._contadores[posicao] = [0, 0, 0.0, 0]
+        self._fatia_atual = max(fatia, self._fatia_atual)
+        return self._fatia_atual % self.fatias
+
+    def adicionar(self, rtt_ms, t=None):
+        """Uma sonda: rtt_ms em ms, ou None se foi perdida. t em segundos (por omissão, time.monotonic())."""
+        posicao = self._avancar(time.monotonic() if t is None else t)
+        contadores, soma = self._contadores[posicao], self._soma_contadores
+        contadores[0] += 1
+        soma[0] += 1
+        if rtt_ms is None:
+            contadores[1] += 1
+            soma[1] += 1
+            return
+        balde = indice_balde(int(rtt_ms * 1000))
+        self._histogramas[posicao, balde] += 1
+        self._total[balde] += 1
+        if self._ultimo_rtt is not None:
+            diferenca = abs(rtt_ms - self._ultimo_rtt)
+            contadores[2] += diferenca
+            contadores[3] += 1
+            soma[2] += diferenca
+            soma[3] += 1
+        self._ultimo_rtt = rtt_ms
+
+    def atualizar(self, t=None):
+        """Faz a janela deslizar até t sem nova amostra (descarta as fatias antigas)."""
+        self._avancar(time.monotonic() if t is None else t)
+
+    @property
+    def amostras(self):
+        """Sondas na janela (recebidas e perdidas)."""
+        return int(self._soma_contadores[0])
+
+    @property
+    def recebidas(self):
+        return int(self._soma_contadores[0] - self._soma_contadores[1])
+
+    def percentis(self, ps):
+        """Latências (ms) dos percentis ps das sondas recebidas na janela (None se não houver)."""
+        n = self.recebidas
+        if n == 0:
+            return [None] * len(ps)
+        acumulado = np.cumsum(self._total)
+        # Menor balde cuja contagem acumulada atinge ceil(p% de n) (percentil "nearest rank")
+        posicoes = np.maximum(np.ceil(np.asarray(ps, dtype=float) / 100.0 * n), 1)
+        return [float(_VALORES_MS[i]) for i in np.searchsorted(acumulado, posicoes)]
+
+    def percentil(self, p):
+        return self.percentis([p])[0]
+
+    def maximo(self):
+        ocupados = np.flatnonzero(self._total)
+        return float(_VALORES_MS[ocupados[-1]]) if len(ocupados) else None
+
+    def perda_pct(self):
+        return 100.0 * self._soma_contadores[1] / self._soma_contadores[0] if self._soma_contadores[0] else 0.0
+
+    def jitter_ms(self):
+        return self._soma_contadores[2] / self._soma_contadores[3] if self._soma_contadores[3] else 0.0
+
+    def estatistica(self, nome):
+        """Valor de uma estatística pelo nome: 'p<N>' (ex. 'p99'), 'max', 'jitter_ms' ou 'perda_pct'."""
+        if nome.startswith('p') and nome[1:].replace('.', '', 1).isdigit():
+            return self.percentil(float(nome[1:]))
+        if nome == 'max':
+            return self.maximo()
+        if nome == 'jitter_ms':
+            return self.jitter_ms()
+        if nome == 'perda_pct':
+            return self.perda_pct()
+        raise ValueError(f"Estatística desconhecida: '{nome}' (use 'p<N>', 'max', 'jitter_ms' ou 'perda_pct')")
+
+
+class RegraSla:
+    """
+    Regra de alerta sobre uma estatística de uma janela deslizante.
+
+    Viola quando a estatística passa de limiar, com pelo menos minimo_amostras sondas na
+    janela (uma janela quase vazia não decide; nas estatísticas de latência contam só as
+    sondas recebidas). Só volta a cumprir abaixo de limiar * fracao_normal (histerese),
+    para que a regra não oscile na fronteira.
+    """
+
+    def __init__(self, estatistica, limiar, janela_s, minimo_amostras=1, fracao_normal=1.0):
+        self.estatistica = estatistica
+        self.limiar = limiar
+        self.janela_s = janela_s
+        self.minimo_amostras = minimo_amostras
+        self.fracao_normal = fracao_normal
+
+    def __repr__(self):
+        return f"{self.estatistica}({self.janela_s:g} s) > {self.limiar:g}"
+
+    def avaliar(self, janela):
+        """(violada, cumprida, valor): violada e cumprida são ambas falsas na zona de histerese."""
+        amostras = janela.amostras if self.estatistica == 'perda_pct' else janela.recebidas
+        if amostras < self.minimo_amostras:
+            return False, False, None
+        valor = janela.estatistica(self.estatistica)
+        if valor is None:
+            # Nenhuma sonda recebida: só a regra de perda decide
+            return False, False, None
+        return valor > self.limiar, valor <= self.limiar * self.fracao_normal, valor
+
+
+class MotorSla:
+    """
+    Avalia um conjunto de regras, cada uma sobre a janela da sua duração (partilhada
+    entre regras com a mesma janela_s).
+
+    O alerta dispara quando alguma regra viola; termina quando todas as regras estão
+    cumpridas sem interrupção durante periodo_normal_s. Uma avaliação em que alguma regra
+    não está cumprida (violação ou histerese) recomeça a contagem.
+    """
+
+    def __init__(self, regras, periodo_normal_s):
+        self.regras = regras
+        self.periodo_normal_s = periodo_normal_s
+        self.janelas = {}
+        for regra in regras:
+            self.janelas.setdefault(regra.janela_s, JanelaDeslizante(regra.janela_s))
+        self.alerta_ativo = False
+        self._inicio_normal = None
+
+    def adicionar(self, rtt_ms, t=None):
+        t = time.monotonic() if t is None else t
+        for janela in self.janelas.values():
+            janela.adicionar(rtt_ms, t)
+
+    def avaliar(self, t=None):
+        """
+        Devolve ('alerta', índice da regra, valor), ('normal', None, None) ou None.
+
+        'alerta' quando o alerta começa (regra violada com o seu valor) e 'normal'
+        quando termina; None se o estado não mudou.
+        """
+        t = time.monotonic() if t is None else t
+        todas_cumpridas = True
+        for indice, regra in enumerate(self.regras):
+            janela = self.janelas[regra.janela_s]
+            janela.atualizar(t)
+            violada, cumprida, valor = regra.avaliar(janela)
+            if violada and not self.alerta_ativo:
+                self.alerta_ativo, self._inicio_normal = True, None
+                return 'alerta', indice, valor
+            todas_cumpridas = todas_cumpridas and cumprida
+        if not self.alerta_ativo:
+            return None
+        if not todas_cumpridas:
+            self._inicio_normal = None
+        elif self._inicio_normal is None:
+            self._inicio_normal = t
+        elif t - self._inicio_normal >= self.periodo_normal_s:
+            self.alerta_ativo, self._inicio_normal = False, None
+            return 'normal', None, None
+        return None
+
+    def em_calma_desde(self):
+        """Instante (monotónico) em que começou a calma em curso, ou None."""
+        return self._inicio_normal
+
+
+class MotorSlaFatia:
+    """
+    Estado do SLA de uma fatia observada por vários caminhos (host de origem -> destino),
+    cada um com o seu MotorSla e as suas janelas.
+
+    O SLA de uma fatia é o do seu pior caminho: a fatia entra em alerta quando o primeiro
+    caminho viola e só volta ao normal quando nenhum caminho está em alerta. Cada caminho
+    conta a calma por si, pelo que um caminho calmo não esconde outro congestionado.
+    """
+
+    def __init__(self, caminhos, regras, periodo_normal_s):
+        self.regras = regras
+        self.motores = {caminho: MotorSla(regras, periodo_normal_s) for caminho in caminhos}
+        self.alerta_ativo = False
+
+    def adicionar(self, caminho, rtt_ms, t=None):
+        self.motores[caminho].adicionar(rtt_ms, t)
+
+    def avaliar(self, t=None):
+        """
+        Avalia as regras de todos os caminhos; devolve (transições dos caminhos, transição da fatia).
+
+        As transições dos caminhos são uma lista de (caminho, 'alerta' ou 'normal', índice da
+        regra, valor); a da fatia é ('alerta', caminho que disparou, índice, valor),
+        ('normal', None, None, None) ou None se o estado da fatia não mudou.
+        """
+        t = time.monotonic() if t is None else t
+        transicoes = []
+        for caminho, motor in self.motores.items():
+            resultado = motor.avaliar(t)
+            if resultado is not None:
+                transicoes.append((caminho,) + resultado)
+        em_alerta = any(motor.alerta_ativo for motor in self.motores.values())
+        if em_alerta and not self.alerta_ativo:
+            self.alerta_ativo = True
+            caminho, _, indice, valor = next(tr for tr in transicoes if tr[1] == 'alerta')
+            return transicoes, ('alerta', caminho, indice, valor)
+        if self.alerta_ativo and not em_alerta:
+            self.alerta_ativo = False
+            return transicoes, ('normal', None, None, None)
+        return transicoes, None
+
+    def em_calma_desde(self):
+        """Instante em que todos os caminhos em alerta ficaram em calma, ou None."""
+        inicios = [motor.em_calma_desde() for motor in self.motores.values() if motor.alerta_ativo]
+        if not inicios or None in inicios:
+            return None
+        return max(inicios)
+
+
+def regras_de_config(config, limiar_ms):
+    """RegraSla a partir de dicionários; 'limiar' por omissão é limiar_ms (regras de latência)."""
+    return [RegraSla(c['estatistica'], c.get('limiar', limiar_ms), c['janela_s'],
+                     c.get('minimo_amostras', 1), c.get('fracao_normal', 1.0)) for c in config]
+
+
+if __name__ == '__main__':
+    # Verificação rápida da precisão e do custo por amostra contra numpy.percentile
+    rng = np.random.default_rng(1)
+    rtts = rng.lognormal(mean=np.log(2.0), sigma=0.6, size=200_000)
+    janela = JanelaDeslizante(duracao_s=1e9)
+    inicio = time.perf_counter()
+    for i, rtt in enumerate(rtts):
+        janela.adicionar(float(rtt), t=i * 1e-3)
+    custo_us = (time.perf_counter() - inicio) / len(rtts) * 1e6
+    inicio = time.perf_counter()
+    estimados = janela.percentis([50, 95, 99, 99.9])
+    custo_percentis_us = (time.perf_counter() - inicio) * 1e6
+    print(f"{N_BALDES} baldes ({N_BALDES * 4 * (fatias_por_janela + 2) / 1024:.0f} KiB por janela), "
+          f"{custo_us:.2f} µs por amostra, {custo_percentis_us:.0f} µs por consulta de 4 percentis")
+    for p, estimado in zip([50, 95, 99, 99.9], estimados):
+        exato = np.percentile(rtts, p, method='inverted_cdf')
+        print(f"    - p{p:<5} exato {exato:8.4f} ms  estimado {estimado:8.4f} ms  erro {100 * (estimado / exato - 1):+.2f}%")
@@ -0,0 +1,156 @@
+import argparse
+
+from classificacao_fluxos import URLLC, EMBB, comandos_filtros
+
+# --- Configurações ---
+fracao_banda = 0.95      # Parte da largura de banda da ligação usada pelo shaper (a fila forma-se aqui e não no veth)
+banda_padrao_mbit = 100  # Interfaces sem 'bw' nos parâmetros do Mininet
+
+# Qdiscs folha disponíveis (nome -> parâmetros tc), anexadas a cada classe/banda
+FOLHAS = {
+    'sfq': 'sfq perturb 10',
+    'fq_codel': 'fq_codel',
+    'codel': 'codel',
+    'pfifo': 'pfifo limit 100',
+}
+
+
+class EstrategiaQdisc:
+    """
+    Receita tc para a saída de uma interface de roteador.
+
+    comandos() devolve o lote (sem o prefixo 'tc') que substitui a qdisc raiz; todas as
+    receitas começam por limitar a taxa a fracao_banda da ligação, para que a fila se forme
+    na qdisc escolhida. fluxos é a tabela fatia -> portas; os filtros que a aplicam vêm de
+    classificacao_fluxos. ajustavel indica se a árvore tem as classes HTB de classes_htb,
+    que o controlador adaptativo altera no lugar com 'tc class change'.
+    """
+    nome = None
+    ajustavel = False
+
+    def comandos(self, iface, bw_mbit, classes, direcao_filtro, fluxos):
+        raise NotImplementedError
+
+    def comandos_remocao(self, iface):
+        return [f'qdisc del dev {iface} root']
+
+    @staticmethod
+    def taxa_mbit(bw_mbit):
+        return int((bw_mbit or banda_padrao_mbit) * fracao_banda)
+
+
+class HtbFolhas(EstrategiaQdisc):
+    """
+    HTB com uma classe por fatia (classes_htb) e uma qdisc folha em cada classe.
+
+    A folha é a da estratégia, salvo se a classe indicar outra em 'folha'
+    (ex. {'folha': 'fq_codel'} só na classe uRLLC).
+    """
+    ajustavel = True
+
+    def __init__(self, nome, folha):
+        self.nome = nome
+        self.folha = folha
+
+    def comandos(self, iface, bw_mbit, classes, direcao_filtro, fluxos):
+        cmds = [
+            f'qdisc del dev {iface} root',
+            f'qdisc add dev {iface} root handle 1: htb default 30',
+            f'class add dev {iface} parent 1: classid 1:1 htb rate {self.taxa_mbit(bw_mbit)}mbit',
+        ]
+        for minor, classe in classes.items():
+            cmds.append(f"class add dev {iface} parent 1:1 classid 1:{minor} htb "
+                        f"rate {classe['rate']} ceil {classe['ceil']} prio {classe['prio']}")
+        # Uma folha por classe evita bufferbloat dentro da classe
+        for minor, classe in classes.items():
+            cmds.append(f"qdisc add dev {iface} parent 1:{minor} handle {minor}: "
+                        f"{FOLHAS[classe.get('folha', self.folha)]}")
+        return cmds + comandos_filtros(iface, '1:0', direcao_filtro, fluxos, {URLLC: '1:10', EMBB: '1:20'})
+
+
+class ShaperFqCodel(EstrategiaQdisc):
+    """Uma só classe HTB à taxa da ligação com fq_codel: sem fatias, o fair queueing isola os fluxos esparsos."""
+    nome = 'fq_codel'
+
+    def comandos(self, iface, bw_mbit, classes, direcao_filtro, fluxos):
+        return [
+            f'qdisc del dev {iface} root',
+            f'qdisc add dev {iface} root handle 1: htb default 1',
+            f'class add dev {iface} parent 1: classid 1:1 htb rate {self.taxa_mbit(bw_mbit)}mbit',
+            f'qdisc add dev {iface} parent 1:1 handle 10: fq_codel',
+        ]
+
+
+class PrioFqCodel(EstrategiaQdisc):
+    """
+    Prioridade estrita sob um shaper HTB: banda 1 uRLLC, banda 2 eMBB, banda 3 o resto,
+    cada uma com fq_codel. O eMBB não tem teto: só cede à fatia uRLLC.
+    """
+    nome = 'prio_fq_codel'
+
+    def comandos(self, iface, bw_mbit, classes, direcao_filtro, fluxos):
+        cmds = [
+            f'qdisc del dev {iface} root',
+            f'qdisc add dev {iface} root handle 1: htb default 1',
+            f'class add dev {iface} parent 1: classid 1:1 htb rate {self.taxa_mbit(bw_mbit)}mbit',
+            # priomap: todo o tráfego não filtrado vai para a última banda
+            f'qdisc add dev {iface} parent 1:1 handle 2: prio bands 3 priomap {" ".join(["2"] * 16)}',
+        ]
+        for banda in (1, 2, 3):
+            cmds.append(f'qdisc add dev {iface} parent 2:{banda} handle 2{banda}: fq_codel')
+        return cmds + comandos_filtros(iface, '2:0', direcao_filtro, fluxos, {URLLC: '2:1', EMBB: '2:2'})
+
+
+class Cake(EstrategiaQdisc):
+    """
+    cake com shaper próprio e quatro tins diffserv4. Os filtros escolhem o tin pela
+    prioridade do pacote (major = handle do cake, minor = tin de 1, bulk, a 4, voz):
+    uRLLC em voz, eMBB em vídeo, o resto em best effort. Ver tc-cake(8).
+    """
+    nome = 'cake'
+
+    def comandos(self, iface, bw_mbit, classes, direcao_filtro, fluxos):
+        return [
+            f'qdisc del dev {iface} root',
+            f'qdisc add dev {iface} root handle 1: cake bandwidth {self.taxa_mbit(bw_mbit)}mbit diffserv4',
+        ] + comandos_filtros(iface, '1:', direcao_filtro, fluxos, {URLLC: '1:4', EMBB: '1:3'}, acao='skbedit')
+
+
+# Estratégias por nome (controlador_qos.estrategia_qdisc / estrategias_interface)
+ESTRATEGIAS = {e.nome: e for e in [
+    HtbFolhas('htb_sfq', 'sfq'),
+    HtbFolhas('htb_fq_codel', 'fq_codel'),
+    ShaperFqCodel(),
+    PrioFqCodel(),
+    Cake(),
+]}
+
+
+def registrar_estrategia(estrategia):
+    """Acrescenta uma estratégia ao registo (ex. HtbFolhas('htb_codel', 'codel'))."""
+    ESTRATEGIAS[estrategia.nome] = estrategia
+    return estrategia
+
+
+def obter_estrategia(nome):
+    try:
+        return ESTRATEGIAS[nome]
+    except KeyError:
+        raise ValueError(f"Estratégia de qdisc desconhecida: '{nome}'. Disponíveis: {', '.join(ESTRATEGIAS)}")
+
+
+if __name__ == '__main__':
+    # Mostra o lote tc de uma estratégia, para inspeção ou para aplicar à mão com 'tc -batch'
+    import controlador_qos
+
+    parser = argparse.ArgumentParser(description="Lote tc gerado por cada estratégia de qdisc")
+    parser.add_argument('estrategia', nargs='?', choices=list(ESTRATEGIAS), help="Por omissão, todas")
+    parser.add_argument('--iface', default='r_trans1-eth1')
+    parser.add_argument('--bw', type=float, default=50, help="Largura de banda da ligação (Mbit/s)")
+    parser.add_argument('--direcao', default='dport', choices=['dport', 'sport'])
+    args = parser.parse_args()
+
+    for nome in [args.estrategia] if args.estrategia else ESTRATEGIAS:
+        print(f"# {nome}")
+        print('\n'.join(ESTRATEGIAS[nome].comandos(args.iface, args.bw, controlador_qos.classes_htb,
+                                                   args.direcao, controlador_qos.fluxos_fatias)))
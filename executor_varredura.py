@@ -0,0 +1,315 @@
+import argparse
+import csv
+import glob
+import itertools
+import json
+import os
+import queue
+import signal
+import string
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import iperf_json
+import telemetria
+import topologia_parametrica
+import trafego_urllc_udp
+
+# --- Configurações ---
+script_topologia = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mininet_topologia_completa_v3.py")
+margem_timeout_s = 120      # Tempo extra além da duração do teste antes de abortar uma execução
+graca_interrupcao_s = 30    # Tempo dado à execução abortada para derrubar a rede (SIGINT) antes do SIGKILL
+origem_latencia = "h_uRLLC1"
+limiar_padrao_ms = 5.0
+max_paralelo = len(string.ascii_lowercase)  # Um prefixo de uma letra por execução em curso
+
+# Colunas da tabela agregada (além dos parâmetros variados)
+COLUNAS_RESULTADO = ['execucao', 'estado', 'duracao_s', 'amostras', 'lat_p50_ms', 'lat_p95_ms', 'lat_p99_ms',
+                     'lat_max_ms', 'acima_limiar_pct', 'perda_pct', 'alertas', 'qos_aplicado', 'ajustes',
+                     'reacao_media_ms', 'vazao_embb_media_mbps', 'atraso_urllc_p50_ms', 'atraso_urllc_p99_ms',
+                     'perda_urllc_pct']
+
+
+def expandir_grade(grade, fixos=None, repeticoes=1):
+    """Produto cartesiano da grade: lista de dicionários de parâmetros, um por execução."""
+    nomes = list(grade)
+    execucoes = []
+    for valores in itertools.product(*(grade[n] for n in nomes)):
+        for _ in range(repeticoes):
+            execucoes.append(dict(fixos or {}, **dict(zip(nomes, valores))))
+    return execucoes
+
+
+def carregar_grade(caminho):
+    """
+    Lê a descrição da varredura (JSON, ou YAML com PyYAML), ex.:
+        {"grade": {"largura_banda_embb": [30, 45, 60], "limiar_latencia_ms": [5, 10]},
+         "fixos": {"duracao_testes": 60}, "repeticoes": 2, "espec": "topologia.yaml"}
+    """
+    with open(caminho) as f:
+        if caminho.endswith(('.yaml', '.yml')):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def resumir_execucao(dir_execucao, limiar_ms):
+    """Métricas de uma execução a partir da telemetria e dos logs dos servidores iperf3 eMBB."""
+    resumo = {}
+    caminho_telemetria = os.path.join(dir_execucao, telemetria.nome_arquivo_telemetria)
+    if os.path.exists(caminho_telemetria):
+        registros = telemetria.mapear(caminho_telemetria)
+        do_monitor = registros['origem'] == origem_latencia.encode()
+        latencias = registros['valor'][do_monitor & (registros['metrica'] == telemetria.LATENCIA_MS)]
+        perdidas = np.count_nonzero(do_monitor & (registros['metrica'] == telemetria.PERDA))
+        reacoes = registros['valor'][registros['metrica'] == telemetria.REACAO_MS]
+        resumo['amostras'] = len(latencias)
+        if len(latencias):
+            p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+            resumo.update(lat_p50_ms=round(p50, 3), lat_p95_ms=round(p95, 3), lat_p99_ms=round(p99, 3),
+                          lat_max_ms=round(float(latencias.max()), 3),
+                          acima_limiar_pct=round(100.0 * np.mean(latencias > limiar_ms), 2))
+        if len(latencias) + perdidas:
+            resumo['perda_pct'] = round(100.0 * perdidas / (len(latencias) + perdidas), 2)
+        resumo['alertas'] = int(np.count_nonzero(registros['metrica'] == telemetria.ALERTA))
+        resumo['qos_aplicado'] = int(np.count_nonzero(registros['metrica'] == telemetria.QOS_APLICADO))
+        resumo['ajustes'] = int(np.count_nonzero(registros['metrica'] == telemetria.TETO_EMBB_MBIT))
+        if len(reacoes):
+            resumo['reacao_media_ms'] = round(float(reacoes.mean()), 2)
+        # Atraso unidirecional dos pacotes do tráfego uRLLC (gerador 'pacotes'; amostrado acima de
+        # trafego_urllc_udp.max_registos_atraso_hz, pelo que a perda vem das contagens do recetor)
+        do_receptor = registros['origem'] == trafego_urllc_udp.origem_receptor.encode()
+        atrasos = registros['valor'][do_receptor & (registros['metrica'] == telemetria.ATRASO_MS)]
+        if len(atrasos):
+            p50, p99 = np.percentile(atrasos, [50, 99])
+            resumo.update(atraso_urllc_p50_ms=round(float(p50), 3), atraso_urllc_p99_ms=round(float(p99), 3))
+    caminho_fluxos = os.path.join(dir_execucao, "logs_urllc", "resumo_fluxos.json")
+    if os.path.exists(caminho_fluxos):
+        with open(caminho_fluxos) as f:
+            fluxos = json.load(f).values()
+        recebidos, perdidos = sum(r['recebidos'] for r in fluxos), sum(r['perdidos'] for r in fluxos)
+        if recebidos + perdidos:
+            resumo['perda_urllc_pct'] = round(100.0 * perdidos / (recebidos + perdidos), 3)
+
+    # Com um perfil de carga eMBB há um servidor por sessão em simultâneo (iperf_embb_servidor_<porta>.txt)
+    caminhos_embb = sorted(glob.glob(os.path.join(dir_execucao, "logs_embb", "iperf_embb_servidor*.txt")))
+    intervalos = []
+    for caminho in caminhos_embb:
+        with open(caminho) as f:
+            intervalos += iperf_json.ParserIperf().processar_linhas(f)
+    if intervalos and len(caminhos_embb) > 1 and all(r.t_parede is not None for r in intervalos):
+        # Vazão agregada de todos os servidores, segundo a segundo
+        por_segundo = {}
+        for r in intervalos:
+            por_segundo[int(r.t_parede)] = por_segundo.get(int(r.t_parede), 0.0) + r.mbps
+        resumo['vazao_embb_media_mbps'] = round(sum(por_segundo.values()) / len(por_segundo), 2)
+    elif intervalos:
+        resumo['vazao_embb_media_mbps'] = round(sum(r.mbps for r in intervalos) / len(intervalos), 2)
+    return resumo
+
+
+def nomes_nos(espec, prefixo):
+    """Nomes (já prefixados) dos roteadores, switches e hosts de uma execução, e a lista dos switches."""
+    topologia = topologia_parametrica.Topologia(topologia_parametrica.prefixar_espec(espec, prefixo))
+    return set(topologia.roteadores) | set(topologia.switches) | set(topologia.hosts), topologia.switches
+
+
+def _namespace_rede(pid):
+    try:
+        return os.readlink(f'/proc/{pid}/ns/net')
+    except OSError:
+        return None
+
+
+def terminar_restos(nomes):
+    """
+    Mata as shells Mininet (mnexec ... bash -is mininet:<nó>) dos nós indicados e, nos nós
+    com namespace de rede próprio, todos os processos desse namespace (iperf3, monitor...).
+    Devolve o número de processos terminados.
+    """
+    raiz = _namespace_rede(1)
+    shells, por_namespace = [], {}
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                argumentos = f.read().split(b'\0')
+        except OSError:
+            continue
+        nome = next((a[len(b'mininet:'):].decode() for a in argumentos if a.startswith(b'mininet:')), None)
+        if nome in nomes:
+            shells.append(int(pid))
+        por_namespace.setdefault(_namespace_rede(pid), []).append(int(pid))
+
+    alvos = set(shells)
+    for pid in shells:
+        namespace = _namespace_rede(pid)
+        if namespace is not None and namespace != raiz:
+            alvos.update(por_namespace.get(namespace, []))
+    for pid in alvos:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    return len(alvos)
+
+
+def limpar_restos(espec, prefixo):
+    """
+    Remove o que uma execução abortada deixou no namespace raiz: processos dos nós,
+    bridges OVS e pontas de ligação com os nomes prefixados. Devolve True se nada ficou.
+    """
+    nomes, switches = nomes_nos(espec, prefixo)
+    processos = terminar_restos(nomes)
+    for switch in switches:
+        subprocess.run(['ovs-vsctl', '--if-exists', 'del-br', switch], capture_output=True)
+
+    def ligacoes_restantes():
+        saida = subprocess.run(['ip', '-o', 'link', 'show'], capture_output=True, text=True).stdout
+        ifaces = (linha.split(':')[1].strip().split('@')[0] for linha in saida.splitlines() if ':' in linha)
+        return [i for i in ifaces if i.split('-')[0] in nomes]
+
+    ligacoes = ligacoes_restantes()
+    for iface in ligacoes:
+        subprocess.run(['ip', 'link', 'del', iface], capture_output=True)
+    restantes = ligacoes_restantes()
+    bridges = subprocess.run(['ovs-vsctl', 'list-br'], capture_output=True, text=True).stdout.split()
+    restantes += [b for b in bridges if b in nomes]
+    print(f"[Varredura] Prefixo '{prefixo}': {processos} processos terminados, {len(ligacoes)} ligações removidas"
+          + (f", restam {', '.join(restantes)}" if restantes else ""))
+    return not restantes
+
+
+class ExecutorVarredura:
+    """
+    Corre as execuções de uma varredura, até `paralelo` em simultâneo.
+
+    Cada execução é um processo mininet_topologia_completa_v3.py não interativo com
+    diretório de saída próprio e um prefixo de uma letra nos nomes dos nós (os switches
+    OVS e as pontas das ligações partilham o namespace raiz). Um prefixo só é reutilizado
+    quando a execução que o tinha termina; se ela falhou ou foi abortada por timeout, só
+    depois de limpos os seus restos, caso contrário é substituído por uma letra ainda não usada.
+    """
+
+    def __init__(self, dir_saida, paralelo=1, espec=None):
+        if not 1 <= paralelo <= max_paralelo:
+            raise ValueError(f"paralelo deve estar entre 1 e {max_paralelo}.")
+        self.dir_saida = dir_saida
+        self.paralelo = paralelo
+        self.espec = espec
+        self._prefixos = queue.Queue()
+        for letra in string.ascii_lowercase[:paralelo]:
+            self._prefixos.put(letra)
+        self._prefixos_reserva = iter(string.ascii_lowercase[paralelo:])
+
+    def _abortar(self, processo):
+        """Interrompe o grupo de processos da execução como um Ctrl-C (a rede é derrubada) e, se não sair, mata-o."""
+        try:
+            os.killpg(processo.pid, signal.SIGINT)
+            processo.wait(timeout=graca_interrupcao_s)
+        except subprocess.TimeoutExpired:
+            print(f"[WARN] A execução (pid {processo.pid}) não terminou em {graca_interrupcao_s} s: SIGKILL")
+        except ProcessLookupError:
+            pass
+        try:
+            os.killpg(processo.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        processo.wait()
+
+    def _devolver_prefixo(self, prefixo, limpar):
+        espec = topologia_parametrica.carregar_espec(self.espec) if self.espec else topologia_parametrica.ESPEC_PADRAO
+        if not limpar or limpar_restos(espec, prefixo):
+            self._prefixos.put(prefixo)
+            return
+        substituto = next(self._prefixos_reserva, None)
+        if substituto is None:
+            print(f"[WARN] Prefixo '{prefixo}' com restos e sem letras livres: reutilizado assim mesmo")
+            substituto = prefixo
+        else:
+            print(f"[WARN] Prefixo '{prefixo}' retirado (restos por limpar); passa a usar-se '{substituto}'")
+        self._prefixos.put(substituto)
+
+    def _executar(self, indice, parametros):
+        nome = f"execucao_{indice:03d}"
+        dir_execucao = os.path.join(self.dir_saida, nome)
+        os.makedirs(dir_execucao, exist_ok=True)
+        with open(os.path.join(dir_execucao, "parametros.json"), "w") as f:
+            json.dump(parametros, f, indent=2)
+
+        comando = [sys.executable, script_topologia, '--dir', dir_execucao, '--sem-cli',
+                   '--parametros', json.dumps(parametros)]
+        if self.espec:
+            comando.insert(2, self.espec)
+        duracao_teste = parametros.get('duracao_testes', 120)
+
+        prefixo = self._prefixos.get()
+        inicio = time.monotonic()
+        processo, estado = None, 'interrompida'
+        try:
+            print(f"[Varredura] {nome} iniciada (prefixo '{prefixo}'): {parametros}")
+            with open(os.path.join(dir_execucao, "execucao.log"), "w") as log:
+                # Sessão própria: num timeout a interrupção chega ao script e a todos os seus filhos
+                processo = subprocess.Popen(comando + ['--prefixo', prefixo], stdout=log, stderr=subprocess.STDOUT,
+                                            stdin=subprocess.DEVNULL, start_new_session=True)
+                processo.wait(timeout=duracao_teste + margem_timeout_s)
+            estado = 'ok' if processo.returncode == 0 else f'erro {processo.returncode}'
+        except subprocess.TimeoutExpired:
+            estado = 'timeout'
+        finally:
+            if processo is not None and processo.poll() is None:
+                self._abortar(processo)
+            # Uma execução que não terminou bem pode ter deixado a rede (ou parte dela) montada
+            self._devolver_prefixo(prefixo, limpar=estado != 'ok')
+        duracao = time.monotonic() - inicio
+        print(f"[Varredura] {nome} terminada em {duracao:.0f} s ({estado})")
+
+        limiar = parametros.get('limiar_latencia_ms', limiar_padrao_ms)
+        return dict(parametros, execucao=nome, estado=estado, duracao_s=round(duracao, 1),
+                    **resumir_execucao(dir_execucao, limiar))
+
+    def executar(self, execucoes):
+        """Corre todas as execuções e devolve uma linha de resultados por execução, pela ordem da grade."""
+        os.makedirs(self.dir_saida, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.paralelo) as executor:
+            return list(executor.map(self._executar, range(1, len(execucoes) + 1), execucoes))
+
+
+def gravar_tabela(resultados, caminho, nomes_parametros):
+    colunas = ['execucao'] + nomes_parametros + [c for c in COLUNAS_RESULTADO if c != 'execucao']
+    with open(caminho, 'w', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=colunas, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(resultados)
+    return colunas
+
+
+def imprimir_tabela(resultados, colunas):
+    larguras = {c: max(len(c), *(len(str(r.get(c, ''))) for r in resultados)) for c in colunas}
+    print('  '.join(c.ljust(larguras[c]) for c in colunas))
+    for r in resultados:
+        print('  '.join(str(r.get(c, '')).ljust(larguras[c]) for c in colunas))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Executa uma varredura de parâmetros da experiência uRLLC/eMBB")
+    parser.add_argument('grade', help="Descrição da varredura (JSON/YAML)")
+    parser.add_argument('--saida', default='varredura', help="Diretório com uma pasta por execução e a tabela final")
+    parser.add_argument('--paralelo', type=int, default=1, help="Execuções em simultâneo")
+    args = parser.parse_args()
+
+    descricao = carregar_grade(args.grade)
+    grade = descricao['grade']
+    # Numa varredura os gráficos animados só consomem CPU partilhado entre execuções
+    fixos = dict({'gerar_graficos': False}, **descricao.get('fixos', {}))
+    execucoes = expandir_grade(grade, fixos, descricao.get('repeticoes', 1))
+    print(f"[Varredura] {len(execucoes)} execuções, até {args.paralelo} em simultâneo. Saída: {args.saida}")
+
+    resultados = ExecutorVarredura(args.saida, args.paralelo, descricao.get('espec')).executar(execucoes)
+    caminho_tabela = os.path.join(args.saida, "resultados.csv")
+    colunas = gravar_tabela(resultados, caminho_tabela, list(grade))
+    imprimir_tabela(resultados, colunas)
+    print(f"[Varredura] Tabela gravada em {caminho_tabela}")
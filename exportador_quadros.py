@@ -0,0 +1,173 @@
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+
+class CodificadorFFmpeg:
+    """
+    Envia quadros RGBA crus para um processo ffmpeg por um pipe.
+
+    O ffmpeg escreve o ficheiro à medida que os quadros chegam, pelo que o vídeo
+    (ou GIF) já existe durante a experiência e fica completo assim que ela termina.
+    """
+
+    def __init__(self, caminho, fps, argumentos_saida=()):
+        self.caminho = caminho
+        self.fps = fps
+        self.argumentos_saida = list(argumentos_saida)
+        self._processo = None
+
+    def _iniciar(self, largura, altura):
+        comando = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{largura}x{altura}', '-r', str(self.fps),
+                   '-i', '-'] + self.argumentos_saida + [self.caminho]
+        self._processo = subprocess.Popen(comando, stdin=subprocess.PIPE)
+
+    def escrever(self, quadro, exportador):
+        if self._processo is None:
+            altura, largura = quadro.shape[:2]
+            self._iniciar(largura, altura)
+        self._processo.stdin.write(quadro.tobytes())
+
+    def fechar(self, exportador):
+        if self._processo is not None:
+            self._processo.stdin.close()
+            self._processo.wait()
+
+
+def codificador_mp4(caminho, fps):
+    # libx264/yuv420p exige dimensões pares
+    return CodificadorFFmpeg(caminho, fps, ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                                            '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', '+faststart'])
+
+
+class CodificadorGIFPillow:
+    """Alternativa sem ffmpeg: guarda os quadros (em paleta) e grava o GIF ao fechar."""
+
+    def __init__(self, caminho, fps):
+        self.caminho = caminho
+        self.fps = fps
+        self._quadros = []
+
+    def escrever(self, quadro, exportador):
+        from PIL import Image
+        imagem = Image.fromarray(quadro, 'RGBA').convert('RGB')
+        self._quadros.append(imagem.convert('P', palette=Image.Palette.ADAPTIVE))
+
+    def fechar(self, exportador):
+        if self._quadros:
+            self._quadros[0].save(self.caminho, save_all=True, append_images=self._quadros[1:],
+                                  duration=int(1000 / self.fps), loop=0)
+
+
+def codificador_gif(caminho, fps):
+    """GIF em streaming pelo ffmpeg, se existir; caso contrário, pelo Pillow."""
+    if shutil.which('ffmpeg'):
+        return CodificadorFFmpeg(caminho, fps, ['-f', 'gif'])
+    return CodificadorGIFPillow(caminho, fps)
+
+
+class CodificadorPNG:
+    """
+    Instantâneos PNG com cadência própria.
+
+    Se o DPI pedido for o da animação, reaproveita o quadro já renderizado; caso
+    contrário volta a renderizar a figura nesse DPI (apenas a cada intervalo_s).
+    """
+
+    def __init__(self, caminho, dpi, intervalo_s):
+        self.caminho = caminho
+        self.dpi = dpi
+        self.intervalo_s = intervalo_s
+        self._ultimo = None
+        self._quadro = None
+
+    def _gravar(self, quadro, exportador):
+        if self.dpi == exportador.dpi:
+            import matplotlib.image
+            matplotlib.image.imsave(self.caminho, quadro)
+        else:
+            exportador.salvar_figura(self.caminho, self.dpi)
+
+    def escrever(self, quadro, exportador):
+        self._quadro = quadro
+        agora = time.monotonic()
+        if self._ultimo is None or agora - self._ultimo >= self.intervalo_s:
+            self._gravar(quadro, exportador)
+            self._ultimo = agora
+
+    def fechar(self, exportador):
+        # Último instantâneo com o estado final
+        if self._quadro is not None:
+            self._gravar(self._quadro, exportador)
+
+
+class ExportadorQuadros:
+    """
+    Renderiza cada quadro uma única vez e entrega o mesmo raster a vários codificadores.
+
+    Com blit ativo, as partes estáticas da figura (eixos, grelha, legenda, faixas já
+    fechadas) são guardadas como fundo e só os artistas dinâmicos de cada quadro são
+    redesenhados por cima, enquanto os limites dos eixos não mudarem.
+    """
+
+    def __init__(self, fig, dpi, codificadores, usar_blit=True):
+        self.fig = fig
+        self.dpi = dpi
+        self.codificadores = codificadores
+        self.usar_blit = usar_blit
+        self._fundo = None
+        self._assinatura = None
+        self._dinamicos = []
+        fig.set_dpi(dpi)
+
+    def _assinatura_atual(self, artistas):
+        limites = tuple((ax.get_xlim(), ax.get_ylim()) for ax in self.fig.axes)
+        return limites, tuple(id(a) for a in artistas)
+
+    def _renderizar(self, artistas):
+        canvas = self.fig.canvas
+        assinatura = self._assinatura_atual(artistas)
+        if not self.usar_blit:
+            canvas.draw()
+            return
+        if assinatura != self._assinatura or self._fundo is None:
+            # Redesenho completo: artistas que deixaram de ser dinâmicos passam ao fundo
+            for artista in self._dinamicos:
+                if artista not in artistas:
+                    artista.set_animated(False)
+            for artista in artistas:
+                artista.set_animated(True)
+            self._dinamicos = list(artistas)
+            canvas.draw()
+            self._fundo = canvas.copy_from_bbox(self.fig.bbox)
+            self._assinatura = assinatura
+        else:
+            canvas.restore_region(self._fundo)
+        for artista in sorted(artistas, key=lambda a: a.get_zorder()):
+            artista.axes.draw_artist(artista)
+
+    def adicionar_quadro(self, artistas=()):
+        self._renderizar(list(artistas))
+        quadro = np.asarray(self.fig.canvas.buffer_rgba())
+        for codificador in self.codificadores:
+            codificador.escrever(quadro, self)
+
+    def salvar_figura(self, caminho, dpi):
+        """Grava a figura completa noutro DPI (os artistas animados são incluídos)."""
+        for artista in self._dinamicos:
+            artista.set_animated(False)
+        self.fig.savefig(caminho, dpi=dpi)
+        for artista in self._dinamicos:
+            artista.set_animated(True)
+        # O renderizador mudou de resolução: o próximo quadro é redesenhado por inteiro
+        self._fundo = None
+
+    def fechar(self):
+        for codificador in self.codificadores:
+            try:
+                codificador.fechar(self)
+            except Exception as e:
+                print(f"Erro ao finalizar {getattr(codificador, 'caminho', codificador)}: {e}")
@@ -1,16 +1,83 @@
+import argparse
+import asyncio
+import json
 import subprocess
 import time
 import os
 import re
 
+from sonda_latencia import SondaLatencia, AmostraSonda, taxa_minima_hz
+import canal_alerta
+import estatisticas_janela
+import telemetria
+
 # --- Configurações ---
 ip_destino = "172.19.40.100"  # IP do h_cloud
-intervalo_segundos = 1       # Intervalo entre pings
+destinos = [ip_destino]      # Todos os destinos sondados a partir de cada ponto de observação
+taxa_amostragem_hz = 100     # Sondas por segundo (10 a 1000 Hz)
+taxa_total_maxima_hz = 2000  # Soma de todos os caminhos: com muitos sítios, a taxa por caminho baixa
+modo_sonda = "icmp"          # 'icmp' (socket datagram) ou 'udp' (servidor de eco)
+porta_eco_udp = 7            # Porta do servidor de eco no modo 'udp'
+intervalo_segundos = 1       # Intervalo entre linhas de relatório (e entre pings no modo legado)
+intervalo_feedback_s = 0.1   # Janela das amostras de latência enviadas ao controlador adaptativo
 arquivo_alerta = "latencia.alerta"
+socket_alerta = canal_alerta.nome_socket_alerta  # Canal push para o controlador
+arquivo_telemetria = telemetria.nome_arquivo_telemetria  # Amostras e eventos em formato binário
+origem_telemetria = "h_uRLLC1"  # Host onde o monitor corre (primeiro caminho) e origem dos eventos da fatia
+# Outros pontos de observação: host -> namespace de rede (/proc/<pid>/ns/net). As sondas de todos
+# saem deste processo, num só ciclo asyncio: cada socket é aberto no namespace do seu host (setns)
+pontos_observacao = {}
 limiar_latencia_ms = 5.0     # Latência alvo para uRLLC
 periodo_normalizacao_segundos = 70
+# 'janela': o alerta segue regras sobre estatísticas de janelas deslizantes (percentis, perda);
+# 'amostra': uma só amostra acima do limiar dispara e qualquer perda recomeça a calma (legado)
+modo_alerta = 'janela'
+# Regras do modo 'janela' (ver estatisticas_janela.RegraSla). Sem 'limiar', vale limiar_latencia_ms.
+# O alerta dispara se alguma regra violar e termina com todas cumpridas (abaixo de
+# limiar * fracao_normal) durante periodo_normalizacao_segundos.
+# Com n amostras, o pN só ignora uma amostra isolada se n > 100 / (100 - N): daí os mínimos.
+regras_alerta = [
+    {'estatistica': 'p95', 'janela_s': 0.5, 'minimo_amostras': 25, 'fracao_normal': 0.8},   # Degradação súbita
+    {'estatistica': 'p99', 'janela_s': 2.0, 'minimo_amostras': 101, 'fracao_normal': 0.8},  # Cauda persistente
+    {'estatistica': 'perda_pct', 'limiar': 10.0, 'janela_s': 2.0, 'minimo_amostras': 20, 'fracao_normal': 0.5},
+]
+intervalo_avaliacao_s = 0.05  # As regras são avaliadas no máximo a este ritmo (percentis custam O(baldes))
 
 tempo_primeira_latencia_ok = 0
+alerta_ativo = False
+emissor_alerta = None
+escritor_telemetria = None
+motor_sla = None   # estatisticas_janela.MotorSlaFatia: uma janela por caminho, alerta pelo pior
+caminhos = []      # Caminho de cada (ponto de observação, destino); o primeiro é o do host do monitor
+_ultima_avaliacao = 0.0
+
+# Pior RTT de cada caminho na janela de feedback corrente (None se todas as sondas desse caminho se perderam)
+_feedback = {'inicio': 0.0, 'piores': {}}
+
+
+class Caminho:
+    """
+    Um caminho sondado (ponto de observação -> destino): a sua telemetria e linha de relatório.
+
+    As amostras vão para a telemetria com a origem do ponto de observação e o índice do
+    destino como canal (o primeiro caminho fica como antes: origem_telemetria, canal 0).
+    """
+
+    def __init__(self, origem, destino, canal, escritor, namespace=None):
+        self.origem = origem
+        self.destino = destino
+        self.canal = canal
+        self.escritor = escritor
+        self.namespace = namespace
+        self.janela_relatorio = estatisticas_janela.JanelaDeslizante(intervalo_segundos)  # p50/p95/p99 do intervalo
+        # Agregados do intervalo de relatório corrente
+        self.relatorio = {'inicio': time.time(), 'max_rtt': None, 'amostras': 0, 'perdidas': 0, 'jitter': 0.0}
+
+    def __str__(self):
+        return f"{self.origem} -> {self.destino}"
+
+    def registrar(self, metrica, valor):
+        self.escritor.registrar(metrica, valor, canal=self.canal)
 
 def obter_latencia_ping(ip):
     try:
@@ -29,36 +96,273 @@ def obter_latencia_ping(ip):
         print(f"[Erro] Falha ao executar ping: {e}")
         return -1
 
-print(f"Iniciando monitoramento uRLLC com ping para {ip_destino} (limite: {limiar_latencia_ms} ms)")
-try:
-    while True:
-        latencia_ms = obter_latencia_ping(ip_destino)
-        
-        if latencia_ms >= 0:
-            print(f"[INFO] Latência uRLLC: {latencia_ms:.2f} ms")
-
-            if latencia_ms > limiar_latencia_ms:
-                if not os.path.exists(arquivo_alerta):
-                    print(f"[ALERTA] Latência {latencia_ms:.2f} ms > {limiar_latencia_ms:.2f} ms. Criando arquivo de alerta.")
-                    with open(arquivo_alerta, "w") as f:
-                        f.write(f"{latencia_ms:.2f}")
+def avaliar_latencia(latencia_ms):
+    """Aplica a regra de alerta a uma amostra (latência em ms, ou None em caso de perda)."""
+    global tempo_primeira_latencia_ok, alerta_ativo
+
+    if latencia_ms is None:
+        tempo_primeira_latencia_ok = 0
+        return
+
+    if latencia_ms > limiar_latencia_ms:
+        if not alerta_ativo:
+            _entrar_em_alerta(latencia_ms, f"Latência {latencia_ms:.2f} ms > {limiar_latencia_ms:.2f} ms")
+            alerta_ativo = True
+        tempo_primeira_latencia_ok = 0
+    else:
+        if alerta_ativo:
+            if tempo_primeira_latencia_ok == 0:
+                print(f"[INFO] Latência abaixo do limiar. Iniciando período de calma de {periodo_normalizacao_segundos}s...")
+                tempo_primeira_latencia_ok = time.time()
+            elif time.time() - tempo_primeira_latencia_ok > periodo_normalizacao_segundos:
+                _sair_de_alerta(latencia_ms)
+                alerta_ativo = False
                 tempo_primeira_latencia_ok = 0
-            else:
-                if os.path.exists(arquivo_alerta):
-                    if tempo_primeira_latencia_ok == 0:
-                        print(f"[INFO] Latência abaixo do limiar. Iniciando período de calma de {periodo_normalizacao_segundos}s...")
-                        tempo_primeira_latencia_ok = time.time()
-                    elif time.time() - tempo_primeira_latencia_ok > periodo_normalizacao_segundos:
-                        print("[INFO] Período de calma concluído. Removendo arquivo de alerta.")
-                        os.remove(arquivo_alerta)
-                        tempo_primeira_latencia_ok = 0
+
+def _entrar_em_alerta(latencia_ms, motivo, canal=0, origem=None):
+    """Alerta da fatia: notifica o controlador, regista o evento e cria o arquivo de alerta."""
+    print(f"[ALERTA] {motivo}. Criando arquivo de alerta.")
+    # Notifica o controlador primeiro (com o caminho que violou, para localizar o gargalo);
+    # o ficheiro fica para o gráfico e como reserva.
+    emissor_alerta.enviar(canal_alerta.ALERTA, latencia_ms, origem)
+    escritor_telemetria.registrar(telemetria.ALERTA, latencia_ms, canal=canal)
+    with open(arquivo_alerta, "w") as f:
+        f.write(f"{latencia_ms:.2f}")
+
+def _sair_de_alerta(latencia_ms):
+    print("[INFO] Período de calma concluído. Removendo arquivo de alerta.")
+    emissor_alerta.enviar(canal_alerta.NORMAL, latencia_ms)
+    escritor_telemetria.registrar(telemetria.NORMAL, latencia_ms if latencia_ms is not None else 0.0)
+    if os.path.exists(arquivo_alerta):
+        os.remove(arquivo_alerta)
+
+def avaliar_janelas(caminho, amostra):
+    """Modo 'janela': acrescenta a amostra às janelas do caminho e avalia as regras de SLA da fatia."""
+    global alerta_ativo, _ultima_avaliacao
+    agora = time.monotonic()
+    motor_sla.adicionar(caminho, amostra.rtt_ms, agora)
+    if agora - _ultima_avaliacao < intervalo_avaliacao_s:
+        return
+    _ultima_avaliacao = agora
+    calma_antes = motor_sla.em_calma_desde()
+    transicoes, resultado = motor_sla.avaliar(agora)
+    for c, evento, indice, valor in transicoes:
+        c.escritor.registrar(telemetria.ALERTA_CAMINHO if evento == 'alerta' else telemetria.NORMAL_CAMINHO,
+                             valor if valor is not None else 0.0, canal=c.canal)
+        if len(caminhos) > 1:
+            print(f"[INFO] Caminho {c}: {'SLA violado' if evento == 'alerta' else 'normalizado'}.")
+    if resultado is None:
+        if alerta_ativo and calma_antes is None and motor_sla.em_calma_desde() is not None:
+            print(f"[INFO] Regras de SLA cumpridas. Iniciando período de calma de {periodo_normalizacao_segundos}s...")
+        return
+    evento, c, indice, valor = resultado
+    if evento == 'alerta':
+        regra = motor_sla.regras[indice]
+        # O valor enviado ao controlador é sempre uma latência: o p99 da janela da regra
+        latencia = motor_sla.motores[c].janelas[regra.janela_s].percentil(99)
+        _entrar_em_alerta(latencia if latencia is not None else valor,
+                          f"{regra.estatistica} = {valor:.2f} na janela de {regra.janela_s:g} s "
+                          f"(limiar {regra.limiar:g})" + (f" no caminho {c}" if len(caminhos) > 1 else ""),
+                          canal=indice, origem=c.origem)
+        alerta_ativo = True
+    else:
+        _sair_de_alerta(amostra.rtt_ms)
+        alerta_ativo = False
+
+def enviar_feedback(caminho, amostra):
+    """Envia ao controlador o pior RTT de cada janela de intervalo_feedback_s, sobre todos os caminhos."""
+    piores = _feedback['piores']
+    if not amostra.perdido and (piores.get(caminho) is None or amostra.rtt_ms > piores[caminho]):
+        piores[caminho] = amostra.rtt_ms
+    else:
+        piores.setdefault(caminho, None)
+    agora = time.monotonic()
+    if agora - _feedback['inicio'] >= intervalo_feedback_s:
+        # Um caminho com todas as sondas perdidas conta como perda da fatia (None)
+        pior = next((c for c, rtt in piores.items() if rtt is None), None) or max(piores, key=piores.get)
+        emissor_alerta.enviar(canal_alerta.AMOSTRA, piores[pior], pior.origem)
+        _feedback.update(inicio=agora, piores={})
+
+def processar_amostra(amostra, caminho=None):
+    """Trata uma AmostraSonda de um caminho (por omissão o primeiro): decide o alerta e agrega o relatório."""
+    caminho = caminho or caminhos[0]
+    if amostra.perdido:
+        caminho.registrar(telemetria.PERDA, 1.0)
+    else:
+        caminho.registrar(telemetria.LATENCIA_MS, amostra.rtt_ms)
+        caminho.registrar(telemetria.JITTER_MS, amostra.jitter_ms)
+    if modo_alerta == 'janela':
+        avaliar_janelas(caminho, amostra)
+    else:
+        # Legado: as amostras de todos os caminhos passam pela mesma regra
+        avaliar_latencia(amostra.rtt_ms)
+    enviar_feedback(caminho, amostra)
+    caminho.janela_relatorio.adicionar(amostra.rtt_ms)
+
+    relatorio = caminho.relatorio
+    relatorio['amostras'] += 1
+    relatorio['jitter'] = amostra.jitter_ms
+    if amostra.perdido:
+        relatorio['perdidas'] += 1
+    elif relatorio['max_rtt'] is None or amostra.rtt_ms > relatorio['max_rtt']:
+        relatorio['max_rtt'] = amostra.rtt_ms
+
+    agora = time.time()
+    if agora - relatorio['inicio'] >= intervalo_segundos:
+        # Uma linha por intervalo com o pior RTT, para que picos curtos apareçam no gráfico,
+        # e os percentis da janela do último intervalo (também na telemetria). A linha do
+        # primeiro caminho mantém o formato que o gráfico lê; as outras identificam o caminho.
+        rotulo = "" if caminho is caminhos[0] else f" {caminho}"
+        if relatorio['max_rtt'] is not None:
+            perda_pct = 100.0 * relatorio['perdidas'] / relatorio['amostras']
+            p50, p95, p99 = caminho.janela_relatorio.percentis([50, 95, 99])
+            for metrica, valor in ((telemetria.LAT_P50_MS, p50), (telemetria.LAT_P95_MS, p95),
+                                   (telemetria.LAT_P99_MS, p99),
+                                   (telemetria.PERDA_PCT, caminho.janela_relatorio.perda_pct())):
+                caminho.registrar(metrica, valor)
+            print(f"[INFO] Latência uRLLC{rotulo}: {relatorio['max_rtt']:.2f} ms "
+                  f"(amostras: {relatorio['amostras']}, jitter: {relatorio['jitter']:.2f} ms, perda: {perda_pct:.1f}%, "
+                  f"p50/p95/p99: {p50:.2f}/{p95:.2f}/{p99:.2f} ms)")
         else:
-            print("[WARN] Timeout no ping ou resposta inválida.")
-            tempo_primeira_latencia_ok = 0
+            print(f"[WARN] Timeout no ping ou resposta inválida{rotulo}.")
+        relatorio.update(inicio=agora, max_rtt=None, amostras=0, perdidas=0)
 
+def monitorar_com_ping():
+    """Modo legado: um processo ping por amostra, a 1 Hz."""
+    seq = 0
+    while True:
+        latencia_ms = obter_latencia_ping(ip_destino)
+        rtt = latencia_ms if latencia_ms >= 0 else None
+        processar_amostra(AmostraSonda(seq, time.time(), rtt, 0.0, rtt is None, 0.0))
+        seq += 1
         time.sleep(intervalo_segundos)
 
-except KeyboardInterrupt:
-    print("\nMonitoramento uRLLC encerrado.")
-    if os.path.exists(arquivo_alerta):
-        os.remove(arquivo_alerta)
\ No newline at end of file
+def taxa_por_caminho(n_caminhos, taxa_hz=None):
+    """
+    Sondas por segundo de cada caminho: taxa_hz (omissão: taxa_amostragem_hz), limitada pela taxa total.
+
+    Nunca desce abaixo de taxa_minima_hz; com no máximo max_caminhos() caminhos (ver
+    limitar_caminhos), a soma fica dentro de taxa_total_maxima_hz.
+    """
+    taxa_hz = taxa_amostragem_hz if taxa_hz is None else taxa_hz
+    return max(taxa_minima_hz, min(taxa_hz, taxa_total_maxima_hz // max(n_caminhos, 1)))
+
+def max_caminhos():
+    """Quantos caminhos cabem em taxa_total_maxima_hz, cada um à taxa mínima da sonda."""
+    return max(taxa_total_maxima_hz // taxa_minima_hz, 1)
+
+def limitar_caminhos(caminhos):
+    """Os primeiros max_caminhos() caminhos (o do host do monitor primeiro); avisa se alguns ficarem de fora."""
+    limite = max_caminhos()
+    if len(caminhos) > limite:
+        print(f"[WARN] {len(caminhos)} caminhos a {taxa_minima_hz} Hz passariam taxa_total_maxima_hz "
+              f"({taxa_total_maxima_hz} sondas/s): só os primeiros {limite} são sondados.")
+    return caminhos[:limite]
+
+def criar_caminhos():
+    """Um Caminho por (ponto de observação, destino), até max_caminhos(); o host do monitor primeiro."""
+    global escritor_telemetria
+    escritor_telemetria = telemetria.EscritorTelemetria(arquivo_telemetria, origem_telemetria)
+    pontos = [(origem_telemetria, None)]
+    pontos += [(origem, namespace) for origem, namespace in pontos_observacao.items() if origem != origem_telemetria]
+    pares = limitar_caminhos([(origem, namespace, canal, destino)
+                              for origem, namespace in pontos for canal, destino in enumerate(destinos)])
+    escritores = {origem_telemetria: escritor_telemetria}
+    resultado = []
+    for origem, namespace, canal, destino in pares:
+        if origem not in escritores:
+            escritores[origem] = telemetria.EscritorTelemetria(arquivo_telemetria, origem)
+        resultado.append(Caminho(origem, destino, canal, escritores[origem], namespace))
+    return resultado
+
+def fechar_caminhos(descartados, mantidos=()):
+    """Fecha os escritores de telemetria dos caminhos descartados que nenhum caminho mantido partilha."""
+    em_uso = {caminho.escritor for caminho in mantidos}
+    for escritor in {caminho.escritor for caminho in descartados} - em_uso:
+        escritor.fechar()
+
+async def executar_sondas(sondas, taxa_hz):
+    """Todas as sondas no mesmo ciclo asyncio, desfasadas para não partirem em rajada."""
+    async def desfasada(sonda, atraso):
+        await asyncio.sleep(atraso)
+        await sonda.executar()
+    await asyncio.gather(*(desfasada(sonda, i / (taxa_hz * len(sondas))) for i, sonda in enumerate(sondas)))
+
+def monitorar():
+    global emissor_alerta, motor_sla, caminhos
+    emissor_alerta = canal_alerta.EmissorAlerta(socket_alerta)
+    caminhos = criar_caminhos()
+    taxa_hz = taxa_por_caminho(len(caminhos))
+    abertas = []
+    for caminho in caminhos:
+        sonda = SondaLatencia(caminho.destino, taxa_hz, modo_sonda, porta_eco_udp, timeout_s=intervalo_segundos,
+                              ao_amostrar=lambda amostra, c=caminho: processar_amostra(amostra, c),
+                              namespace=caminho.namespace)
+        try:
+            sonda.abrir()
+        except OSError as e:
+            print(f"[WARN] Não foi possível abrir o socket da sonda {caminho} ({e}).")
+            continue
+        abertas.append((caminho, sonda))
+    regras = estatisticas_janela.regras_de_config(regras_alerta, limiar_latencia_ms)
+    if not abertas or abertas[0][0] is not caminhos[0]:
+        # Sem socket no host do monitor: modo legado, só o primeiro caminho
+        for _, sonda in abertas:
+            sonda.fechar()
+        fechar_caminhos(caminhos[1:], caminhos[:1])
+        caminhos = caminhos[:1]
+        motor_sla = estatisticas_janela.MotorSlaFatia(caminhos, regras, periodo_normalizacao_segundos)
+        print(f"[WARN] Usando ping a cada {intervalo_segundos}s para {caminhos[0]}.")
+        monitorar_com_ping()
+        return
+    mantidos = [caminho for caminho, _ in abertas]
+    fechar_caminhos([caminho for caminho in caminhos if caminho not in mantidos], mantidos)
+    caminhos = mantidos
+    motor_sla = estatisticas_janela.MotorSlaFatia(caminhos, regras, periodo_normalizacao_segundos)
+    if len(caminhos) > 1:
+        print(f"Caminhos sondados a {taxa_hz} Hz cada: {', '.join(str(c) for c in caminhos)}")
+    for caminho in caminhos:
+        caminho.relatorio['inicio'] = time.time()
+    asyncio.run(executar_sondas([sonda for _, sonda in abertas], taxa_hz))
+
+def ler_argumentos():
+    """Permite ao executor de varreduras mudar a configuração sem editar o script."""
+    global ip_destino, destinos, pontos_observacao
+    global limiar_latencia_ms, periodo_normalizacao_segundos, taxa_amostragem_hz, modo_alerta, regras_alerta
+    parser = argparse.ArgumentParser(description="Monitor de latência uRLLC")
+    parser.add_argument('--destino', nargs='+', default=destinos, help="Um ou mais destinos a sondar")
+    parser.add_argument('--ponto', action='append', default=[], metavar='HOST=NAMESPACE',
+                        help="Outro ponto de observação: nome do host e o seu namespace de rede "
+                             "(ex. h_uRLLC2=/proc/1234/ns/net); repetível")
+    parser.add_argument('--limiar', type=float, default=limiar_latencia_ms, help="Limiar de alerta (ms)")
+    parser.add_argument('--periodo-calma', type=float, default=periodo_normalizacao_segundos,
+                        help="Segundos abaixo do limiar antes de desativar o alerta")
+    parser.add_argument('--taxa', type=int, default=taxa_amostragem_hz, help="Sondas por segundo")
+    parser.add_argument('--modo-alerta', default=modo_alerta, choices=['janela', 'amostra'])
+    parser.add_argument('--regras', type=json.loads, default=regras_alerta,
+                        help="JSON com a lista de regras do modo 'janela' (ver regras_alerta)")
+    args = parser.parse_args()
+    destinos, limiar_latencia_ms = args.destino, args.limiar
+    ip_destino = destinos[0]
+    pontos_observacao = dict(pontos_observacao, **dict(ponto.split('=', 1) for ponto in args.ponto))
+    periodo_normalizacao_segundos, taxa_amostragem_hz = args.periodo_calma, args.taxa
+    modo_alerta, regras_alerta = args.modo_alerta, args.regras
+
+if __name__ == '__main__':
+    ler_argumentos()
+    print(f"Iniciando monitoramento uRLLC com sonda {modo_sonda} a {taxa_amostragem_hz} Hz para {', '.join(destinos)} "
+          f"(limite: {limiar_latencia_ms} ms)")
+    if modo_alerta == 'janela':
+        print(f"Regras de alerta: {estatisticas_janela.regras_de_config(regras_alerta, limiar_latencia_ms)}")
+    try:
+        monitorar()
+    except KeyboardInterrupt:
+        print("\nMonitoramento uRLLC encerrado.")
+        if os.path.exists(arquivo_alerta):
+            if emissor_alerta:
+                emissor_alerta.enviar(canal_alerta.NORMAL)
+            os.remove(arquivo_alerta)
+    finally:
+        for escritor in {escritor_telemetria} | {caminho.escritor for caminho in caminhos}:
+            if escritor:
+                escritor.fechar()
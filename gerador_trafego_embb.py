@@ -2,7 +2,11 @@ import time
 import os
 import sys
 
-def iniciar_trafego_embb(host_cliente, ip_servidor, porta_servidor, largura_banda_mbps, duracao_segundos, log_dir):
+import iperf_json
+import telemetria
+
+def iniciar_trafego_embb(host_cliente, ip_servidor, porta_servidor, largura_banda_mbps, duracao_segundos, log_dir,
+                         escritor=None):
     """
     Inicia um fluxo de tráfego eMBB usando iperf UDP.
 
@@ -13,6 +17,7 @@ def iniciar_trafego_embb(host_cliente, ip_servidor, porta_servidor, largura_band
         largura_banda_mbps (int): A largura de banda alvo em Mbps.
         duracao_segundos (int): A duração do teste em segundos.
         log_dir (str): Diretório para salvar os logs.
+        escritor (telemetria.EscritorTelemetria): Se dado, regista o instante do lançamento (TRAFEGO_INICIO).
     """
     log_file_path = os.path.join(log_dir, "iperf_embb_log.txt")
 
@@ -28,13 +33,17 @@ def iniciar_trafego_embb(host_cliente, ip_servidor, porta_servidor, largura_band
     # -u: Modo UDP
     # -b <bandwidth>M: Largura de banda em Mbps
     # -t <duration>: Duração do teste
+    # -i 1 --json-stream: Um objeto JSON por intervalo de 1 s (texto em Mbits/s se o iperf3 for antigo)
     # > log_file 2>&1: Redireciona stdout e stderr para o arquivo de log
     # &: Executa em segundo plano
     
     # O comando é executado diretamente no host Mininet via .cmd()
+    opcoes = iperf_json.opcoes_saida(iperf_json.suporta_json_stream(host_cliente))
     cmd = (f"iperf3 -c {ip_servidor} -p {porta_servidor} -u -b {largura_banda_mbps}M -t {duracao_segundos} "
-           f"> {log_file_path} 2>&1 &")
-    
+           f"{opcoes} > {log_file_path} 2>&1 &")
+
+    if escritor is not None:
+        escritor.registrar(telemetria.TRAFEGO_INICIO, largura_banda_mbps, canal=telemetria.CANAL_EMBB)
     host_cliente.cmd(cmd)
     
     print(f"[eMBB Gen] Comando iperf enviado para {host_cliente.name}. Aguardando conclusão...")
@@ -63,7 +72,7 @@ if __name__ == '__main__':
             def cmd(self, command):
                 print(f"MockHost.cmd: {command}")
                 # For a real test, you'd run this command directly in your shell
-                os.system(command) 
+                return os.popen(command).read()
         
         mock_h = MockHost()
         iniciar_trafego_embb(mock_h, _ip_servidor, _porta_servidor, _largura_banda, _duracao, _log_dir)
@@ -2,11 +2,45 @@ import subprocess
 import time
 import os
 
-def iniciar_trafego_urllc(h_cliente, ip_servidor, porta_urllc, duracao_segundos, log_dir):
+import iperf_json
+import telemetria
+from trafego_urllc_udp import taxa_em_bits
+
+# Diretório dos scripts (o emissor por pacote é lançado a partir daqui dentro do host)
+code_dir = os.path.dirname(os.path.abspath(__file__))
+
+def iniciar_trafego_urllc(h_cliente, ip_servidor, porta_urllc, duracao_segundos, log_dir,
+                          taxa='40M', tamanho_pacote=128, gerador='iperf', agenda='periodica', fluxos=1,
+                          escritor=None, taxa_pps=None):
     """
-    Inicia um cliente iperf3 para gerar tráfego uRLLC (UDP) com taxa de bits baixa.
+    Inicia o tráfego uRLLC (UDP) de h_cliente para o servidor.
+
+    taxa segue a sintaxe do iperf3 -b (ex.: '100k', '40M') e é a taxa agregada de todos os
+    fluxos; tamanho_pacote é o -l em bytes. Com gerador='pacotes' o tráfego vem do
+    trafego_urllc_udp.py (agenda 'periodica' ou 'poisson', fluxos num só processo) e o
+    recetor na nuvem mede o atraso unidirecional de cada pacote; com 'iperf' é um cliente
+    iperf3 -u, que só reporta vazão agregada. Com gerador='pacotes', taxa_pps (pacotes/s de
+    todos os fluxos) sobrepõe taxa. Com escritor (telemetria.EscritorTelemetria), o instante
+    do lançamento fica na telemetria (TRAFEGO_INICIO).
     """
     print(f"*** Iniciando tráfego uRLLC de {h_cliente.name} para {ip_servidor}:{porta_urllc}...")
+    por_pacotes = gerador == 'pacotes' and taxa_pps is not None
+    if escritor is not None:
+        bits = taxa_pps * tamanho_pacote * 8 if por_pacotes else taxa_em_bits(taxa)
+        escritor.registrar(telemetria.TRAFEGO_INICIO, bits / 1e6, canal=telemetria.CANAL_URLLC)
+
+    if gerador == 'pacotes':
+        opcao_taxa = f"--taxa-pps {taxa_pps / fluxos:g}" if por_pacotes else f"--taxa {taxa}"
+        log_file_path = os.path.join(log_dir, f"emissor_urllc_{h_cliente.name}_to_{ip_servidor}.log")
+        emissor_cmd = (
+            f"python3 -u {code_dir}/trafego_urllc_udp.py enviar {ip_servidor} --portas {porta_urllc} "
+            f"--fluxos {fluxos} {opcao_taxa} --tamanho {tamanho_pacote} --agenda {agenda} "
+            f"--duracao {duracao_segundos} > {log_file_path} 2>&1 &"
+        )
+        print(f"    - Executando em {h_cliente.name}: {emissor_cmd}")
+        h_cliente.cmd(emissor_cmd)
+        print(f"    - Tráfego uRLLC de {h_cliente.name} iniciado ({fluxos} fluxos, agenda {agenda}).")
+        return
 
     log_file_path = os.path.join(log_dir, f"iperf_urllc_{h_cliente.name}_to_{ip_servidor}.log")
 
@@ -14,11 +48,12 @@ def iniciar_trafego_urllc(h_cliente, ip_servidor, porta_urllc, duracao_segundos,
     # -u: UDP
     # -b: Largura de banda em bits/seg (ex: 100k para 100 Kbps)
     # -t: Duração em segundos
-    # -i: Intervalo para relatórios (opcional, pode ser omitido para menos saída)
+    # -i 1 --json-stream: Um objeto JSON por intervalo de 1 s (texto em Mbits/s se o iperf3 for antigo)
     # --logfile: Salva a saída para um arquivo
     # -p: Porta
+    opcoes = iperf_json.opcoes_saida(iperf_json.suporta_json_stream(h_cliente))
     iperf_cmd = (
-        f"iperf3 -c {ip_servidor} -b 40M -l 128 -t {duracao_segundos} -p {porta_urllc} "
+        f"iperf3 -c {ip_servidor} -u -b {taxa} -l {tamanho_pacote} -t {duracao_segundos} -p {porta_urllc} {opcoes} "
         f"--logfile {log_file_path} > /dev/null 2>&1 &"
     )
     
@@ -2,37 +2,103 @@ import matplotlib
 matplotlib.use("Agg")  # Usa backend sem GUI (ideal para servidores/headless)
 
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.patches import Patch, Rectangle
+import argparse
 import os
-import pandas as pd
+import shutil
+import time
+from collections import deque
 import numpy as np
 import re
 
+from leitor_incremental import SeguidorArquivo, BufferAmostras
+import exportador_quadros
+import iperf_json
+import linha_temporal
+import series_longas
+import telemetria
+
 # --- Configuração ---
 # O diretório do projeto deve ser o mesmo usado em mininet_topologia_completa_v3.py
 project_dir = "/home/ubuntu/compartilhada"
+intervalo_ms = 1000  # 1 quadro por segundo (fps = 1)
+total_quadros = 120  # Quadros gravados (um por intervalo_ms, ao longo da experiência)
+window_size = 5 # Janela para a média móvel
+limiar_latencia_ms = 5.0
+modo_longo = False  # Execuções longas (ex. 24 h): memória e tempo por quadro constantes (ver series_longas)
+
+# Opções de linha de comando (usadas pelo executor de varreduras: uma pasta por execução)
+_parser = argparse.ArgumentParser(description="Gráfico de latência uRLLC e vazão eMBB")
+_parser.add_argument('--dir', default=project_dir, help="Diretório com os logs e onde gravar as saídas")
+_parser.add_argument('--quadros', type=int, default=total_quadros)
+_parser.add_argument('--limiar', type=float, default=limiar_latencia_ms)
+_parser.add_argument('--longo', action='store_true', default=modo_longo,
+                     help="Modo de longa duração: buffer circular, agregados e séries reduzidas à largura em píxeis")
+_args = _parser.parse_args()
+project_dir, total_quadros, limiar_latencia_ms = _args.dir, _args.quadros, _args.limiar
+modo_longo = _args.longo
+
 arquivo_log_urllc = os.path.join(project_dir, "urllc_log.txt") # Ajustado para usar project_dir
 arquivo_alerta = os.path.join(project_dir, "latencia.alerta") # Caminho para o arquivo de alerta de QoS
+arquivo_telemetria = os.path.join(project_dir, telemetria.nome_arquivo_telemetria)
+fonte_dados = "telemetria"  # 'telemetria' (binário, sem parsing) ou 'log' (texto do urllc_log.txt)
+origem_latencia = "h_uRLLC1"
 
 embb_client_name = "h_eMBB1"
 embb_server_ip = "172.19.40.100" # IP do h_cloud
 embb_log_base_dir = os.path.join(project_dir, "logs_embb") # Ajustado para usar project_dir
 arquivo_log_embb = os.path.join(embb_log_base_dir, "iperf_embb_log.txt")
-
-intervalo_ms = 1000  # 1 quadro por segundo (fps = 1)
-window_size = 5 # Janela para a média móvel
-
-# Listas para dados uRLLC
-tempos_urllc = []
-latencias_urllc = []
-
-# Variáveis para o monitoramento de QoS
-qos_active_start_index = None
-qos_active_periods = [] # Lista de tuplas (start_index, end_index) para períodos de QoS ativo
-first_qos_label = True # Flag para garantir que a label "QoS Ativo" apareça apenas uma vez
+# Vazão eMBB efetivamente entregue: log do servidor iperf3 (lado recetor) em h_cloud
+arquivo_vazao_embb = os.path.join(embb_log_base_dir, "iperf_embb_servidor.txt")
+
+# Resolução de saída: a animação e os instantâneos PNG têm DPI e cadência próprios
+tamanho_figura = (12, 6)
+dpi_animacao = 100
+dpi_png = 300
+intervalo_png_s = 10  # Segundos entre instantâneos PNG (um último é sempre gravado no fim)
+usar_blit = True      # Redesenha só os artistas dinâmicos enquanto os eixos não mudam
+passo_eixo_x = 60     # O eixo X (segundos) cresce em degraus, para que os limites mudem raramente
+marcadores_carga = 200  # Mudanças de carga (fases e arranques de tráfego) marcadas no gráfico, as mais recentes
+
+# Dados uRLLC: o leitor/seguidor lê só os registos ou linhas novos e o buffer acumula as latências
+leitor_telemetria = telemetria.LeitorTelemetria(arquivo_telemetria)
+agregador_latencia = telemetria.AgregadorMaximo(intervalo_ms / 1000)  # Pior RTT por intervalo, como no log
+seguidor_urllc = SeguidorArquivo(arquivo_log_urllc)
+buffer_latencias_urllc = BufferAmostras()
+buffer_media_movel = BufferAmostras()  # Média móvel calculada só para as amostras novas
+buffer_tempos_urllc = BufferAmostras()   # x de cada latência em segundos desde a primeira medida
+tempos_urllc = buffer_tempos_urllc.valores
+latencias_urllc = buffer_latencias_urllc.valores
+n_latencias = 0
+ancora_telemetria = None  # (t_ns, tempo de parede) para alinhar a telemetria com os logs do iperf3
+t0_parede = None          # Tempo de parede da primeira medida de latência (x = 0)
+eventos_pendentes = []    # Eventos lidos antes da primeira latência (ainda sem x = 0)
+
+# Dados eMBB: intervalos de 1 s do iperf3 (JSON em streaming), eixo Y secundário
+seguidor_vazao_embb = iperf_json.SeguidorIperf(arquivo_vazao_embb)
+buffer_tempos_embb = BufferAmostras()
+buffer_vazao_embb = BufferAmostras()
+
+# Variáveis para o monitoramento de QoS: com telemetria, os períodos vêm dos eventos do controlador
+# (árvore HTB aplicada/removida); com a fonte 'log', do arquivo de alerta visto a cada quadro
+periodos_qos = linha_temporal.PeriodosQos()
+qos_active_start_x = None
+faixa_qos_atual = None  # Retângulo do período de QoS em curso (atualizado a cada quadro)
+x_carga = deque(maxlen=marcadores_carga)  # x das mudanças de carga
+
+# Modo longo: as listas/buffers acima ficam vazios; cada série guarda as amostras recentes num
+# buffer circular e as antigas em agregados por balde, e o que se desenha é reduzido (LTTB)
+# a um ponto por píxel de largura, pelo que memória e tempo por quadro não crescem com a duração
+serie_latencia = series_longas.SerieLonga()
+serie_vazao_embb = series_longas.SerieLonga()
+serie_qos = series_longas.SerieLonga()  # 1 com o QoS ativo, 0 sem: uma amostra por transição e por quadro
+x_qos = 0.0  # x da última amostra da serie_qos (as amostras têm de ser crescentes)
+pontos_grafico = int(tamanho_figura[0] * dpi_animacao)
 
 # Criar a figura e os eixos
-fig, ax1 = plt.subplots(figsize=(12, 6)) # Aumentar tamanho para melhor visualização
+fig, ax1 = plt.subplots(figsize=tamanho_figura) # Aumentar tamanho para melhor visualização
+ax2 = ax1.twinx()  # Vazão eMBB
 
 # --- PRE-EXECUÇÃO: Garantir que os diretórios e arquivos de log existam ---
 os.makedirs(project_dir, exist_ok=True)
@@ -78,108 +144,278 @@ def extrair_largura_banda_embb(linhas):
     return larguras_banda_extraidas
 
 
-def atualizar(frame):
-    global qos_active_start_index, qos_active_periods, first_qos_label
+def x_telemetria(t_ns):
+    """Segundos desde a primeira medida de latência (x = 0), no relógio monotónico da telemetria."""
+    return (np.asarray(t_ns, dtype=np.int64) - agregador_latencia.t0_ns) / 1e9
+
+
+def ler_latencias_novas():
+    """
+    Latências novas (uma por intervalo) da fonte configurada: (x em segundos, latências, eventos).
+
+    Com telemetria, x é o instante real de cada intervalo e os eventos são os de todas as
+    origens (monitor, controlador, geradores), ordenados; com o log, x é o índice da medida
+    vezes o intervalo e não há eventos. Levanta FileNotFoundError se faltar.
+    """
+    global ancora_telemetria, t0_parede, n_latencias
+    if fonte_dados == "telemetria":
+        registros = leitor_telemetria.ler_novos()
+        if ancora_telemetria is None:
+            ancora_telemetria = telemetria.ancora_relogio(registros)
+        eventos_pendentes.append(linha_temporal.eventos(registros))
+        registros = registros[(registros['metrica'] == telemetria.LATENCIA_MS) &
+                              (registros['origem'] == origem_latencia.encode())]
+        t_ns, maximos = agregador_latencia.adicionar(registros['t_ns'], registros['valor'])
+        if agregador_latencia.t0_ns is None:
+            return np.empty(0), maximos, eventos_pendentes[-1][:0]
+        if t0_parede is None and ancora_telemetria is not None:
+            t_ns0, parede0 = ancora_telemetria
+            t0_parede = parede0 + (agregador_latencia.t0_ns - t_ns0) / 1e9
+        eventos = np.concatenate(eventos_pendentes)
+        eventos_pendentes.clear()
+        n_latencias += len(maximos)
+        return x_telemetria(t_ns), maximos, eventos
+    latencias = extrair_latencias_urllc(seguidor_urllc.ler_novas_linhas())
+    x = (n_latencias + np.arange(len(latencias))) * intervalo_ms / 1000
+    n_latencias += len(latencias)
+    return x, latencias, []
+
+
+def ler_vazao_embb_nova():
+    """Devolve (x em segundos, Mbit/s) dos intervalos eMBB novos, na mesma escala de tempo da latência."""
+    registros = seguidor_vazao_embb.ler_novos()
+    if not registros:
+        return [], []
+    if t0_parede is not None and registros[0].t_parede is not None:
+        # Alinha pelo relógio de parede: o iperf3 arrancou noutro instante que o monitor
+        x = [r.t_parede - t0_parede for r in registros]
+    else:
+        x = [r.inicio_s for r in registros]
+    return x, [r.mbps for r in registros]
+
+
+def media_movel_incremental(latencias, n_antigas):
+    """Média móvel das amostras a partir de n_antigas, usando só a janela necessária."""
+    inicio = max(n_antigas, window_size - 1)
+    if len(latencias) <= inicio:
+        return np.empty(0)
+    trecho = latencias[inicio - window_size + 1:]
+    return np.convolve(trecho, np.ones(window_size) / window_size, mode='valid')
+
+
+def transicoes_qos(eventos, x_atual):
+    """
+    Mudanças do estado do QoS desde o último quadro: lista de (x, ativo).
+
+    Com telemetria, nos instantes em que o controlador acabou de aplicar ou remover a árvore;
+    com a fonte 'log', no quadro em que o arquivo de alerta apareceu ou desapareceu.
+    """
+    if fonte_dados == "telemetria":
+        return [(float(x_telemetria(t_ns)), ativo) for t_ns, ativo in periodos_qos.adicionar(eventos)]
+    ativo = os.path.exists(arquivo_alerta)
+    return [(x_atual, ativo)] if ativo != (qos_active_start_x is not None) else []
+
+
+def marcar_cargas(eventos):
+    """Acrescenta as mudanças de carga dos eventos aos marcadores e atualiza as linhas verticais."""
+    if len(eventos) == 0:
+        return
+    cargas = eventos[np.isin(eventos['metrica'], linha_temporal.EVENTOS_CARGA)]
+    if len(cargas) == 0:
+        return
+    x_carga.extend(x_telemetria(cargas['t_ns']).tolist())
+    marcadores_carga_linhas.set_segments([[(x, 0), (x, 1)] for x in x_carga])
+
+
+def criar_faixa_qos(inicio):
+    faixa = Rectangle((inicio, 0), 0, 1, transform=ax1.get_xaxis_transform(),
+                      color='orange', alpha=0.3, linewidth=0)
+    ax1.add_patch(faixa)
+    return faixa
+
+
+# --- Artistas criados uma única vez; atualizar() só muda os seus dados ---
+linha_latencia, = ax1.plot([], [], marker=None if modo_longo else 'o', color='blue', label="Latência uRLLC (ms)", linewidth=0.7, markersize=4)
+linha_media_movel, = ax1.plot([], [], color='cyan', linestyle='--', label=f"Média Móvel uRLLC ({window_size}s)")
+linha_vazao_embb, = ax2.plot([], [], color='green', linewidth=1.0, alpha=0.8, label="Vazão eMBB recebida (Mbit/s)")
+linha_limite = ax1.axhline(y=limiar_latencia_ms, color='red', linestyle=':', label=f'Limite uRLLC ({limiar_latencia_ms:g}ms)')
+ax1.set_xlabel("Tempo (s)")
+ax1.set_ylabel("Latência uRLLC (ms)", color='blue')
+ax1.tick_params(axis='y', labelcolor='blue')
+ax1.grid(True, linestyle='--', alpha=0.7)
+ax1.set_xlim(0, passo_eixo_x)
+ax1.set_ylim(0, 10)
+ax2.set_ylabel("Vazão eMBB (Mbit/s)", color='green')
+ax2.tick_params(axis='y', labelcolor='green')
+ax2.set_ylim(0, 50)
+# Modo longo: um só artista para todas as faixas de QoS, refeito a partir da serie_qos
+faixas_qos_longo = PolyCollection([], transform=ax1.get_xaxis_transform(), facecolor='orange', alpha=0.3, linewidth=0)
+if modo_longo:
+    ax1.add_collection(faixas_qos_longo)
+# Mudanças de carga (fases eMBB, degraus, arranque dos geradores), no relógio comum da telemetria
+marcadores_carga_linhas = LineCollection([], transform=ax1.get_xaxis_transform(), colors='gray',
+                                         linestyles='-.', linewidths=0.8, label="Mudança de carga")
+ax1.add_collection(marcadores_carga_linhas)
+
+# --- Títulos e Legendas (a legenda fica no eixo de cima, o ax2) ---
+ax1.set_title("Monitoramento de Latência uRLLC")
+ax2.legend(handles=[linha_latencia, linha_media_movel, linha_limite, linha_vazao_embb, marcadores_carga_linhas, Patch(color='orange', alpha=0.3, label='QoS Ativo')],
+           loc='upper left', bbox_to_anchor=(0.0, 1.0))
 
-    # --- Ler e processar dados uRLLC ---
-    try:
-        with open(arquivo_log_urllc, "r") as f:
-            linhas_urllc = f.readlines()
-    except FileNotFoundError:
-        print(f"Erro: Arquivo de log uRLLC não encontrado em {arquivo_log_urllc}. Skipping update.")
-        return # Sair da atualização se o arquivo principal não existir
 
-    nova_latencias = extrair_latencias_urllc(linhas_urllc)
-    tempos_urllc.clear()
-    latencias_urllc.clear()
-    for i, lat in enumerate(nova_latencias):
-        tempos_urllc.append(i)
-        latencias_urllc.append(lat)
+def atualizar(frame):
+    global qos_active_start_x, faixa_qos_atual
+    global tempos_urllc, latencias_urllc
 
-    current_data_index = len(tempos_urllc) - 1 if tempos_urllc else 0 # Ensure it's not negative
+    # --- Ler e processar dados uRLLC (apenas o acrescentado desde o último quadro) ---
+    try:
+        x_novos, latencias_novas, eventos = ler_latencias_novas()
+    except FileNotFoundError as e:
+        print(f"Erro: Arquivo de dados uRLLC não encontrado em {e.filename}. Skipping update.")
+        return [] # Sair da atualização se o arquivo principal não existir
+
+    n_antigas = len(buffer_latencias_urllc)
+    buffer_tempos_urllc.adicionar(x_novos)
+    buffer_latencias_urllc.adicionar(latencias_novas)
+    tempos_urllc = buffer_tempos_urllc.valores
+    latencias_urllc = buffer_latencias_urllc.valores
+    buffer_media_movel.adicionar(media_movel_incremental(latencias_urllc, n_antigas))
+
+    # --- Vazão eMBB (só os intervalos novos do log do iperf3) ---
+    x_embb, vazao_embb = ler_vazao_embb_nova()
+    buffer_tempos_embb.adicionar(x_embb)
+    buffer_vazao_embb.adicionar(vazao_embb)
+
+    # Instante atual: a última latência ou o último evento, se for posterior
+    x_atual = float(tempos_urllc[-1]) if len(tempos_urllc) else 0.0
+    if len(eventos):
+        x_atual = max(x_atual, float(x_telemetria(eventos['t_ns'][-1])))
 
     # --- Monitoramento e marcação de QoS ---
-    qos_is_active_now = os.path.exists(arquivo_alerta)
-
-    if qos_is_active_now and qos_active_start_index is None:
-        # QoS acaba de ser ativado
-        qos_active_start_index = current_data_index
-
-    elif not qos_is_active_now and qos_active_start_index is not None:
-        # QoS acaba de ser desativado
-        qos_active_periods.append((qos_active_start_index, current_data_index))
-        qos_active_start_index = None
-
-    # --- Plotar uRLLC (Eixo Y Esquerdo) ---
-    ax1.clear()
-    first_qos_label = True # Reset for each update call to correctly apply label
-
-    # Plotar períodos de QoS ativo
-    for start, end in qos_active_periods:
-        if first_qos_label:
-            ax1.axvspan(start, end, color='orange', alpha=0.3, label='QoS Ativo')
-            first_qos_label = False
-        else:
-            ax1.axvspan(start, end, color='orange', alpha=0.3)
-
-    # Plotar o período de QoS ativo atual (se houver)
-    if qos_active_start_index is not None:
-        if first_qos_label:
-            ax1.axvspan(qos_active_start_index, current_data_index, color='orange', alpha=0.3, label='QoS Ativo')
-            first_qos_label = False
+    for x, qos_is_active_now in transicoes_qos(eventos, x_atual):
+        if qos_is_active_now:
+            # QoS acaba de ser ativado
+            qos_active_start_x = x
+            faixa_qos_atual = criar_faixa_qos(x)
         else:
-            ax1.axvspan(qos_active_start_index, current_data_index, color='orange', alpha=0.3)
-
-
-    ax1.plot(tempos_urllc, latencias_urllc, marker='o', color='blue', label="Latência uRLLC (ms)", linewidth=0.7, markersize=4)
-
-    # Média móvel uRLLC
-    if len(latencias_urllc) >= window_size:
-        latencias_series = pd.Series(latencias_urllc)
-        media_movel = latencias_series.rolling(window=window_size).mean()
-        ax1.plot(tempos_urllc[window_size-1:], media_movel[window_size-1:], color='cyan', linestyle='--', label=f"Média Móvel uRLLC ({window_size}s)")
-
-    ax1.axhline(y=5, color='red', linestyle=':', label='Limite uRLLC (5ms)')
-    ax1.set_xlabel("Tempo (segundos/medidas)")
-    ax1.set_ylabel("Latência uRLLC (ms)", color='blue')
-    ax1.tick_params(axis='y', labelcolor='blue')
-    # Ajustar o limite Y para garantir que 5ms e os dados caibam
-    if latencias_urllc:
-        ax1.set_ylim(0, max(10, max(latencias_urllc + [5]) + 1))
-    else:
-        ax1.set_ylim(0, 10)
-    ax1.grid(True, linestyle='--', alpha=0.7)
+            # QoS acaba de ser desativado: a faixa fica com a largura final
+            faixa_qos_atual.set_width(x - qos_active_start_x)
+            qos_active_start_x = None
+            faixa_qos_atual = None
 
+    if faixa_qos_atual is not None:
+        faixa_qos_atual.set_width(max(x_atual - qos_active_start_x, 0))
+    marcar_cargas(eventos)
 
-    # --- Títulos e Legendas ---
-    ax1.set_title("Monitoramento de Latência uRLLC")
-
-    # Combinar legendas de ambos os eixos
-    lines, labels = ax1.get_legend_handles_labels()
-    ax1.legend(lines, labels, loc='upper left', bbox_to_anchor=(0.0, 1.0))
-
-    # Salvar como PNG em alta definição (DPI)
-    plt.savefig(os.path.join(project_dir, "latencia_e_trafego.png"), dpi=600, bbox_inches='tight')
-
-
-# Criar a animação (com 10 quadros como exemplo para testes, em Mininet pode ser mais)
-# Em um ambiente Mininet real, o 'frames' pode ser omitido ou muito maior para captura contínua.
-# Ou você pode rodar 'atualizar(None)' periodicamente em vez de FuncAnimation.
-ani = animation.FuncAnimation(
-    fig,
-    atualizar,
-    frames=120,  # número de quadros do vídeo/gif para demonstração
-    interval=intervalo_ms,
-    cache_frame_data=False
-)
-
-# Salvar como GIF
-ani.save(os.path.join(project_dir, "latencia_e_trafego.gif"), writer="pillow", fps=1)
+    # --- Plotar uRLLC (Eixo Y Esquerdo) ---
+    linha_latencia.set_data(tempos_urllc, latencias_urllc)
+    linha_media_movel.set_data(tempos_urllc[window_size - 1:], buffer_media_movel.valores)
+    linha_vazao_embb.set_data(buffer_tempos_embb.valores, buffer_vazao_embb.valores)
+
+    # Limites só mudam quando os dados saem da área visível
+    x_max = max(x_atual, buffer_tempos_embb.valores.max() if len(buffer_tempos_embb) else 0)
+    if x_max >= ax1.get_xlim()[1]:
+        ax1.set_xlim(0, (x_max // passo_eixo_x + 1) * passo_eixo_x)
+    if len(latencias_urllc):
+        # Ajustar o limite Y para garantir que o limiar e os dados caibam
+        ax1.set_ylim(0, max(10, max(latencias_urllc.max(), limiar_latencia_ms) + 1))
+    if len(buffer_vazao_embb) and buffer_vazao_embb.valores.max() > ax2.get_ylim()[1]:
+        ax2.set_ylim(0, (buffer_vazao_embb.valores.max() // 10 + 1) * 10)
+
+    artistas = [linha_latencia, linha_media_movel, linha_vazao_embb, marcadores_carga_linhas]
+    if faixa_qos_atual is not None:
+        artistas.append(faixa_qos_atual)
+    return artistas
+
+
+def periodos_ativos(x, ativo):
+    """Retângulos (em coordenadas de faixa do ax1) dos trechos em que ativo > 0."""
+    mudancas = np.flatnonzero(np.diff(np.r_[0, (ativo > 0).astype(int), 0]))
+    faixas = []
+    for inicio, fim in zip(mudancas[::2], mudancas[1::2]):
+        x0, x1 = x[inicio], x[min(fim, len(x) - 1)]
+        faixas.append([(x0, 0), (x1, 0), (x1, 1), (x0, 1)])
+    return faixas
+
+
+def atualizar_longo(frame):
+    """atualizar() do modo longo: as mesmas leituras, com séries de memória fixa."""
+    global qos_active_start_x, x_qos
 
-# Salvar como MP4 (vídeo)
+    try:
+        x_novos, latencias_novas, eventos = ler_latencias_novas()
+    except FileNotFoundError as e:
+        print(f"Erro: Arquivo de dados uRLLC não encontrado em {e.filename}. Skipping update.")
+        return []
+    serie_latencia.adicionar(x_novos, latencias_novas)
+    serie_vazao_embb.adicionar(*ler_vazao_embb_nova())
+
+    x_atual = float(x_novos[-1]) if len(x_novos) else x_qos
+    if len(eventos):
+        x_atual = max(x_atual, float(x_telemetria(eventos['t_ns'][-1])))
+    # Cada transição entra no seu instante; no fim, o estado atual no instante atual
+    for x, ativo in transicoes_qos(eventos, x_atual):
+        x_qos = max(x, x_qos)
+        serie_qos.adicionar([x_qos], [1.0 if ativo else 0.0])
+        qos_active_start_x = x if ativo else None
+    x_qos = max(x_atual, x_qos)
+    serie_qos.adicionar([x_qos], [0.0 if qos_active_start_x is None else 1.0])
+    marcar_cargas(eventos)
+
+    # Pior RTT de cada balde antigo (os picos não se perdem na agregação), seguido das amostras cruas
+    x_lat, y_lat = serie_latencia.serie('max')
+    linha_latencia.set_data(*series_longas.lttb(x_lat, y_lat, pontos_grafico))
+    # Média móvel sobre as amostras recentes; para as antigas, a média de cada balde
+    x_antigas, media_antigas = serie_latencia.antigas.serie('media')
+    recentes = serie_latencia.recentes
+    media_recentes = media_movel_incremental(recentes.valores, 0)
+    linha_media_movel.set_data(*series_longas.lttb(np.r_[x_antigas, recentes.t[window_size - 1:]],
+                                                   np.r_[media_antigas, media_recentes], pontos_grafico))
+    x_embb, y_embb = serie_vazao_embb.serie('media')
+    linha_vazao_embb.set_data(*series_longas.lttb(x_embb, y_embb, pontos_grafico))
+    faixas_qos_longo.set_verts(periodos_ativos(*serie_qos.serie('max')))
+
+    # O eixo X cresce 25% de cada vez: redesenhos completos cada vez mais raros
+    x_max = max(x_atual, x_embb.max() if len(x_embb) else 0)
+    limite_x = ax1.get_xlim()[1]
+    while x_max >= limite_x:
+        limite_x = max(limite_x * 1.25, passo_eixo_x)
+    if limite_x != ax1.get_xlim()[1]:
+        ax1.set_xlim(0, (limite_x // passo_eixo_x + 1) * passo_eixo_x)
+    ax1.set_ylim(0, max(10, max(serie_latencia.maximo(), limiar_latencia_ms) + 1))
+    vazao_maxima = serie_vazao_embb.maximo()
+    if vazao_maxima > ax2.get_ylim()[1]:
+        ax2.set_ylim(0, (vazao_maxima // 10 + 1) * 10)
+
+    return [linha_latencia, linha_media_movel, linha_vazao_embb, faixas_qos_longo, marcadores_carga_linhas]
+
+
+# --- Exportação numa só passagem ---
+# Cada quadro é renderizado uma vez e o mesmo raster segue para o GIF, o MP4 e os
+# instantâneos PNG, à medida que a experiência decorre (em vez de dois ani.save no fim).
+fps = 1000 / intervalo_ms
+codificadores = [
+    exportador_quadros.CodificadorPNG(os.path.join(project_dir, "latencia_e_trafego.png"), dpi_png, intervalo_png_s),
+]
+if modo_longo and not shutil.which('ffmpeg'):
+    # O GIF pelo Pillow guarda todos os quadros em memória até ao fim
+    print("[INFO] Modo longo sem ffmpeg: GIF não gerado (só o PNG).")
+else:
+    codificadores.insert(0, exportador_quadros.codificador_gif(os.path.join(project_dir, "latencia_e_trafego.gif"), fps))
+if shutil.which('ffmpeg'):
+    codificadores.append(exportador_quadros.codificador_mp4(os.path.join(project_dir, "latencia_e_trafego.mp4"), fps))
+else:
+    print("Não foi possível salvar o MP4: ffmpeg não encontrado. Certifique-se de que o ffmpeg está instalado e acessível.")
+
+exportador = exportador_quadros.ExportadorQuadros(fig, dpi_animacao, codificadores, usar_blit=usar_blit)
+proximo_quadro = time.monotonic()
 try:
-    ani.save(os.path.join(project_dir, "latencia_e_trafego.mp4"), writer="ffmpeg", fps=1)
-except ValueError as e:
-    print(f"Não foi possível salvar o MP4: {e}. Certifique-se de que o ffmpeg está instalado e acessível.")
-
-print("✅ PNG, GIF e MP4 gerados com sucesso para latência uRLLC e tráfego eMBB!")
\ No newline at end of file
+    for frame in range(total_quadros):
+        exportador.adicionar_quadro(atualizar_longo(frame) if modo_longo else atualizar(frame))
+        # Ritmo de tempo real: um quadro por intervalo_ms
+        proximo_quadro += intervalo_ms / 1000
+        time.sleep(max(0.0, proximo_quadro - time.monotonic()))
+finally:
+    exportador.fechar()
+
+print("✅ PNG, GIF e MP4 gerados com sucesso para latência uRLLC e tráfego eMBB!")
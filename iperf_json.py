@@ -0,0 +1,114 @@
+import json
+import re
+import sys
+from collections import namedtuple
+
+from leitor_incremental import SeguidorArquivo
+
+# Um registo por intervalo de relatório do iperf3 (normalmente 1 s).
+# jitter_ms/perda_pct/pacotes ficam a None quando o lado que escreveu o log não os mede
+# (ex.: o cliente UDP só conhece a perda no fim; o servidor mede-a a cada intervalo).
+RegistroIntervalo = namedtuple('RegistroIntervalo',
+                               ['inicio_s', 'fim_s', 'mbps', 'jitter_ms', 'perda_pct', 'pacotes', 't_parede'])
+
+# Linhas de texto do iperf3 (modo sem JSON), ex.:
+# [  5]   0.00-1.00   sec  5.36 MBytes  45.0 Mbits/sec  0.012 ms  0/3880 (0%)
+_padrao_texto = re.compile(
+    r'\[\s*(?:\d+|SUM)\]\s+(\d+\.\d+)-(\d+\.\d+)\s+sec\s+\S+\s+\S+\s+(\d+(?:\.\d+)?)\s+([KMG]?)bits/sec'
+    r'(?:\s+(\d+(?:\.\d+)?)\s+ms\s+(\d+)/(\d+)\s+\((\S+)%\))?')
+_escala_mbps = {'': 1e-6, 'K': 1e-3, 'M': 1.0, 'G': 1e3}
+
+
+def suporta_json_stream(host):
+    """Verifica se o iperf3 do host aceita --json-stream (iperf3 >= 3.17)."""
+    return '--json-stream' in (host.cmd('iperf3 --help 2>&1') or '')
+
+
+def opcoes_saida(json_stream):
+    """Opções de relatório do iperf3: JSON em streaming, ou texto em Mbits/s como alternativa."""
+    return '-i 1 --json-stream' if json_stream else '-i 1 -f m'
+
+
+class ParserIperf:
+    """
+    Parser em streaming de logs do iperf3.
+
+    Aceita linha a linha a saída de '--json-stream' (um objeto JSON por linha) e,
+    para versões antigas do iperf3, as linhas de texto equivalentes.
+    """
+
+    def __init__(self):
+        self.t_inicio_parede = None  # Instante (time.time()) em que o teste começou, se conhecido
+
+    def _do_json(self, evento):
+        tipo = evento.get('event')
+        dados = evento.get('data', {})
+        if tipo == 'start':
+            self.t_inicio_parede = dados.get('timestamp', {}).get('timesecs')
+            return None
+        if tipo != 'interval':
+            return None
+        soma = dados.get('sum') or {}
+        if soma.get('omitted'):
+            return None
+        inicio, fim = soma.get('start', 0.0), soma.get('end', 0.0)
+        perda = soma.get('lost_percent')
+        return RegistroIntervalo(
+            inicio, fim, soma.get('bits_per_second', 0.0) / 1e6, soma.get('jitter_ms'), perda,
+            soma.get('packets'), self._parede(inicio))
+
+    def _do_texto(self, linha):
+        match = _padrao_texto.search(linha)
+        if not match or 'sender' in linha or 'receiver' in linha:
+            return None  # Linhas de resumo final repetem o teste inteiro
+        inicio, fim, valor, prefixo, jitter, perdidos, total, perda = match.groups()
+        inicio, fim = float(inicio), float(fim)
+        return RegistroIntervalo(
+            inicio, fim, float(valor) * _escala_mbps[prefixo], float(jitter) if jitter else None,
+            float(perda) if perda else None, int(total) if total else None, self._parede(inicio))
+
+    def _parede(self, inicio_s):
+        return self.t_inicio_parede + inicio_s if self.t_inicio_parede is not None else None
+
+    def processar_linha(self, linha):
+        """Devolve um RegistroIntervalo, ou None se a linha não for um relatório de intervalo."""
+        linha = linha.strip()
+        if linha.startswith('{'):
+            try:
+                return self._do_json(json.loads(linha))
+            except ValueError:
+                return None
+        return self._do_texto(linha)
+
+    def processar_linhas(self, linhas):
+        registros = []
+        for linha in linhas:
+            registro = self.processar_linha(linha)
+            if registro is not None:
+                registros.append(registro)
+        return registros
+
+
+class SeguidorIperf:
+    """Segue um log do iperf3 enquanto o teste decorre e devolve só os intervalos novos."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.parser = ParserIperf()
+        self._seguidor = SeguidorArquivo(caminho)
+
+    def ler_novos(self):
+        """Devolve a lista de RegistroIntervalo novos ([] se o log ainda não existir)."""
+        try:
+            return self.parser.processar_linhas(self._seguidor.ler_novas_linhas())
+        except FileNotFoundError:
+            return []
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        with open(sys.argv[1]) as f:
+            for registro in ParserIperf().processar_linhas(f):
+                print(registro)
+    else:
+        print("Uso: python3 iperf_json.py <LOG_IPERF3>")
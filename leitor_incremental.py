@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+
+
+class SeguidorArquivo:
+    """
+    Lê um ficheiro de log de forma incremental, como 'tail -F'.
+
+    Guarda o offset entre chamadas e devolve apenas as linhas completas acrescentadas
+    desde a última leitura; uma linha parcial fica retida até o escritor a terminar.
+    Rotação (o caminho passa a apontar para outro inode) e truncagem (o ficheiro
+    encolhe) são detetadas: o ficheiro antigo é lido até ao fim e a leitura recomeça
+    do início do novo.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+        self._inode = None
+        self._resto = b''
+
+    def _abrir(self):
+        self._arquivo = open(self.caminho, 'rb')
+        self._inode = os.fstat(self._arquivo.fileno()).st_ino
+        self._resto = b''
+
+    def _ler_disponivel(self):
+        dados = self._resto + self._arquivo.read()
+        *linhas, self._resto = dados.split(b'\n')
+        return [linha.decode('utf-8', errors='replace') for linha in linhas]
+
+    def ler_novas_linhas(self):
+        """
+        Devolve a lista de linhas completas novas (sem o '\\n').
+
+        Levanta FileNotFoundError se o ficheiro ainda não existir.
+        """
+        if self._arquivo is None:
+            self._abrir()
+
+        linhas = self._ler_disponivel()
+
+        try:
+            estado = os.stat(self.caminho)
+        except FileNotFoundError:
+            return linhas  # Rodado e ainda não recriado: continua no ficheiro antigo
+
+        if estado.st_ino != self._inode:
+            # Rotação: o que restava do antigo já foi lido acima.
+            self._arquivo.close()
+            self._abrir()
+            linhas += self._ler_disponivel()
+        elif estado.st_size < self._arquivo.tell():
+            # Truncagem: recomeça do início.
+            self._arquivo.seek(0)
+            self._resto = b''
+            linhas += self._ler_disponivel()
+        return linhas
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class BufferAmostras:
+    """
+    Buffer de amostras sobre um array NumPy pré-alocado.
+
+    A capacidade duplica quando se esgota, pelo que acrescentar é O(1) amortizado e
+    'valores' é uma vista sem cópia das amostras já recebidas.
+    """
+
+    def __init__(self, capacidade=4096, dtype=np.float64):
+        self._dados = np.empty(capacidade, dtype=dtype)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def adicionar(self, valores):
+        novos = len(valores)
+        if novos == 0:
+            return
+        necessario = self._n + novos
+        if necessario > len(self._dados):
+            capacidade = len(self._dados)
+            while capacidade < necessario:
+                capacidade *= 2
+            maior = np.empty(capacidade, dtype=self._dados.dtype)
+            maior[:self._n] = self._dados[:self._n]
+            self._dados = maior
+        self._dados[self._n:necessario] = valores
+        self._n = necessario
+
+    @property
+    def valores(self):
+        return self._dados[:self._n]
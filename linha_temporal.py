@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+import benchmark_controlador
+import telemetria
+
+# --- Configurações ---
+nome_arquivo_linha_temporal = "linha_temporal.json"  # Episódios de violação e atrasos causais
+nome_arquivo_eventos = "linha_temporal.csv"          # Todos os eventos, por ordem, no relógio comum
+janela_recuperacao_s = benchmark_controlador.janela_recuperacao_s  # Fim de um episódio: esta janela sem violações
+
+# Eventos que mudam a carga oferecida (a causa candidata de um episódio)
+EVENTOS_CARGA = (telemetria.TRAFEGO_INICIO, telemetria.FASE_EMBB_INICIO, telemetria.FASE_EMBB_FIM,
+                 telemetria.DEGRAU_INICIO, telemetria.DEGRAU_FIM)
+# Fim de cada tipo de atuação (canal de QOS_INICIO e QOS_INTERFACES)
+FIM_ATUACAO = {0: telemetria.QOS_APLICADO, 1: telemetria.QOS_ALTERADO, 2: telemetria.QOS_REMOVIDO}
+TIPOS_ATUACAO = {0: 'aplicar', 1: 'alterar', 2: 'remover'}
+
+# Atrasos de cada episódio (ms); o resumo dá os percentis de cada um
+ATRASOS = ['carga_violacao_ms', 'violacao_alerta_ms', 'violacao_atuacao_ms', 'alerta_atuacao_ms',
+           'duracao_atuacao_ms', 'atuacao_recuperacao_ms', 'violacao_recuperacao_ms']
+
+
+def eventos(registros):
+    """Os eventos (métricas >= PRIMEIRO_EVENTO, sem as âncoras de relógio) de todas as origens, por instante."""
+    selecao = (registros['metrica'] >= telemetria.PRIMEIRO_EVENTO) & (registros['metrica'] != telemetria.RELOGIO)
+    return np.sort(np.array(registros[selecao]), order='t_ns', kind='stable')
+
+
+def atuacoes(registros):
+    """
+    Atuações tc do controlador: lista de dicts com tipo, inicio_ns e fim_ns.
+
+    Cada fim (QOS_APLICADO, QOS_ALTERADO, QOS_REMOVIDO) é emparelhado com o QOS_INICIO do mesmo
+    tipo que o precede; numa telemetria sem QOS_INICIO, o início é o fim menos a duração registada.
+    """
+    selecao = np.isin(registros['metrica'], [telemetria.QOS_INICIO] + list(FIM_ATUACAO.values()))
+    do_controlador = np.sort(np.array(registros[selecao]), order='t_ns', kind='stable')
+    inicios, resultado = {}, []
+    for r in do_controlador:
+        if r['metrica'] == telemetria.QOS_INICIO:
+            inicios[int(r['canal'])] = int(r['t_ns'])
+            continue
+        tipo = next(t for t, m in FIM_ATUACAO.items() if m == r['metrica'])
+        fim = int(r['t_ns'])
+        inicio = inicios.pop(tipo, fim - int(r['valor'] * 1e6))
+        resultado.append({'tipo': TIPOS_ATUACAO[tipo], 'inicio_ns': inicio, 'fim_ns': fim})
+    return resultado
+
+
+class PeriodosQos:
+    """
+    Períodos com a árvore instalada (do fim da aplicação ao fim da remoção), a partir dos
+    eventos do controlador, em lotes de registos (ex. os de um LeitorTelemetria).
+    """
+
+    def __init__(self):
+        self.inicio_ns = None  # Período em curso
+        self.periodos = []     # (início, fim) em ns dos períodos fechados
+
+    def adicionar(self, registros):
+        """Devolve as transições do lote: lista de (t_ns, ativo)."""
+        selecao = registros[np.isin(registros['metrica'], [telemetria.QOS_APLICADO, telemetria.QOS_REMOVIDO])]
+        transicoes = []
+        for r in np.sort(selecao, order='t_ns', kind='stable'):
+            t_ns = int(r['t_ns'])
+            if r['metrica'] == telemetria.QOS_APLICADO and self.inicio_ns is None:
+                self.inicio_ns = t_ns
+                transicoes.append((t_ns, True))
+            elif r['metrica'] == telemetria.QOS_REMOVIDO and self.inicio_ns is not None:
+                self.periodos.append((self.inicio_ns, t_ns))
+                self.inicio_ns = None
+                transicoes.append((t_ns, False))
+        return transicoes
+
+
+def _primeiro(t_eventos, depois_ns, antes_ns=None):
+    """Primeiro instante de t_eventos (ordenado) em [depois_ns, antes_ns), ou None."""
+    i = np.searchsorted(t_eventos, depois_ns, side='left')
+    if i < len(t_eventos) and (antes_ns is None or t_eventos[i] < antes_ns):
+        return int(t_eventos[i])
+    return None
+
+
+def _ms(de_ns, ate_ns):
+    return round((ate_ns - de_ns) / 1e6, 3) if de_ns is not None and ate_ns is not None else None
+
+
+def episodios(registros, limiar_ms):
+    """
+    Episódios de violação do SLA nas sondas do monitor e os atrasos causais de cada um.
+
+    Um episódio começa na primeira sonda em violação (acima do limiar ou perdida) e termina
+    no início da primeira janela de janela_recuperacao_s sem violações (como no
+    benchmark_controlador). Para cada um, no relógio comum da telemetria:
+      carga_violacao_ms        última mudança de carga (EVENTOS_CARGA) -> primeira violação
+      violacao_alerta_ms       primeira violação -> ALERTA do monitor
+      violacao_atuacao_ms      primeira violação -> início da atuação tc (aplicar ou alterar)
+                               procurada desde a mudança de carga: negativo se foi antecipada
+      alerta_atuacao_ms        ALERTA -> início dessa atuação
+      duracao_atuacao_ms       início -> fim da atuação (tc nos roteadores)
+      atuacao_recuperacao_ms   fim da atuação -> recuperação
+      violacao_recuperacao_ms  duração do episódio
+    """
+    t, violacao = benchmark_controlador._amostras_monitor(registros, limiar_ms)
+    if not np.any(violacao):
+        return []
+    fim_ns = int(t[-1]) + 1
+    janela_ns = janela_recuperacao_s * 1e9
+    # Candidatas a recuperação, como em benchmark_controlador._primeira_recuperacao, calculadas uma só vez
+    proxima = np.minimum.accumulate(np.where(violacao, t, np.iinfo(np.int64).max)[::-1])[::-1]
+    recuperacoes = np.flatnonzero(~violacao & (proxima - t > janela_ns) & (t + janela_ns <= fim_ns))
+    violacoes = np.flatnonzero(violacao)
+
+    ordenados = eventos(registros)
+    t_carga = ordenados['t_ns'][np.isin(ordenados['metrica'], EVENTOS_CARGA)]
+    cargas = ordenados[np.isin(ordenados['metrica'], EVENTOS_CARGA)]
+    t_alertas = ordenados['t_ns'][ordenados['metrica'] == telemetria.ALERTA]
+    atuacoes_reacao = [a for a in atuacoes(registros) if a['tipo'] != 'remover']
+    t_atuacoes = np.array([a['inicio_ns'] for a in atuacoes_reacao], dtype=np.int64)
+
+    resultado, i, fim_anterior = [], 0, None
+    while i < len(violacoes):
+        inicio_idx = violacoes[i]
+        inicio = int(t[inicio_idx])
+        r = np.searchsorted(recuperacoes, inicio_idx, side='right')
+        recuperacao = int(t[recuperacoes[r]]) if r < len(recuperacoes) else None
+
+        c = np.searchsorted(t_carga, inicio, side='right') - 1
+        carga = cargas[c] if c >= 0 else None
+        t_carga_ep = int(carga['t_ns']) if carga is not None else None
+        # Só conta o que aconteceu depois do episódio anterior (e da mudança de carga, se houver)
+        desde = max(fim_anterior or 0, t_carga_ep or 0)
+        alerta = _primeiro(t_alertas, inicio, recuperacao)
+        a = np.searchsorted(t_atuacoes, desde, side='left')
+        atuacao = atuacoes_reacao[a] if a < len(t_atuacoes) and (recuperacao is None or t_atuacoes[a] < recuperacao) \
+            else None
+
+        episodio = {
+            'inicio_s': round((inicio - int(t[0])) / 1e9, 3),
+            'carga': (f"{telemetria.NOMES_METRICAS[int(carga['metrica'])]} {carga['origem'].decode(errors='replace')} "
+                      f"{float(carga['valor']):g}") if carga is not None else None,
+            'atuacao': atuacao['tipo'] if atuacao else None,
+            'carga_violacao_ms': _ms(t_carga_ep, inicio),
+            'violacao_alerta_ms': _ms(inicio, alerta),
+            'violacao_atuacao_ms': _ms(inicio, atuacao['inicio_ns'] if atuacao else None),
+            'alerta_atuacao_ms': _ms(alerta, atuacao['inicio_ns'] if atuacao else None),
+            'duracao_atuacao_ms': _ms(atuacao['inicio_ns'], atuacao['fim_ns']) if atuacao else None,
+            'atuacao_recuperacao_ms': _ms(atuacao['fim_ns'] if atuacao else None, recuperacao),
+            'violacao_recuperacao_ms': _ms(inicio, recuperacao),
+        }
+        resultado.append(episodio)
+        if recuperacao is None:
+            break
+        fim_anterior = recuperacao
+        i = np.searchsorted(violacoes, recuperacoes[r], side='right')
+    return resultado
+
+
+def gravar(project_dir, limiar_ms):
+    """Grava os eventos ordenados (CSV) e os episódios com o resumo dos atrasos (JSON); devolve o relatório."""
+    registros = np.array(telemetria.mapear(os.path.join(project_dir, telemetria.nome_arquivo_telemetria)))
+    ordenados = eventos(registros)
+    df = telemetria.para_dataframe(ordenados)
+    t0 = int(registros['t_ns'].min()) if len(registros) else 0
+    df.insert(1, 't_s', (df['t_ns'] - t0) / 1e9)
+    df.to_csv(os.path.join(project_dir, nome_arquivo_eventos), index=False)
+
+    lista = episodios(registros, limiar_ms)
+    relatorio = {'limiar_latencia_ms': limiar_ms, 'eventos': len(ordenados), 'episodios': lista,
+                 'resumo': benchmark_controlador.resumir(lista, ATRASOS)}
+    with open(os.path.join(project_dir, nome_arquivo_linha_temporal), 'w') as f:
+        json.dump(relatorio, f, indent=2)
+    return relatorio
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Linha temporal comum (monitor, controlador, geradores) e "
+                                                 "atrasos causais de cada episódio de violação")
+    parser.add_argument('dir', help="Diretório da execução (com telemetria.bin)")
+    parser.add_argument('--limiar', type=float, default=5.0, help="limiar_latencia_ms")
+    args = parser.parse_args()
+
+    relatorio = gravar(args.dir, args.limiar)
+    print(f">>> {relatorio['eventos']} eventos em {nome_arquivo_eventos}; "
+          f"{len(relatorio['episodios'])} episódios de violação")
+    for atraso, entrada in relatorio['resumo'].items():
+        percentis = ', '.join(f"{k} {v}" for k, v in entrada.items() if k != 'n')
+        print(f"    - {atraso:<24} n={entrada['n']:<3} {percentis}")
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import benchmark_controlador
+import controlador_qos
+import estrategias_qdisc
+import previsao_latencia
+import telemetria
+
+# --- Configurações ---
+limiar_fila_ms = 1.0          # Atraso de fila (backlog à taxa da ligação) a partir do qual a interface é gargalo
+limiar_descartes_pps = 1.0    # Descartes por segundo a partir dos quais a interface é gargalo
+janela_s = 2.0                # Só contam interfaces congestionadas nas últimas leituras deste período
+limiar_salto_ms = 1.0         # Acréscimo de RTT de um salto (sondas por salto) que o marca como gargalo
+sondas_por_salto = 3          # Pings por salto (em paralelo entre saltos), intervalo de 0,2 s
+nome_arquivo_comparacao = "comparacao_alcance.json"
+
+_RE_RTT = re.compile(r'^(\S+) rtt min/avg/max/mdev = [\d.]+/([\d.]+)/')
+_NOMES_CUSTO = {0: 'aplicar', 1: 'alterar', 2: 'remover'}
+
+
+class LocalizadorGargalo:
+    """
+    Localiza as interfaces congestionadas para o controlador instalar a árvore só nelas.
+
+    A fonte principal são as leituras do amostrador_tc (observar() é um dos seus
+    observadores): uma interface é gargalo se o atraso de fila da qdisc raiz ou a taxa de
+    descartes passou o limiar nas últimas janela_s. Sem nenhuma interface assim (ex.
+    amostrador desligado), recorre a sondas por salto: o salto cujo acréscimo de RTT passa
+    limiar_salto_ms marca as suas interfaces (ver Salto em topologia_parametrica). As
+    sondas saem do caminho que violou o SLA (apontar()) ou, sem ele, de todos os caminhos
+    do monitor em paralelo.
+
+    Args:
+        saltos (list): Saltos do percurso do host até à nuvem (Topologia.saltos).
+        host: Nó de onde partem as sondas por salto (None: sem sondas).
+        caminhos (dict): Outros percursos, origem do monitor -> (saltos, host).
+    """
+
+    def __init__(self, saltos=(), host=None, caminhos=None):
+        self.caminhos = dict(caminhos or {})
+        if saltos:
+            self.caminhos.setdefault(host.name if host is not None else None, (list(saltos), host))
+        self.origem = None
+        self._descartes = {}     # (roteador, interface) -> (t, descartes acumulados) da leitura anterior
+        self._congestionadas = {}  # (roteador, interface) -> (t, atraso de fila ms, descartes/s)
+        self._ultimo_t = None
+
+    def observar(self, roteador, por_interface, t_ns):
+        """Observador do amostrador_tc (corre na thread da leitura)."""
+        t = t_ns / 1e9
+        for iface, elementos in por_interface.items():
+            bw = roteador.intf(iface).params.get('bw')
+            qdiscs = [c for tipo, _, _, c in elementos if tipo == 'qdisc']
+            if not bw or not qdiscs:
+                continue
+            # A qdisc raiz inclui as filhas: o maior valor é o da interface
+            backlog = max(c.get('backlog', 0) for c in qdiscs)
+            descartes = max(c.get('drops', 0) for c in qdiscs)
+            chave = (roteador.name, iface)
+            anterior = self._descartes.get(chave)
+            self._descartes[chave] = (t, descartes)
+            taxa = 0.0
+            # Contadores recomeçam quando a árvore é recriada
+            if anterior is not None and t > anterior[0] and descartes >= anterior[1]:
+                taxa = (descartes - anterior[1]) / (t - anterior[0])
+            atraso = previsao_latencia.atraso_fila_ms(backlog, bw)
+            if atraso >= limiar_fila_ms or taxa >= limiar_descartes_pps:
+                self._congestionadas[chave] = (t, atraso, taxa)
+        self._ultimo_t = t if self._ultimo_t is None else max(self._ultimo_t, t)
+
+    def congestionadas(self):
+        """{(roteador, interface): (atraso de fila ms, descartes/s)} nas últimas janela_s de leituras."""
+        if self._ultimo_t is None:
+            return {}
+        return {chave: (atraso, taxa) for chave, (t, atraso, taxa) in list(self._congestionadas.items())
+                if t >= self._ultimo_t - janela_s}
+
+    def apontar(self, origem):
+        """Origem do caminho que violou o SLA (como no evento do monitor); None: todos os caminhos."""
+        self.origem = origem if origem in self.caminhos else None
+
+    @staticmethod
+    def sondar_saltos(saltos, host):
+        """RTT médio (ms) até cada salto, ou None se o salto não respondeu. Um só comando no host."""
+        if host is None or not saltos:
+            return []
+        ips = ' '.join(salto.ip for salto in saltos)
+        saida = host.cmd(f'for ip in {ips}; do echo "$ip $(ping -c {sondas_por_salto} -i 0.2 -W 1 -q $ip '
+                              f'| tail -1)" & done; wait')
+        rtts = {}
+        for linha in saida.splitlines():
+            m = _RE_RTT.match(linha.strip())
+            if m:
+                rtts[m.group(1)] = float(m.group(2))
+        return [rtts.get(salto.ip) for salto in saltos]
+
+    @classmethod
+    def saltos_congestionados(cls, saltos, host):
+        """Interfaces dos saltos cujo acréscimo de RTT face ao salto anterior passa limiar_salto_ms."""
+        interfaces, anterior = [], 0.0
+        for salto, rtt in zip(saltos, cls.sondar_saltos(saltos, host)):
+            if rtt is None:
+                continue
+            if rtt - anterior >= limiar_salto_ms:
+                interfaces += salto.interfaces
+            anterior = rtt
+        return interfaces
+
+    def por_sondas(self):
+        """Interfaces congestionadas no caminho apontado ou, sem ele, na união de todos os caminhos."""
+        percursos = [self.caminhos[self.origem]] if self.origem is not None else list(self.caminhos.values())
+        if len(percursos) <= 1:
+            return [i for saltos, host in percursos for i in self.saltos_congestionados(saltos, host)]
+        with ThreadPoolExecutor(max_workers=len(percursos)) as executor:
+            resultados = list(executor.map(lambda percurso: self.saltos_congestionados(*percurso), percursos))
+        return list(dict.fromkeys(i for interfaces in resultados for i in interfaces))
+
+    def localizar(self, sondas=True):
+        """Devolve ({roteador: {interfaces}}, fonte) com fonte 'tc', 'sondas' ou None (nada localizado)."""
+        interfaces, fonte = list(self.congestionadas()), 'tc'
+        if not interfaces and sondas:
+            interfaces, fonte = self.por_sondas(), 'sondas'
+        alvo = {}
+        for roteador, iface in interfaces:
+            alvo.setdefault(roteador, set()).add(iface)
+        return alvo, (fonte if alvo else None)
+
+
+def custo_e_resultado(project_dir, limiar_ms):
+    """
+    Custo da atuação e efeito de uma execução, a partir da telemetria.
+
+    O custo são as interfaces em que o controlador atuou (QOS_INTERFACES, por tipo) e o
+    número de árvores instaladas; o efeito, a violação do SLA nas sondas e a vazão eMBB
+    entregue (do resumo_simulacao.json numa execução simulada, senão do servidor iperf3).
+    """
+    registros = telemetria.mapear(os.path.join(project_dir, telemetria.nome_arquivo_telemetria))
+    controlador = registros[registros['origem'] == b'controlador']
+    custos = controlador[controlador['metrica'] == telemetria.QOS_INTERFACES]
+    resultado = {
+        'arvores_instaladas': int(np.count_nonzero(controlador['metrica'] == telemetria.QOS_APLICADO)),
+        'interfaces_atuadas': int(custos['valor'].sum()),
+    }
+    for canal, nome in _NOMES_CUSTO.items():
+        resultado[f'interfaces_{nome}'] = int(custos['valor'][custos['canal'] == canal].sum())
+
+    _, violacao = benchmark_controlador._amostras_monitor(registros, limiar_ms)
+    resultado['violacao_sla_pct'] = round(100 * float(violacao.mean()), 2) if len(violacao) else None
+
+    caminho_resumo = os.path.join(project_dir, "resumo_simulacao.json")
+    portas_embb = controlador_qos.fluxos_fatias[estrategias_qdisc.EMBB]
+    if os.path.exists(caminho_resumo):
+        with open(caminho_resumo) as f:
+            fluxos = json.load(f)['fluxos']
+        vazao = sum(fl['vazao_media_mbps'] for fl in fluxos if fl['porta'] in portas_embb)
+    else:
+        _, mbps = benchmark_controlador._vazao_entregue(
+            os.path.join(project_dir, "logs_embb", "iperf_embb_servidor.txt"), telemetria.ancora_relogio(registros))
+        vazao = float(mbps.mean()) if len(mbps) else None
+    resultado['vazao_embb_mbps'] = round(vazao, 2) if vazao is not None else None
+    return resultado
+
+
+def comparar(dir_todas, dir_gargalo, limiar_ms):
+    """Compara uma execução com alcance_qos 'todas' e outra 'gargalo' (mesma carga)."""
+    todas = custo_e_resultado(dir_todas, limiar_ms)
+    gargalo = custo_e_resultado(dir_gargalo, limiar_ms)
+    comparacao = {'todas': todas, 'gargalo': gargalo,
+                  'interfaces_poupadas': todas['interfaces_atuadas'] - gargalo['interfaces_atuadas']}
+    if todas['vazao_embb_mbps'] is not None and gargalo['vazao_embb_mbps'] is not None:
+        comparacao['vazao_embb_ganha_mbps'] = round(gargalo['vazao_embb_mbps'] - todas['vazao_embb_mbps'], 2)
+    if todas['violacao_sla_pct'] is not None and gargalo['violacao_sla_pct'] is not None:
+        comparacao['violacao_sla_diferenca_pct'] = round(gargalo['violacao_sla_pct'] - todas['violacao_sla_pct'], 2)
+    return comparacao
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Custo de atuação e vazão eMBB: árvore em todas as interfaces "
+                                                 "contra só no gargalo")
+    parser.add_argument('--todas', help="Execução com alcance_qos = 'todas'")
+    parser.add_argument('--gargalo', help="Execução com alcance_qos = 'gargalo'")
+    parser.add_argument('--simular', metavar='DIR',
+                        help="Corre as duas execuções no simulador_rede (DIR/todas e DIR/gargalo)")
+    parser.add_argument('--parametros', default='{}', help="JSON com parâmetros das execuções simuladas")
+    parser.add_argument('--limiar', type=float, default=5.0, help="limiar_latencia_ms")
+    args = parser.parse_args()
+
+    if args.simular:
+        import simulador_rede
+        parametros = dict(json.loads(args.parametros), limiar_latencia_ms=args.limiar)
+        for alcance in ('todas', 'gargalo'):
+            print(f">>> Simulando com alcance_qos = '{alcance}'...")
+            simulador_rede.ExperienciaSimulada(os.path.join(args.simular, alcance),
+                                               dict(parametros, alcance_qos=alcance)).executar()
+        args.todas, args.gargalo = os.path.join(args.simular, 'todas'), os.path.join(args.simular, 'gargalo')
+    elif not (args.todas and args.gargalo):
+        parser.error("indique --todas e --gargalo, ou --simular")
+
+    comparacao = comparar(args.todas, args.gargalo, args.limiar)
+    with open(os.path.join(args.gargalo, nome_arquivo_comparacao), 'w') as f:
+        json.dump(comparacao, f, indent=2)
+    for alcance in ('todas', 'gargalo'):
+        r = comparacao[alcance]
+        print(f"    - {alcance:<8} interfaces atuadas {r['interfaces_atuadas']:>4} "
+              f"({r['arvores_instaladas']} árvores)  vazão eMBB {r['vazao_embb_mbps']} Mbit/s  "
+              f"violação do SLA {r['violacao_sla_pct']}%")
+    print(f"[INFO] Interfaces poupadas: {comparacao['interfaces_poupadas']}; "
+          f"vazão eMBB ganha: {comparacao.get('vazao_embb_ganha_mbps')} Mbit/s")
@@ -5,16 +5,33 @@ from mininet.node import Host, Node, OVSKernelSwitch
 from mininet.link import TCLink
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
-import time
+import argparse
+import json
 import os
+import shlex
+import signal
+import time
 from threading import Thread
 
 # Importar o nosso novo controlador
 import controlador_qos
+import estrategias_qdisc
 # Importar o novo gerador de tráfego eMBB
 import gerador_trafego_embb
+import perfis_trafego_embb
 # ### ALTERAÇÕES PARA ULLRC ###
 import gerador_trafego_urllc # Importar o novo gerador de tráfego uRLLC
+import telemetria
+import iperf_json
+import topologia_parametrica
+import prontidao
+import amostrador_tc
+import canal_alerta
+import classificacao_fluxos
+import controlador_adaptativo
+import localizacao_gargalo
+import sonda_latencia
+import gerador_monitor_uRLLC
 
 
 class LinuxRouter(Node):
@@ -28,18 +45,81 @@ class LinuxRouter(Node):
         self.cmd('sysctl -w net.ipv4.ip_forward=0')
         super(LinuxRouter, self).terminate()
 
-def run_topology():
-    # Defina o diretório do seu projeto aqui. Baseado na sua imagem.
-    project_dir = "/home/ubuntu/compartilhada"
+# Diretório dos scripts (monitor e gráfico são lançados a partir daqui dentro dos hosts)
+code_dir = os.path.dirname(os.path.abspath(__file__))
+origem_trafego = 'trafego'  # Origem, na telemetria, do lançamento dos geradores (TRAFEGO_INICIO)
+
+# Parâmetros de uma execução (o executor_varredura.py varia-os)
+PARAMETROS_PADRAO = {
+    'largura_banda_embb': 45,        # Mbit/s
+    'perfil_embb': None,             # Linha temporal de carga eMBB em todos os hosts eMBB (ver perfis_trafego_embb):
+                                     # nome em PERFIS, ficheiro JSON ou lista de fases; None: um só iperf3 constante
+    'semente_embb': None,            # Semente das chegadas de Poisson do perfil (None: aleatória, fica no plano)
+    'duracao_testes': 120,           # Segundos (duração total para eMBB e uRLLC)
+    'taxa_urllc': '40M',             # Taxa agregada uRLLC do gerador 'iperf' (sintaxe do iperf3 -b)
+    'tamanho_pacote_urllc': 128,     # Bytes de carga por pacote uRLLC
+    'gerador_urllc': 'iperf',        # 'iperf' (iperf3 -u) ou 'pacotes' (atraso unidirecional por pacote)
+    'taxa_pps_urllc': 1000,          # Pacotes/s agregados do gerador 'pacotes' (o emissor em Python não segura os 40M)
+    'agenda_urllc': 'periodica',     # 'periodica' ou 'poisson' (gerador 'pacotes')
+    'fluxos_urllc': 1,               # Fluxos uRLLC (gerador 'pacotes'), repartindo a taxa
+    'limiar_latencia_ms': 5.0,
+    'periodo_normalizacao_s': 70,    # Período de calma do monitor antes de desativar o alerta
+    'modo_alerta': 'janela',         # 'janela' (regras sobre percentis/perda em janelas deslizantes) ou 'amostra'
+    'pontos_monitor': 'urllc',       # 'urllc': o monitor sonda a partir de todos os hosts uRLLC; 'principal': só h_uRLLC1
+    'regras_alerta': None,           # Lista de regras do modo 'janela' (None: regras_alerta do gerador_monitor_uRLLC)
+    'modo_controle': controlador_qos.modo_controle,
+    'modo_previsao': controlador_qos.modo_previsao,  # 'ativo': árvore aplicada antes do cruzamento previsto (adaptativo)
+    'horizonte_previsao_s': controlador_qos.horizonte_previsao_s,
+    'classes_htb': {},               # minor -> parâmetros a sobrepor, ex. {"20": {"ceil": "30mbit"}}
+    'estrategia_qdisc': controlador_qos.estrategia_qdisc,  # Ver estrategias_qdisc.ESTRATEGIAS
+    'estrategias_interface': {},     # Interface ou roteador (sem prefixo) -> estratégia, ex. {"r_trans3": "cake"}
+    'alcance_qos': controlador_qos.alcance_qos,  # 'todas' ou 'gargalo' (só nas interfaces congestionadas)
+    'modo_classificacao': classificacao_fluxos.modo_classificacao,  # 'linear', 'hash' ou 'dscp'
+    'amostragem_tc_s': 0.5,          # Intervalo do amostrador de contadores tc (0 desliga)
+    'gerar_graficos': True,
+    'grafico_longo': False,          # Gráfico com memória e tempo por quadro constantes (execuções de horas)
+}
+
+def preparar_rede(espec, project_dir, parametros, prefixo=''):
+    """
+    Constrói e configura a rede e arranca controlador, monitor e servidores iperf3.
+
+    Devolve um dicionário com a rede, os hosts principais e os diretórios de logs,
+    pronto para receber tráfego (usado por run_topology e pelo benchmark_controlador).
+    prefixo é acrescentado a todos os nomes de nós, para que várias topologias possam
+    correr em simultâneo.
+    """
     alert_file_path = os.path.join(project_dir, "latencia.alerta")
     embb_log_dir = os.path.join(project_dir, "logs_embb")
     # ### ALTERAÇÕES PARA ULLRC ###
     urllc_log_dir = os.path.join(project_dir, "logs_urllc") # Novo diretório para logs uRLLC
+    cronometro = prontidao.Cronometro()
+    cronometro.fase('Limpeza de execuções anteriores')
+    os.makedirs(project_dir, exist_ok=True)
 
+    # O controlador corre neste processo: a configuração da execução aplica-se aos módulos
+    controlador_qos.modo_controle = parametros['modo_controle']
+    controlador_qos.modo_previsao = parametros['modo_previsao']
+    controlador_qos.horizonte_previsao_s = parametros['horizonte_previsao_s']
+    controlador_qos.alcance_qos = parametros['alcance_qos']
+    controlador_adaptativo.limiar_latencia_ms = parametros['limiar_latencia_ms']
+    for minor, classe in parametros['classes_htb'].items():
+        controlador_qos.classes_htb[int(minor)].update(classe)
+    classificacao_fluxos.modo_classificacao = parametros['modo_classificacao']
+    controlador_qos.estrategia_qdisc = parametros['estrategia_qdisc']
+    controlador_qos.estrategias_interface = {prefixo + nome: estrategia
+                                             for nome, estrategia in parametros['estrategias_interface'].items()}
+    for nome in [parametros['estrategia_qdisc'], *parametros['estrategias_interface'].values()]:
+        estrategias_qdisc.obter_estrategia(nome)  # Nome inválido falha já, não no primeiro alerta
 
     # Limpa o ficheiro de alerta de uma execução anterior, se existir
     if os.path.exists(alert_file_path):
         os.remove(alert_file_path)
+
+    # A telemetria binária é só de acréscimo: começa vazia em cada execução
+    telemetry_file_path = os.path.join(project_dir, telemetria.nome_arquivo_telemetria)
+    if os.path.exists(telemetry_file_path):
+        os.remove(telemetry_file_path)
     
     # Limpa o diretório de logs eMBB, se existir
     if os.path.exists(embb_log_dir):
@@ -54,134 +134,249 @@ def run_topology():
         shutil.rmtree(urllc_log_dir)
     os.makedirs(urllc_log_dir, exist_ok=True)
         
+    cronometro.fase('Criação de nós e links')
     net = Mininet(switch=OVSKernelSwitch, link=TCLink, controller=None)
+    # O que parar_rede precisa para derrubar uma rede que falhe a meio do arranque
+    rede = {'net': net, 'alert_file_path': alert_file_path, 'amostrador_tc': None, 'agendador_embb': None}
 
-    info('*** Adicionando Roteadores da Rede de Transporte...\n')
-    r_trans1 = net.addHost('r_trans1', cls=LinuxRouter, ip=None)
-    r_trans2 = net.addHost('r_trans2', cls=LinuxRouter, ip=None)
-    r_trans3 = net.addHost('r_trans3', cls=LinuxRouter, ip=None)
-    r_trans4 = net.addHost('r_trans4', cls=LinuxRouter, ip=None)
-    
-    roteadores = [r_trans1, r_trans2, r_trans3, r_trans4]
-
-    info('*** Adicionando Switches de Acesso...\n')
-    s_access1 = net.addSwitch('s_access1')
-    s_access2 = net.addSwitch('s_access2')
-
-    info('*** Adicionando Hosts de Usuário e Nuvem...\n')
-    h_uRLLC1 = net.addHost('h_uRLLC1', ip='172.18.1.10/24', defaultRoute='via 172.18.1.1')
-    h_eMBB1 = net.addHost('h_eMBB1', ip='172.18.1.20/24', defaultRoute='via 172.18.1.1')
-    h_uRLLC2 = net.addHost('h_uRLLC2', ip='172.18.2.10/24', defaultRoute='via 172.18.2.1')
-    h_eMBB2 = net.addHost('h_eMBB2', ip='172.18.2.20/24', defaultRoute='via 172.18.2.1')
-    h_cloud = net.addHost('h_cloud', ip='172.19.40.100/24', defaultRoute='via 172.19.40.4')
-    
-    link_params_access = {'bw': 50}
-    link_params_transport = {'bw': 100}
-    link_params_cloud = {'bw': 200}
-
-    info('*** Criando Links...\n')
-    net.addLink(h_uRLLC1, s_access1, **link_params_access)
-    net.addLink(h_eMBB1, s_access1, **link_params_access)
-    net.addLink(h_uRLLC2, s_access2, **link_params_access)
-    net.addLink(h_eMBB2, s_access2, **link_params_access)
-    net.addLink(s_access1, r_trans1, intfName2='r_trans1-eth0', **link_params_access)
-    net.addLink(s_access2, r_trans2, intfName2='r_trans2-eth0', **link_params_access)
-    net.addLink(r_trans1, r_trans3, intfName1='r_trans1-eth1', intfName2='r_trans3-eth0', **link_params_transport)
-    net.addLink(r_trans2, r_trans3, intfName1='r_trans2-eth1', intfName2='r_trans3-eth1', **link_params_transport)
-    net.addLink(r_trans3, r_trans4, intfName1='r_trans3-eth2', intfName2='r_trans4-eth0', **link_params_transport)
-    net.addLink(r_trans4, h_cloud, intfName1='r_trans4-eth1', **link_params_cloud)
-
-    info('*** Iniciando a rede...\n')
-    net.start()
-
-    info('*** Configurando modo standalone para switches OVS...\n')
-    for sw in net.switches:
-        sw.cmd('ovs-vsctl set-fail-mode', sw.name, 'standalone')
-
-    info('*** Configurando IPs e Rotas nos Roteadores...\n')
-    r_trans1.cmd('ip addr add 172.18.1.1/24 dev r_trans1-eth0'); r_trans1.cmd('ip link set r_trans1-eth0 up')
-    r_trans1.cmd('ip addr add 172.19.13.1/24 dev r_trans1-eth1'); r_trans1.cmd('ip link set r_trans1-eth1 up')
-    r_trans2.cmd('ip addr add 172.18.2.1/24 dev r_trans2-eth0'); r_trans2.cmd('ip link set r_trans2-eth0 up')
-    r_trans2.cmd('ip addr add 172.19.23.2/24 dev r_trans2-eth1'); r_trans2.cmd('ip link set r_trans2-eth1 up')
-    r_trans3.cmd('ip addr add 172.19.13.3/24 dev r_trans3-eth0'); r_trans3.cmd('ip link set r_trans3-eth0 up')
-    r_trans3.cmd('ip addr add 172.19.23.3/24 dev r_trans3-eth1'); r_trans3.cmd('ip link set r_trans3-eth1 up')
-    r_trans3.cmd('ip addr add 172.19.34.3/24 dev r_trans3-eth2'); r_trans3.cmd('ip link set r_trans3-eth2 up')
-    r_trans4.cmd('ip addr add 172.19.34.4/24 dev r_trans4-eth0'); r_trans4.cmd('ip link set r_trans4-eth0 up')
-    r_trans4.cmd('ip addr add 172.19.40.4/24 dev r_trans4-eth1'); r_trans4.cmd('ip link set r_trans4-eth1 up')
-    r_trans1.cmd('ip route add 172.18.2.0/24 via 172.19.13.3'); r_trans1.cmd('ip route add 172.19.23.0/24 via 172.19.13.3'); r_trans1.cmd('ip route add 172.19.34.0/24 via 172.19.13.3'); r_trans1.cmd('ip route add 172.19.40.0/24 via 172.19.13.3')
-    r_trans2.cmd('ip route add 172.18.1.0/24 via 172.19.23.3'); r_trans2.cmd('ip route add 172.19.13.0/24 via 172.19.23.3'); r_trans2.cmd('ip route add 172.19.34.0/24 via 172.19.23.3'); r_trans2.cmd('ip route add 172.19.40.0/24 via 172.19.23.3')
-    r_trans3.cmd('ip route add 172.18.1.0/24 via 172.19.13.1'); r_trans3.cmd('ip route add 172.18.2.0/24 via 172.19.23.2'); r_trans3.cmd('ip route add 172.19.40.0/24 via 172.19.34.4')
-    r_trans4.cmd('ip route add 172.18.1.0/24 via 172.19.34.3'); r_trans4.cmd('ip route add 172.18.2.0/24 via 172.19.34.3'); r_trans4.cmd('ip route add 172.19.13.0/24 via 172.19.34.3'); r_trans4.cmd('ip route add 172.19.23.0/24 via 172.19.34.3')
-
-    info('*** Aguardando para estabilização da rede...\n')
-    time.sleep(2)
-    
-    info('*** Iniciando o Controlador de QoS em uma thread separada...\n')
-    controller_thread = Thread(target=controlador_qos.iniciar_loop_controle, args=(roteadores, project_dir, net))
-    controller_thread.daemon = True
-    controller_thread.start()
-    
-    info('*** Iniciando o Monitor de Latência uRLLC...\n')
-    monitor_cmd = (f"cd {project_dir} && "
-                   f"sudo python3 -u gerador_monitor_uRLLC.py > urllc_log.txt &")
-    h_uRLLC1.cmd(monitor_cmd)
-    
-    info('*** Iniciando Servidor iperf para tráfego eMBB...\n')
-    h_cloud.cmd(f'iperf3 -s -p {controlador_qos.porta_embb} &') # Use iperf3
-    
-    # ### ALTERAÇÕES PARA ULLRC ###
-    info('*** Iniciando Servidor iperf para tráfego uRLLC...\n')
-    # Usamos a porta definida no controlador para consistência
-    h_cloud.cmd(f'iperf3 -s -p {controlador_qos.porta_urllc} &') # Servidor UDP para uRLLC
+    try:
+        info('*** Criando roteadores, switches, hosts e links a partir da especificação da topologia...\n')
+        topologia = topologia_parametrica.Topologia(topologia_parametrica.prefixar_espec(espec, prefixo))
+        roteadores = topologia.construir(net, LinuxRouter)
+        hosts_urllc = [net.get(nome) for nome in topologia.hosts_fatia(classificacao_fluxos.URLLC)]
+        hosts_embb = [net.get(nome) for nome in topologia.hosts_fatia(classificacao_fluxos.EMBB)]
+        if not hosts_urllc or not hosts_embb:
+            raise ValueError("A especificação precisa de pelo menos um host uRLLC e um eMBB nos sítios de acesso "
+                             "(fatia pelo nome do host ou em 'fatias').")
+        # Papéis da experiência, pela ordem dos sítios: o monitor corre no primeiro host uRLLC e o tráfego
+        # uRLLC sai do segundo (do mesmo, com um só sítio); o tráfego eMBB fixo sai do primeiro host eMBB
+        h_uRLLC1, h_uRLLC2 = hosts_urllc[0], hosts_urllc[min(1, len(hosts_urllc) - 1)]
+        h_eMBB1 = hosts_embb[0]
+        h_cloud = net.get(topologia.host_nuvem)
+        controlador_qos.host_estabilizacao = h_uRLLC1.name
+        controlador_qos.ip_estabilizacao = topologia.hosts[h_uRLLC1.name][1]  # Gateway do seu sítio
+        # Pontos de onde o monitor também sonda, além do h_uRLLC1
+        pontos_monitor = [h for h in hosts_urllc if h is not h_uRLLC1] if parametros['pontos_monitor'] == 'urllc' else []
+        plano_embb = None
+        if parametros['perfil_embb'] is not None:
+            plano_embb = perfis_trafego_embb.planear(parametros['perfil_embb'], len(hosts_embb),
+                                                     controlador_qos.fluxos_fatias[classificacao_fluxos.EMBB],
+                                                     parametros['semente_embb'], parametros['duracao_testes'])
+
+        info('*** Iniciando a rede...\n')
+        cronometro.fase('net.start()')
+        net.start()
+
+        info('*** Configurando modo standalone para switches OVS...\n')
+        cronometro.fase('Switches OVS em modo standalone')
+        # Uma única transação ovs-vsctl para todos os switches
+        if net.switches:
+            net.switches[0].cmd('ovs-vsctl ' + ' -- '.join(f'set-fail-mode {sw.name} standalone' for sw in net.switches))
 
-    info('*** Aguardando 3 segundos para os servidores iperf iniciarem...\n')
-    time.sleep(2)
+        info('*** Configurando IPs e Rotas nos Roteadores (ip -batch em paralelo)...\n')
+        cronometro.fase('IPs e rotas dos roteadores')
+        for nome, erros in topologia.configurar(net).items():
+            info(f'*** Aviso: erros ao configurar {nome}:\n{erros}\n')
+        # O controlador aplica as regras nas interfaces dos percursos calculados
+        controlador_qos.interfaces_map = topologia.mapa_interfaces()
+        if parametros['alcance_qos'] == 'gargalo':
+            # Filas do amostrador_tc e, na falta delas, sondas por salto a partir do ponto do monitor
+            # cujo caminho violou o SLA (chave: a origem nos eventos do monitor, o nome sem prefixo dos
+            # outros pontos e origem_telemetria para o host onde o monitor corre, seja qual for o seu nome)
+            pontos = {gerador_monitor_uRLLC.origem_telemetria: h_uRLLC1}
+            pontos.update((h.name[len(prefixo):], h) for h in pontos_monitor)
+            controlador_qos.localizador = localizacao_gargalo.LocalizadorGargalo(
+                caminhos={origem: (topologia.saltos(h.name), h) for origem, h in pontos.items()})
 
-    # --- INÍCIO DA CHAMADA AO GERADOR DE TRÁFEGO eMBB SEPARADO ---
-    info('*** Iniciando Cliente iperf para tráfego eMBB (45 Mbits/s por 120s)\n')
-    largura_banda_embb = 45 # Mbits/s
-    duracao_testes = 120    # Segundos (duração total para eMBB e uRLLC)
+        info('*** Aguardando rotas e conectividade até à nuvem...\n')
+        cronometro.fase('Verificação das rotas')
+        prontidao.esperar_ate(lambda: topologia.rotas_instaladas(net), 'Rotas estáticas')
+        cronometro.fase('Primeiro ping acesso -> nuvem')
+        prontidao.esperar_ate(lambda: prontidao.alcancavel(h_uRLLC1, h_cloud.IP()), 'Conectividade h_uRLLC1 -> h_cloud')
     
-    gerador_trafego_embb.iniciar_trafego_embb(
-        h_eMBB1,
-        h_cloud.IP(),
-        controlador_qos.porta_embb,
-        largura_banda_embb,
-        duracao_testes, # Usar a mesma duração para ambos os testes
-        embb_log_dir
-    )
+        info('*** Iniciando o Controlador de QoS em uma thread separada...\n')
+        cronometro.fase('Controlador de QoS')
+        controller_thread = Thread(target=controlador_qos.iniciar_loop_controle, args=(roteadores, project_dir, net))
+        controller_thread.daemon = True
+        controller_thread.start()
+        # O monitor envia os alertas para o socket criado pelo controlador
+        prontidao.esperar_ate(lambda: os.path.exists(os.path.join(project_dir, canal_alerta.nome_socket_alerta)),
+                              'Socket de alertas do controlador')
+        amostrador = None
+        if parametros['amostragem_tc_s']:
+            # O previsor e o localizador do gargalo seguem o backlog das filas a partir das mesmas leituras
+            observadores = [controlador_qos.observar_filas]
+            if controlador_qos.localizador is not None:
+                observadores.append(controlador_qos.localizador.observar)
+            amostrador = amostrador_tc.AmostradorTc(roteadores, controlador_qos.interfaces_map, project_dir,
+                                                    parametros['amostragem_tc_s'], observadores=observadores).iniciar()
+            rede['amostrador_tc'] = amostrador
     
-    # ### ALTERAÇÕES PARA ULLRC ###
-    info('*** Iniciando Cliente iperf para tráfego uRLLC\n')
-    # O gerador de tráfego uRLLC simula um fluxo constante de baixa taxa de bits
-    gerador_trafego_urllc.iniciar_trafego_urllc(
-        h_uRLLC2, # Usar o mesmo host que monitora a latência
-        h_cloud.IP(),
-        controlador_qos.porta_urllc,
-        duracao_testes, # Usar a mesma duração
-        urllc_log_dir # Novo diretório de log para uRLLC
-    )
-
-    # --- INICIAR GERADOR DE GRÁFICO AUTOMATICAMENTE ---
-    info('*** Iniciando o gerador de gráfico uRLLC/eMBB automaticamente...\n')
-    graph_cmd = (f"cd {project_dir} && "
-                 f"sudo python3 -u grafico_monitor_urllc_v3.py > graph_gen_log.txt 2>&1 &")
-    h_uRLLC1.cmd(graph_cmd)
+        cronometro.fase('Monitor e servidores iperf3')
+        info('*** Iniciando o Monitor de Latência uRLLC...\n')
+        # Um só processo no h_uRLLC1 sonda também a partir dos outros hosts uRLLC (socket aberto
+        # no namespace de rede de cada um), para todos os hosts da nuvem
+        for host in [h_uRLLC1] + pontos_monitor:
+            # Sockets ICMP datagram: o namespace de cada host começa com ping_group_range vazio
+            host.cmd("sysctl -qw net.ipv4.ping_group_range='0 2147483647'")
+        destinos_monitor = ' '.join(net.get(nome).IP() for nome in topologia.nuvem['hosts'])
+        monitor_cmd = (f"cd {project_dir} && "
+                       f"sudo python3 -u {code_dir}/gerador_monitor_uRLLC.py --destino {destinos_monitor} "
+                       + ''.join(f"--ponto {h.name[len(prefixo):]}={sonda_latencia.namespace_rede(h.pid)} "
+                                 for h in pontos_monitor) +
+                       f"--limiar {parametros['limiar_latencia_ms']} --periodo-calma {parametros['periodo_normalizacao_s']} "
+                       f"--modo-alerta {parametros['modo_alerta']} "
+                       + (f"--regras {shlex.quote(json.dumps(parametros['regras_alerta']))} "
+                          if parametros['regras_alerta'] is not None else "")
+                       + "> urllc_log.txt &")
+        h_uRLLC1.cmd(monitor_cmd)
+    
+        # Os servidores também registam cada intervalo: do lado recetor há vazão entregue, jitter e perda
+        opcoes_iperf = iperf_json.opcoes_saida(iperf_json.suporta_json_stream(h_cloud))
+
+        info('*** Iniciando Servidor iperf para tráfego eMBB...\n')
+        h_cloud.cmd(f'iperf3 -s -p {controlador_qos.porta_embb} {opcoes_iperf} '
+                    f'> {os.path.join(embb_log_dir, "iperf_embb_servidor.txt")} 2>&1 &') # Use iperf3
+        portas_iperf = [controlador_qos.porta_embb]
+        # Um servidor por sessão eMBB em simultâneo do perfil de carga (cada iperf3 -s serve um teste de cada vez)
+        for porta in (plano_embb.portas() if plano_embb else []):
+            if porta != controlador_qos.porta_embb:
+                h_cloud.cmd(f'iperf3 -s -p {porta} {opcoes_iperf} '
+                            f'> {os.path.join(embb_log_dir, f"iperf_embb_servidor_{porta}.txt")} 2>&1 &')
+                portas_iperf.append(porta)
     
-    info('*** Tráfego eMBB, uRLLC e Gerador de Gráfico iniciados. Aguardando conclusão do teste...\n')
+        # ### ALTERAÇÕES PARA ULLRC ###
+        if parametros['gerador_urllc'] == 'pacotes':
+            info('*** Iniciando Recetor uRLLC (atraso unidirecional por pacote)...\n')
+            h_cloud.cmd(f'python3 -u {code_dir}/trafego_urllc_udp.py receber --portas {controlador_qos.porta_urllc} '
+                        f'--telemetria {os.path.join(project_dir, telemetria.nome_arquivo_telemetria)} '
+                        f'--resumo {os.path.join(urllc_log_dir, "resumo_fluxos.json")} '
+                        f'> {os.path.join(urllc_log_dir, "receptor_urllc.txt")} 2>&1 &')
+            prontidao.esperar_ate(lambda: prontidao.porta_udp_aberta(h_cloud, controlador_qos.porta_urllc),
+                                  'Recetor uRLLC')
+        else:
+            info('*** Iniciando Servidor iperf para tráfego uRLLC...\n')
+            # Usamos a porta definida no controlador para consistência
+            h_cloud.cmd(f'iperf3 -s -p {controlador_qos.porta_urllc} {opcoes_iperf} '
+                        f'> {os.path.join(urllc_log_dir, "iperf_urllc_servidor.txt")} 2>&1 &') # Servidor UDP para uRLLC
+            portas_iperf.append(controlador_qos.porta_urllc)
 
-    # Espera o tempo necessário para o tráfego eMBB, uRLLC e a geração do gráfico terminarem
-    time.sleep(duracao_testes + 10)
-    info('*** Teste de tráfego eMBB e geração de gráfico concluídos.\n')
+        info('*** Aguardando os servidores iperf3 ficarem à escuta...\n')
+        for porta in portas_iperf:
+            prontidao.esperar_ate(lambda: prontidao.porta_a_escutar(h_cloud, porta), f'Servidor iperf3 na porta {porta}')
+    except BaseException:
+        # Rotas que não convergem (TimeoutError de prontidao), um servidor que não arranca ou um
+        # Ctrl-C a meio: sem isto ficavam a rede, o monitor e os iperf3 a correr, e a próxima
+        # execução da varredura colidia com os namespaces e ligações deixados para trás
+        info('*** Falha ao preparar a rede: a derrubar o que já arrancou...\n')
+        parar_rede(rede)
+        raise
 
-    #info('*** Topologia pronta. Teste a conectividade no CLI.\n')
-    CLI(net)
+    info(f'*** Rede pronta para tráfego em {cronometro.total():.2f} s:\n{cronometro.resumo()}\n')
+    rede.update({
+        'net': net, 'topologia': topologia, 'roteadores': roteadores, 'project_dir': project_dir,
+        'h_uRLLC1': h_uRLLC1, 'h_eMBB1': h_eMBB1, 'h_uRLLC2': h_uRLLC2, 'h_cloud': h_cloud,
+        'embb_log_dir': embb_log_dir, 'urllc_log_dir': urllc_log_dir, 'alert_file_path': alert_file_path,
+        'amostrador_tc': amostrador, 'hosts_embb': hosts_embb, 'plano_embb': plano_embb, 'agendador_embb': None,
+    })
+    return rede
 
+def parar_rede(rede):
+    """Termina os processos dos hosts e derruba a rede."""
     info('*** Parando a rede...\n')
+    if rede['amostrador_tc'] is not None:
+        rede['amostrador_tc'].parar()
+    if rede['agendador_embb'] is not None:
+        rede['agendador_embb'].parar()
+    # Termina os processos em segundo plano de cada host (monitor, iperf3, gráfico): com
+    # várias execuções em simultâneo não se pode usar pkill, que apanharia as das outras.
+    for host in rede['net'].hosts:
+        host.cmd('kill $(jobs -p) 2>/dev/null')
 
-    net.stop()
-    if os.path.exists(alert_file_path):
-        os.remove(alert_file_path)
+    rede['net'].stop()
+    if os.path.exists(rede['alert_file_path']):
+        os.remove(rede['alert_file_path'])
+
+def run_topology(espec=topologia_parametrica.ESPEC_PADRAO, project_dir="/home/ubuntu/compartilhada",
+                 parametros=None, prefixo='', interativo=True):
+    """
+    Executa uma experiência completa.
+
+    Com interativo=False a rede é derrubada no fim sem abrir o CLI.
+    """
+    parametros = dict(PARAMETROS_PADRAO, **(parametros or {}))
+    rede = preparar_rede(espec, project_dir, parametros, prefixo)
+    net, h_cloud = rede['net'], rede['h_cloud']
+    h_uRLLC1, h_eMBB1, h_uRLLC2 = rede['h_uRLLC1'], rede['h_eMBB1'], rede['h_uRLLC2']
+    embb_log_dir, urllc_log_dir = rede['embb_log_dir'], rede['urllc_log_dir']
+
+    # A rede é sempre derrubada, mesmo se a execução for interrompida (Ctrl-C, timeout da varredura)
+    try:
+        # O lançamento de cada gerador fica na linha temporal comum (telemetria), ao lado das sondas e do controlador
+        escritor_trafego = telemetria.EscritorTelemetria(
+            os.path.join(project_dir, telemetria.nome_arquivo_telemetria), origem_trafego)
+
+        # --- INÍCIO DA CHAMADA AO GERADOR DE TRÁFEGO eMBB SEPARADO ---
+        largura_banda_embb = parametros['largura_banda_embb'] # Mbits/s
+        duracao_testes = parametros['duracao_testes']          # Segundos (duração total para eMBB e uRLLC)
+        if rede['plano_embb'] is not None:
+            info(f"*** Iniciando o perfil de carga eMBB '{parametros['perfil_embb']}' em "
+                 f"{', '.join(h.name for h in rede['hosts_embb'])}\n")
+            rede['agendador_embb'] = perfis_trafego_embb.AgendadorEmbb(
+                rede['plano_embb'], rede['hosts_embb'], h_cloud.IP(), embb_log_dir, project_dir,
+                iperf_json.opcoes_saida(iperf_json.suporta_json_stream(h_eMBB1))).iniciar()
+        else:
+            info(f'*** Iniciando Cliente iperf para tráfego eMBB ({largura_banda_embb} Mbits/s por {duracao_testes}s)\n')
+
+            gerador_trafego_embb.iniciar_trafego_embb(
+                h_eMBB1,
+                h_cloud.IP(),
+                controlador_qos.porta_embb,
+                largura_banda_embb,
+                duracao_testes, # Usar a mesma duração para ambos os testes
+                embb_log_dir,
+                escritor_trafego,
+            )
+    
+        # ### ALTERAÇÕES PARA ULLRC ###
+        info('*** Iniciando Cliente de tráfego uRLLC\n')
+        # O gerador de tráfego uRLLC simula um fluxo constante de baixa taxa de bits
+        gerador_trafego_urllc.iniciar_trafego_urllc(
+            h_uRLLC2, # Usar o mesmo host que monitora a latência
+            h_cloud.IP(),
+            controlador_qos.porta_urllc,
+            duracao_testes, # Usar a mesma duração
+            urllc_log_dir, # Novo diretório de log para uRLLC
+            parametros['taxa_urllc'],
+            parametros['tamanho_pacote_urllc'],
+            parametros['gerador_urllc'],
+            parametros['agenda_urllc'],
+            parametros['fluxos_urllc'],
+            escritor_trafego,
+            parametros['taxa_pps_urllc'],
+        )
+        escritor_trafego.fechar()
+
+        # --- INICIAR GERADOR DE GRÁFICO AUTOMATICAMENTE ---
+        if parametros['gerar_graficos']:
+            info('*** Iniciando o gerador de gráfico uRLLC/eMBB automaticamente...\n')
+            graph_cmd = (f"cd {project_dir} && "
+                         f"sudo python3 -u {code_dir}/grafico_monitor_urllc_v3.py --dir {project_dir} "
+                         f"--quadros {duracao_testes} --limiar {parametros['limiar_latencia_ms']}"
+                         f"{' --longo' if parametros['grafico_longo'] else ''} > graph_gen_log.txt 2>&1 &")
+            h_uRLLC1.cmd(graph_cmd)
+    
+        info('*** Tráfego eMBB, uRLLC e Gerador de Gráfico iniciados. Aguardando conclusão do teste...\n')
+
+        # Espera o tempo necessário para o tráfego eMBB, uRLLC e a geração do gráfico terminarem
+        time.sleep(duracao_testes + 10)
+        info('*** Teste de tráfego eMBB e geração de gráfico concluídos.\n')
+
+        #info('*** Topologia pronta. Teste a conectividade no CLI.\n')
+        if interativo:
+            CLI(net)
+    finally:
+        parar_rede(rede)
     # Não remove os diretórios de logs para análise pós-execução
     # if os.path.exists(embb_log_dir):
     #     import shutil
@@ -193,4 +388,15 @@ def run_topology():
 
 if __name__ == '__main__':
     setLogLevel('info')
-    run_topology()
\ No newline at end of file
+    # SIGTERM (kill, fim da varredura) derruba a rede como o Ctrl-C, pelo finally de run_topology
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    parser = argparse.ArgumentParser(description="Topologia Mininet com controlo de QoS para uRLLC/eMBB")
+    # Opcional: especificação da topologia em JSON/YAML (ver topologia_parametrica.py)
+    parser.add_argument('espec', nargs='?', help="Especificação da topologia (JSON/YAML)")
+    parser.add_argument('--dir', default="/home/ubuntu/compartilhada", help="Diretório de saída da execução")
+    parser.add_argument('--parametros', default='{}', help="JSON com parâmetros a sobrepor a PARAMETROS_PADRAO")
+    parser.add_argument('--prefixo', default='', help="Prefixo dos nomes dos nós (execuções em simultâneo)")
+    parser.add_argument('--sem-cli', action='store_true', help="Derruba a rede no fim sem abrir o CLI")
+    args = parser.parse_args()
+    espec = topologia_parametrica.carregar_espec(args.espec) if args.espec else topologia_parametrica.ESPEC_PADRAO
+    run_topology(espec, args.dir, json.loads(args.parametros), args.prefixo, interativo=not args.sem_cli)
\ No newline at end of file
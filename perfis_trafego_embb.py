@@ -0,0 +1,359 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+import telemetria
+
+# --- Configurações ---
+margem_porta_s = 1.0                  # O servidor iperf3 só aceita um teste de cada vez: folga entre sessões
+origem_agendador = "carga_embb"        # Origem dos eventos de fase/sessão na telemetria
+nome_arquivo_plano = "plano_embb.json"  # Plano da execução com os instantes reais de cada fase e sessão
+
+# Fase da linha temporal: perfil e instante/duração relativos ao início da carga.
+# carga_mbps é a carga média planeada da fase (soma das sessões a dividir pela duração).
+Fase = namedtuple('Fase', ['indice', 'perfil', 'inicio_s', 'duracao_s', 'carga_mbps'])
+# Sessão iperf3 -u de um host eMBB para uma porta do servidor; mbps é a taxa total da
+# sessão, repartida pelos seus fluxos paralelos (-P). host é um índice na lista de hosts eMBB.
+Sessao = namedtuple('Sessao', ['indice', 'fase', 'inicio_s', 'duracao_s', 'mbps', 'fluxos', 'host', 'porta'])
+
+# Linhas temporais prontas a usar (parâmetro 'perfil_embb' pelo nome). Cada fase tem
+# 'perfil' e 'duracao_s'; os restantes parâmetros dependem do perfil (ver _sessoes_*).
+PERFIS = {
+    'constante': [
+        {'perfil': 'constante', 'duracao_s': 120, 'mbps': 45},
+    ],
+    'rajadas': [
+        {'perfil': 'pausa', 'duracao_s': 10},
+        {'perfil': 'rajadas', 'duracao_s': 50, 'mbps': 80, 'ligado_s': 2, 'desligado_s': 8},
+        {'perfil': 'rajadas', 'duracao_s': 50, 'mbps': 80, 'ligado_s': 0.5, 'desligado_s': 2, 'utilizadores': 2},
+        {'perfil': 'pausa', 'duracao_s': 10},
+    ],
+    'rampa': [
+        {'perfil': 'pausa', 'duracao_s': 10},
+        {'perfil': 'rampa', 'duracao_s': 40, 'de_mbps': 10, 'ate_mbps': 90, 'degraus': 8},
+        {'perfil': 'constante', 'duracao_s': 20, 'mbps': 90, 'utilizadores': 2},
+        {'perfil': 'rampa', 'duracao_s': 40, 'de_mbps': 90, 'ate_mbps': 10, 'degraus': 8},
+        {'perfil': 'pausa', 'duracao_s': 10},
+    ],
+    'multiutilizador': [
+        {'perfil': 'pausa', 'duracao_s': 10},
+        {'perfil': 'poisson', 'duracao_s': 100, 'chegadas_por_s': 0.5, 'duracao_media_s': 8,
+         'mbps_por_sessao': 15},
+        {'perfil': 'pausa', 'duracao_s': 10},
+    ],
+    'misto': [
+        {'perfil': 'constante', 'duracao_s': 20, 'mbps': 20, 'utilizadores': 2, 'fluxos': 4},
+        {'perfil': 'rampa', 'duracao_s': 20, 'de_mbps': 20, 'ate_mbps': 70, 'degraus': 5},
+        {'perfil': 'rajadas', 'duracao_s': 30, 'mbps': 90, 'ligado_s': 1, 'desligado_s': 4},
+        {'perfil': 'poisson', 'duracao_s': 40, 'chegadas_por_s': 1, 'duracao_media_s': 5, 'mbps_por_sessao': 10},
+        {'perfil': 'pausa', 'duracao_s': 10},
+    ],
+}
+
+
+def _sessoes_pausa(fase, rng):
+    return []
+
+
+def _sessoes_constante(fase, rng):
+    """mbps repartidos por 'utilizadores' sessões simultâneas durante toda a fase."""
+    utilizadores = fase.get('utilizadores', 1)
+    return [(0.0, fase['duracao_s'], fase['mbps'] / utilizadores, fase.get('fluxos', 1))] * utilizadores
+
+
+def _sessoes_rajadas(fase, rng):
+    """Liga/desliga: mbps durante ligado_s, nada durante desligado_s, até ao fim da fase."""
+    utilizadores = fase.get('utilizadores', 1)
+    periodo = fase['ligado_s'] + fase['desligado_s']
+    sessoes, t = [], 0.0
+    while t < fase['duracao_s']:
+        duracao = min(fase['ligado_s'], fase['duracao_s'] - t)
+        sessoes += [(t, duracao, fase['mbps'] / utilizadores, fase.get('fluxos', 1))] * utilizadores
+        t += periodo
+    return sessoes
+
+
+def _sessoes_rampa(fase, rng):
+    """Escada de 'degraus' patamares iguais de de_mbps a ate_mbps (inclusive)."""
+    degraus = fase.get('degraus', 5)
+    duracao = fase['duracao_s'] / degraus
+    passo = (fase['ate_mbps'] - fase['de_mbps']) / max(degraus - 1, 1)
+    utilizadores = fase.get('utilizadores', 1)
+    sessoes = []
+    for n in range(degraus):
+        mbps = (fase['de_mbps'] + n * passo) / utilizadores
+        sessoes += [(n * duracao, duracao, mbps, fase.get('fluxos', 1))] * utilizadores
+    return sessoes
+
+
+def _sessoes_poisson(fase, rng):
+    """
+    Chegadas de Poisson (chegadas_por_s) de sessões com duração exponencial de média
+    duracao_media_s (mínimo de 1 s), cada uma a mbps_por_sessao. Terminam no fim da fase.
+    """
+    sessoes, t = [], rng.expovariate(fase['chegadas_por_s'])
+    while t < fase['duracao_s']:
+        duracao = max(1.0, rng.expovariate(1.0 / fase['duracao_media_s']))
+        sessoes.append((t, min(duracao, fase['duracao_s'] - t), fase['mbps_por_sessao'], fase.get('fluxos', 1)))
+        t += rng.expovariate(fase['chegadas_por_s'])
+    return sessoes
+
+
+GERADORES_FASE = {
+    'pausa': _sessoes_pausa,
+    'constante': _sessoes_constante,
+    'rajadas': _sessoes_rajadas,
+    'rampa': _sessoes_rampa,
+    'poisson': _sessoes_poisson,
+}
+
+
+class PlanoCarga:
+    """
+    Linha temporal de carga eMBB já expandida em sessões iperf3.
+
+    As sessões são distribuídas pelos hosts eMBB em rotação e cada uma recebe uma porta
+    do servidor livre no seu início (margem_porta_s depois da sessão anterior nessa porta).
+    Sem porta livre a sessão é bloqueada: fica de fora do plano e é contada em bloqueadas.
+    """
+
+    def __init__(self, fases, sessoes, bloqueadas, semente):
+        self.fases = fases
+        self.sessoes = sessoes
+        self.bloqueadas = bloqueadas
+        self.semente = semente
+
+    @property
+    def duracao_s(self):
+        return max((f.inicio_s + f.duracao_s for f in self.fases), default=0.0)
+
+    def portas(self):
+        """Portas do servidor usadas por alguma sessão (é preciso um iperf3 -s em cada)."""
+        return sorted({s.porta for s in self.sessoes})
+
+    def carga_em(self, t_s):
+        """Carga planeada (Mbit/s) no instante t_s."""
+        return sum(s.mbps for s in self.sessoes if s.inicio_s <= t_s < s.inicio_s + s.duracao_s)
+
+    def para_dict(self):
+        return {'semente': self.semente, 'bloqueadas': self.bloqueadas,
+                'fases': [f._asdict() for f in self.fases], 'sessoes': [s._asdict() for s in self.sessoes]}
+
+
+def resolver_perfil(perfil):
+    """Lista de fases a partir do nome de um perfil de PERFIS, de um ficheiro JSON ou da própria lista."""
+    if isinstance(perfil, str):
+        if perfil in PERFIS:
+            return PERFIS[perfil]
+        if os.path.exists(perfil):
+            with open(perfil) as f:
+                return json.load(f)
+        raise ValueError(f"Perfil eMBB desconhecido: '{perfil}'. Disponíveis: {', '.join(PERFIS)} "
+                         f"(ou um ficheiro JSON com a lista de fases)")
+    return perfil
+
+
+def planear(perfil, n_hosts, portas, semente=None, duracao_max_s=None):
+    """
+    Expande a linha temporal de fases em sessões com host, porta e instantes relativos.
+
+    portas: portas do servidor disponíveis para sessões em simultâneo. duracao_max_s corta
+    as fases e sessões que passem desse instante (a duração do teste). Com a mesma
+    semente o plano é o mesmo (as chegadas de Poisson são as únicas aleatórias).
+    """
+    if n_hosts < 1:
+        raise ValueError("Nenhum host eMBB para gerar a carga.")
+    semente = random.randrange(2 ** 32) if semente is None else semente
+    rng = random.Random(semente)
+
+    duracoes, pedidas, inicio = [], [], 0.0
+    for indice, parametros in enumerate(resolver_perfil(perfil)):
+        nome = parametros.get('perfil')
+        if nome not in GERADORES_FASE:
+            raise ValueError(f"Fase {indice}: perfil '{nome}' desconhecido. Disponíveis: {', '.join(GERADORES_FASE)}")
+        try:
+            sessoes = GERADORES_FASE[nome](parametros, rng)
+        except KeyError as erro:
+            raise ValueError(f"Fase {indice} ({nome}): falta o parâmetro {erro}")
+        duracao = float(parametros['duracao_s'])
+        if duracao_max_s is not None:
+            duracao = min(duracao, duracao_max_s - inicio)
+            if duracao <= 0:
+                break
+        pedidas += [(inicio + t, min(d, duracao - t), mbps, fluxos, indice)
+                    for t, d, mbps, fluxos in sessoes if t < duracao]
+        duracoes.append((indice, nome, inicio, duracao))
+        inicio += duracao
+
+    livres = [(0.0, porta) for porta in portas]  # (livre a partir de, porta)
+    heapq.heapify(livres)
+    atribuidas, bloqueadas = [], 0
+    for t, duracao, mbps, fluxos, fase in sorted(pedidas, key=lambda s: s[0]):
+        if not livres or livres[0][0] > t:
+            bloqueadas += 1
+            continue
+        _, porta = heapq.heappop(livres)
+        heapq.heappush(livres, (t + duracao + margem_porta_s, porta))
+        indice = len(atribuidas)
+        atribuidas.append(Sessao(indice, fase, round(t, 6), round(duracao, 6), round(mbps, 6), int(fluxos),
+                                 indice % n_hosts, porta))
+
+    # Carga média do que vai de facto ser gerado (sem as sessões bloqueadas)
+    fases = [Fase(indice, nome, inicio, duracao,
+                  round(sum(s.duracao_s * s.mbps for s in atribuidas if s.fase == indice) / duracao, 3))
+             for indice, nome, inicio, duracao in duracoes]
+    return PlanoCarga(fases, atribuidas, bloqueadas, semente)
+
+
+class AgendadorEmbb:
+    """
+    Executa um PlanoCarga: lança e termina cada sessão iperf3 no seu instante e regista
+    na telemetria o início e o fim de cada fase e de cada sessão.
+
+    As sessões são processos próprios no namespace do host (host.popen), não comandos na
+    shell do nó, para que várias possam correr em simultâneo no mesmo host. O fim de cada
+    sessão é um SIGINT no instante planeado (o -t do iperf3 só aceita segundos inteiros).
+    O instante registado é o do lançamento: o tráfego começa após o handshake de controlo
+    do iperf3 (poucos ms). O plano com os instantes reais fica em nome_arquivo_plano.
+    """
+
+    def __init__(self, plano, hosts, ip_servidor, log_dir, project_dir, opcoes_iperf='-i 1 -f m'):
+        self.plano = plano
+        self.hosts = hosts
+        self.ip_servidor = ip_servidor
+        self.log_dir = log_dir
+        self.opcoes_iperf = opcoes_iperf.split()
+        self.caminho_plano = os.path.join(project_dir, nome_arquivo_plano)
+        self._escritor = telemetria.EscritorTelemetria(
+            os.path.join(project_dir, telemetria.nome_arquivo_telemetria), origem_agendador)
+        self.t_fases = {}    # índice -> (t_ns início, t_ns fim)
+        self.t_sessoes = {}  # índice -> (t_ns início, t_ns fim)
+        self._processos = {}
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _agenda(self):
+        """Ações (instante relativo, ordem, tipo, objeto); no mesmo instante: fins de sessão,
+        fim de fase, início de fase, inícios de sessão."""
+        acoes = []
+        for f in self.plano.fases:
+            acoes += [(f.inicio_s, 2, 'inicio_fase', f), (f.inicio_s + f.duracao_s, 1, 'fim_fase', f)]
+        for s in self.plano.sessoes:
+            acoes += [(s.inicio_s, 3, 'inicio_sessao', s), (s.inicio_s + s.duracao_s, 0, 'fim_sessao', s)]
+        return sorted(acoes, key=lambda a: (a[0], a[1], a[3].indice))
+
+    def _iniciar_sessao(self, sessao):
+        host = self.hosts[sessao.host]
+        caminho_log = os.path.join(self.log_dir, f"sessao_{sessao.indice:03d}_{host.name}_{sessao.porta}.txt")
+        comando = ['iperf3', '-c', self.ip_servidor, '-p', str(sessao.porta), '-u',
+                   '-b', f'{sessao.mbps / sessao.fluxos:g}M', '-P', str(sessao.fluxos),
+                   '-t', str(max(1, math.ceil(sessao.duracao_s)))] + self.opcoes_iperf
+        with open(caminho_log, 'w') as log:
+            self._processos[sessao.indice] = host.popen(comando, stdout=log, stderr=subprocess.STDOUT)
+
+    def _terminar_sessao(self, sessao):
+        processo = self._processos.get(sessao.indice)
+        if processo is not None and processo.poll() is None:
+            processo.send_signal(signal.SIGINT)
+
+    def _executar(self, acao, objeto):
+        t_ns = time.monotonic_ns()
+        if acao == 'inicio_fase':
+            self._escritor.registrar(telemetria.FASE_EMBB_INICIO, objeto.carga_mbps, canal=objeto.indice, t_ns=t_ns)
+            self.t_fases[objeto.indice] = (t_ns, None)
+            print(f"[eMBB Gen] Fase {objeto.indice} ({objeto.perfil}, {objeto.duracao_s:g} s, "
+                  f"{objeto.carga_mbps:g} Mbit/s em média)")
+        elif acao == 'fim_fase':
+            self._escritor.registrar(telemetria.FASE_EMBB_FIM, objeto.carga_mbps, canal=objeto.indice, t_ns=t_ns)
+            self.t_fases[objeto.indice] = (self.t_fases[objeto.indice][0], t_ns)
+        elif acao == 'inicio_sessao':
+            self._iniciar_sessao(objeto)
+            self._escritor.registrar(telemetria.SESSAO_EMBB_INICIO, objeto.mbps, canal=objeto.indice % 65536,
+                                     t_ns=t_ns)
+            self.t_sessoes[objeto.indice] = (t_ns, None)
+        else:
+            self._terminar_sessao(objeto)
+            self._escritor.registrar(telemetria.SESSAO_EMBB_FIM, objeto.mbps, canal=objeto.indice % 65536,
+                                     t_ns=t_ns)
+            self.t_sessoes[objeto.indice] = (self.t_sessoes[objeto.indice][0], t_ns)
+
+    def _loop(self):
+        t0 = time.monotonic()
+        for t_rel, _, acao, objeto in self._agenda():
+            if self._parar.wait(max(0.0, t0 + t_rel - time.monotonic())):
+                return
+            self._executar(acao, objeto)
+
+    def iniciar(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        if self.plano.bloqueadas:
+            print(f"[ALERTA] {self.plano.bloqueadas} sessões eMBB bloqueadas por falta de portas livres no servidor.")
+        print(f"[eMBB Gen] {len(self.plano.fases)} fases e {len(self.plano.sessoes)} sessões em "
+              f"{len(self.hosts)} hosts ({self.plano.duracao_s:g} s, semente {self.plano.semente}).")
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def esperar(self, timeout=None):
+        """Espera pelo fim da linha temporal. Devolve verdadeiro se terminou."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def parar(self):
+        """Interrompe a linha temporal (se ainda decorrer), termina as sessões e grava o plano."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        for processo in self._processos.values():
+            if processo.poll() is None:
+                processo.send_signal(signal.SIGINT)
+        for processo in self._processos.values():
+            try:
+                processo.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+        self._escritor.fechar()
+        plano = self.plano.para_dict()
+        for lista, tempos in ((plano['fases'], self.t_fases), (plano['sessoes'], self.t_sessoes)):
+            for entrada in lista:
+                entrada['t_inicio_ns'], entrada['t_fim_ns'] = tempos.get(entrada['indice'], (None, None))
+        for entrada in plano['sessoes']:
+            entrada['host'] = self.hosts[entrada['host']].name
+        with open(self.caminho_plano, 'w') as f:
+            json.dump(plano, f, indent=2)
+
+
+if __name__ == '__main__':
+    # Mostra o plano de um perfil sem Mininet (para verificar uma linha temporal antes da execução)
+    parser = argparse.ArgumentParser(description="Plano de carga eMBB de um perfil (fases e sessões iperf3)")
+    parser.add_argument('perfil', help=f"Nome ({', '.join(PERFIS)}) ou ficheiro JSON com a lista de fases")
+    parser.add_argument('--hosts', type=int, default=2, help="Número de hosts eMBB")
+    parser.add_argument('--semente', type=int)
+    parser.add_argument('--duracao', type=float, help="Duração máxima do teste (s)")
+    parser.add_argument('--sessoes', action='store_true', help="Lista também as sessões")
+    args = parser.parse_args()
+
+    import controlador_qos
+
+    portas = controlador_qos.fluxos_fatias[controlador_qos.estrategias_qdisc.EMBB]
+    plano = planear(args.perfil, args.hosts, portas, args.semente, args.duracao)
+    print(f"Semente {plano.semente}; {len(plano.sessoes)} sessões, {plano.bloqueadas} bloqueadas, "
+          f"{len(plano.portas())} portas usadas, {plano.duracao_s:g} s")
+    print(f"{'fase':>4} {'perfil':<10} {'início':>8} {'duração':>8} {'carga média':>12} {'pico':>8} {'sessões':>8}")
+    for fase in plano.fases:
+        sessoes = [s for s in plano.sessoes if s.fase == fase.indice]
+        pico = max((plano.carga_em(s.inicio_s) for s in sessoes), default=0.0)
+        print(f"{fase.indice:>4} {fase.perfil:<10} {fase.inicio_s:>7.1f}s {fase.duracao_s:>7.1f}s "
+              f"{fase.carga_mbps:>7.1f} Mb/s {pico:>6.1f}Mb {len(sessoes):>8}")
+    if args.sessoes:
+        for s in plano.sessoes:
+            print(f"    - sessão {s.indice:>3} fase {s.fase} host {s.host} porta {s.porta}: "
+                  f"{s.inicio_s:7.2f}s +{s.duracao_s:5.2f}s {s.mbps:6.2f} Mbit/s x{s.fluxos}")
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+import amostrador_tc
+import telemetria
+
+# --- Configurações ---
+horizonte_s = 0.5             # Antecedência com que se quer prever o cruzamento do limiar
+janela_rtt_s = 1.0            # Amostras de RTT usadas na regressão da tendência
+janela_fila_s = 2.0           # Amostras de backlog por interface (o amostrador_tc lê a cada 0,5 s)
+minimo_pontos = 4             # Pontos mínimos numa janela para estimar a tendência
+alfa_ewma = 0.3               # Nível do RTT: média móvel exponencial
+periodo_refratario_s = 5.0    # Depois de uma previsão, a seguinte só conta passado este tempo
+separacao_episodios_s = 2.0   # Violações mais afastadas do que isto pertencem a episódios diferentes
+intervalo_janela_rtt_s = 0.1  # Janela do pior RTT enviado pelo monitor (intervalo_feedback_s)
+capacidade_serie = 256        # Amostras guardadas por série no previsor em linha
+
+
+def regressao_deslizante(t, v, janela_s, minimo=None):
+    """
+    Regressão linear de v em t sobre os últimos janela_s segundos de cada amostra.
+
+    Vetorizada com somas acumuladas: O(n) para a série inteira. Devolve (declive por
+    segundo, valor da reta no instante da amostra); NaN onde a janela tem menos de
+    minimo pontos ou todos no mesmo instante.
+    """
+    minimo = minimo_pontos if minimo is None else minimo
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    if len(t) == 0:
+        return np.empty(0), np.empty(0)
+    # Centrar no primeiro instante evita cancelamento numérico nas somas de t²
+    tc = t - t[0]
+    somas = [np.concatenate([[0.0], np.cumsum(x)]) for x in (np.ones_like(tc), tc, v, tc * tc, tc * v)]
+    inicio = np.searchsorted(t, t - janela_s, side='left')
+    fim = np.arange(1, len(t) + 1)
+    n, st, sv, stt, stv = (s[fim] - s[inicio] for s in somas)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denominador = n * stt - st * st
+        declive = (n * stv - st * sv) / denominador
+        intercecao = (sv - declive * st) / n
+    invalido = (n < minimo) | (np.abs(denominador) < 1e-12)
+    declive[invalido] = np.nan
+    return declive, np.where(invalido, np.nan, intercecao + declive * tc)
+
+
+def ewma(v, alfa=None):
+    """Média móvel exponencial de uma série (recursiva: uma iteração por janela do monitor)."""
+    alfa = alfa_ewma if alfa is None else alfa
+    saida = np.empty(len(v))
+    nivel = None
+    for i, x in enumerate(v):
+        nivel = x if nivel is None else alfa * x + (1 - alfa) * nivel
+        saida[i] = nivel
+    return saida
+
+
+def prever(t_rtt, rtt, filas, limiar_ms, horizonte=None):
+    """
+    Latência prevista a horizonte segundos, para cada amostra de RTT.
+
+    Duas tendências, cada uma projetada a partir do instante da amostra:
+      - a reta da regressão do RTT (só se o declive for positivo);
+      - o nível do RTT (EWMA) mais o crescimento previsto do atraso de fila da pior
+        interface: o backlog que se acumula num gargalo soma-se ao RTT.
+    filas: lista de (t, atraso de fila em ms) por interface. Devolve (prevista, alarme),
+    onde alarme marca as amostras abaixo do limiar com cruzamento previsto.
+    """
+    horizonte = horizonte_s if horizonte is None else horizonte
+    t_rtt = np.asarray(t_rtt, dtype=float)
+    rtt = np.asarray(rtt, dtype=float)
+    declive, reta = regressao_deslizante(t_rtt, rtt, janela_rtt_s)
+    prevista = np.where(declive > 0, reta + declive * horizonte, rtt)
+    prevista = np.where(np.isnan(prevista), rtt, prevista)
+
+    crescimento_fila = np.zeros(len(t_rtt))
+    for t_fila, atraso in filas:
+        if len(t_fila) == 0:
+            continue
+        declive_fila, _ = regressao_deslizante(t_fila, atraso, janela_fila_s, minimo=3)
+        # Última tendência conhecida em cada instante de RTT (e só se for recente)
+        indice = np.searchsorted(t_fila, t_rtt, side='right') - 1
+        valido = indice >= 0
+        recente = valido & (t_rtt - np.asarray(t_fila)[np.maximum(indice, 0)] <= janela_fila_s)
+        tendencia = np.where(recente, declive_fila[np.maximum(indice, 0)], 0.0)
+        crescimento_fila = np.maximum(crescimento_fila, np.nan_to_num(tendencia))
+    prevista = np.maximum(prevista, ewma(rtt) + crescimento_fila * horizonte)
+    return prevista, (prevista > limiar_ms) & (rtt <= limiar_ms)
+
+
+def primeiros_alarmes(t, alarme, refratario_s=None):
+    """Instantes dos alarmes, ignorando os que caem no período refratário do anterior."""
+    refratario_s = periodo_refratario_s if refratario_s is None else refratario_s
+    instantes, ultimo = [], None
+    for instante in np.asarray(t)[np.asarray(alarme)]:
+        if ultimo is None or instante - ultimo >= refratario_s:
+            instantes.append(float(instante))
+            ultimo = instante
+    return np.array(instantes)
+
+
+class _Serie:
+    """Série circular de (t, valor) com capacidade fixa."""
+
+    def __init__(self, capacidade=None):
+        capacidade = capacidade or capacidade_serie
+        self.t = np.zeros(capacidade)
+        self.v = np.zeros(capacidade)
+        self.n = 0
+
+    def adicionar(self, t, valor):
+        posicao = self.n % len(self.t)
+        self.t[posicao], self.v[posicao] = t, valor
+        self.n += 1
+
+    def ultimos(self, janela_s):
+        """(t, v) por ordem temporal, dos últimos janela_s segundos."""
+        if self.n == 0:
+            return np.empty(0), np.empty(0)
+        ordem = np.arange(max(0, self.n - len(self.t)), self.n) % len(self.t)
+        t, v = self.t[ordem], self.v[ordem]
+        manter = t >= t[-1] - janela_s
+        return t[manter], v[manter]
+
+
+class PrevisorLatencia:
+    """
+    Previsor em linha usado pelo controlador: recebe o pior RTT de cada janela do monitor
+    e o atraso de fila de cada interface (amostrador_tc) e diz se o limiar vai ser cruzado
+    dentro do horizonte. Usa prever() sobre as últimas amostras de cada série, pelo que
+    dá o mesmo resultado que a avaliação da execução inteira em avaliar_execucao().
+    """
+
+    def __init__(self, limiar_ms, horizonte=None):
+        self.limiar_ms = limiar_ms
+        self.horizonte_s = horizonte_s if horizonte is None else horizonte
+        self._rtt = _Serie()
+        self._filas = {}
+        self._ultimo_alarme = None
+
+    def adicionar_rtt(self, t, rtt_ms):
+        self._rtt.adicionar(t, rtt_ms)
+
+    def adicionar_fila(self, chave, t, atraso_ms):
+        self._filas.setdefault(chave, _Serie()).adicionar(t, atraso_ms)
+
+    def avaliar(self):
+        """Devolve a latência prevista se houver cruzamento previsto (fora do período refratário), senão None."""
+        # Janela suficiente para a regressão e para aquecer o EWMA
+        t, rtt = self._rtt.ultimos(max(janela_rtt_s, 3 / alfa_ewma * intervalo_janela_rtt_s))
+        if len(t) == 0:
+            return None
+        filas = [serie.ultimos(janela_fila_s) for serie in self._filas.values()]
+        prevista, alarme = prever(t, rtt, filas, self.limiar_ms, self.horizonte_s)
+        if not alarme[-1]:
+            return None
+        if self._ultimo_alarme is not None and t[-1] - self._ultimo_alarme < periodo_refratario_s:
+            return None
+        self._ultimo_alarme = t[-1]
+        return float(prevista[-1])
+
+
+def atraso_fila_ms(backlog_bytes, bw_mbit):
+    """Tempo para escoar o backlog à taxa da ligação."""
+    return backlog_bytes * 8 / (bw_mbit * 1000.0)
+
+
+def series_da_telemetria(registros, origem_monitor, canais=None):
+    """
+    Séries para prever() a partir da telemetria de uma execução.
+
+    RTT: o pior de cada janela de intervalo_janela_rtt_s (o que o monitor envia ao
+    controlador); NaN nas janelas em que todas as sondas se perderam. Filas: o maior
+    backlog das qdiscs de cada interface, convertido em atraso com o 'bw_mbit' de
+    tc_canais.json.
+    """
+    do_monitor = registros[registros['origem'] == origem_monitor.encode()]
+    sondas = np.sort(do_monitor[np.isin(do_monitor['metrica'], [telemetria.LATENCIA_MS, telemetria.PERDA])],
+                     order='t_ns')
+    if len(sondas) == 0:
+        return np.empty(0), np.empty(0), []
+    valores = np.where(sondas['metrica'] == telemetria.PERDA, -np.inf, sondas['valor'])
+    janela = (sondas['t_ns'] - sondas['t_ns'][0]) // int(intervalo_janela_rtt_s * 1e9)
+    inicios = np.flatnonzero(np.diff(janela, prepend=-1))
+    t_rtt = sondas['t_ns'][np.append(inicios[1:] - 1, len(sondas) - 1)] / 1e9
+    rtt = np.maximum.reduceat(valores, inicios)
+    rtt[np.isneginf(rtt)] = np.nan
+
+    filas = []
+    for (roteador, _), lista in _interfaces(canais or {}).items():
+        bw = lista[0].get('bw_mbit')
+        if not bw:
+            continue
+        amostras = registros[(registros['origem'] == roteador.encode())
+                             & (registros['metrica'] == telemetria.TC_BACKLOG_BYTES)
+                             & np.isin(registros['canal'], [c['canal'] for c in lista])]
+        if len(amostras) == 0:
+            continue
+        # Várias qdiscs da mesma interface na mesma leitura: fica o maior backlog (o da raiz)
+        instantes, posicoes = np.unique(amostras['t_ns'], return_inverse=True)
+        maximos = np.zeros(len(instantes))
+        np.maximum.at(maximos, posicoes, amostras['valor'])
+        filas.append((instantes / 1e9, atraso_fila_ms(maximos, bw)))
+    return t_rtt, rtt, filas
+
+
+def _interfaces(canais):
+    por_interface = {}
+    for canal in canais.values():
+        if canal['tipo'] == 'qdisc':
+            por_interface.setdefault((canal['roteador'], canal['interface']), []).append(canal)
+    return por_interface
+
+
+def avaliar_execucao(project_dir, limiar_ms, origem_monitor="h_uRLLC1", horizonte=None):
+    """
+    Repete o previsor sobre a telemetria de uma execução e mede-o contra o que aconteceu.
+
+    Episódio: primeira violação (janela acima do limiar ou só com perdas) depois de
+    separacao_episodios_s sem violações. Um alarme antecipa um episódio que começa até
+    horizonte + uma janela depois dele; um alarme sem nenhuma janela em violação nesse
+    intervalo é uma falsa ativação. Violações evitáveis: sondas em violação entre o instante em que a árvore
+    estaria instalada (alarme + tempo médio de aplicação medido) e a primeira atuação
+    reativa do controlador depois do início do episódio.
+
+    É exato numa execução sem previsão ativa (o que teria acontecido sem antecipação é o que
+    aconteceu). Numa execução com previsão ativa, as antecipações em linha (QOS_ANTECIPADO)
+    são contadas à parte: uma antecipação sem violação a seguir tanto pode ter evitado o
+    episódio como ser falsa; compare com uma execução igual sem previsão.
+    """
+    horizonte = horizonte_s if horizonte is None else horizonte
+    registros = np.array(telemetria.mapear(os.path.join(project_dir, telemetria.nome_arquivo_telemetria)))
+    tem_canais = os.path.exists(os.path.join(project_dir, amostrador_tc.nome_arquivo_canais))
+    canais = amostrador_tc.carregar_canais(project_dir) if tem_canais else {}
+    t_rtt, rtt, filas = series_da_telemetria(registros, origem_monitor, canais)
+    recebidas = ~np.isnan(rtt)
+    _, alarme = prever(t_rtt[recebidas], rtt[recebidas], filas, limiar_ms, horizonte)
+    alarmes = primeiros_alarmes(t_rtt[recebidas], alarme)
+
+    # Janelas em violação: pior RTT acima do limiar ou todas as sondas perdidas
+    t_violacoes = t_rtt[~(rtt <= limiar_ms)]
+    novos = np.diff(t_violacoes, prepend=-np.inf) > separacao_episodios_s
+    episodios = t_violacoes[novos]
+
+    do_monitor = registros[registros['origem'] == origem_monitor.encode()]
+    sondas_violacao = np.sort(do_monitor['t_ns'][
+        ((do_monitor['metrica'] == telemetria.LATENCIA_MS) & (do_monitor['valor'] > limiar_ms))
+        | (do_monitor['metrica'] == telemetria.PERDA)]) / 1e9
+    atuacoes = np.sort(registros['t_ns'][np.isin(registros['metrica'],
+                                                  [telemetria.QOS_APLICADO, telemetria.TETO_EMBB_MBIT])]) / 1e9
+    aplicacoes = registros['valor'][registros['metrica'] == telemetria.QOS_APLICADO]
+    aplicacao_s = float(np.mean(aplicacoes)) / 1000 if len(aplicacoes) else 0.0
+
+    tolerancia = horizonte + intervalo_janela_rtt_s
+    # Vetorizado: para cada alarme, a primeira janela em violação depois dele; para cada
+    # episódio, o último alarme antes do seu início
+    seguinte = np.searchsorted(t_violacoes, alarmes, side='right')
+    proxima_violacao = np.append(t_violacoes, np.inf)[seguinte]
+    verdadeiros = proxima_violacao - alarmes <= tolerancia
+    anterior = np.searchsorted(alarmes, episodios, side='left') - 1
+    alarme_anterior = np.where(anterior >= 0, np.append(alarmes, -np.inf)[anterior], -np.inf)
+    antecipado = episodios - alarme_anterior <= tolerancia
+
+    evitaveis = 0
+    for inicio, alarme_t in zip(episodios[antecipado], alarme_anterior[antecipado]):
+        reativa = atuacoes[atuacoes >= inicio]
+        fim = reativa[0] if len(reativa) else inicio + separacao_episodios_s
+        protegido = max(inicio, alarme_t + aplicacao_s)
+        evitaveis += int(np.count_nonzero((sondas_violacao >= protegido) & (sondas_violacao < fim)))
+    antecedencias = episodios[antecipado] - alarme_anterior[antecipado]
+
+    em_linha = registros['t_ns'][registros['metrica'] == telemetria.QOS_ANTECIPADO] / 1e9
+    seguidas = [bool(np.any((t_violacoes > t) & (t_violacoes <= t + tolerancia))) for t in em_linha]
+    return {
+        'limiar_ms': limiar_ms, 'horizonte_s': horizonte,
+        'episodios': int(len(episodios)), 'alarmes': int(len(alarmes)),
+        'episodios_antecipados': int(np.count_nonzero(antecipado)),
+        'antecedencia_media_ms': round(1000 * float(np.mean(antecedencias)), 1) if len(antecedencias) else None,
+        'violacoes_evitaveis': evitaveis,
+        'falsas_ativacoes': int(np.count_nonzero(~verdadeiros)),
+        'sondas_em_violacao': int(len(sondas_violacao)),
+        'antecipacoes_em_linha': int(len(em_linha)),
+        'antecipacoes_em_linha_seguidas_de_violacao': int(sum(seguidas)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Avaliação do previsor de latência sobre a telemetria de uma execução")
+    parser.add_argument('dir', help="Diretório da execução (telemetria.bin, tc_canais.json)")
+    parser.add_argument('--limiar', type=float, default=5.0, help="limiar_latencia_ms")
+    parser.add_argument('--horizonte', type=float, default=horizonte_s, help="Horizonte de previsão (s)")
+    parser.add_argument('--origem', default="h_uRLLC1", help="Origem das sondas do monitor na telemetria")
+    args = parser.parse_args()
+
+    relatorio = avaliar_execucao(args.dir, args.limiar, args.origem, args.horizonte)
+    with open(os.path.join(args.dir, "previsao.json"), "w") as f:
+        json.dump(relatorio, f, indent=2)
+    for chave, valor in relatorio.items():
+        print(f"    - {chave:<44} {valor}")
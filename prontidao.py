@@ -0,0 +1,59 @@
+import time
+
+# --- Configurações ---
+intervalo_sondagem_s = 0.05  # Espera entre verificações de prontidão
+timeout_padrao_s = 10.0
+
+
+class Cronometro:
+    """Mede a duração de cada fase do arranque e imprime o resumo no fim."""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.fases = []  # (nome, duração em s)
+        self._fase = None
+
+    def fase(self, nome):
+        """Termina a fase em curso (se houver) e começa a seguinte."""
+        agora = time.monotonic()
+        if self._fase is not None:
+            self.fases.append((self._fase[0], agora - self._fase[1]))
+        self._fase = (nome, agora) if nome else None
+
+    def total(self):
+        return time.monotonic() - self.inicio
+
+    def resumo(self):
+        self.fase(None)
+        linhas = [f"    - {nome:<40} {duracao * 1000:8.1f} ms" for nome, duracao in self.fases]
+        linhas.append(f"    - {'Total':<40} {self.total() * 1000:8.1f} ms")
+        return '\n'.join(linhas)
+
+
+def esperar_ate(condicao, descricao, timeout_s=timeout_padrao_s):
+    """
+    Chama condicao() até devolver verdadeiro. Devolve o tempo de espera em segundos.
+
+    Levanta TimeoutError se timeout_s se esgotar, em vez de seguir com a rede a meio.
+    """
+    inicio = time.monotonic()
+    while not condicao():
+        if time.monotonic() - inicio > timeout_s:
+            raise TimeoutError(f"{descricao}: não ficou pronto em {timeout_s:.0f} s")
+        time.sleep(intervalo_sondagem_s)
+    return time.monotonic() - inicio
+
+
+def porta_a_escutar(host, porta):
+    """Verdadeiro se algum processo do host escuta na porta TCP (o iperf3 usa-a como canal de controlo)."""
+    return bool(host.cmd(f'ss -Hltn "sport = :{porta}"').strip())
+
+
+def porta_udp_aberta(host, porta):
+    """Verdadeiro se algum socket UDP do host está ligado à porta."""
+    return bool(host.cmd(f'ss -Hlun "sport = :{porta}"').strip())
+
+
+def alcancavel(origem, ip_destino):
+    """Um ping curto: verdadeiro se ip_destino responder a partir do host origem."""
+    return ' 0% packet loss' in origem.cmd(f'ping -c 1 -W 1 {ip_destino}')
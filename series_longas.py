@@ -0,0 +1,235 @@
+from collections import deque
+
+import numpy as np
+
+# --- Configurações ---
+capacidade_bruta = 3600       # Amostras recentes guardadas tal como chegaram (1 h a uma amostra por segundo)
+largura_balde = 10.0          # Largura dos baldes do primeiro nível de agregados (unidades de t)
+fator_niveis = 6              # Cada nível junta este número de baldes do anterior
+niveis = 4                    # Níveis de agregados: 10 s, 1 min, 6 min e 36 min com os valores por omissão
+capacidade_nivel = 360        # Baldes por nível; o último funde os seus dois a dois quando enche
+limites_histograma = np.geomspace(1e-3, 1e5, 65)  # Histograma logarítmico de cada balde (percentis a ±15%)
+
+
+class BufferCircular:
+    """
+    As últimas capacidade amostras (t, valor) em dois arrays NumPy de tamanho fixo.
+
+    adicionar() devolve as amostras que deixaram de caber, para irem para os agregados;
+    t e valores são cópias por ordem cronológica.
+    """
+
+    def __init__(self, capacidade=None):
+        self.capacidade = capacidade_bruta if capacidade is None else capacidade
+        self._t = np.empty(self.capacidade)
+        self._v = np.empty(self.capacidade)
+        self._escritas = 0
+
+    def __len__(self):
+        return min(self._escritas, self.capacidade)
+
+    def _ordenado(self, dados):
+        if self._escritas <= self.capacidade:
+            return dados[:self._escritas].copy()
+        inicio = self._escritas % self.capacidade
+        return np.concatenate([dados[inicio:], dados[:inicio]])
+
+    @property
+    def t(self):
+        return self._ordenado(self._t)
+
+    @property
+    def valores(self):
+        return self._ordenado(self._v)
+
+    def adicionar(self, t, valores):
+        """Acrescenta amostras e devolve (t, valores) das que saíram, mais antigas primeiro."""
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(valores, dtype=float)
+        ocupado = len(self)
+        excesso = max(0, ocupado + len(t) - self.capacidade)
+        do_buffer = min(excesso, ocupado)
+        t_saem, v_saem = self.t[:do_buffer], self.valores[:do_buffer]
+        if excesso > ocupado:
+            # Lote maior do que o buffer: as primeiras do lote saem sem nunca entrar
+            t_saem = np.concatenate([t_saem, t[:excesso - ocupado]])
+            v_saem = np.concatenate([v_saem, v[:excesso - ocupado]])
+            t, v = t[excesso - ocupado:], v[excesso - ocupado:]
+        posicoes = (self._escritas + np.arange(len(t))) % self.capacidade
+        self._t[posicoes] = t
+        self._v[posicoes] = v
+        self._escritas += len(t)
+        return t_saem, v_saem
+
+
+class _Balde:
+    __slots__ = ('inicio', 'fim', 'n', 'soma', 'minimo', 'maximo', 'histograma')
+
+    def __init__(self, t, v):
+        self.inicio, self.fim = float(t[0]), float(t[-1])
+        self.n, self.soma = len(v), float(v.sum())
+        self.minimo, self.maximo = float(v.min()), float(v.max())
+        self.histograma = np.bincount(_classe_histograma(v), minlength=len(limites_histograma) - 1)
+
+    def fundir(self, outro):
+        self.inicio, self.fim = min(self.inicio, outro.inicio), max(self.fim, outro.fim)
+        self.n += outro.n
+        self.soma += outro.soma
+        self.minimo, self.maximo = min(self.minimo, outro.minimo), max(self.maximo, outro.maximo)
+        self.histograma = self.histograma + outro.histograma
+        return self
+
+
+def _classe_histograma(v):
+    return np.clip(np.searchsorted(limites_histograma, v, side='right') - 1, 0, len(limites_histograma) - 2)
+
+
+class AgregadosMultirresolucao:
+    """
+    Resumo de amostras antigas em baldes cada vez mais largos, com memória fixa.
+
+    O nível 0 tem baldes de largura_balde; quando um nível passa de capacidade_nivel
+    baldes, os fator_niveis mais antigos fundem-se num balde do nível seguinte. O último
+    nível, quando enche, funde os seus baldes dois a dois (a largura duplica), pelo que a
+    memória não depende da duração. Cada balde guarda contagem, soma, mínimo, máximo e um
+    histograma logarítmico que se soma na fusão: os percentis são aproximados, os outros exatos.
+    """
+
+    def __init__(self, largura=None, fator=None, n_niveis=None, capacidade=None):
+        self.largura = largura_balde if largura is None else largura
+        self.fator = fator_niveis if fator is None else fator
+        self.capacidade = capacidade_nivel if capacidade is None else capacidade
+        self._niveis = [deque() for _ in range(niveis if n_niveis is None else n_niveis)]
+        self._indice_aberto = None  # Índice (t // largura) do balde mais recente do nível 0
+
+    def __len__(self):
+        return sum(len(nivel) for nivel in self._niveis)
+
+    def adicionar(self, t, valores):
+        """Acrescenta amostras por ordem cronológica (ex. as que saem do BufferCircular)."""
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(valores, dtype=float)
+        validos = np.isfinite(v)
+        t, v = t[validos], v[validos]
+        if len(t) == 0:
+            return
+        indices = np.floor(t / self.largura)
+        inicios = np.flatnonzero(np.r_[True, indices[1:] != indices[:-1]])
+        nivel0 = self._niveis[0]
+        for inicio, fim in zip(inicios, np.r_[inicios[1:], len(t)]):
+            balde = _Balde(t[inicio:fim], v[inicio:fim])
+            if nivel0 and indices[inicio] == self._indice_aberto:
+                nivel0[-1].fundir(balde)
+            else:
+                nivel0.append(balde)
+            self._indice_aberto = indices[inicio]
+        self._compactar()
+
+    def _compactar(self):
+        for nivel, seguinte in zip(self._niveis, self._niveis[1:]):
+            while len(nivel) > self.capacidade:
+                balde = nivel.popleft()
+                for _ in range(self.fator - 1):
+                    balde = balde.fundir(nivel.popleft())
+                seguinte.append(balde)
+        ultimo = self._niveis[-1]
+        if len(ultimo) > self.capacidade:
+            baldes = list(ultimo)
+            ultimo.clear()
+            for par in range(0, len(baldes), 2):
+                ultimo.append(baldes[par].fundir(baldes[par + 1]) if par + 1 < len(baldes) else baldes[par])
+
+    def serie(self, estatistica='media'):
+        """(centro de cada balde, estatística), do mais antigo para o mais recente.
+
+        estatistica: 'min', 'max', 'media', 'n' ou um percentil 'pNN' (ex. 'p95').
+        """
+        baldes = [b for nivel in reversed(self._niveis) for b in nivel]
+        if not baldes:
+            return np.empty(0), np.empty(0)
+        centros = np.array([(b.inicio + b.fim) / 2 for b in baldes])
+        if estatistica in ('min', 'max'):
+            return centros, np.array([b.minimo if estatistica == 'min' else b.maximo for b in baldes])
+        if estatistica == 'media':
+            return centros, np.array([b.soma / b.n for b in baldes])
+        if estatistica == 'n':
+            return centros, np.array([b.n for b in baldes], dtype=float)
+        return centros, _percentis(baldes, float(estatistica[1:]))
+
+
+def _percentis(baldes, p):
+    """Percentil p de cada balde pelo histograma, interpolado em escala log e limitado a [min, max]."""
+    histogramas = np.array([b.histograma for b in baldes])
+    acumulado = np.cumsum(histogramas, axis=1)
+    alvo = p / 100 * acumulado[:, -1]
+    classe = np.minimum((acumulado < alvo[:, None]).sum(axis=1), histogramas.shape[1] - 1)
+    linhas = np.arange(len(baldes))
+    antes = np.where(classe > 0, acumulado[linhas, classe - 1], 0)
+    fracao = np.clip((alvo - antes) / np.maximum(histogramas[linhas, classe], 1), 0, 1)
+    baixo, alto = np.log(limites_histograma[classe]), np.log(limites_histograma[classe + 1])
+    valores = np.exp(baixo + fracao * (alto - baixo))
+    return np.clip(valores, [b.minimo for b in baldes], [b.maximo for b in baldes])
+
+
+class SerieLonga:
+    """
+    Série de duração ilimitada com memória fixa: as amostras recentes num BufferCircular,
+    as antigas em AgregadosMultirresolucao.
+    """
+
+    def __init__(self, capacidade=None, **agregados):
+        self.recentes = BufferCircular(capacidade)
+        self.antigas = AgregadosMultirresolucao(**agregados)
+
+    def adicionar(self, t, valores):
+        self.antigas.adicionar(*self.recentes.adicionar(t, valores))
+
+    def serie(self, estatistica='media'):
+        """As amostras antigas reduzidas à estatística de cada balde, seguidas das recentes."""
+        t_antigas, v_antigas = self.antigas.serie(estatistica)
+        return np.concatenate([t_antigas, self.recentes.t]), np.concatenate([v_antigas, self.recentes.valores])
+
+    def maximo(self, padrao=0.0):
+        _, maximos = self.antigas.serie('max')
+        valores = np.concatenate([maximos, self.recentes.valores])
+        valores = valores[np.isfinite(valores)]
+        return float(valores.max()) if len(valores) else padrao
+
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: reduz (x, y) a n pontos que mantêm a forma da série.
+
+    O primeiro e o último ponto ficam; de cada um dos n-2 grupos intermédios fica o ponto
+    que forma o maior triângulo com o ponto escolhido antes e a média do grupo seguinte,
+    o que preserva os picos (ao contrário de uma média ou de uma amostragem regular).
+    Os pontos não finitos são ignorados.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    validos = np.isfinite(y)
+    x, y = x[validos], y[validos]
+    if n >= len(x) or n < 3:
+        return x, y
+    passo = (len(x) - 2) / (n - 2)
+    limites = (np.arange(n - 1) * passo).astype(np.int64) + 1  # limites[i]:limites[i+1] é o grupo i
+    limites[-1] = len(x) - 1
+    # Média de cada grupo (e do último ponto, o "grupo" final), vetorizada; só a escolha é sequencial
+    tamanhos = np.diff(np.r_[limites, len(x)])
+    medias_x = np.add.reduceat(x, limites) / tamanhos
+    medias_y = np.add.reduceat(y, limites) / tamanhos
+    xs, ys = x.tolist(), y.tolist()
+    escolhidos = [0]
+    a = 0
+    for i in range(n - 2):
+        xa, ya = xs[a], ys[a]
+        dx, dy = xa - medias_x[i + 1], medias_y[i + 1] - ya
+        melhor, area_maxima = limites[i], -1.0
+        for j in range(limites[i], limites[i + 1]):
+            area = abs(dx * (ys[j] - ya) - (xa - xs[j]) * dy)
+            if area > area_maxima:
+                melhor, area_maxima = j, area
+        escolhidos.append(melhor)
+        a = melhor
+    escolhidos.append(len(x) - 1)
+    return x[escolhidos], y[escolhidos]
@@ -0,0 +1,1145 @@
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import re
+import shlex
+import time
+from collections import deque
+
+import numpy as np
+
+import controlador_adaptativo
+import classificacao_fluxos
+import controlador_qos
+import estatisticas_janela
+import gerador_monitor_uRLLC
+import gerador_trafego_embb
+import gerador_trafego_urllc
+import localizacao_gargalo
+import perfis_trafego_embb
+import previsao_latencia
+import telemetria
+import topologia_parametrica
+import trafego_urllc_udp
+
+# --- Configurações ---
+granularidade_s = 0.001       # Fontes de taxa constante emitem os pacotes deste intervalo numa só rajada (0: pacote a pacote)
+atraso_salto_s = 20e-6        # Propagação + processamento por salto (par veth)
+limite_fila_padrao = 1000     # Pacotes na fila de uma interface sem qdisc instalada (txqueuelen)
+atraso_atuacao_s = 0.02       # Decisão do controlador -> árvore instalada/alterada nos roteadores
+cabecalho_bytes = 28          # IP + UDP acrescentados à carga
+tamanho_sonda_bytes = 84      # Eco ICMP com 56 bytes de dados
+tamanho_udp_iperf = 1448      # -l por omissão do iperf3 em UDP
+timeout_sonda_s = 1.0
+balde_s = 0.01                # Crédito máximo dos baldes de fichas (rate/ceil) em segundos de taxa
+nome_arquivo_resumo = "resumo_simulacao.json"
+origem_trafego = 'trafego'    # Origem do lançamento dos geradores na telemetria (a mesma da topologia Mininet)
+
+# Limite (pacotes) das qdiscs folha; None: o 'limit' do comando. O sfq e o fq_codel são modelados
+# como FIFO com o seu limite (sem equidade entre fluxos nem descarte por CoDel).
+LIMITES_FOLHA = {'sfq': 127, 'fq_codel': 10240, 'codel': 1000, 'pfifo': None, 'bfifo': None}
+# Tins do cake diffserv4 (minor usado pelos filtros -> prioridade estrita; 1 = bulk, 4 = voz)
+TINS_CAKE = {1: 3, 2: 2, 3: 1, 4: 0}
+
+# Parâmetros de uma experiência simulada: os mesmos nomes do PARAMETROS_PADRAO da topologia Mininet
+PARAMETROS_PADRAO = {
+    'largura_banda_embb': 45,
+    'perfil_embb': None,
+    'semente_embb': None,
+    'duracao_testes': 120,
+    'taxa_urllc': '40M',
+    'tamanho_pacote_urllc': 128,
+    'agenda_urllc': 'periodica',
+    'fluxos_urllc': 1,
+    'limiar_latencia_ms': 5.0,
+    'periodo_normalizacao_s': 70,
+    'modo_alerta': 'janela',
+    'regras_alerta': None,
+    'pontos_monitor': 'urllc',
+    'modo_controle': controlador_qos.modo_controle,
+    'modo_previsao': controlador_qos.modo_previsao,
+    'horizonte_previsao_s': controlador_qos.horizonte_previsao_s,
+    'classes_htb': {},
+    'estrategia_qdisc': controlador_qos.estrategia_qdisc,
+    'estrategias_interface': {},
+    'alcance_qos': controlador_qos.alcance_qos,
+    'amostragem_tc_s': 0.5,
+    # Só do simulador
+    'taxa_sondas_hz': gerador_monitor_uRLLC.taxa_amostragem_hz,
+    'semente': 0,
+}
+
+_RE_TAXA = re.compile(r'^([\d.]+)([kmg]?)(bit|bps)?$', re.IGNORECASE)
+_UNIDADES_TAXA = {'': 1, 'k': 1e3, 'm': 1e6, 'g': 1e9}
+
+
+def taxa_tc(texto):
+    """Taxa na sintaxe do tc ('5mbit', '10.0mbit', '100kbit') em bit/s."""
+    encontrada = _RE_TAXA.match(texto)
+    if not encontrada:
+        raise ValueError(f"taxa inválida: {texto}")
+    valor, prefixo, unidade = encontrada.groups()
+    # 'bps' no tc são bytes por segundo
+    return float(valor) * _UNIDADES_TAXA[prefixo.lower()] * (8 if unidade and unidade.lower() == 'bps' else 1)
+
+
+class Motor:
+    """Fila de eventos em tempo virtual (segundos desde o início da experiência)."""
+
+    def __init__(self):
+        self.agora = 0.0
+        self._eventos = []
+        self._sequencia = itertools.count()  # Desempate estável: eventos no mesmo instante pela ordem de criação
+
+    def agendar(self, t, funcao, *args):
+        heapq.heappush(self._eventos, (t, next(self._sequencia), funcao, args))
+
+    def executar_ate(self, t_fim):
+        eventos = self._eventos
+        while eventos and eventos[0][0] <= t_fim:
+            t, _, funcao, args = heapq.heappop(eventos)
+            self.agora = t
+            funcao(*args)
+        self.agora = t_fim
+
+
+class Rajada:
+    """
+    Pacotes consecutivos de um fluxo que atravessam a rede juntos (um só evento por salto).
+
+    A rajada ocupa cada ligação o tempo de todos os seus pacotes, mas chega ao salto
+    seguinte logo que o primeiro pacote passa (os routers não esperam pela rajada inteira).
+    t_envio é o instante de emissão do último pacote; a entrega conta a chegada do último.
+    """
+    __slots__ = ('fluxo', 'destino', 'protocolo', 'sport', 'dport', 'dscp', 'pacotes', 'tamanho', 't_envio')
+
+    def __init__(self, fluxo, destino, protocolo, sport, dport, pacotes, tamanho, t_envio):
+        self.fluxo = fluxo
+        self.destino = destino
+        self.protocolo = protocolo
+        self.sport = sport
+        self.dport = dport
+        self.dscp = 0
+        self.pacotes = pacotes
+        self.tamanho = tamanho  # Bytes por pacote na ligação
+        self.t_envio = t_envio
+
+
+class Fluxo:
+    """Contadores de um fluxo; ao_chegar(rajada, t) é chamado na entrega ao destino."""
+
+    def __init__(self, nome, porta, ao_chegar=None):
+        self.nome = nome
+        self.porta = porta
+        self.ao_chegar = ao_chegar
+        self.enviados = 0
+        self.recebidos = 0
+        self.descartados = 0
+        self.bytes_por_segundo = {}  # Carga UDP entregue (como o iperf3 a conta)
+        self.atrasos = []  # (atraso em s, pacotes) por rajada entregue
+
+    def entregar(self, rajada, t):
+        self.recebidos += rajada.pacotes
+        segundo = int(t)
+        carga = rajada.pacotes * max(rajada.tamanho - cabecalho_bytes, 0)
+        self.bytes_por_segundo[segundo] = self.bytes_por_segundo.get(segundo, 0) + carga
+        self.atrasos.append((t - rajada.t_envio, rajada.pacotes))
+        if self.ao_chegar is not None:
+            self.ao_chegar(rajada, t)
+
+
+class _Classe:
+    """Fila de uma classe (ou banda/tin) com baldes de fichas opcionais de rate e ceil."""
+
+    def __init__(self, motor, prio=0, rate_bps=None, ceil_bps=None, limite=limite_fila_padrao):
+        self.motor = motor
+        self.prio = prio
+        self.limite = limite
+        self.fila = deque()
+        self.backlog_bytes = 0
+        self.backlog_pacotes = 0
+        self.bytes = self.pacotes = self.descartes = 0
+        self.ultimo_servico = -1.0
+        self.definir_taxas(rate_bps, ceil_bps)
+
+    def definir_taxas(self, rate_bps, ceil_bps):
+        """Novos rate/ceil (bit/s); as fichas acumuladas ficam, limitadas aos novos baldes."""
+        self.repor_se_definida()
+        self.rate = rate_bps / 8 if rate_bps else None  # Bytes/s; None: sem limite próprio
+        self.ceil = (ceil_bps or rate_bps) / 8 if rate_bps else None
+        if self.rate is not None:
+            self.fichas_rate = min(getattr(self, 'fichas_rate', 0.0), self.rate * balde_s)
+            self.fichas_ceil = min(getattr(self, 'fichas_ceil', 0.0), self.ceil * balde_s)
+        self._t = self.motor.agora
+
+    def repor_se_definida(self):
+        if getattr(self, 'rate', None) is not None:
+            self.repor()
+
+    def repor(self):
+        if self.rate is None:
+            return
+        dt = self.motor.agora - self._t
+        self._t = self.motor.agora
+        self.fichas_rate = min(self.fichas_rate + dt * self.rate, self.rate * balde_s)
+        self.fichas_ceil = min(self.fichas_ceil + dt * self.ceil, self.ceil * balde_s)
+
+    def enfileirar(self, rajada):
+        """Aceita os pacotes que cabem no limite; devolve os descartados."""
+        cabem = max(0, self.limite - self.backlog_pacotes)
+        descartados = max(0, rajada.pacotes - cabem)
+        if descartados:
+            rajada.pacotes -= descartados
+            self.descartes += descartados
+            rajada.fluxo.descartados += descartados
+        if rajada.pacotes:
+            self.fila.append(rajada)
+            self.backlog_bytes += rajada.pacotes * rajada.tamanho
+            self.backlog_pacotes += rajada.pacotes
+        return descartados
+
+    def retirar(self):
+        rajada = self.fila.popleft()
+        volume = rajada.pacotes * rajada.tamanho
+        self.backlog_bytes -= volume
+        self.backlog_pacotes -= rajada.pacotes
+        self.bytes += volume
+        self.pacotes += rajada.pacotes
+        self.cobrar(volume)
+        self.ultimo_servico = self.motor.agora
+        return rajada
+
+    def cobrar(self, volume):
+        if self.rate is not None:
+            self.fichas_rate -= volume
+            self.fichas_ceil -= volume
+
+    def espera_ceil(self):
+        """Segundos até a classe poder emprestar (fichas de ceil >= 0)."""
+        return 0.0 if self.rate is None or self.fichas_ceil >= 0 else -self.fichas_ceil / self.ceil
+
+
+class Disciplina:
+    """
+    Qdisc de saída de uma interface simulada, construída a partir dos comandos tc.
+
+    Todas as árvores das estratégias (HTB com folhas, HTB + prio, cake) reduzem-se a um
+    shaper opcional (a classe raiz HTB ou a largura de banda do cake) e a um conjunto de
+    classes folha com prioridade e, nas classes HTB, baldes de rate/ceil. A cada envio é
+    escolhida a classe de menor prio com fichas de rate; se nenhuma tiver, a de menor
+    prio que possa emprestar até ao ceil (empate: a servida há mais tempo).
+    """
+
+    def __init__(self, motor, kind='fifo', handle='0:', limite=limite_fila_padrao):
+        self.motor = motor
+        self.kind = kind
+        self.handle = handle
+        self.shaper = None  # _Classe com os baldes da classe raiz (None: só a ligação limita)
+        self.classes = {}
+        self.padrao = None
+        self.filtros = []  # (prio, ordem, condição, alvo)
+        if kind not in ('htb', 'cake'):
+            self.classes[handle] = _Classe(motor, limite=limite)
+            self.padrao = handle
+
+    def classe_de(self, rajada):
+        for _, _, condicao, alvo in self.filtros:
+            if alvo in self.classes and condicao(rajada):
+                return self.classes[alvo]
+        return self.classes.get(self.padrao) or next(iter(self.classes.values()))
+
+    def backlog(self):
+        return sum(c.backlog_bytes for c in self.classes.values())
+
+    def proxima(self):
+        """Classe a servir agora, ou (None, segundos até alguma poder ser servida)."""
+        if self.shaper is not None:
+            self.shaper.repor()
+            if self.shaper.fichas_ceil < 0:
+                return None, self.shaper.espera_ceil()
+        com_fila = [c for c in self.classes.values() if c.fila]
+        if not com_fila:
+            return None, None
+        for c in com_fila:
+            c.repor()
+        garantidas = [c for c in com_fila if c.rate is None or c.fichas_rate >= 0]
+        if garantidas:
+            return min(garantidas, key=lambda c: (c.prio, c.ultimo_servico)), None
+        emprestam = [c for c in com_fila if c.fichas_ceil >= 0]
+        if emprestam:
+            return min(emprestam, key=lambda c: (c.prio, c.ultimo_servico)), None
+        return None, min(c.espera_ceil() for c in com_fila)
+
+
+class InterfaceSimulada:
+    """Interface de um nó: fila de saída servida à taxa da ligação (params['bw'] em Mbit/s)."""
+
+    def __init__(self, no, nome, bw_mbit):
+        self.node = no
+        self.name = nome
+        self.params = {'bw': bw_mbit}
+        self.par = None  # Interface na outra ponta da ligação
+        self.bps = (bw_mbit or 1000) * 1e6
+        self.disciplina = Disciplina(no.rede.motor)
+        self.marcacoes = []  # (campo, porta, dscp) da marcação à entrada (clsact, modo 'dscp')
+        self._ocupada = False
+        self._despertar = None
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<InterfaceSimulada {self.name}>"
+
+    def marcar(self, rajada):
+        for campo, porta, dscp in self.marcacoes:
+            if getattr(rajada, campo) == porta:
+                rajada.dscp = dscp
+                return
+
+    def enviar(self, rajada):
+        self.disciplina.classe_de(rajada).enfileirar(rajada)
+        if not self._ocupada:
+            self._servir()
+
+    def _servir(self, chamada=None):
+        if chamada is not None and chamada is not self._despertar:
+            return  # Despertar substituído por outro
+        self._despertar = None
+        motor = self.node.rede.motor
+        classe, espera = self.disciplina.proxima()
+        if classe is None:
+            if espera is not None:
+                self._despertar = object()
+                motor.agendar(motor.agora + max(espera, 1e-7), self._servir, self._despertar)
+            return
+        rajada = classe.retirar()
+        if self.disciplina.shaper is not None:
+            self.disciplina.shaper.cobrar(rajada.pacotes * rajada.tamanho)
+        self._ocupada = True
+        por_pacote = rajada.tamanho * 8 / self.bps
+        motor.agendar(motor.agora + rajada.pacotes * por_pacote, self._fim_transmissao)
+        motor.agendar(motor.agora + por_pacote + atraso_salto_s, self.par.node.receber, rajada, self.par)
+
+    def _fim_transmissao(self):
+        self._ocupada = False
+        self._servir()
+
+    def substituir_disciplina(self, disciplina):
+        """Troca a qdisc raiz; os pacotes em fila na anterior perdem-se, como no kernel."""
+        for classe in self.disciplina.classes.values():
+            for rajada in classe.fila:
+                rajada.fluxo.descartados += rajada.pacotes
+        self.disciplina = disciplina
+        self._despertar = None
+        if not self._ocupada:
+            self._servir()
+
+
+class NoSimulado:
+    """
+    Host, switch ou roteador simulado, com a interface dos nós Mininet usada pelo controlador
+    e pelos geradores: name, params, cmd(), cmdPrint(), intf(), intfList() e IP().
+
+    cmd() interpreta os comandos que estes módulos enviam: tc (linha ou -batch), iperf3,
+    trafego_urllc_udp.py enviar/receber, ping e 'ip -4 route show'; os restantes não fazem nada.
+    """
+
+    def __init__(self, rede, nome, tipo, ip=None):
+        self.rede = rede
+        self.name = nome
+        self.tipo = tipo
+        self.params = {}
+        self._ip = ip
+        self._interfaces = []
+        self.rotas = {}  # Nome do nó de destino (host ou roteador) -> interface de saída
+
+    def __repr__(self):
+        return f"<NoSimulado {self.name}>"
+
+    def IP(self):
+        return self._ip
+
+    def intf(self, nome=None):
+        if nome is None:
+            return self._interfaces[0] if self._interfaces else None
+        return next((i for i in self._interfaces if i.name == str(nome)), None)
+
+    def intfList(self):
+        return list(self._interfaces)
+
+    def nova_interface(self, nome, bw_mbit):
+        iface = InterfaceSimulada(self, nome or f"{self.name}-eth{len(self._interfaces)}", bw_mbit)
+        self._interfaces.append(iface)
+        return iface
+
+    def receber(self, rajada, entrada):
+        entrada.marcar(rajada)
+        if rajada.destino is self:
+            # Chegada do último pacote da rajada
+            ultimo = (rajada.pacotes - 1) * rajada.tamanho * 8 / entrada.par.bps
+            rajada.fluxo.entregar(rajada, self.rede.motor.agora + ultimo)
+        else:
+            self.rotas[rajada.destino.name].enviar(rajada)
+
+    def cmd(self, comando, *args, **kwargs):
+        return self.rede.executar(self, comando)
+
+    def cmdPrint(self, comando):
+        saida = self.cmd(comando)
+        print(saida, end='')
+        return saida
+
+
+class RedeSimulada:
+    """
+    A topologia de topologia_parametrica (mesmas interfaces, larguras de banda e mapa do
+    controlador) como rede de eventos discretos, em tempo virtual.
+
+    Cada ligação é uma fila de saída por sentido, servida à sua largura de banda e com a
+    qdisc que o tc lá instalar; o encaminhamento segue o caminho mais curto até ao host.
+    get(), hosts, switches e routers imitam o objeto Mininet que o controlador recebe.
+    """
+
+    def __init__(self, espec=topologia_parametrica.ESPEC_PADRAO, semente=0):
+        self.topologia = topologia_parametrica.Topologia(espec)
+        self.motor = Motor()
+        self.rng = np.random.default_rng(semente)
+        self.nos = {}
+        self.fluxos = []
+        self.servidores = set()  # (host, porta) com 'iperf3 -s'
+        topo = self.topologia
+        self.routers = [self._no(nome, 'roteador') for nome in topo.roteadores]
+        self.switches = [self._no(nome, 'switch') for nome in topo.switches]
+        self.hosts = [self._no(nome, 'host', endereco.split('/')[0]) for nome, (endereco, _) in topo.hosts.items()]
+        self._por_ip = {h.IP(): h for h in self.hosts}
+        # Endereços dos roteadores: alvos das sondas por salto
+        for nome in topo.roteadores:
+            for iface in topo.interfaces[nome]:
+                self._por_ip[str(iface.endereco.ip)] = self.nos[nome]
+        for ligacao in sorted(topo.ligacoes, key=lambda l: l.no1 not in topo.hosts):
+            a = self.nos[ligacao.no1].nova_interface(ligacao.intf1, ligacao.bw)
+            b = self.nos[ligacao.no2].nova_interface(ligacao.intf2, ligacao.bw)
+            a.par, b.par = b, a
+        for no in self.hosts + self.routers:
+            self._rotas_para(no)
+
+    def _no(self, nome, tipo, ip=None):
+        self.nos[nome] = NoSimulado(self, nome, tipo, ip)
+        return self.nos[nome]
+
+    def _rotas_para(self, destino):
+        """Pesquisa em largura a partir do destino: cada nó sai pela interface que o aproxima."""
+        visitados, fila = {destino.name}, deque([destino])
+        while fila:
+            no = fila.popleft()
+            for iface in no.intfList():
+                vizinho = iface.par.node
+                if vizinho.name not in visitados:
+                    visitados.add(vizinho.name)
+                    vizinho.rotas[destino.name] = iface.par
+                    fila.append(vizinho)
+
+    def get(self, nome):
+        return self.nos[nome]
+
+    def __getitem__(self, nome):
+        return self.nos[nome]
+
+    def por_ip(self, ip):
+        return self._por_ip[ip]
+
+    def atraso_percurso(self, origem, destino, tamanho=tamanho_sonda_bytes):
+        """Atraso de um pacote de origem a destino com as filas no estado atual (backlog + pacote + salto)."""
+        atraso, no = 0.0, origem
+        while no is not destino:
+            iface = no.rotas[destino.name]
+            atraso += (iface.disciplina.backlog() + tamanho) * 8 / iface.bps + atraso_salto_s
+            no = iface.par.node
+        return atraso
+
+    # --- Fontes de tráfego ---
+
+    def enviar(self, origem, rajada):
+        origem.intf().enviar(rajada)
+
+    def fonte_taxa_constante(self, origem, destino, porta, taxa_bps, tamanho, duracao_s, agenda='periodica',
+                             nome=None, inicio_s=None):
+        """
+        Fluxo UDP à taxa taxa_bps com pacotes de tamanho bytes de carga, de origem para destino:porta.
+
+        Os pacotes de cada granularidade_s seguem numa rajada; na agenda 'poisson' o número de
+        pacotes de cada rajada segue uma distribuição de Poisson com a mesma média.
+        """
+        fluxo = Fluxo(nome or f"{origem.name}->{destino.name}:{porta}", porta)
+        self.fluxos.append(fluxo)
+        tamanho_ligacao = tamanho + cabecalho_bytes
+        intervalo_pacote = tamanho * 8 / taxa_bps
+        por_rajada = max(1, int(granularidade_s / intervalo_pacote)) if granularidade_s else 1
+        periodo = por_rajada * intervalo_pacote
+        inicio = self.motor.agora if inicio_s is None else inicio_s
+        fim = inicio + duracao_s
+        sport = 40000 + len(self.fluxos)
+
+        def emitir(t):
+            pacotes = por_rajada if agenda == 'periodica' else int(self.rng.poisson(por_rajada))
+            if pacotes:
+                fluxo.enviados += pacotes
+                self.enviar(origem, Rajada(fluxo, destino, 'udp', sport, porta, pacotes, tamanho_ligacao, t))
+            if t + periodo < fim:
+                self.motor.agendar(t + periodo, emitir, t + periodo)
+
+        self.motor.agendar(inicio + periodo, emitir, inicio + periodo)
+        return fluxo
+
+    # --- Comandos ---
+
+    def executar(self, no, comando):
+        if comando.startswith('for ip in ') and 'ping' in comando:
+            return self._sondas_salto(no, comando[len('for ip in '):].split(';')[0].split())
+        # 'cmd; echo marca$?': o código de saída do comando, como na shell (controlador_qos.executar_lote_tc)
+        comando, _, eco = comando.partition('; echo ')
+        comando = comando.split(' > ')[0].split(' 2>')[0].rstrip(' &')
+        try:
+            partes = shlex.split(comando)
+        except ValueError:
+            return ''
+        if not partes:
+            return ''
+        programa = os.path.basename(partes[0])
+        if programa == 'tc':
+            saida = self._tc(no, partes[1:])
+            return saida + (eco.replace('$?', '1' if saida else '0') + '\n' if eco else '')
+        if programa == 'iperf3':
+            return self._iperf3(no, partes[1:])
+        if programa.startswith('python') and any(p.endswith('trafego_urllc_udp.py') for p in partes):
+            indice = next(i for i, p in enumerate(partes) if p.endswith('trafego_urllc_udp.py'))
+            return self._emissor_urllc(no, partes[indice + 1:])
+        if programa == 'ping':
+            destino = self.por_ip(partes[-1]) if partes[-1] in self._por_ip else None
+            return f"PING {partes[-1]}: simulado, {'alcançável' if destino else 'sem rota'}; 0% packet loss\n"
+        if programa == 'ip' and 'route' in partes:
+            return ''.join(f"{rede} via {via} dev -\n" for rede, via in self.topologia.rotas.get(no.name, []))
+        return ''
+
+    def _iperf3(self, no, args):
+        if '--help' in args:
+            return "Usage: iperf3 [-s|-c host] [options]\n  --json-stream  output in line-delimited JSON format\n"
+        opcoes = _opcoes(args)
+        porta = int(opcoes.get('-p', 5201))
+        if '-s' in args:
+            self.servidores.add((no.name, porta))
+            return ''
+        if '-u' not in args:
+            return "iperf3: o simulador só modela UDP (-u)\n"
+        taxa = trafego_urllc_udp.taxa_em_bits(opcoes.get('-b', '1M'))
+        for n in range(int(opcoes.get('-P', 1))):
+            self.fonte_taxa_constante(no, self.por_ip(opcoes['-c']), porta, taxa,
+                                      int(opcoes.get('-l', tamanho_udp_iperf)), float(opcoes.get('-t', 10)),
+                                      nome=f"iperf3 {no.name}:{porta}#{n}")
+        return ''
+
+    def _emissor_urllc(self, no, args):
+        if not args or args[0] != 'enviar':
+            return ''
+        opcoes = _opcoes(args[2:])
+        portas = trafego_urllc_udp._portas(opcoes.get('--portas', '5202'))
+        fluxos = int(opcoes.get('--fluxos', 1))
+        tamanho = int(opcoes.get('--tamanho', 128))
+        if '--taxa' in opcoes:
+            taxa = trafego_urllc_udp.taxa_em_bits(opcoes['--taxa']) / fluxos
+        else:
+            taxa = float(opcoes.get('--taxa-pps', 1000)) * tamanho * 8
+        for n in range(fluxos):
+            self.fonte_taxa_constante(no, self.por_ip(args[1]), portas[n % len(portas)], taxa, tamanho,
+                                      float(opcoes.get('--duracao', 1e9)), opcoes.get('--agenda', 'periodica'),
+                                      nome=f"urllc {no.name}#{n}")
+        return ''
+
+    def _sondas_salto(self, no, ips):
+        """Sondas por salto do localizacao_gargalo: o RTT de cada alvo com as filas de agora."""
+        linhas = []
+        for ip in ips:
+            if ip in self._por_ip:
+                destino = self._por_ip[ip]
+                rtt_ms = 1000 * (self.atraso_percurso(no, destino) + self.atraso_percurso(destino, no))
+                linhas.append(f"{ip} rtt min/avg/max/mdev = {rtt_ms:.3f}/{rtt_ms:.3f}/{rtt_ms:.3f}/0.000 ms\n")
+        return ''.join(linhas)
+
+    def _tc(self, no, args):
+        if '-batch' in args:
+            with open(args[args.index('-batch') + 1]) as f:
+                linhas = [linha for linha in f.read().splitlines() if linha.strip()]
+        else:
+            linhas = [' '.join(a for a in args if not a.startswith('-'))]
+        erros = []
+        for linha in linhas:
+            try:
+                _aplicar_tc(no, shlex.split(linha))
+            except (ValueError, IndexError, KeyError) as e:
+                erros.append(f"Error: {e} ({linha})")
+                if '-force' not in args:
+                    break
+        return ''.join(e + '\n' for e in erros)
+
+
+def _opcoes(args):
+    """Opções '-x valor' / '--opcao valor' de uma linha de comandos (flags sem valor ficam de fora)."""
+    opcoes = {}
+    for atual, seguinte in zip(args, args[1:]):
+        if atual.startswith('-') and not seguinte.startswith('-'):
+            opcoes[atual] = seguinte
+    return opcoes
+
+
+def _valor(partes, chave, padrao=None):
+    return partes[partes.index(chave) + 1] if chave in partes else padrao
+
+
+def _classid(texto):
+    """Normaliza um handle tc: '1:' e '1:0' são a mesma coisa."""
+    major, _, minor = texto.partition(':')
+    return f"{major}:{minor}" if minor not in ('', '0') else f"{major}:"
+
+
+def _aplicar_tc(no, partes):
+    objeto, acao = partes[0], partes[1]
+    if acao not in ('add', 'del', 'change', 'replace'):
+        return  # show, monitor...
+    iface = no.intf(_valor(partes, 'dev'))
+    if iface is None:
+        raise ValueError(f'Cannot find device "{_valor(partes, "dev")}"')
+    motor = no.rede.motor
+    disciplina = iface.disciplina
+
+    if objeto == 'qdisc':
+        if acao == 'del':
+            if 'clsact' in partes:
+                iface.marcacoes = []
+            elif 'root' in partes:
+                iface.substituir_disciplina(Disciplina(motor))
+            return
+        if acao not in ('add', 'replace'):
+            return
+        if 'clsact' in partes:
+            return
+        handle = _classid(_valor(partes, 'handle', '0:'))
+        if 'root' in partes:
+            kind = partes[partes.index(handle.rstrip(':') + ':') + 1] if 'handle' in partes else partes[-1]
+            nova = Disciplina(motor, kind, handle, _limite(kind, partes))
+            if kind == 'htb':
+                nova.padrao = f"{handle.rstrip(':')}:{_valor(partes, 'default', '0')}"
+            elif kind == 'cake':
+                nova.shaper = _Classe(motor, rate_bps=taxa_tc(_valor(partes, 'bandwidth')))
+                for tin, prio in TINS_CAKE.items():
+                    nova.classes[f"{handle}{tin}"] = _Classe(motor, prio=prio)
+                nova.padrao = f"{handle}2"
+            iface.substituir_disciplina(nova)
+            return
+        pai = _classid(_valor(partes, 'parent'))
+        kind = partes[partes.index('handle') + 2] if 'handle' in partes else partes[-1]
+        if kind == 'prio':
+            # Bandas da prio: classes folha em prioridade estrita no lugar da classe pai
+            bandas = int(_valor(partes, 'bands', 3))
+            classe_pai = disciplina.classes.pop(pai, None)
+            for banda in range(1, bandas + 1):
+                disciplina.classes[f"{handle}{banda}"] = _Classe(motor, prio=(classe_pai.prio if classe_pai else 0) * 10 + banda)
+            priomap = partes[partes.index('priomap') + 1:] if 'priomap' in partes else ['1']
+            if disciplina.padrao == pai:
+                disciplina.padrao = f"{handle}{int(priomap[0]) + 1}"
+            return
+        if pai in disciplina.classes:
+            disciplina.classes[pai].limite = _limite(kind, partes)
+        return
+
+    if objeto == 'class':
+        classid = _classid(_valor(partes, 'classid'))
+        pai = _classid(_valor(partes, 'parent'))
+        rate = taxa_tc(_valor(partes, 'rate'))
+        ceil = taxa_tc(_valor(partes, 'ceil')) if 'ceil' in partes else None
+        prio = int(_valor(partes, 'prio', 0))
+        if pai == disciplina.handle:
+            # Classe raiz: o shaper da interface; também serve de folha se for o destino por omissão
+            if disciplina.shaper is None:
+                disciplina.shaper = _Classe(motor)
+            disciplina.shaper.definir_taxas(rate, ceil)
+            disciplina.classes.setdefault(classid, _Classe(motor, prio=prio))
+            return
+        disciplina.classes.pop(pai, None)  # A classe pai deixa de ser folha
+        if classid in disciplina.classes and acao in ('change', 'replace'):
+            classe = disciplina.classes[classid]
+            classe.definir_taxas(rate, ceil)
+            classe.prio = prio
+        else:
+            disciplina.classes[classid] = _Classe(motor, prio, rate, ceil)
+        return
+
+    if objeto == 'filter' and acao in ('add', 'replace'):
+        _filtro(iface, partes)
+
+
+def _limite(kind, partes):
+    limite = LIMITES_FOLHA.get(kind, limite_fila_padrao)
+    return int(_valor(partes, 'limit', limite if limite is not None else limite_fila_padrao))
+
+
+def _filtro(iface, partes):
+    """Filtro u32: condições 'match ip protocol/dport/sport/dsfield' e destino flowid ou skbedit priority."""
+    if 'divisor' in partes or 'link' in partes or _valor(partes, 'protocol') != 'ip':
+        return  # Tabelas de hash e ligações entre elas: só as folhas com destino contam
+    condicoes = []
+    for i, parte in enumerate(partes):
+        if parte != 'match' or partes[i + 1] != 'ip':
+            continue
+        campo, valor, mascara = partes[i + 2], partes[i + 3], int(partes[i + 4], 0)
+        if campo == 'protocol':
+            condicoes.append(lambda r, v=int(valor, 0): v == 1 and r.protocolo == 'icmp')
+        elif campo in ('dport', 'sport'):
+            condicoes.append(lambda r, c=campo, v=int(valor, 0): getattr(r, c) == v)
+        elif campo == 'dsfield':
+            condicoes.append(lambda r, v=int(valor, 0), m=mascara: ((r.dscp << 2) & m) == (v & m))
+    if 'ingress' in partes:
+        dscp = int(_valor(partes, 'set'), 0) >> 2
+        for i, parte in enumerate(partes):
+            if parte == 'match' and partes[i + 2] in ('dport', 'sport'):
+                iface.marcacoes.append((partes[i + 2], int(partes[i + 3], 0), dscp))
+        return
+    if 'flowid' in partes:
+        alvo = _classid(_valor(partes, 'flowid'))
+    elif 'priority' in partes:
+        alvo = _classid(_valor(partes, 'priority'))
+    else:
+        return
+    disciplina = iface.disciplina
+    disciplina.filtros.append((int(_valor(partes, 'prio', 0)), len(disciplina.filtros),
+                               lambda r, cs=condicoes: all(c(r) for c in cs), alvo))
+    disciplina.filtros.sort(key=lambda f: f[:2])
+
+
+class EscritorVirtual:
+    """A interface de telemetria.EscritorTelemetria para os módulos reais, com os registos no tempo virtual."""
+
+    def __init__(self, experiencia, origem):
+        self.experiencia = experiencia
+        self.origem = origem
+
+    def registrar(self, metrica, valor, canal=0, t_ns=None):
+        self.experiencia.registrar(self.origem, metrica, valor, canal, t_ns)
+
+
+class ExperienciaSimulada:
+    """
+    Uma experiência completa em tempo virtual: os geradores de tráfego, o monitor uRLLC e o
+    controlador de QoS sobre a RedeSimulada, com a telemetria e o resumo no project_dir.
+
+    Os geradores e a atuação são os mesmos módulos da topologia Mininet (o controlador
+    aplica as árvores com executar_lote_tc nos nós simulados). O que corre em tempo real
+    no Mininet é aqui um evento: as sondas do monitor, a janela de feedback de
+    intervalo_feedback_s, as regras de SLA do modo binário e a leitura dos contadores tc.
+    """
+
+    def __init__(self, project_dir, parametros=None, espec=topologia_parametrica.ESPEC_PADRAO, verboso=False):
+        self.project_dir = project_dir
+        self.parametros = dict(PARAMETROS_PADRAO, **(parametros or {}))
+        self.verboso = verboso
+        os.makedirs(project_dir, exist_ok=True)
+        caminho_telemetria = os.path.join(project_dir, telemetria.nome_arquivo_telemetria)
+        if os.path.exists(caminho_telemetria):
+            os.remove(caminho_telemetria)
+
+        p = self.parametros
+        self.rede = RedeSimulada(espec, p['semente'])
+        self.motor = self.rede.motor
+        # Papéis como na topologia Mininet: monitor no primeiro host uRLLC, tráfego uRLLC do segundo
+        # (do mesmo, com um só sítio), eMBB fixo do primeiro host eMBB
+        topologia = self.rede.topologia
+        self.hosts_urllc = [self.rede.get(nome) for nome in topologia.hosts_fatia(classificacao_fluxos.URLLC)]
+        self.hosts_embb = [self.rede.get(nome) for nome in topologia.hosts_fatia(classificacao_fluxos.EMBB)]
+        if not self.hosts_urllc or not self.hosts_embb:
+            raise ValueError("A especificação precisa de pelo menos um host uRLLC e um eMBB nos sítios de acesso.")
+        self.h_uRLLC1, self.h_cloud = self.hosts_urllc[0], self.rede.get(topologia.host_nuvem)
+        self._configurar_controlador(espec)
+        # Caminhos do monitor (origem, destino, canal): de cada ponto de observação a cada host da
+        # nuvem; o primeiro, do host do monitor ao host da nuvem, é o das chaves de topo do resumo
+        pontos = [self.h_uRLLC1]
+        if p['pontos_monitor'] == 'urllc':
+            pontos += self.hosts_urllc[1:]
+        destinos = [self.rede.get(nome) for nome in self.rede.topologia.nuvem['hosts']]
+        self.caminhos = gerador_monitor_uRLLC.limitar_caminhos(
+            [(origem, destino, canal) for origem in pontos for canal, destino in enumerate(destinos)])
+        self.taxa_sondas_hz = gerador_monitor_uRLLC.taxa_por_caminho(len(self.caminhos), p['taxa_sondas_hz'])
+        if p['alcance_qos'] == 'gargalo':
+            # Sondas por salto a partir do ponto cujo caminho violou o SLA (chave: a origem nos eventos)
+            self.localizador = localizacao_gargalo.LocalizadorGargalo(
+                caminhos={self._origem_caminho(c): (self.rede.topologia.saltos(c[0].name), c[0]) for c in self.caminhos})
+            controlador_qos.localizador = self.localizador
+
+        # Escritores abertos já, para que a âncora RELOGIO de cada um caia no instante virtual 0
+        self._t0_ns = time.monotonic_ns()
+        self._telemetria = caminho_telemetria
+        self._escritores = {}
+        origens = [gerador_monitor_uRLLC.origem_telemetria, 'controlador', origem_trafego,
+                   perfis_trafego_embb.origem_agendador] + [r.name for r in self.roteadores]
+        for origem in origens:
+            self._escritores[origem] = telemetria.EscritorTelemetria(caminho_telemetria, origem)
+        self.limiar_ms = p['limiar_latencia_ms']
+        self.rtts = {caminho: [] for caminho in self.caminhos}
+        self.perdas = {caminho: 0 for caminho in self.caminhos}
+        self._janela = {}  # Caminho -> RTTs da janela de feedback (None por sonda perdida)
+        self._pendentes = {}
+        self.ajustes = []
+        self._canais = {}
+
+        self.controlador = controlador_adaptativo.ControladorAIMD(self.limiar_ms)
+        self.previsor = None
+        if p['modo_previsao'] == 'ativo' and p['modo_controle'] == 'adaptativo':
+            self.previsor = previsao_latencia.PrevisorLatencia(self.limiar_ms, p['horizonte_previsao_s'])
+        regras = p['regras_alerta'] or gerador_monitor_uRLLC.regras_alerta
+        if p['modo_alerta'] == 'amostra':
+            regras = [{'estatistica': 'max', 'janela_s': 1.0 / self.taxa_sondas_hz}]
+        self.motor_sla = estatisticas_janela.MotorSlaFatia(self.caminhos,
+                                                           estatisticas_janela.regras_de_config(regras, self.limiar_ms),
+                                                           p['periodo_normalizacao_s'])
+
+    def _configurar_controlador(self, espec):
+        p = self.parametros
+        controlador_qos.modo_controle = p['modo_controle']
+        controlador_qos.modo_previsao = p['modo_previsao']
+        controlador_qos.horizonte_previsao_s = p['horizonte_previsao_s']
+        controlador_qos.host_estabilizacao = self.h_uRLLC1.name
+        controlador_qos.ip_estabilizacao = self.rede.topologia.hosts[self.h_uRLLC1.name][1]
+        controlador_qos.interfaces_map = self.rede.topologia.mapa_interfaces()
+        controlador_qos.estrategia_qdisc = p['estrategia_qdisc']
+        controlador_qos.estrategias_interface = dict(p['estrategias_interface'])
+        for minor, classe in p['classes_htb'].items():
+            controlador_qos.classes_htb[int(minor)].update(classe)
+        controlador_qos.regras_qos_ativas = False
+        controlador_qos.interfaces_qos = {}
+        controlador_qos.custos_atuacao = []
+        controlador_qos.alcance_qos = p['alcance_qos']
+        controlador_qos.localizador = self.localizador = None  # Criado com os caminhos do monitor
+        controlador_qos.escritor_telemetria = None  # Os eventos vão para a telemetria em tempo virtual
+        controlador_adaptativo.limiar_latencia_ms = p['limiar_latencia_ms']
+        self.roteadores = [r for r in self.rede.routers if r.name in controlador_qos.interfaces_map]
+
+    # --- Telemetria em tempo virtual ---
+
+    def _t_ns(self):
+        return self._t0_ns + int(self.motor.agora * 1e9)
+
+    def registrar(self, origem, metrica, valor, canal=0, t_ns=None):
+        if origem not in self._escritores:
+            self._escritores[origem] = telemetria.EscritorTelemetria(self._telemetria, origem)
+        self._escritores[origem].registrar(metrica, valor, canal=canal, t_ns=self._t_ns() if t_ns is None else t_ns)
+
+    # --- Monitor ---
+
+    def _sonda(self, caminho):
+        # Um Fluxo por sonda: identifica o caminho, o eco e o timeout
+        origem, destino, _ = caminho
+        sonda = Fluxo('sonda', 0, self._eco)
+        sonda.enviados = 1
+        self._pendentes[sonda] = (caminho, self.motor.agora)
+        self.rede.enviar(origem, Rajada(sonda, destino, 'icmp', 0, 0, 1, tamanho_sonda_bytes, self.motor.agora))
+        self.motor.agendar(self.motor.agora + timeout_sonda_s, self._timeout, sonda)
+        proxima = self.motor.agora + 1.0 / self.taxa_sondas_hz
+        if proxima < self._fim_s:
+            self.motor.agendar(proxima, self._sonda, caminho)
+
+    def _eco(self, rajada, t):
+        pendente = self._pendentes.get(rajada.fluxo)
+        if pendente is None:
+            return  # Chegou depois do timeout
+        (origem, destino, canal), enviado = pendente
+        if rajada.destino is destino:
+            # Resposta do destino pelo caminho de volta
+            self.rede.enviar(destino, Rajada(rajada.fluxo, origem, 'icmp', 0, 0, 1, tamanho_sonda_bytes, rajada.t_envio))
+            return
+        caminho = self._pendentes.pop(rajada.fluxo)[0]
+        rtt_ms = (t - enviado) * 1000
+        self.rtts[caminho].append(rtt_ms)
+        self._janela.setdefault(caminho, []).append(rtt_ms)
+        self.motor_sla.adicionar(caminho, rtt_ms, t)
+        self.registrar(self._origem_caminho(caminho), telemetria.LATENCIA_MS, rtt_ms, canal)
+
+    def _timeout(self, sonda):
+        pendente = self._pendentes.pop(sonda, None)
+        if pendente is None:
+            return
+        caminho = pendente[0]
+        self.perdas[caminho] += 1
+        self._janela.setdefault(caminho, []).append(None)
+        self.motor_sla.adicionar(caminho, None, self.motor.agora)
+        self.registrar(self._origem_caminho(caminho), telemetria.PERDA, 1, caminho[2])
+
+    def _origem_caminho(self, caminho):
+        """Origem das amostras de um caminho na telemetria: o host de onde sonda, como no monitor."""
+        return gerador_monitor_uRLLC.origem_telemetria if caminho[0] is self.h_uRLLC1 else caminho[0].name
+
+    # --- Controlador ---
+
+    def _feedback(self):
+        """Fim de uma janela do monitor: o pior RTT vai para o controlador adaptativo."""
+        agora = self.motor.agora
+        if self._janela:
+            # Pior RTT sobre todos os caminhos; um caminho sem nenhuma resposta conta como perda (None)
+            piores = {caminho: max((rtt for rtt in rtts if rtt is not None), default=None)
+                      for caminho, rtts in self._janela.items()}
+            caminho_pior = (next((c for c, rtt in piores.items() if rtt is None), None)
+                            or max(piores, key=piores.get))
+            pior = piores[caminho_pior]
+            self._janela = {}
+            estado = self.controlador.estado()
+            ajuste = self.controlador.atualizar(pior, agora)
+            if self.previsor is not None:
+                controlador_qos.alimentar_previsor(self.previsor, [{'latencia_ms': pior, 't_deteccao_mono': agora}])
+                if ajuste is None and not self.controlador.ativo:
+                    ajuste = controlador_qos.antecipar(self.controlador, self.previsor)
+                    if ajuste is not None:
+                        self.registrar('controlador', telemetria.QOS_ANTECIPADO, ajuste.latencia_ms)
+            if ajuste is not None:
+                self.motor.agendar(agora + atraso_atuacao_s, self._atuar, ajuste, self._origem_caminho(caminho_pior),
+                                   estado)
+        if agora + gerador_monitor_uRLLC.intervalo_feedback_s < self._fim_s:
+            self.motor.agendar(agora + gerador_monitor_uRLLC.intervalo_feedback_s, self._feedback)
+
+    def _avaliar_sla(self):
+        """Modo binário: as regras do monitor ligam e desligam a árvore fixa."""
+        transicoes, estado = self.motor_sla.avaliar(self.motor.agora)
+        for caminho, evento, _, valor in transicoes:
+            self.registrar(self._origem_caminho(caminho),
+                           telemetria.ALERTA_CAMINHO if evento == 'alerta' else telemetria.NORMAL_CAMINHO,
+                           valor if valor is not None else 0.0, caminho[2])
+        if estado is not None:
+            self.registrar(gerador_monitor_uRLLC.origem_telemetria,
+                           telemetria.ALERTA if estado[0] == 'alerta' else telemetria.NORMAL,
+                           estado[3] if estado[3] is not None else 0.0, estado[2] or 0)
+            self.motor.agendar(self.motor.agora + atraso_atuacao_s, self._atuar, estado[0],
+                               self._origem_caminho(estado[1]) if estado[1] is not None else None)
+        if self.motor.agora < self._fim_s:
+            self.motor.agendar(self.motor.agora + gerador_monitor_uRLLC.intervalo_avaliacao_s, self._avaliar_sla)
+
+    def _atuar(self, decisao, origem=None, estado=None):
+        """
+        Aplica um Ajuste (adaptativo) ou 'alerta'/'normal' (binário) com o código do controlador_qos.
+        origem é o ponto do monitor cujo caminho motivou a decisão, como no evento do monitor;
+        estado, o do controlador adaptativo antes do Ajuste, reposto se o tc o recusar.
+        """
+        antes = controlador_qos.regras_qos_ativas
+        custos = len(controlador_qos.custos_atuacao)
+        evento = {'tipo': 'alerta', 't_deteccao_mono': time.monotonic(), 'latencia_ms': None, 'origem': origem}
+        aplicado = True
+        saida = None if self.verboso else open(os.path.join(self.project_dir, 'controlador_simulado.log'), 'a')
+        with contextlib.redirect_stdout(saida) if saida else contextlib.nullcontext():
+            if isinstance(decisao, controlador_adaptativo.Ajuste):
+                aplicado = controlador_qos.aplicar_ajuste(self.roteadores, self.rede, decisao,
+                                                          dict(evento, latencia_ms=decisao.latencia_ms))
+                if not aplicado:
+                    self.controlador.repor(estado)
+            elif decisao == 'alerta' and not antes:
+                controlador_qos.apontar_gargalo(evento)
+                controlador_qos.regras_qos_ativas = controlador_qos.aplicar_regras_qos_bidirecional(self.roteadores, self.rede)
+            elif decisao == 'normal' and antes:
+                controlador_qos.regras_qos_ativas = controlador_qos.remover_regras_qos(self.roteadores)
+        if saida:
+            saida.close()
+        depois = controlador_qos.regras_qos_ativas
+        atuacao_ms = atraso_atuacao_s * 1000
+        # A atuação começou na decisão, atraso_atuacao_s antes
+        t_inicio_ns = self._t_ns() - int(atraso_atuacao_s * 1e9)
+        if depois and not antes:
+            self.registrar('controlador', telemetria.QOS_INICIO, 0.0, 0, t_inicio_ns)
+            self.registrar('controlador', telemetria.QOS_APLICADO, atuacao_ms)
+        elif antes and not depois:
+            self.registrar('controlador', telemetria.QOS_INICIO, 0.0, 2, t_inicio_ns)
+            self.registrar('controlador', telemetria.QOS_REMOVIDO, atuacao_ms)
+        elif antes and aplicado and isinstance(decisao, controlador_adaptativo.Ajuste):
+            self.registrar('controlador', telemetria.QOS_INICIO, 0.0, 1, t_inicio_ns)
+            self.registrar('controlador', telemetria.QOS_ALTERADO, atuacao_ms)
+        for tipo, interfaces in controlador_qos.custos_atuacao[custos:]:
+            self.registrar('controlador', telemetria.QOS_INTERFACES, interfaces, tipo)
+        if aplicado and isinstance(decisao, controlador_adaptativo.Ajuste):
+            self.registrar('controlador', telemetria.TETO_EMBB_MBIT, decisao.teto_embb_mbit)
+            self.registrar('controlador', telemetria.GARANTIA_URLLC_MBIT, decisao.garantia_urllc_mbit)
+            self.ajustes.append(decisao._replace(t=self.motor.agora))
+
+    # --- Contadores tc ---
+
+    def _canal(self, roteador, iface, tipo, handle, kind):
+        chave = (roteador.name, iface.name, tipo, handle)
+        if chave not in self._canais:
+            self._canais[chave] = (len(self._canais), kind)
+            with open(os.path.join(self.project_dir, 'tc_canais.json'), 'w') as f:
+                json.dump([dict(canal=c, roteador=r, interface=i, tipo=t, handle=h, kind=k,
+                                bw_mbit=self.rede.get(r).intf(i).params['bw'])
+                           for (r, i, t, h), (c, k) in self._canais.items()], f, indent=2)
+        return self._canais[chave][0]
+
+    def _amostrar_tc(self):
+        """
+        Como o amostrador_tc: contadores por qdisc raiz e por classe, e os observadores do
+        previsor e do localizador do gargalo.
+        """
+        for roteador in self.roteadores:
+            por_interface = {}
+            for direcao in ('forward', 'backward'):
+                for nome in controlador_qos.interfaces_map[roteador.name].get(direcao, []):
+                    iface = roteador.intf(nome)
+                    disciplina = iface.disciplina
+                    classes = disciplina.classes
+                    raiz = {'bytes': sum(c.bytes for c in classes.values()),
+                            'packets': sum(c.pacotes for c in classes.values()),
+                            'drops': sum(c.descartes for c in classes.values()),
+                            'backlog': disciplina.backlog(),
+                            'qlen': sum(c.backlog_pacotes for c in classes.values())}
+                    elementos = [('qdisc', disciplina.handle, disciplina.kind, raiz)]
+                    elementos += [('class', h, disciplina.kind, {'bytes': c.bytes, 'packets': c.pacotes,
+                                                                 'drops': c.descartes, 'backlog': c.backlog_bytes,
+                                                                 'qlen': c.backlog_pacotes})
+                                  for h, c in classes.items() if disciplina.kind != 'fifo']
+                    por_interface[nome] = elementos
+                    for tipo, handle, kind, contadores in elementos:
+                        canal = self._canal(roteador, iface, tipo, handle, kind)
+                        for chave, valor in contadores.items():
+                            self.registrar(roteador.name, _CONTADORES[chave], valor, canal)
+            if self.previsor is not None:
+                controlador_qos.observar_filas(roteador, por_interface, int(self.motor.agora * 1e9))
+            if self.localizador is not None:
+                self.localizador.observar(roteador, por_interface, int(self.motor.agora * 1e9))
+        if self.motor.agora + self.parametros['amostragem_tc_s'] < self._fim_s:
+            self.motor.agendar(self.motor.agora + self.parametros['amostragem_tc_s'], self._amostrar_tc)
+
+    # --- Execução ---
+
+    def _iniciar_trafego(self):
+        p = self.parametros
+        rede, h_cloud = self.rede, self.h_cloud
+        embb_log_dir = os.path.join(self.project_dir, "logs_embb")
+        urllc_log_dir = os.path.join(self.project_dir, "logs_urllc")
+        os.makedirs(urllc_log_dir, exist_ok=True)
+        h_cloud.cmd(f'iperf3 -s -p {controlador_qos.porta_embb} &')
+        if p['perfil_embb'] is not None:
+            hosts_embb = self.hosts_embb
+            portas = [controlador_qos.porta_embb] + controlador_qos.portas_embb_adicionais
+            plano = perfis_trafego_embb.planear(p['perfil_embb'], len(hosts_embb), portas, p['semente_embb'],
+                                                p['duracao_testes'])
+            for sessao in plano.sessoes:
+                h_cloud.cmd(f'iperf3 -s -p {sessao.porta} &')
+                rede.fonte_taxa_constante(hosts_embb[sessao.host], h_cloud, sessao.porta, sessao.mbps * 1e6,
+                                          tamanho_udp_iperf, sessao.duracao_s, nome=f"sessao {sessao.indice}",
+                                          inicio_s=sessao.inicio_s)
+            # As mudanças de fase e as sessões na linha temporal, como as regista o AgendadorEmbb
+            origem = perfis_trafego_embb.origem_agendador
+            for fase in plano.fases:
+                self.motor.agendar(fase.inicio_s, self.registrar, origem, telemetria.FASE_EMBB_INICIO,
+                                   fase.carga_mbps, fase.indice)
+                self.motor.agendar(fase.inicio_s + fase.duracao_s, self.registrar, origem, telemetria.FASE_EMBB_FIM,
+                                   fase.carga_mbps, fase.indice)
+            for sessao in plano.sessoes:
+                self.motor.agendar(sessao.inicio_s, self.registrar, origem, telemetria.SESSAO_EMBB_INICIO,
+                                   sessao.mbps, sessao.indice % 65536)
+                self.motor.agendar(sessao.inicio_s + sessao.duracao_s, self.registrar, origem,
+                                   telemetria.SESSAO_EMBB_FIM, sessao.mbps, sessao.indice % 65536)
+        else:
+            gerador_trafego_embb.iniciar_trafego_embb(self.hosts_embb[0], h_cloud.IP(), controlador_qos.porta_embb,
+                                                      p['largura_banda_embb'], p['duracao_testes'], embb_log_dir,
+                                                      EscritorVirtual(self, origem_trafego))
+        h_uRLLC2 = self.hosts_urllc[min(1, len(self.hosts_urllc) - 1)]
+        gerador_trafego_urllc.iniciar_trafego_urllc(h_uRLLC2, h_cloud.IP(), controlador_qos.porta_urllc,
+                                                    p['duracao_testes'], urllc_log_dir, p['taxa_urllc'],
+                                                    p['tamanho_pacote_urllc'], 'pacotes', p['agenda_urllc'],
+                                                    p['fluxos_urllc'], EscritorVirtual(self, origem_trafego))
+
+    def executar(self):
+        """Corre a experiência até ao fim; devolve o resumo (também gravado em nome_arquivo_resumo)."""
+        p = self.parametros
+        self._fim_s = p['duracao_testes']
+        inicio_real = time.perf_counter()
+        with contextlib.redirect_stdout(None) if not self.verboso else contextlib.nullcontext():
+            self._iniciar_trafego()
+        # Os caminhos sondam desfasados dentro do período, como no monitor
+        for i, caminho in enumerate(self.caminhos):
+            self.motor.agendar(i / (self.taxa_sondas_hz * len(self.caminhos)), self._sonda, caminho)
+        if p['modo_controle'] == 'adaptativo':
+            self.motor.agendar(gerador_monitor_uRLLC.intervalo_feedback_s, self._feedback)
+        else:
+            self.motor.agendar(gerador_monitor_uRLLC.intervalo_avaliacao_s, self._avaliar_sla)
+        if p['amostragem_tc_s']:
+            self.motor.agendar(p['amostragem_tc_s'], self._amostrar_tc)
+        self.motor.executar_ate(self._fim_s + timeout_sonda_s)
+        for escritor in self._escritores.values():
+            escritor.fechar()
+        resumo = self.resumo(time.perf_counter() - inicio_real)
+        with open(os.path.join(self.project_dir, nome_arquivo_resumo), 'w') as f:
+            json.dump(resumo, f, indent=2)
+        return resumo
+
+    def _resumo_sondas(self, caminho):
+        rtts = np.array(self.rtts[caminho])
+        perdas = self.perdas[caminho]
+        sondas = len(rtts) + perdas
+        return {
+            'sondas': sondas,
+            'rtt_p50_ms': round(float(np.percentile(rtts, 50)), 3) if len(rtts) else None,
+            'rtt_p99_ms': round(float(np.percentile(rtts, 99)), 3) if len(rtts) else None,
+            'perda_sondas_pct': round(100 * perdas / sondas, 2) if sondas else None,
+            'violacao_sla_pct': round(100 * (np.count_nonzero(rtts > self.limiar_ms) + perdas) / sondas, 2)
+            if sondas else None,
+        }
+
+    def resumo(self, duracao_real_s):
+        resumo = {
+            'duracao_simulada_s': self._fim_s,
+            'duracao_real_s': round(duracao_real_s, 2),
+            'aceleracao': round(self._fim_s / duracao_real_s, 1),
+            **self._resumo_sondas(self.caminhos[0]),
+            'caminhos': [dict(caminho=f"{origem.name} -> {destino.name}", **self._resumo_sondas((origem, destino, canal)))
+                         for origem, destino, canal in self.caminhos],
+            'ajustes': len(self.ajustes),
+            'interfaces_atuadas': sum(n for _, n in controlador_qos.custos_atuacao),
+            'qos_ativo_no_fim': controlador_qos.regras_qos_ativas,
+            'fluxos': [],
+        }
+        for fluxo in self.rede.fluxos:
+            atrasos = np.array(fluxo.atrasos) if fluxo.atrasos else np.zeros((0, 2))
+            resumo['fluxos'].append({
+                'fluxo': fluxo.nome, 'porta': fluxo.porta,
+                'enviados': fluxo.enviados, 'recebidos': fluxo.recebidos, 'descartados': fluxo.descartados,
+                'vazao_media_mbps': round(sum(fluxo.bytes_por_segundo.values()) * 8 / 1e6 / self._fim_s, 2),
+                'atraso_p99_ms': round(1000 * float(_percentil_ponderado(atrasos[:, 0], atrasos[:, 1], 99)), 3)
+                if len(atrasos) else None,
+            })
+        return resumo
+
+
+_CONTADORES = {'bytes': telemetria.TC_BYTES, 'packets': telemetria.TC_PACOTES, 'drops': telemetria.TC_DESCARTES,
+               'backlog': telemetria.TC_BACKLOG_BYTES, 'qlen': telemetria.TC_BACKLOG_PACOTES}
+
+
+def _percentil_ponderado(valores, pesos, p):
+    ordem = np.argsort(valores)
+    acumulado = np.cumsum(pesos[ordem])
+    return valores[ordem][np.searchsorted(acumulado, p / 100 * acumulado[-1])]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Experiência de controlo de QoS em simulação de eventos discretos "
+                                                 "(sem Mininet nem root)")
+    parser.add_argument('--saida', default='simulacao', help="Diretório da execução (telemetria.bin, resumo)")
+    parser.add_argument('--parametros', default='{}', help="JSON com parâmetros a sobrepor a PARAMETROS_PADRAO")
+    parser.add_argument('--espec', help="Especificação da topologia (JSON ou YAML; por omissão a original)")
+    parser.add_argument('--verboso', action='store_true', help="Mostra a saída dos geradores e do controlador")
+    args = parser.parse_args()
+
+    espec = topologia_parametrica.carregar_espec(args.espec) if args.espec else topologia_parametrica.ESPEC_PADRAO
+    resumo = ExperienciaSimulada(args.saida, json.loads(args.parametros), espec, args.verboso).executar()
+    print(f"{resumo['duracao_simulada_s']} s simulados em {resumo['duracao_real_s']} s "
+          f"({resumo['aceleracao']}x o tempo real), {resumo['ajustes']} ajustes do controlador")
+    print(f"    - RTT das sondas: p50 {resumo['rtt_p50_ms']} ms, p99 {resumo['rtt_p99_ms']} ms, "
+          f"perda {resumo['perda_sondas_pct']}%, acima do limiar {resumo['violacao_sla_pct']}%")
+    for fluxo in resumo['fluxos']:
+        print(f"    - {fluxo['fluxo']:<28} {fluxo['vazao_media_mbps']:>7.2f} Mbit/s  "
+              f"perdidos {fluxo['descartados']:>7}  atraso p99 {fluxo['atraso_p99_ms']} ms")
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import ctypes
+import os
+import socket
+import struct
+import sys
+import time
+from collections import namedtuple
+
+# --- Configurações ---
+taxa_minima_hz = 10
+taxa_maxima_hz = 1000
+porta_eco_padrao = 7          # Porta do servidor de eco UDP
+timeout_padrao_s = 1.0        # Tempo máximo de espera por uma resposta
+
+# Constantes do kernel Linux (nem todas são exportadas pelo módulo socket)
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+CLONE_NEWNET = getattr(os, 'CLONE_NEWNET', 0x40000000)
+
+_CABECALHO_ICMP = struct.Struct('!BBHHH')   # tipo, código, checksum, id, seq
+_CARGA = struct.Struct('!IQ')               # seq (32 bits), instante de envio (ns)
+_TIMESPEC = struct.Struct('@ll')
+
+# Uma amostra por sonda enviada. rtt_ms é None quando a sonda foi perdida.
+AmostraSonda = namedtuple('AmostraSonda', ['seq', 't_envio', 'rtt_ms', 'jitter_ms', 'perdido', 'taxa_perda'])
+
+
+def _checksum(dados):
+    if len(dados) % 2:
+        dados += b'\x00'
+    soma = sum(struct.unpack(f'!{len(dados) // 2}H', dados))
+    soma = (soma >> 16) + (soma & 0xffff)
+    soma += soma >> 16
+    return ~soma & 0xffff
+
+
+def _timestamp_kernel(ancdata):
+    """Extrai o instante de recepção (SO_TIMESTAMPNS) dos dados auxiliares, em ns."""
+    for nivel, tipo, dados in ancdata:
+        if nivel == socket.SOL_SOCKET and tipo == SO_TIMESTAMPNS and len(dados) >= _TIMESPEC.size:
+            seg, nseg = _TIMESPEC.unpack(dados[:_TIMESPEC.size])
+            return seg * 1_000_000_000 + nseg
+    return None
+
+
+def namespace_rede(pid):
+    """Ficheiro do namespace de rede de um processo (ex.: o shell de um host Mininet, host.pid)."""
+    return f"/proc/{pid}/ns/net"
+
+
+def _setns(fd):
+    if hasattr(os, 'setns'):  # Python >= 3.12
+        os.setns(fd, CLONE_NEWNET)
+        return
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.setns(fd, CLONE_NEWNET) != 0:
+        erro = ctypes.get_errno()
+        raise OSError(erro, os.strerror(erro))
+
+
+@contextlib.contextmanager
+def no_namespace(caminho):
+    """
+    Executa o bloco no namespace de rede do ficheiro caminho (None: o atual) e volta ao original.
+
+    Um socket fica no namespace onde foi criado, pelo que um só processo pode sondar a partir
+    de vários hosts: cada socket é aberto dentro do bloco e usado fora dele. Só muda a thread
+    atual e requer CAP_SYS_ADMIN (root).
+    """
+    if caminho is None:
+        yield
+        return
+    original = os.open('/proc/thread-self/ns/net', os.O_RDONLY)
+    try:
+        alvo = os.open(caminho, os.O_RDONLY)
+        try:
+            _setns(alvo)
+        finally:
+            os.close(alvo)
+        try:
+            yield
+        finally:
+            _setns(original)
+    finally:
+        os.close(original)
+
+
+class SondaLatencia:
+    """
+    Sonda de latência em processo, baseada em asyncio.
+
+    Envia sondas a uma taxa fixa (entre 10 e 1000 Hz) usando um socket ICMP datagram
+    ("ping sem fork") ou um socket UDP para um servidor de eco. O instante de recepção
+    vem do kernel (SO_TIMESTAMPNS), o que elimina o jitter de agendamento do processo.
+
+    Args:
+        ip_destino (str): O endereço IP a sondar.
+        taxa_hz (float): Sondas por segundo.
+        modo (str): 'icmp' ou 'udp'.
+        porta_eco (int): Porta do servidor de eco (apenas no modo 'udp').
+        timeout_s (float): Tempo após o qual uma sonda sem resposta é considerada perdida.
+        ao_amostrar (callable): Função chamada com cada AmostraSonda.
+        namespace (str): Namespace de rede de onde sondar (ver namespace_rede); None: o do processo.
+    """
+
+    def __init__(self, ip_destino, taxa_hz=100, modo='icmp', porta_eco=porta_eco_padrao,
+                 timeout_s=timeout_padrao_s, ao_amostrar=None, namespace=None):
+        if not taxa_minima_hz <= taxa_hz <= taxa_maxima_hz:
+            raise ValueError(f"Taxa de amostragem deve estar entre {taxa_minima_hz} e {taxa_maxima_hz} Hz (recebido: {taxa_hz})")
+        if modo not in ('icmp', 'udp'):
+            raise ValueError(f"Modo de sonda desconhecido: {modo}")
+
+        self.ip_destino = ip_destino
+        self.taxa_hz = taxa_hz
+        self.modo = modo
+        self.porta_eco = porta_eco
+        self.timeout_s = timeout_s
+        self.ao_amostrar = ao_amostrar
+        self.namespace = namespace
+
+        self._sock = None
+        self._seq = 0
+        self._pendentes = {}   # seq -> instante de envio (ns), em ordem de envio
+        self._ultimo_rtt = None
+        self._jitter_ms = 0.0
+        self._enviados = 0
+        self._perdidos = 0
+        self._parar = False
+
+    def abrir(self):
+        """Abre o socket da sonda. Levanta OSError se o sistema não o permitir."""
+        with no_namespace(self.namespace):
+            if self.modo == 'icmp':
+                # Requer que o gid do processo esteja em net.ipv4.ping_group_range (ou root).
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        sock.setblocking(False)
+        self._sock = sock
+
+    def parar(self):
+        self._parar = True
+
+    def fechar(self):
+        """Fecha o socket de uma sonda aberta que não chegou a executar (executar() fecha o seu)."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _montar_pacote(self, seq, t_envio):
+        carga = _CARGA.pack(seq, t_envio)
+        if self.modo == 'udp':
+            return carga
+        # O kernel substitui o identificador pelo "porto" do socket ICMP datagram.
+        cabecalho = _CABECALHO_ICMP.pack(ICMP_ECHO_REQUEST, 0, 0, 0, seq & 0xffff)
+        checksum = _checksum(cabecalho + carga)
+        cabecalho = _CABECALHO_ICMP.pack(ICMP_ECHO_REQUEST, 0, checksum, 0, seq & 0xffff)
+        return cabecalho + carga
+
+    def _enviar(self):
+        seq = self._seq
+        self._seq = (self._seq + 1) & 0xffffffff
+        t_envio = time.time_ns()
+        destino = (self.ip_destino, self.porta_eco if self.modo == 'udp' else 0)
+        self._enviados += 1
+        try:
+            self._sock.sendto(self._montar_pacote(seq, t_envio), destino)
+        except OSError:
+            # Rede inalcançável, buffer cheio, etc.: conta como perda imediata.
+            self._registrar_perda(seq, t_envio)
+            return
+        self._pendentes[seq] = t_envio
+
+    def _ao_receber(self):
+        while True:
+            try:
+                dados, ancdata, _, _ = self._sock.recvmsg(2048, socket.CMSG_SPACE(_TIMESPEC.size))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Erros ICMP assíncronos (ex.: porta inalcançável no modo UDP).
+                continue
+            t_recepcao = _timestamp_kernel(ancdata) or time.time_ns()
+
+            if self.modo == 'icmp':
+                if len(dados) < _CABECALHO_ICMP.size + _CARGA.size or dados[0] != ICMP_ECHO_REPLY:
+                    continue
+                dados = dados[_CABECALHO_ICMP.size:]
+            if len(dados) < _CARGA.size:
+                continue
+            seq, _ = _CARGA.unpack(dados[:_CARGA.size])
+
+            t_envio = self._pendentes.pop(seq, None)
+            if t_envio is None:
+                continue  # Resposta duplicada ou que chegou após o timeout
+            self._registrar_resposta(seq, t_envio, (t_recepcao - t_envio) / 1e6)
+
+    def _registrar_resposta(self, seq, t_envio, rtt_ms):
+        if self._ultimo_rtt is not None:
+            self._jitter_ms += (abs(rtt_ms - self._ultimo_rtt) - self._jitter_ms) / 16
+        self._ultimo_rtt = rtt_ms
+        self._emitir(AmostraSonda(seq, t_envio / 1e9, rtt_ms, self._jitter_ms, False, self._perdidos / self._enviados))
+
+    def _registrar_perda(self, seq, t_envio):
+        self._perdidos += 1
+        self._emitir(AmostraSonda(seq, t_envio / 1e9, None, self._jitter_ms, True, self._perdidos / self._enviados))
+
+    def _expirar_pendentes(self, todos=False):
+        limite = time.time_ns() - int(self.timeout_s * 1e9)
+        # O dicionário preserva a ordem de envio: basta olhar o início.
+        while self._pendentes:
+            seq, t_envio = next(iter(self._pendentes.items()))
+            if not todos and t_envio > limite:
+                break
+            del self._pendentes[seq]
+            self._registrar_perda(seq, t_envio)
+
+    def _emitir(self, amostra):
+        if self.ao_amostrar:
+            self.ao_amostrar(amostra)
+
+    async def executar(self, duracao_s=None):
+        """Envia sondas até parar() ser chamado ou até duracao_s segundos."""
+        loop = asyncio.get_running_loop()
+        if self._sock is None:
+            self.abrir()
+        loop.add_reader(self._sock.fileno(), self._ao_receber)
+
+        periodo = 1.0 / self.taxa_hz
+        inicio = loop.time()
+        proximo = inicio
+        try:
+            while not self._parar and (duracao_s is None or proximo - inicio < duracao_s):
+                self._enviar()
+                self._expirar_pendentes()
+                proximo += periodo
+                atraso = proximo - loop.time()
+                if atraso > 0:
+                    await asyncio.sleep(atraso)
+                else:
+                    # Atrasados: não acumula uma rajada de envios para "recuperar".
+                    proximo = loop.time()
+                    await asyncio.sleep(0)
+            # Aguarda as últimas respostas antes de encerrar.
+            await asyncio.sleep(self.timeout_s)
+            self._expirar_pendentes(todos=True)
+        finally:
+            loop.remove_reader(self._sock.fileno())
+            self.fechar()
+
+
+class _ProtocoloEco(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, dados, endereco):
+        self.transport.sendto(dados, endereco)
+
+
+async def servidor_eco_udp(porta=porta_eco_padrao, endereco='0.0.0.0'):
+    """Servidor de eco UDP para o modo 'udp' da sonda. Executa até ser cancelado."""
+    loop = asyncio.get_running_loop()
+    transporte, _ = await loop.create_datagram_endpoint(_ProtocoloEco, local_addr=(endereco, porta))
+    print(f"[Eco UDP] Servidor de eco escutando em {endereco}:{porta}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transporte.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--eco':
+        try:
+            asyncio.run(servidor_eco_udp(int(sys.argv[2])))
+        except KeyboardInterrupt:
+            pass
+    elif len(sys.argv) >= 2:
+        _ip = sys.argv[1]
+        _taxa = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+        _modo = sys.argv[3] if len(sys.argv) > 3 else 'icmp'
+
+        def _imprimir(amostra):
+            if amostra.perdido:
+                print(f"seq={amostra.seq} perdido (perda: {amostra.taxa_perda * 100:.1f}%)")
+            else:
+                print(f"seq={amostra.seq} rtt={amostra.rtt_ms:.3f} ms jitter={amostra.jitter_ms:.3f} ms")
+
+        try:
+            asyncio.run(SondaLatencia(_ip, _taxa, _modo, ao_amostrar=_imprimir).executar())
+        except KeyboardInterrupt:
+            pass
+    else:
+        print("Uso: python3 sonda_latencia.py <IP_DESTINO> [TAXA_HZ] [icmp|udp]")
+        print("     python3 sonda_latencia.py --eco <PORTA>")
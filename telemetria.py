@@ -0,0 +1,244 @@
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+# --- Configurações ---
+nome_arquivo_telemetria = "telemetria.bin"  # Partilhado por monitor, controlador e gráfico
+intervalo_descarga_s = 0.5                  # Amostras ficam em memória no máximo este tempo
+
+# Registo de tamanho fixo (40 bytes, little-endian), sem cabeçalho no ficheiro:
+#   t_ns     int64    instante CLOCK_MONOTONIC em ns (o mesmo relógio em todos os hosts Mininet)
+#   origem   16 bytes host/componente que escreveu (ex.: 'h_uRLLC1', 'controlador')
+#   metrica  uint16   código da métrica ou evento (ver abaixo)
+#   canal    uint16   sub-identificador opcional (classe tc, fluxo, percurso...)
+#   valor    float64
+FORMATO_REGISTRO = struct.Struct('<q16sHH4xd')
+dtype_registro = np.dtype({
+    'names': ['t_ns', 'origem', 'metrica', 'canal', 'valor'],
+    'formats': ['<i8', 'S16', '<u2', '<u2', '<f8'],
+    'offsets': [0, 8, 24, 26, 32],
+    'itemsize': FORMATO_REGISTRO.size,
+})
+
+# Amostras
+LATENCIA_MS = 1
+JITTER_MS = 2
+PERDA = 3              # 1.0 por sonda perdida; -1.0 quando um pacote uRLLC dado como perdido chega atrasado
+ATRASO_MS = 4          # Atraso unidirecional de um pacote uRLLC (trafego_urllc_udp; canal: fluxo)
+REORDENADO = 5         # Pacote fora de ordem; valor: distância à maior seq já recebida
+LAT_P50_MS = 6         # Percentis e perda da janela do último intervalo de relatório do monitor
+LAT_P95_MS = 7
+LAT_P99_MS = 8
+PERDA_PCT = 9
+# Contadores tc por qdisc/classe (amostrador_tc; canal: ver tc_canais.json, origem: roteador)
+TC_BYTES = 10          # Acumulado
+TC_PACOTES = 11        # Acumulado
+TC_DESCARTES = 12      # Acumulado
+TC_OVERLIMITS = 13     # Acumulado
+TC_BACKLOG_BYTES = 14  # Instantâneo
+TC_BACKLOG_PACOTES = 15  # Instantâneo
+# Eventos (códigos >= 100 são descarregados de imediato)
+ALERTA = 100           # valor: latência que disparou o alerta (ms); canal: regra (monitor em modo 'janela')
+NORMAL = 101           # valor: latência no fim do período de calma (ms)
+ALERTA_CAMINHO = 102   # Alerta de um só caminho do monitor (origem: host de onde sonda; canal: índice do destino)
+NORMAL_CAMINHO = 103   # Fim do alerta desse caminho; ALERTA e NORMAL são os da fatia (pior caminho)
+QOS_APLICADO = 110     # valor: duração da aplicação (ms)
+QOS_REMOVIDO = 111     # valor: duração da remoção (ms)
+REACAO_MS = 112        # valor: tempo deteção -> atuação (ms)
+TETO_EMBB_MBIT = 113   # valor: novo ceil da classe eMBB (controlo adaptativo)
+GARANTIA_URLLC_MBIT = 114  # valor: novo rate da classe uRLLC (controlo adaptativo)
+QOS_ANTECIPADO = 115   # valor: latência prevista no horizonte (ms) que levou a aplicar a árvore (previsao_latencia)
+QOS_INTERFACES = 116   # valor: interfaces em que a atuação correu (custo); canal: 0 aplicar, 1 alterar, 2 remover
+QOS_INICIO = 117       # Início de uma atuação tc (o fim é QOS_APLICADO, QOS_ALTERADO ou QOS_REMOVIDO); canal: idem
+QOS_ALTERADO = 118     # valor: duração da alteração no lugar das classes (ms)
+DEGRAU_INICIO = 120    # valor: carga eMBB injetada (Mbit/s); canal: índice do degrau (benchmark)
+DEGRAU_FIM = 121       # valor: carga eMBB retirada (Mbit/s); canal: índice do degrau
+FASE_EMBB_INICIO = 122  # valor: carga eMBB média planeada (Mbit/s); canal: índice da fase (perfis_trafego_embb)
+FASE_EMBB_FIM = 123    # valor: idem; canal: índice da fase
+SESSAO_EMBB_INICIO = 124  # valor: taxa da sessão iperf3 (Mbit/s); canal: índice da sessão
+SESSAO_EMBB_FIM = 125  # valor: idem; canal: índice da sessão
+TRAFEGO_INICIO = 126   # valor: taxa pedida ao gerador (Mbit/s); canal: fatia (CANAL_URLLC, CANAL_EMBB)
+RELOGIO = 200          # valor: time.time() no instante t_ns (âncora para tempo de parede)
+
+NOMES_METRICAS = {
+    LATENCIA_MS: 'latencia_ms',
+    JITTER_MS: 'jitter_ms',
+    PERDA: 'perda',
+    ATRASO_MS: 'atraso_ms',
+    REORDENADO: 'reordenado',
+    LAT_P50_MS: 'lat_p50_ms',
+    LAT_P95_MS: 'lat_p95_ms',
+    LAT_P99_MS: 'lat_p99_ms',
+    PERDA_PCT: 'perda_pct',
+    TC_BYTES: 'tc_bytes',
+    TC_PACOTES: 'tc_pacotes',
+    TC_DESCARTES: 'tc_descartes',
+    TC_OVERLIMITS: 'tc_overlimits',
+    TC_BACKLOG_BYTES: 'tc_backlog_bytes',
+    TC_BACKLOG_PACOTES: 'tc_backlog_pacotes',
+    ALERTA: 'alerta',
+    NORMAL: 'normal',
+    ALERTA_CAMINHO: 'alerta_caminho',
+    NORMAL_CAMINHO: 'normal_caminho',
+    QOS_APLICADO: 'qos_aplicado',
+    QOS_REMOVIDO: 'qos_removido',
+    REACAO_MS: 'reacao_ms',
+    TETO_EMBB_MBIT: 'teto_embb_mbit',
+    GARANTIA_URLLC_MBIT: 'garantia_urllc_mbit',
+    QOS_ANTECIPADO: 'qos_antecipado',
+    QOS_INTERFACES: 'qos_interfaces',
+    QOS_INICIO: 'qos_inicio',
+    QOS_ALTERADO: 'qos_alterado',
+    DEGRAU_INICIO: 'degrau_inicio',
+    DEGRAU_FIM: 'degrau_fim',
+    FASE_EMBB_INICIO: 'fase_embb_inicio',
+    FASE_EMBB_FIM: 'fase_embb_fim',
+    SESSAO_EMBB_INICIO: 'sessao_embb_inicio',
+    SESSAO_EMBB_FIM: 'sessao_embb_fim',
+    TRAFEGO_INICIO: 'trafego_inicio',
+    RELOGIO: 'relogio',
+}
+
+PRIMEIRO_EVENTO = 100
+CANAL_URLLC, CANAL_EMBB = 0, 1
+
+
+class EscritorTelemetria:
+    """
+    Acrescenta registos ao ficheiro de telemetria.
+
+    O ficheiro é aberto com O_APPEND: cada write() é atómico, pelo que vários
+    processos podem escrever no mesmo ficheiro. As amostras são agrupadas em memória
+    e descarregadas a cada intervalo_descarga_s; os eventos são escritos de imediato.
+    """
+
+    def __init__(self, caminho, origem):
+        self.caminho = caminho
+        self.origem = origem.encode()[:16]
+        self._fd = os.open(caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        self._pendente = bytearray()
+        self._ultima_descarga = time.monotonic()
+        # Âncora para converter o relógio monotónico em tempo de parede
+        self.registrar(RELOGIO, time.time())
+
+    def registrar(self, metrica, valor, canal=0, t_ns=None):
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        self._pendente += FORMATO_REGISTRO.pack(t_ns, self.origem, metrica, canal, valor)
+        if metrica >= PRIMEIRO_EVENTO or time.monotonic() - self._ultima_descarga >= intervalo_descarga_s:
+            self.descarregar()
+
+    def descarregar(self):
+        if self._pendente:
+            os.write(self._fd, self._pendente)
+            self._pendente.clear()
+        self._ultima_descarga = time.monotonic()
+
+    def fechar(self):
+        self.descarregar()
+        os.close(self._fd)
+
+
+def mapear(caminho):
+    """Mapeia em memória todos os registos completos do ficheiro (sem cópia)."""
+    n = os.path.getsize(caminho) // FORMATO_REGISTRO.size
+    if n == 0:
+        return np.empty(0, dtype=dtype_registro)
+    return np.memmap(caminho, dtype=dtype_registro, mode='r', shape=(n,))
+
+
+class LeitorTelemetria:
+    """Leitor incremental: cada chamada a ler_novos() devolve só os registos acrescentados."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lidos = 0
+
+    def ler_novos(self):
+        """Levanta FileNotFoundError se o ficheiro ainda não existir."""
+        registros = mapear(self.caminho)
+        if len(registros) < self._lidos:
+            self._lidos = 0  # Ficheiro truncado/recriado
+        novos = np.array(registros[self._lidos:])
+        self._lidos = len(registros)
+        return novos
+
+
+class AgregadorMaximo:
+    """
+    Reduz amostras ao máximo por intervalo fixo (ex.: o pior RTT de cada segundo).
+
+    Só devolve intervalos completos; o intervalo em curso fica pendente até chegar
+    uma amostra do seguinte.
+    """
+
+    def __init__(self, intervalo_s=1.0):
+        self.intervalo_ns = int(intervalo_s * 1e9)
+        self.t0_ns = None
+        self._pendente_t = np.empty(0, dtype=np.int64)
+        self._pendente_v = np.empty(0)
+
+    def adicionar(self, t_ns, valores):
+        """Devolve (início de cada intervalo completo em ns, máximo do intervalo)."""
+        t = np.concatenate([self._pendente_t, t_ns])
+        v = np.concatenate([self._pendente_v, valores])
+        if len(t) == 0:
+            return t, v
+        if self.t0_ns is None:
+            self.t0_ns = int(t[0])
+        intervalos = (t - self.t0_ns) // self.intervalo_ns
+        completos = intervalos < intervalos[-1]
+        self._pendente_t, self._pendente_v = t[~completos], v[~completos]
+
+        intervalos, v = intervalos[completos], v[completos]
+        if len(intervalos) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        inicios = np.flatnonzero(np.r_[True, intervalos[1:] != intervalos[:-1]])
+        return self.t0_ns + intervalos[inicios] * self.intervalo_ns, np.maximum.reduceat(v, inicios)
+
+
+def ancora_relogio(registros):
+    """Devolve (t_ns, tempo de parede) da primeira âncora, ou None."""
+    ancoras = registros[registros['metrica'] == RELOGIO]
+    if len(ancoras) == 0:
+        return None
+    return int(ancoras['t_ns'][0]), float(ancoras['valor'][0])
+
+
+def para_dataframe(registros):
+    """Converte registos num pandas.DataFrame com nomes legíveis e tempo de parede."""
+    import pandas as pd
+
+    df = pd.DataFrame({
+        't_ns': registros['t_ns'],
+        'origem': [o.decode(errors='replace') for o in registros['origem']],
+        'metrica': [NOMES_METRICAS.get(int(m), str(m)) for m in registros['metrica']],
+        'canal': registros['canal'],
+        'valor': registros['valor'],
+    })
+    ancora = ancora_relogio(registros)
+    if ancora is not None:
+        t_ns0, parede0 = ancora
+        df['tempo'] = pd.to_datetime(parede0 + (df['t_ns'] - t_ns0) / 1e9, unit='s')
+    return df
+
+
+def converter(caminho_entrada, caminho_saida):
+    """Converte um ficheiro de telemetria para CSV ou Parquet (pela extensão da saída)."""
+    df = para_dataframe(mapear(caminho_entrada))
+    if caminho_saida.endswith('.parquet'):
+        df.to_parquet(caminho_saida, index=False)  # Requer pyarrow ou fastparquet
+    else:
+        df.to_csv(caminho_saida, index=False)
+    return len(df)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        n = converter(sys.argv[1], sys.argv[2])
+        print(f"{n} registos convertidos para {sys.argv[2]}")
+    else:
+        print("Uso: python3 telemetria.py <ENTRADA.bin> <SAIDA.csv|SAIDA.parquet>")
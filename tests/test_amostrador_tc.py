@@ -0,0 +1,34 @@
+import json
+
+from amostrador_tc import interpretar_lote
+
+_QDISC = [{'kind': 'htb', 'handle': '1:', 'root': True, 'bytes': 1000, 'packets': 10, 'drops': 1,
+           'overlimits': 2, 'backlog': 300, 'qlen': 3}]
+_CLASSES = [{'class': 'htb', 'handle': '1:10', 'stats': {'bytes': 400, 'packets': 4, 'drops': 0,
+                                                         'overlimits': 0, 'backlog': 0, 'qlen': 0}}]
+_TEXTO = """class htb 1:10 parent 1:1 prio 0 rate 10Mbit ceil 20Mbit burst 1600b cburst 1600b
+ Sent 1234 bytes 10 pkt (dropped 1, overlimits 2 requeues 0)
+ backlog 1.5Kb 3p requeues 0
+class htb 1:20 parent 1:1 prio 1 rate 5Mbit ceil 20Mbit burst 1600b cburst 1600b
+ Sent 99 bytes 1 pkt (dropped 0, overlimits 0 requeues 0)
+ backlog 0b 0p requeues 0
+"""
+
+
+def test_interpretar_lote_json():
+    saida = json.dumps(_QDISC) + '\n' + json.dumps(_CLASSES) + '\n' + json.dumps([{'kind': 'fq_codel', 'handle': '0:'}])
+    resultado = interpretar_lote(saida, ['eth0', 'eth1'])
+    assert resultado['eth0'][0] == ('qdisc', '1:', 'htb', {'bytes': 1000, 'packets': 10, 'drops': 1,
+                                                           'overlimits': 2, 'backlog': 300, 'qlen': 3})
+    assert resultado['eth0'][1][:3] == ('class', '1:10', 'htb')
+    assert resultado['eth0'][1][3]['bytes'] == 400
+    assert resultado['eth1'] == [('qdisc', '0:', 'fq_codel', {})]
+
+
+def test_interpretar_lote_classes_em_texto():
+    saida = json.dumps(_QDISC) + '\n' + _TEXTO + json.dumps(_QDISC) + '\n[]\n'
+    resultado = interpretar_lote(saida, ['eth0', 'eth1'])
+    classes = [e for e in resultado['eth0'] if e[0] == 'class']
+    assert [c[1] for c in classes] == ['1:10', '1:20']
+    assert classes[0][3] == {'bytes': 1234, 'packets': 10, 'drops': 1, 'overlimits': 2, 'backlog': 1536, 'qlen': 3}
+    assert [e[0] for e in resultado['eth1']] == ['qdisc']
@@ -0,0 +1,51 @@
+import pytest
+
+import classificacao_fluxos
+from classificacao_fluxos import comandos_filtros, comandos_marcacao
+
+_DESTINOS = {'urllc': '1:10', 'embb': '1:20'}
+
+
+def _portas_classificadas(cmds):
+    return sorted((int(c.split(' dport ')[1].split()[0]), c.split('flowid ')[1])
+                  for c in cmds if ' dport ' in c)
+
+
+def test_linear_um_filtro_por_porta():
+    cmds = comandos_filtros('r1-eth0', '1:', 'dport', {'urllc': [5202], 'embb': [5201, 5210]}, _DESTINOS,
+                            modo='linear')
+    assert cmds[0] == 'filter add dev r1-eth0 parent 1: protocol ip prio 1 u32 match ip protocol 1 0xff flowid 1:10'
+    assert 'protocol arp prio 3' in cmds[1]
+    assert _portas_classificadas(cmds) == [(5201, '1:20'), (5202, '1:10'), (5210, '1:20')]
+    assert 'match ip dport 5202 0xffff flowid 1:10' in next(c for c in cmds if '5202' in c)
+    assert ' prio 1 ' in next(c for c in cmds if '5202' in c)
+
+
+def test_hash_tabelas_em_dois_niveis():
+    portas = list(range(5000, 5600))
+    cmds = comandos_filtros('r1-eth0', '1:', 'sport', {'embb': portas}, {'embb': '1:20'}, modo='hash')
+    assert not any('protocol 1 0xff' in c for c in cmds)  # Sem destino uRLLC: ICMP fica na classe por omissão
+    tabelas = [c for c in cmds if 'divisor 256' in c]
+    assert len(tabelas) == 1 + len({p >> 8 for p in portas})
+    assert len([c for c in cmds if ' sport ' in c]) == len(portas)
+    assert cmds[-1].endswith(f'hashkey mask 0xff000000 at 20 link {classificacao_fluxos.primeira_tabela:x}:')
+    assert 'ht 12:0: match ip sport 5120 0xffff flowid 1:20' in next(c for c in cmds if 'sport 5120 ' in c)
+
+
+def test_dscp_e_marcacao():
+    cmds = comandos_filtros('r3-eth0', '1:', 'dport', {'urllc': [5202], 'embb': [5201]}, _DESTINOS, modo='dscp')
+    assert any('dsfield 0xb8 0xfc flowid 1:10' in c for c in cmds)
+    assert any('dsfield 0x88 0xfc flowid 1:20' in c for c in cmds)
+    marcacao = comandos_marcacao('r1-eth0', 'dport', {'urllc': [5202], 'embb': [5201]})
+    assert marcacao[:2] == ['qdisc del dev r1-eth0 clsact', 'qdisc add dev r1-eth0 clsact']
+    assert all(c.startswith('filter add dev r1-eth0 ingress') for c in marcacao[2:])
+    assert any('set 0xb8 retain 0xfc' in c for c in marcacao)
+
+
+def test_skbedit_e_erros():
+    cmds = comandos_filtros('r1-eth0', '1:', 'dport', {'urllc': [5202]}, {'urllc': 1}, acao='skbedit', modo='linear')
+    assert all(c.endswith('action skbedit priority 1') for c in cmds)
+    with pytest.raises(ValueError):
+        comandos_filtros('r1-eth0', '1:', 'dport', {'urllc': [5202], 'embb': [5202]}, _DESTINOS, modo='linear')
+    with pytest.raises(ValueError):
+        comandos_filtros('r1-eth0', '1:', 'dport', {}, _DESTINOS, modo='outro')
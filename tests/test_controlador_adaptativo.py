@@ -0,0 +1,98 @@
+import pytest
+
+import controlador_adaptativo as ca
+from controlador_adaptativo import ControladorAIMD
+
+
+def test_violacao_reduz_e_respeita_o_intervalo():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    ajuste = controlador.atualizar(8.0, agora=0.0)
+    assert ajuste.motivo == 'reduzir' and controlador.ativo
+    assert ajuste.teto_embb_mbit == pytest.approx(ca.teto_embb_max_mbit * ca.fator_reducao)
+    assert ajuste.garantia_urllc_mbit == pytest.approx(ca.garantia_urllc_base_mbit * ca.fator_garantia)
+    assert controlador.atualizar(8.0, agora=ca.intervalo_reducao_s / 2) is None
+    assert controlador.atualizar(None, agora=ca.intervalo_reducao_s).motivo == 'reduzir'  # Perda conta como violação
+
+
+def test_reducoes_param_nos_limites():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    t, ajustes = 0.0, []
+    while (ajuste := controlador.atualizar(9.0, agora=t)) is not None:
+        ajustes.append(ajuste)
+        t += ca.intervalo_reducao_s
+    assert ajustes[-1].teto_embb_mbit == ca.teto_embb_min_mbit
+    assert ajustes[-1].garantia_urllc_mbit == ca.garantia_urllc_max_mbit
+
+
+def test_banda_de_histerese_nao_muda_nada():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    assert controlador.atualizar(1.0, agora=0.0) is None  # Inativo e calmo
+    controlador.atualizar(8.0, agora=0.0)
+    for t in range(1, 10):
+        assert controlador.atualizar(4.0, agora=float(t)) is None
+    with pytest.raises(ValueError):
+        ControladorAIMD(limiar_ms=5.0, alvo_ms=5.0)
+
+
+def test_aumento_aditivo_e_liberacao():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    controlador.atualizar(8.0, agora=0.0)
+    teto, garantia = controlador.teto_embb_mbit, controlador.garantia_urllc_mbit
+
+    ajuste = controlador.atualizar(1.0, agora=ca.intervalo_aumento_s)
+    assert ajuste.motivo == 'aumentar'
+    assert ajuste.teto_embb_mbit == pytest.approx(teto + ca.passo_aumento_mbit)
+    assert ajuste.garantia_urllc_mbit == pytest.approx(garantia - ca.passo_garantia_mbit)
+
+    t = ca.intervalo_aumento_s
+    while controlador.teto_embb_mbit < ca.teto_embb_max_mbit or \
+            controlador.garantia_urllc_mbit > ca.garantia_urllc_base_mbit:
+        t += ca.intervalo_aumento_s
+        assert controlador.atualizar(1.0, agora=t).motivo == 'aumentar'
+    # No máximo: só liberta depois de periodo_liberacao_s de calma contínua
+    assert controlador.atualizar(1.0, agora=t + 1.0) is None
+    assert controlador.atualizar(1.0, agora=t + ca.periodo_liberacao_s + 1.0).motivo == 'liberar'
+    assert not controlador.ativo
+
+
+def test_antecipar_so_com_a_arvore_desligada():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    ajuste = controlador.antecipar(6.0, agora=0.0)
+    assert ajuste.motivo == 'antecipar' and ajuste.latencia_ms == 6.0
+    assert controlador.ativo
+    assert controlador.antecipar(6.0, agora=1.0) is None
+
+
+def test_repor_volta_ao_estado_anterior_ao_ajuste():
+    controlador = ControladorAIMD(limiar_ms=5.0, alvo_ms=3.0)
+    estado = controlador.estado()
+    controlador.atualizar(8.0, agora=0.0)
+    controlador.repor(estado)
+    assert controlador.estado() == (False, ca.teto_embb_max_mbit, ca.garantia_urllc_base_mbit)
+    assert controlador.atualizar(8.0, agora=ca.intervalo_reducao_s).motivo == 'reduzir'
+
+
+def test_ajuste_recusado_pelo_tc_nao_e_registado(tmp_path, monkeypatch):
+    import numpy as np
+
+    import simulador_rede
+    import telemetria
+
+    aplicar_tc = simulador_rede._aplicar_tc
+
+    def recusar_alteracoes(no, partes):
+        if partes[:2] == ['class', 'change']:
+            raise ValueError('RTNETLINK answers: Invalid argument')
+        aplicar_tc(no, partes)
+
+    monkeypatch.setattr(simulador_rede, '_aplicar_tc', recusar_alteracoes)
+    parametros = {'duracao_testes': 30, 'perfil_embb': 'rampa', 'semente': 1, 'semente_embb': 1,
+                  'modo_controle': 'adaptativo'}
+    experiencia = simulador_rede.ExperienciaSimulada(str(tmp_path), parametros)
+    experiencia.executar()
+    registros = telemetria.mapear(str(tmp_path / telemetria.nome_arquivo_telemetria))
+    # Só a instalação chegou ao kernel: as reduções seguintes foram recusadas e desfeitas no controlador
+    assert [a.motivo for a in experiencia.ajustes] == ['reduzir']
+    assert np.count_nonzero(registros['metrica'] == telemetria.TETO_EMBB_MBIT) == 1
+    assert np.count_nonzero(registros['metrica'] == telemetria.QOS_ALTERADO) == 0
+    assert experiencia.controlador.teto_embb_mbit == experiencia.ajustes[0].teto_embb_mbit
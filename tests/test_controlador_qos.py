@@ -0,0 +1,32 @@
+import controlador_qos
+import simulador_rede
+
+
+def test_class_change_recusado_repoe_as_classes(tmp_path, monkeypatch):
+    """Um roteador que recusa o 'class change' não deixa os outros nem o classes_htb com os novos valores."""
+    for minor, classe in controlador_qos.classes_htb.items():
+        monkeypatch.setitem(controlador_qos.classes_htb, minor, dict(classe))
+    aplicar_tc = simulador_rede._aplicar_tc
+
+    def recusar_em_r_trans3(no, partes):
+        if no.name == 'r_trans3' and partes[:2] == ['class', 'change']:
+            raise ValueError('RTNETLINK answers: Invalid argument')
+        aplicar_tc(no, partes)
+
+    monkeypatch.setattr(simulador_rede, '_aplicar_tc', recusar_em_r_trans3)
+    parametros = {'duracao_testes': 20, 'perfil_embb': 'rampa', 'semente': 1, 'semente_embb': 1,
+                  'modo_controle': 'adaptativo'}
+    experiencia = simulador_rede.ExperienciaSimulada(str(tmp_path), parametros)
+    experiencia.executar()
+
+    instalado = experiencia.ajustes[0]
+    assert controlador_qos.classes_htb[20]['ceil'] == f'{instalado.teto_embb_mbit:.1f}mbit'
+    ceil_bytes_s = instalado.teto_embb_mbit * 1e6 / 8
+    assert controlador_qos.interfaces_qos
+    for nome, interfaces in controlador_qos.interfaces_qos.items():
+        roteador = experiencia.rede.get(nome)
+        for iface in interfaces:
+            classe = roteador.intf(iface).disciplina.classes['1:20']
+            assert abs(classe.ceil - ceil_bytes_s) < 1
+    with open(tmp_path / 'controlador_simulado.log') as f:
+        assert 'classes repostas nos valores anteriores' in f.read()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import estatisticas_janela
+from estatisticas_janela import JanelaDeslizante, indice_balde
+
+
+def test_indice_balde_exato_abaixo_da_zona_linear():
+    for valor in (0, 1, 17, estatisticas_janela._LINEAR - 1):
+        assert indice_balde(valor) == valor
+    assert indice_balde(-5) == 0
+
+
+def test_indice_balde_monotono_e_limitado():
+    valores = np.unique(np.geomspace(1, estatisticas_janela.maximo_us * 4, 5000).astype(int))
+    indices = [indice_balde(int(v)) for v in valores]
+    assert indices == sorted(indices)
+    assert max(indices) == estatisticas_janela.N_BALDES - 1
+
+
+def test_percentis_com_erro_relativo_abaixo_de_um_balde():
+    rng = np.random.default_rng(7)
+    rtts = rng.lognormal(mean=np.log(2.0), sigma=0.6, size=20_000)
+    janela = JanelaDeslizante(10.0)
+    for i, rtt in enumerate(rtts):
+        janela.adicionar(float(rtt), t=i * 1e-4)
+    for p, estimado in zip((50, 95, 99), janela.percentis([50, 95, 99])):
+        exato = np.percentile(rtts, p, method='inverted_cdf')
+        assert abs(estimado - exato) / exato < 2 / 2 ** estatisticas_janela.bits_subbaldes
+
+
+def test_janela_vazia_e_perdas():
+    janela = JanelaDeslizante(1.0)
+    assert janela.percentil(99) is None
+    for i in range(8):
+        janela.adicionar(1.0 if i % 4 else None, t=i * 0.01)
+    assert janela.amostras == 8
+    assert janela.recebidas == 6
+    assert janela.perda_pct() == pytest.approx(25.0)
+
+
+def test_janela_desliza_e_esquece_as_amostras_antigas():
+    janela = JanelaDeslizante(1.0)
+    janela.adicionar(50.0, t=0.0)
+    janela.adicionar(1.0, t=0.5)
+    assert janela.maximo() == pytest.approx(50.0, rel=0.01)
+    janela.atualizar(t=1.2)
+    assert janela.amostras == 1
+    assert janela.maximo() == pytest.approx(1.0, rel=0.01)
@@ -0,0 +1,62 @@
+import os
+
+import gerador_monitor_uRLLC as monitor
+
+
+class SondaFalsa:
+    """Abre só fora do host do monitor (namespace não nulo), para forçar o modo legado."""
+
+    criadas = []
+
+    def __init__(self, ip_destino, taxa_hz, modo, porta_eco, timeout_s=None, ao_amostrar=None, namespace=None):
+        self.namespace = namespace
+        self.aberta = False
+        SondaFalsa.criadas.append(self)
+
+    def abrir(self):
+        if self.namespace is None:
+            raise OSError("sem permissão")
+        self.aberta = True
+
+    def fechar(self):
+        self.aberta = False
+
+
+def _configurar(monkeypatch, tmp_path, pontos, destinos):
+    monkeypatch.setattr(monitor, 'arquivo_telemetria', str(tmp_path / 'telemetria.bin'))
+    monkeypatch.setattr(monitor, 'socket_alerta', str(tmp_path / 'alerta.sock'))
+    monkeypatch.setattr(monitor, 'pontos_observacao', pontos)
+    monkeypatch.setattr(monitor, 'destinos', destinos)
+
+
+def test_modo_legado_fecha_sondas_e_escritores_dos_outros_caminhos(monkeypatch, tmp_path):
+    _configurar(monkeypatch, tmp_path, {'h_uRLLC2': '/ns/2', 'h_uRLLC3': '/ns/3'}, ['10.0.0.1', '10.0.0.2'])
+    SondaFalsa.criadas = []
+    monkeypatch.setattr(monitor, 'SondaLatencia', SondaFalsa)
+    monkeypatch.setattr(monitor, 'monitorar_com_ping', lambda: None)
+    fechados = []
+    original = monitor.telemetria.EscritorTelemetria.fechar
+    monkeypatch.setattr(monitor.telemetria.EscritorTelemetria, 'fechar',
+                        lambda self: (fechados.append(self.origem), original(self)))
+
+    monitor.monitorar()
+
+    assert len(SondaFalsa.criadas) == 6 and not any(s.aberta for s in SondaFalsa.criadas)
+    assert sorted(fechados) == [b'h_uRLLC2', b'h_uRLLC3']
+    assert [str(c) for c in monitor.caminhos] == ['h_uRLLC1 -> 10.0.0.1']
+    os.fstat(monitor.escritor_telemetria._fd)  # O do host do monitor continua aberto para o ping
+    monitor.escritor_telemetria.fechar()
+
+
+def test_caminhos_limitados_pela_taxa_total(monkeypatch, tmp_path, capsys):
+    pontos = {f'h_uRLLC{i}': f'/ns/{i}' for i in range(2, 6)}
+    _configurar(monkeypatch, tmp_path, pontos, ['10.0.0.1', '10.0.0.2'])
+    monkeypatch.setattr(monitor, 'taxa_total_maxima_hz', 50)
+
+    caminhos = monitor.criar_caminhos()
+
+    assert len(caminhos) == monitor.max_caminhos() == 50 // monitor.taxa_minima_hz
+    assert str(caminhos[0]) == 'h_uRLLC1 -> 10.0.0.1'
+    assert monitor.taxa_por_caminho(len(caminhos)) * len(caminhos) <= monitor.taxa_total_maxima_hz
+    assert "só os primeiros 5 são sondados" in capsys.readouterr().out
+    monitor.fechar_caminhos(caminhos)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from iperf_json import ParserIperf, SeguidorIperf
+
+
+def _intervalo(inicio, fim, bps, **extra):
+    return json.dumps({'event': 'interval', 'data': {'sum': dict(start=inicio, end=fim, bits_per_second=bps,
+                                                                 **extra)}})
+
+
+def test_json_stream_com_ancora_de_parede():
+    parser = ParserIperf()
+    linhas = [
+        json.dumps({'event': 'start', 'data': {'timestamp': {'timesecs': 1000}}}),
+        _intervalo(0.0, 1.0, 45e6),
+        _intervalo(1.0, 2.0, 1e6, omitted=True),
+        _intervalo(2.0, 3.0, 2e6, jitter_ms=0.5, lost_percent=1.0, packets=100),
+        json.dumps({'event': 'end', 'data': {}}),
+        '{truncado',
+    ]
+    registros = parser.processar_linhas(linhas)
+    assert len(registros) == 2
+    assert registros[0].mbps == pytest.approx(45.0)
+    assert registros[0].t_parede == 1000.0
+    assert registros[0].jitter_ms is None
+    assert registros[1][:6] == (2.0, 3.0, pytest.approx(2.0), 0.5, 1.0, 100)
+    assert registros[1].t_parede == 1002.0
+
+
+def test_texto_ignora_resumos_e_converte_unidades():
+    parser = ParserIperf()
+    registros = parser.processar_linhas([
+        '[  5]   0.00-1.00   sec  5.36 MBytes  45.0 Mbits/sec  0.012 ms  0/3880 (0%)',
+        '[  5]   1.00-2.00   sec   122 KBytes  1000 Kbits/sec',
+        '[  5]   0.00-10.00  sec  53.6 MBytes  45.0 Mbits/sec                  sender',
+        'iperf Done.',
+    ])
+    assert len(registros) == 2
+    assert registros[0][:6] == (0.0, 1.0, 45.0, 0.012, 0.0, 3880)
+    assert registros[1].mbps == pytest.approx(1.0)
+    assert registros[1].perda_pct is None and registros[1].t_parede is None
+
+
+def test_seguidor_iperf_le_so_intervalos_novos(tmp_path):
+    caminho = tmp_path / 'iperf.json'
+    seguidor = SeguidorIperf(str(caminho))
+    assert seguidor.ler_novos() == []
+    with open(caminho, 'a') as f:
+        f.write(_intervalo(0.0, 1.0, 10e6) + '\n' + _intervalo(1.0, 2.0, 20e6)[:10])
+    assert [r.mbps for r in seguidor.ler_novos()] == [pytest.approx(10.0)]
+    with open(caminho, 'a') as f:
+        f.write(_intervalo(1.0, 2.0, 20e6)[10:] + '\n')
+    assert [r.mbps for r in seguidor.ler_novos()] == [pytest.approx(20.0)]
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from leitor_incremental import BufferAmostras, SeguidorArquivo
+
+
+def _acrescentar(caminho, texto):
+    with open(caminho, 'a') as f:
+        f.write(texto)
+
+
+def test_seguidor_devolve_so_linhas_completas_novas(tmp_path):
+    caminho = tmp_path / 'urllc.log'
+    seguidor = SeguidorArquivo(str(caminho))
+    with pytest.raises(FileNotFoundError):
+        seguidor.ler_novas_linhas()
+
+    _acrescentar(caminho, 'a\nb\nparc')
+    assert seguidor.ler_novas_linhas() == ['a', 'b']
+    assert seguidor.ler_novas_linhas() == []
+    _acrescentar(caminho, 'ial\nc\n')
+    assert seguidor.ler_novas_linhas() == ['parcial', 'c']
+    seguidor.fechar()
+
+
+def test_seguidor_truncagem_recomeca_do_inicio(tmp_path):
+    caminho = tmp_path / 'urllc.log'
+    _acrescentar(caminho, 'antiga 1\nantiga 2\n')
+    seguidor = SeguidorArquivo(str(caminho))
+    assert len(seguidor.ler_novas_linhas()) == 2
+    with open(caminho, 'w') as f:
+        f.write('nova\n')
+    assert seguidor.ler_novas_linhas() == ['nova']
+    seguidor.fechar()
+
+
+def test_seguidor_rotacao_le_o_fim_do_antigo_e_o_novo(tmp_path):
+    caminho = tmp_path / 'urllc.log'
+    _acrescentar(caminho, 'um\n')
+    seguidor = SeguidorArquivo(str(caminho))
+    assert seguidor.ler_novas_linhas() == ['um']
+    _acrescentar(caminho, 'dois\n')
+    os.rename(caminho, tmp_path / 'urllc.log.1')
+    assert seguidor.ler_novas_linhas() == ['dois']
+    _acrescentar(caminho, 'tres\n')
+    assert seguidor.ler_novas_linhas() == ['tres']
+    seguidor.fechar()
+
+
+def test_buffer_amostras_cresce_e_mantem_a_ordem():
+    buffer = BufferAmostras(capacidade=2)
+    buffer.adicionar([])
+    assert len(buffer) == 0
+    buffer.adicionar([1.0, 2.0, 3.0])
+    buffer.adicionar(np.arange(4.0, 11.0))
+    assert len(buffer) == 10
+    np.testing.assert_array_equal(buffer.valores, np.arange(1.0, 11.0))
@@ -0,0 +1,56 @@
+from localizacao_gargalo import LocalizadorGargalo
+from simulador_rede import ExperienciaSimulada
+from topologia_parametrica import Topologia
+
+
+class HostFalso:
+    """Responde às sondas por salto com um RTT que cresce depois do IP congestionado."""
+
+    def __init__(self, name, ip_lento=None):
+        self.name = name
+        self.ip_lento = ip_lento
+        self.sondas = 0
+
+    def cmd(self, comando):
+        self.sondas += 1
+        ips = comando[len('for ip in '):].split(';')[0].split()
+        linhas, rtt = [], 0.1
+        for ip in ips:
+            rtt += 5.0 if ip == self.ip_lento else 0.05
+            linhas.append(f"{ip} rtt min/avg/max/mdev = {rtt:.3f}/{rtt:.3f}/{rtt:.3f}/0.000 ms")
+        return '\n'.join(linhas)
+
+
+def _localizador():
+    topologia = Topologia()
+    h1 = HostFalso('h_uRLLC1')
+    h2 = HostFalso('h_uRLLC2', ip_lento=topologia.saltos('h_uRLLC2')[1].ip)
+    return LocalizadorGargalo(caminhos={h.name: (topologia.saltos(h.name), h) for h in (h1, h2)}), h1, h2
+
+
+def test_sondas_partem_do_caminho_que_violou():
+    localizador, h1, h2 = _localizador()
+    localizador.apontar('h_uRLLC2')
+    alvo, fonte = localizador.localizar()
+    assert fonte == 'sondas'
+    assert alvo == {'r_trans2': {'r_trans2-eth1'}, 'r_trans3': {'r_trans3-eth1'}}
+    assert (h1.sondas, h2.sondas) == (0, 1)
+
+
+def test_sem_origem_junta_todos_os_caminhos():
+    localizador, h1, h2 = _localizador()
+    localizador.apontar('desconhecida')
+    alvo, _ = localizador.localizar()
+    assert alvo == {'r_trans2': {'r_trans2-eth1'}, 'r_trans3': {'r_trans3-eth1'}}
+    assert (h1.sondas, h2.sondas) == (1, 1)
+
+
+def test_simulador_localiza_no_caminho_que_violou(tmp_path):
+    parametros = {'duracao_testes': 20, 'perfil_embb': 'rampa', 'semente': 1, 'semente_embb': 1,
+                  'alcance_qos': 'gargalo', 'modo_controle': 'binario'}
+    resumo = ExperienciaSimulada(str(tmp_path), parametros).executar()
+    with open(tmp_path / 'controlador_simulado.log') as f:
+        log = f.read()
+    assert 'Gargalo localizado' in log
+    assert 'Gargalo não localizado' not in log
+    assert 0 < resumo['interfaces_atuadas'] < 9
@@ -0,0 +1,42 @@
+import pytest
+
+import perfis_trafego_embb
+from perfis_trafego_embb import planear
+
+
+def test_planear_rampa():
+    fases = [{'perfil': 'rampa', 'duracao_s': 40, 'de_mbps': 10, 'ate_mbps': 40, 'degraus': 4}]
+    plano = planear(fases, 2, [5201, 5210, 5211, 5212, 5213], semente=1)
+    assert [s.mbps for s in plano.sessoes] == [10, 20, 30, 40]
+    assert [s.inicio_s for s in plano.sessoes] == [0, 10, 20, 30]
+    assert [s.host for s in plano.sessoes] == [0, 1, 0, 1]
+    assert plano.bloqueadas == 0
+    assert plano.fases[0].carga_mbps == pytest.approx(25.0)
+    assert plano.carga_em(15.0) == 20
+
+
+def test_planear_reprodutivel_com_a_semente():
+    fases = [{'perfil': 'poisson', 'duracao_s': 60, 'chegadas_por_s': 0.5, 'duracao_media_s': 5,
+              'mbps_por_sessao': 4}]
+    portas = list(range(5300, 5340))
+    assert planear(fases, 2, portas, semente=3).para_dict() == planear(fases, 2, portas, semente=3).para_dict()
+    assert planear(fases, 2, portas, semente=3).para_dict() != planear(fases, 2, portas, semente=4).para_dict()
+
+
+def test_planear_corta_na_duracao_e_bloqueia_sem_portas():
+    fases = [{'perfil': 'constante', 'duracao_s': 30, 'mbps': 30, 'utilizadores': 3},
+             {'perfil': 'pausa', 'duracao_s': 30}]
+    plano = planear(fases, 1, [5201], semente=0, duracao_max_s=20)
+    assert len(plano.fases) == 1 and plano.fases[0].duracao_s == 20
+    assert len(plano.sessoes) == 1 and plano.bloqueadas == 2
+    assert plano.sessoes[0].duracao_s == 20
+
+
+def test_planear_erros():
+    with pytest.raises(ValueError):
+        planear('rampa', 0, [5201])
+    with pytest.raises(ValueError):
+        planear([{'perfil': 'inexistente', 'duracao_s': 1}], 1, [5201])
+    with pytest.raises(ValueError):
+        planear([{'perfil': 'constante', 'duracao_s': 1}], 1, [5201])
+    assert 'rampa' in perfis_trafego_embb.PERFIS
@@ -0,0 +1,26 @@
+import numpy as np
+
+from previsao_latencia import regressao_deslizante
+
+
+def test_regressao_deslizante_recupera_uma_reta():
+    t = np.arange(0, 5, 0.1)
+    declive, valor = regressao_deslizante(t, 3.0 * t + 2.0, janela_s=1.0, minimo=4)
+    validos = ~np.isnan(declive)
+    assert validos[4:].all()
+    np.testing.assert_allclose(declive[validos], 3.0)
+    np.testing.assert_allclose(valor[validos], 3.0 * t[validos] + 2.0)
+
+
+def test_regressao_deslizante_sem_pontos_suficientes():
+    t = np.array([0.0, 0.1, 0.2, 5.0, 5.1])
+    declive, valor = regressao_deslizante(t, t, janela_s=0.5, minimo=3)
+    assert np.isnan(declive[:2]).all()
+    assert declive[2] == np.float64(declive[2]) and not np.isnan(declive[2])
+    assert np.isnan(declive[3:]).all() and np.isnan(valor[3:]).all()
+    assert len(regressao_deslizante([], [], 1.0)[0]) == 0
+
+
+def test_regressao_deslizante_instantes_repetidos():
+    declive, _ = regressao_deslizante([1.0] * 5, [1.0, 2.0, 3.0, 4.0, 5.0], janela_s=1.0, minimo=2)
+    assert np.isnan(declive).all()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from series_longas import BufferCircular, lttb
+
+
+def test_buffer_circular_devolve_as_amostras_que_saem_por_ordem():
+    buffer = BufferCircular(4)
+    t_saem, _ = buffer.adicionar([0, 1, 2], [10, 11, 12])
+    assert len(t_saem) == 0
+    t_saem, v_saem = buffer.adicionar([3, 4, 5], [13, 14, 15])
+    assert t_saem.tolist() == [0, 1]
+    assert v_saem.tolist() == [10, 11]
+    assert len(buffer) == 4
+    assert buffer.t.tolist() == [2, 3, 4, 5]
+    assert buffer.valores.tolist() == [12, 13, 14, 15]
+
+
+def test_buffer_circular_lote_maior_do_que_a_capacidade():
+    buffer = BufferCircular(3)
+    buffer.adicionar([0], [0])
+    t_saem, _ = buffer.adicionar(np.arange(1, 6), np.arange(1, 6))
+    assert t_saem.tolist() == [0, 1, 2]
+    assert buffer.t.tolist() == [3, 4, 5]
+
+
+def test_lttb_mantem_extremos_e_picos():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[417] = 25.0
+    xs, ys = lttb(x, y, 50)
+    assert len(xs) == 50
+    assert xs[0] == 0 and xs[-1] == 999
+    assert 417 in xs
+    assert np.all(np.diff(xs) > 0)
+
+
+def test_lttb_ignora_nao_finitos_e_poucos_pontos():
+    x = np.arange(10, dtype=float)
+    y = np.arange(10, dtype=float)
+    y[3] = np.nan
+    xs, ys = lttb(x, y, 20)
+    assert 3 not in xs
+    assert len(xs) == 9
+    xs, _ = lttb(x, y, 2)
+    assert len(xs) == 9
@@ -0,0 +1,49 @@
+import json
+import os
+
+import telemetria
+import topologia_parametrica
+from simulador_rede import ExperienciaSimulada
+
+_TEMPO_REAL = ('duracao_real_s', 'aceleracao')
+
+
+def _simular(diretorio, **parametros):
+    ExperienciaSimulada(str(diretorio), dict({'duracao_testes': 10, 'perfil_embb': 'rampa', 'semente': 1,
+                                              'semente_embb': 1}, **parametros)).executar()
+    with open(os.path.join(diretorio, 'resumo_simulacao.json')) as f:
+        return json.load(f)
+
+
+def test_execucao_curta_com_semente_fixa(tmp_path):
+    resumo = _simular(tmp_path / 'a')
+    assert resumo['duracao_simulada_s'] == 10
+    assert [c['caminho'] for c in resumo['caminhos']] == ['h_uRLLC1 -> h_cloud', 'h_uRLLC2 -> h_cloud']
+    assert resumo['sondas'] == resumo['caminhos'][0]['sondas'] > 0
+    assert 0 <= resumo['perda_sondas_pct'] <= 100
+    assert 0 <= resumo['violacao_sla_pct'] <= 100
+    assert resumo['rtt_p50_ms'] <= resumo['rtt_p99_ms']
+    assert any(f['fluxo'].startswith('urllc') for f in resumo['fluxos'])
+    for fluxo in resumo['fluxos']:
+        assert fluxo['recebidos'] + fluxo['descartados'] <= fluxo['enviados']
+    registros = telemetria.mapear(str(tmp_path / 'a' / telemetria.nome_arquivo_telemetria))
+    assert (registros['metrica'] == telemetria.LATENCIA_MS).any()
+
+    # Determinística para a mesma semente
+    repetido = _simular(tmp_path / 'b')
+    for chave in _TEMPO_REAL:
+        resumo.pop(chave), repetido.pop(chave)
+    assert repetido == resumo
+
+
+
+def test_especificacao_com_outros_nomes_e_um_so_sitio(tmp_path):
+    espec = topologia_parametrica.gerar_espec(3, 1, 'linha')
+    espec['acessos'][0]['hosts'] = {'sensor': 10, 'video': 20}
+    espec['acessos'][0]['fatias'] = {'sensor': 'urllc', 'video': 'embb'}
+    espec['nuvem']['hosts'] = {'servidor': 100}
+    ExperienciaSimulada(str(tmp_path), {'duracao_testes': 5, 'semente': 1, 'semente_embb': 1}, espec).executar()
+    with open(tmp_path / 'resumo_simulacao.json') as f:
+        resumo = json.load(f)
+    assert [c['caminho'] for c in resumo['caminhos']] == ['sensor -> servidor']
+    assert resumo['sondas'] > 0
@@ -0,0 +1,45 @@
+import numpy as np
+
+import telemetria
+from telemetria import EscritorTelemetria, LeitorTelemetria
+
+
+def test_escrita_e_leitura_incremental(tmp_path):
+    caminho = str(tmp_path / telemetria.nome_arquivo_telemetria)
+    escritor = EscritorTelemetria(caminho, 'h_uRLLC1')
+    leitor = LeitorTelemetria(caminho)
+
+    escritor.registrar(telemetria.LATENCIA_MS, 1.5, canal=2, t_ns=1000)
+    escritor.registrar(telemetria.ALERTA, 7.0, t_ns=2000)  # Evento: descarrega também a amostra pendente
+    novos = leitor.ler_novos()
+    assert novos['metrica'].tolist() == [telemetria.RELOGIO, telemetria.LATENCIA_MS, telemetria.ALERTA]
+    assert novos['t_ns'][1:].tolist() == [1000, 2000]
+    assert novos['canal'][1] == 2
+    assert novos['valor'][1:].tolist() == [1.5, 7.0]
+    assert set(novos['origem']) == {b'h_uRLLC1'}
+    assert len(leitor.ler_novos()) == 0
+
+    escritor.registrar(telemetria.PERDA, 1.0, t_ns=3000)
+    assert len(leitor.ler_novos()) == 0  # Amostra ainda em memória
+    escritor.fechar()
+    novos = leitor.ler_novos()
+    assert novos['metrica'].tolist() == [telemetria.PERDA]
+    assert len(telemetria.mapear(caminho)) == 4
+
+
+def test_varios_escritores_e_ficheiro_recriado(tmp_path):
+    caminho = str(tmp_path / telemetria.nome_arquivo_telemetria)
+    leitor = LeitorTelemetria(caminho)
+    for origem in ('monitor', 'controlador'):
+        escritor = EscritorTelemetria(caminho, origem)
+        escritor.registrar(telemetria.QOS_APLICADO, 3.0)
+        escritor.fechar()
+    registros = leitor.ler_novos()
+    assert len(registros) == 4
+    assert np.count_nonzero(registros['metrica'] == telemetria.QOS_APLICADO) == 2
+
+    # Um ficheiro recriado mais curto volta a ser lido do início
+    (tmp_path / telemetria.nome_arquivo_telemetria).unlink()
+    escritor = EscritorTelemetria(caminho, 'monitor')
+    escritor.fechar()
+    assert leitor.ler_novos()['metrica'].tolist() == [telemetria.RELOGIO]
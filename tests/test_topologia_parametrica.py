@@ -0,0 +1,61 @@
+import ipaddress
+
+import pytest
+
+from topologia_parametrica import ESPEC_PADRAO, Topologia, gerar_espec, prefixar_espec
+
+
+def test_rotas_da_topologia_padrao():
+    topologia = Topologia()
+    assert dict(topologia.rotas['r_trans1']) == {
+        '172.18.2.0/24': '172.19.13.3',
+        '172.19.23.0/24': '172.19.13.3',
+        '172.19.34.0/24': '172.19.13.3',
+        '172.19.40.0/24': '172.19.13.3',
+    }
+    assert dict(topologia.rotas['r_trans3'])['172.19.40.0/24'] == '172.19.34.4'
+    assert dict(topologia.rotas['r_trans4'])['172.18.1.0/24'] == '172.19.34.3'
+    assert topologia.hosts['h_cloud'] == ('172.19.40.100/24', '172.19.40.4')
+
+
+def test_mapa_interfaces_da_topologia_padrao():
+    mapa = Topologia().mapa_interfaces()
+    assert mapa['r_trans1'] == {'forward': ['r_trans1-eth1'], 'backward': ['r_trans1-eth0'],
+                                'marcacao': {'r_trans1-eth0': 'dport'}}
+    assert mapa['r_trans3'] == {'forward': ['r_trans3-eth2'], 'backward': ['r_trans3-eth0', 'r_trans3-eth1']}
+    assert mapa['r_trans4'] == {'forward': ['r_trans4-eth1'], 'backward': ['r_trans4-eth0'],
+                                'marcacao': {'r_trans4-eth1': 'sport'}}
+
+
+@pytest.mark.parametrize('forma', ['arvore', 'linha', 'anel'])
+def test_especificacoes_geradas_sao_alcancaveis(forma):
+    topologia = Topologia(gerar_espec(6, 3, forma))
+    redes = {i.endereco.network for ifaces in topologia.interfaces.values() for i in ifaces}
+    for roteador, ifaces in topologia.interfaces.items():
+        ligadas = {i.endereco.network for i in ifaces}
+        assert {ipaddress.ip_network(r) for r, _ in topologia.rotas[roteador]} == redes - ligadas
+    mapa = topologia.mapa_interfaces()
+    assert all('forward' in mapa[s['roteador']] for s in topologia.espec['acessos'])
+
+
+def test_prefixo_e_erros():
+    topologia = Topologia(prefixar_espec(ESPEC_PADRAO, 'b'))
+    assert 'br_trans1' in topologia.rotas and 'bh_cloud' in topologia.hosts
+    espec = dict(ESPEC_PADRAO, enlaces=[])
+    with pytest.raises(ValueError):
+        Topologia(espec)
+
+
+def test_fatias_pela_ordem_dos_sitios_e_declaradas():
+    topologia = Topologia(gerar_espec(4, 11, 'linha'))
+    assert topologia.hosts_fatia('urllc')[:3] == ['h_uRLLC1', 'h_uRLLC2', 'h_uRLLC3']
+    assert topologia.hosts_fatia('urllc')[-1] == 'h_uRLLC11'
+    assert topologia.host_nuvem == 'h_cloud'
+
+    espec = gerar_espec(2, 1)
+    espec['acessos'][0]['hosts'] = {'sensor': 10, 'video': 20}
+    espec['acessos'][0]['fatias'] = {'sensor': 'urllc', 'video': 'embb'}
+    espec['nuvem']['hosts'] = {'servidor': 100}
+    topologia = Topologia(prefixar_espec(espec, 'c'))
+    assert (topologia.hosts_fatia('urllc'), topologia.hosts_fatia('embb')) == (['csensor'], ['cvideo'])
+    assert topologia.host_nuvem == 'cservidor'
@@ -0,0 +1,67 @@
+import trafego_urllc_udp
+from trafego_urllc_udp import ReceptorUrllc
+
+
+def _receber(seqs, receptor=None):
+    receptor = receptor or ReceptorUrllc([5202])
+    for seq in seqs:
+        receptor._processar(0, seq, 1.0)
+    return receptor
+
+
+def test_emissor_reiniciado_nao_conta_duplicados():
+    resumo = _receber(list(range(1000, 1010)) + list(range(50))).resumo()[0]
+    assert resumo['recebidos'] == 60
+    assert resumo['duplicados'] == 0
+    assert resumo['reinicios'] == 1
+    assert resumo['perdidos'] == 0
+
+
+def test_reinicio_por_salto_maximo():
+    inicio = trafego_urllc_udp.salto_maximo + 10
+    receptor = _receber(range(inicio, inicio + 5))
+    receptor = _receber([0, 1], receptor)
+    receptor._expirar_faltas(todas=True)
+    resumo = receptor.resumo()[0]
+    assert resumo['reinicios'] == 1 and resumo['duplicados'] == 0 and resumo['perdidos'] == 0
+
+
+def test_chegada_depois_de_dado_como_perdido():
+    receptor = _receber([0, 1, 3, 4])
+    receptor._expirar_faltas(todas=True)
+    assert receptor.resumo()[0]['perdidos'] == 1
+    resumo = _receber([2], receptor).resumo()[0]
+    assert resumo['atrasados'] == 1
+    assert resumo['perdidos'] == 0
+    assert resumo['duplicados'] == 0
+    assert resumo['recebidos'] == 5
+
+
+def test_reordenados_e_duplicados():
+    receptor = _receber([1, 0, 2, 4, 3, 3])
+    receptor._expirar_faltas(todas=True)
+    resumo = receptor.resumo()[0]
+    assert resumo['reordenados'] == 2
+    assert resumo['duplicados'] == 1
+    assert resumo['reinicios'] == 0
+    assert resumo['perdidos'] == 0
+    assert resumo['recebidos'] == 5
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.registos = []
+
+    def registrar(self, metrica, valor, canal=0, t_ns=None):
+        self.registos.append((metrica, valor))
+
+
+def test_atraso_amostrado_acima_do_maximo_de_registos(monkeypatch):
+    monkeypatch.setattr(trafego_urllc_udp, 'max_registos_atraso_hz', 10)
+    escritor = EscritorFalso()
+    receptor = ReceptorUrllc([5202], escritor)
+    for seq in range(5000):
+        receptor._processar(0, seq, 1.0)
+    atrasos = [v for m, v in escritor.registos if m == trafego_urllc_udp.telemetria.ATRASO_MS]
+    assert 1 <= len(atrasos) < 100
+    assert receptor.resumo()[0]['recebidos'] == 5000
@@ -0,0 +1,388 @@
+import ipaddress
+import json
+import os
+import sys
+import tempfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configurações ---
+pool_transporte = "10.0.0.0/8"      # Sub-redes /24 para enlaces sem 'subrede' explícita
+pool_acesso = "172.18.0.0/16"       # Sub-redes /24 dos sítios de acesso gerados (172.18.<n>.0/24)
+subrede_nuvem = "172.19.40.0/24"    # Mantém o h_cloud em 172.19.40.100 nas topologias geradas
+bw_padrao = {'acesso': 50, 'transporte': 100, 'nuvem': 200}
+tamanho_max_iface = 15              # IFNAMSIZ - 1 no Linux
+max_threads = 32                    # Roteadores configurados em simultâneo
+
+# Especificação da topologia original (4 roteadores, 2 sítios de acesso, 1 nuvem).
+#   roteadores: nome -> id; nos enlaces com 'subrede' explícita o id é a parte de host
+#               do endereço do roteador (ex.: r_trans3 em 172.19.13.0/24 -> 172.19.13.3)
+#   acessos:    sítios atrás de um switch; o roteador usa o endereço 'gateway' (omissão: .1);
+#               'fatias' opcional (host -> 'urllc' ou 'embb'), por omissão deduzida do nome do host
+#   enlaces:    ligações de transporte entre roteadores ('subrede' opcional: atribuída do pool)
+#   nuvem:      sítio de destino do tráfego; sem 'switch', o único host liga-se diretamente
+# As interfaces de cada roteador são numeradas por esta ordem: acessos, enlaces, nuvem.
+ESPEC_PADRAO = {
+    'roteadores': {'r_trans1': 1, 'r_trans2': 2, 'r_trans3': 3, 'r_trans4': 4},
+    'acessos': [
+        {'roteador': 'r_trans1', 'switch': 's_access1', 'subrede': '172.18.1.0/24',
+         'hosts': {'h_uRLLC1': 10, 'h_eMBB1': 20}},
+        {'roteador': 'r_trans2', 'switch': 's_access2', 'subrede': '172.18.2.0/24',
+         'hosts': {'h_uRLLC2': 10, 'h_eMBB2': 20}},
+    ],
+    'enlaces': [
+        {'a': 'r_trans1', 'b': 'r_trans3', 'subrede': '172.19.13.0/24'},
+        {'a': 'r_trans2', 'b': 'r_trans3', 'subrede': '172.19.23.0/24'},
+        {'a': 'r_trans3', 'b': 'r_trans4', 'subrede': '172.19.34.0/24'},
+    ],
+    'nuvem': {'roteador': 'r_trans4', 'subrede': '172.19.40.0/24', 'gateway': 4,
+              'hosts': {'h_cloud': 100}},
+    'bw': bw_padrao,
+}
+
+# Interface de um roteador. vizinho: roteador do outro lado, ou None se der para um sítio.
+Interface = namedtuple('Interface', ['nome', 'roteador', 'endereco', 'vizinho'])
+# Ligação a criar no Mininet (intf1/intf2 a None deixam o nome por omissão).
+Ligacao = namedtuple('Ligacao', ['no1', 'no2', 'intf1', 'intf2', 'bw'])
+# Alvo de uma sonda por salto e interfaces de saída (roteador, interface) atravessadas entre o
+# alvo anterior e este, nos dois sentidos: o acréscimo de RTT deste salto forma-se nas suas filas.
+Salto = namedtuple('Salto', ['ip', 'interfaces'])
+FATIAS = ('urllc', 'embb')
+
+
+class Topologia:
+    """
+    Plano completo de uma topologia a partir da especificação declarativa.
+
+    Calcula endereços, nomes de interface, rotas estáticas pelo caminho mais curto
+    (em número de saltos) e o mapa forward/backward do controlador de QoS. Só o
+    construir()/configurar() precisam do Mininet.
+    """
+
+    def __init__(self, espec=ESPEC_PADRAO):
+        self.espec = espec
+        self.bw = dict(bw_padrao, **espec.get('bw', {}))
+        self.roteadores = list(espec['roteadores'])
+        self.interfaces = {r: [] for r in self.roteadores}
+        self.switches = []
+        self.hosts = {}  # nome -> (endereço com prefixo, gateway)
+        self.fatias = {}  # host de acesso -> fatia, pela ordem dos sítios na especificação
+        self.ligacoes = []
+        self._pool = ipaddress.ip_network(pool_transporte).subnets(new_prefix=24)
+
+        for sitio in espec.get('acessos', []):
+            self._adicionar_sitio(sitio, self.bw['acesso'])
+            for nome in sitio['hosts']:
+                self.fatias[nome] = sitio.get('fatias', {}).get(nome) or _fatia_pelo_nome(nome)
+        for enlace in espec.get('enlaces', []):
+            self._adicionar_enlace(enlace)
+        self.nuvem = espec['nuvem']
+        self.iface_nuvem = self._adicionar_sitio(self.nuvem, self.bw['nuvem'])
+        self.host_nuvem = next(iter(self.nuvem['hosts']))  # Destino do tráfego e das sondas por salto
+
+        self._vizinhos = {r: [(i.vizinho, i) for i in self.interfaces[r] if i.vizinho] for r in self.roteadores}
+        self._proximo_salto = {r: self._bfs(r) for r in self.roteadores}
+        self._donos = {}  # sub-rede -> roteadores ligados a ela
+        for r in self.roteadores:
+            for iface in self.interfaces[r]:
+                self._donos.setdefault(iface.endereco.network, []).append(r)
+        self.rotas = {r: self._calcular_rotas(r) for r in self.roteadores}
+
+    def _nova_interface(self, roteador, endereco, vizinho):
+        if roteador not in self.interfaces:
+            raise ValueError(f"Roteador desconhecido na especificação: {roteador}")
+        nome = f"{roteador}-eth{len(self.interfaces[roteador])}"
+        if len(nome) > tamanho_max_iface:
+            raise ValueError(f"Nome de interface demasiado longo ({nome}): use nomes de roteador mais curtos.")
+        iface = Interface(nome, roteador, endereco, vizinho)
+        self.interfaces[roteador].append(iface)
+        return iface
+
+    def _adicionar_sitio(self, sitio, bw):
+        rede = ipaddress.ip_network(sitio['subrede'])
+        gateway = rede[sitio.get('gateway', 1)]
+        roteador = sitio['roteador']
+        iface = self._nova_interface(roteador, ipaddress.ip_interface(f"{gateway}/{rede.prefixlen}"), None)
+        for nome, id_host in sitio['hosts'].items():
+            self.hosts[nome] = (f"{rede[id_host]}/{rede.prefixlen}", str(gateway))
+
+        switch = sitio.get('switch')
+        if switch:
+            self.switches.append(switch)
+            for nome in sitio['hosts']:
+                self.ligacoes.append(Ligacao(nome, switch, None, None, bw))
+            self.ligacoes.append(Ligacao(switch, roteador, None, iface.nome, bw))
+        elif len(sitio['hosts']) == 1:
+            self.ligacoes.append(Ligacao(roteador, next(iter(sitio['hosts'])), iface.nome, None, bw))
+        else:
+            raise ValueError(f"Sítio em {roteador} com vários hosts precisa de um 'switch'.")
+        return iface
+
+    def _adicionar_enlace(self, enlace):
+        a, b = enlace['a'], enlace['b']
+        if 'subrede' in enlace:
+            rede = ipaddress.ip_network(enlace['subrede'])
+            id_a, id_b = self.espec['roteadores'][a], self.espec['roteadores'][b]
+        else:
+            rede = next(self._pool)
+            id_a, id_b = 1, 2
+        iface_a = self._nova_interface(a, ipaddress.ip_interface(f"{rede[id_a]}/{rede.prefixlen}"), b)
+        iface_b = self._nova_interface(b, ipaddress.ip_interface(f"{rede[id_b]}/{rede.prefixlen}"), a)
+        self.ligacoes.append(Ligacao(a, b, iface_a.nome, iface_b.nome, self.bw['transporte']))
+
+    def _bfs(self, origem):
+        """Caminhos mais curtos a partir de origem: destino -> (distância, primeiro salto)."""
+        resultado = {origem: (0, None)}
+        fila = deque([origem])
+        while fila:
+            atual = fila.popleft()
+            distancia, primeiro = resultado[atual]
+            for vizinho, _ in self._vizinhos[atual]:
+                if vizinho not in resultado:
+                    # O primeiro salto herda-se do antecessor (exceto a partir da origem)
+                    resultado[vizinho] = (distancia + 1, primeiro or vizinho)
+                    fila.append(vizinho)
+        return resultado
+
+    def _iface_para(self, roteador, vizinho):
+        return next(i for v, i in self._vizinhos[roteador] if v == vizinho)
+
+    def _calcular_rotas(self, roteador):
+        """Lista de (sub-rede, próximo salto) para todas as sub-redes não ligadas diretamente."""
+        ligadas = {iface.endereco.network for iface in self.interfaces[roteador]}
+        caminhos = self._proximo_salto[roteador]
+
+        rotas = []
+        for rede, donos in self._donos.items():
+            if rede in ligadas:
+                continue
+            alcancaveis = [r for r in donos if r in caminhos]
+            if not alcancaveis:
+                raise ValueError(f"{rede} é inalcançável a partir de {roteador} (topologia desligada).")
+            destino = min(alcancaveis, key=lambda r: caminhos[r][0])
+            _, vizinho = caminhos[destino]
+            via = self._iface_para(vizinho, roteador).endereco.ip
+            rotas.append((str(rede), str(via)))
+        return rotas
+
+    def _percurso(self, origem, destino):
+        """Roteadores visitados de origem a destino seguindo as rotas calculadas."""
+        percurso = [origem]
+        while percurso[-1] != destino:
+            percurso.append(self._proximo_salto[percurso[-1]][destino][1])
+        return percurso
+
+    def mapa_interfaces(self):
+        """
+        Deriva o interfaces_map do controlador_qos a partir dos percursos acesso <-> nuvem.
+
+        'forward' são as interfaces de saída no sentido da nuvem (filtro por porta de
+        destino); 'backward' as de saída no sentido dos sítios de acesso (porta de origem).
+        'marcacao' são as interfaces por onde o tráfego entra no percurso (acessos: porta
+        de destino; nuvem: porta de origem), onde o modo de classificação 'dscp' marca.
+        """
+        nuvem = self.nuvem['roteador']
+        saidas = {}
+        marcacao = {nuvem: {self.iface_nuvem.nome: 'sport'}}
+        for sitio in self.espec.get('acessos', []):
+            acesso = sitio['roteador']
+            ida = self._percurso(acesso, nuvem)
+            for atual, seguinte in zip(ida, ida[1:]):
+                saidas.setdefault(atual, {}).setdefault('forward', set()).add(self._iface_para(atual, seguinte))
+            saidas.setdefault(nuvem, {}).setdefault('forward', set()).add(self.iface_nuvem)
+
+            volta = self._percurso(nuvem, acesso)
+            for atual, seguinte in zip(volta, volta[1:]):
+                saidas.setdefault(atual, {}).setdefault('backward', set()).add(self._iface_para(atual, seguinte))
+            iface_acesso = next(i for i in self.interfaces[acesso]
+                                if i.vizinho is None and i.endereco.network == ipaddress.ip_network(sitio['subrede']))
+            saidas.setdefault(acesso, {}).setdefault('backward', set()).add(iface_acesso)
+            marcacao.setdefault(acesso, {})[iface_acesso.nome] = 'dport'
+
+        ordem = {i.nome: n for r in self.roteadores for n, i in enumerate(self.interfaces[r])}
+        mapa = {r: {direcao: sorted((i.nome for i in ifaces), key=ordem.get)
+                    for direcao, ifaces in saidas[r].items()}
+                for r in self.roteadores if r in saidas}
+        for r, entradas in marcacao.items():
+            mapa[r]['marcacao'] = entradas
+        return mapa
+
+    def saltos(self, host):
+        """
+        Saltos do percurso de um host de acesso até ao host da nuvem, para sondas por salto.
+
+        O primeiro alvo é o gateway do sítio; os seguintes, o endereço de cada roteador do
+        percurso na ligação por onde o tráfego chega; o último, o host da nuvem.
+        """
+        sitio = next(s for s in self.espec.get('acessos', []) if host in s['hosts'])
+        acesso, nuvem = sitio['roteador'], self.nuvem['roteador']
+        iface_acesso = next(i for i in self.interfaces[acesso]
+                            if i.vizinho is None and i.endereco.network == ipaddress.ip_network(sitio['subrede']))
+        saltos = [Salto(str(iface_acesso.endereco.ip), [(acesso, iface_acesso.nome)])]
+        percurso = self._percurso(acesso, nuvem)
+        for atual, seguinte in zip(percurso, percurso[1:]):
+            chegada = self._iface_para(seguinte, atual)
+            saltos.append(Salto(str(chegada.endereco.ip),
+                                [(atual, self._iface_para(atual, seguinte).nome), (seguinte, chegada.nome)]))
+        saltos.append(Salto(self.hosts[self.host_nuvem][0].split('/')[0], [(nuvem, self.iface_nuvem.nome)]))
+        return saltos
+
+    def hosts_fatia(self, fatia):
+        """Hosts de acesso de uma fatia ('urllc' ou 'embb'), pela ordem dos sítios na especificação."""
+        return [nome for nome, f in self.fatias.items() if f == fatia]
+
+    def comandos_ip(self, roteador):
+        """Comandos 'ip' (sem o prefixo) que endereçam as interfaces e instalam as rotas do roteador."""
+        comandos = []
+        for iface in self.interfaces[roteador]:
+            comandos.append(f"addr add {iface.endereco} dev {iface.nome}")
+            comandos.append(f"link set {iface.nome} up")
+        for rede, via in self.rotas[roteador]:
+            comandos.append(f"route add {rede} via {via}")
+        return comandos
+
+    def construir(self, net, cls_roteador):
+        """Adiciona roteadores, switches, hosts e ligações à rede Mininet. Devolve a lista de roteadores."""
+        roteadores = [net.addHost(nome, cls=cls_roteador, ip=None) for nome in self.roteadores]
+        for nome in self.switches:
+            net.addSwitch(nome)
+        for nome, (endereco, gateway) in self.hosts.items():
+            net.addHost(nome, ip=endereco, defaultRoute=f'via {gateway}')
+        # Ligações dos hosts primeiro, como na topologia original
+        for ligacao in sorted(self.ligacoes, key=lambda l: l.no1 not in self.hosts):
+            opcoes = {}
+            if ligacao.intf1:
+                opcoes['intfName1'] = ligacao.intf1
+            if ligacao.intf2:
+                opcoes['intfName2'] = ligacao.intf2
+            net.addLink(net.get(ligacao.no1), net.get(ligacao.no2), bw=ligacao.bw, **opcoes)
+        return roteadores
+
+    def configurar(self, net):
+        """
+        Endereça as interfaces e instala as rotas estáticas em todos os roteadores (após net.start()).
+
+        Cada roteador recebe um único 'ip -batch' e os roteadores são configurados em
+        paralelo. Devolve {roteador: mensagens de erro do ip} (vazio se tudo correu bem).
+        """
+        def configurar_roteador(nome):
+            return executar_lote_ip(net.get(nome), self.comandos_ip(nome))
+
+        with ThreadPoolExecutor(max_workers=min(len(self.roteadores), max_threads)) as executor:
+            saidas = dict(zip(self.roteadores, executor.map(configurar_roteador, self.roteadores)))
+        return {nome: saida.strip() for nome, saida in saidas.items() if saida.strip()}
+
+    def rotas_instaladas(self, net):
+        """Verdadeiro se todos os roteadores já têm todas as rotas calculadas na tabela."""
+        for nome in self.roteadores:
+            tabela = net.get(nome).cmd('ip -4 route show')
+            if any(f"{rede} via {via}" not in tabela for rede, via in self.rotas[nome]):
+                return False
+        return True
+
+
+def _fatia_pelo_nome(nome):
+    """'h_uRLLC3' -> 'urllc', 'h_eMBB3' -> 'embb'; None se o nome não indicar a fatia."""
+    return next((fatia for fatia in FATIAS if fatia in nome.lower()), None)
+
+
+def executar_lote_ip(no, comandos):
+    """Executa uma lista de comandos ip (sem o prefixo 'ip') numa única chamada 'ip -batch'."""
+    if not comandos:
+        return ''
+    with tempfile.NamedTemporaryFile('w', prefix=f'ip_{no.name}_', suffix='.batch', delete=False) as f:
+        f.write('\n'.join(comandos) + '\n')
+        caminho_lote = f.name
+    try:
+        return no.cmd(f'ip -force -batch {caminho_lote} 2>&1')
+    finally:
+        os.remove(caminho_lote)
+
+
+def gerar_espec(n_roteadores, n_sitios, forma='arvore'):
+    """
+    Gera uma especificação sintética para testes de escala.
+
+    forma: 'arvore' (binária, nuvem na raiz r_trans1, sítios nas folhas), 'anel' ou
+    'linha' (nuvem em r_trans1, sítios distribuídos pelos restantes roteadores).
+    Cada sítio n tem h_uRLLC<n> (.10) e h_eMBB<n> (.20) em 172.18.<n>.0/24.
+    """
+    if n_roteadores < 2:
+        raise ValueError("São precisos pelo menos 2 roteadores.")
+    redes_acesso = list(ipaddress.ip_network(pool_acesso).subnets(new_prefix=24))
+    if n_sitios >= len(redes_acesso):
+        raise ValueError(f"No máximo {len(redes_acesso) - 1} sítios de acesso.")
+
+    nomes = [f'r_trans{i}' for i in range(1, n_roteadores + 1)]
+    if forma == 'arvore':
+        enlaces = [{'a': nomes[i // 2 - 1], 'b': nomes[i - 1]} for i in range(2, n_roteadores + 1)]
+        pais = {e['a'] for e in enlaces}
+        bordas = [n for n in nomes if n not in pais]
+    elif forma in ('anel', 'linha'):
+        enlaces = [{'a': nomes[i], 'b': nomes[i + 1]} for i in range(n_roteadores - 1)]
+        if forma == 'anel' and n_roteadores > 2:
+            enlaces.append({'a': nomes[-1], 'b': nomes[0]})
+        bordas = nomes[1:]
+    else:
+        raise ValueError(f"Forma desconhecida: {forma}")
+
+    acessos = []
+    for n in range(1, n_sitios + 1):
+        acessos.append({'roteador': bordas[(n - 1) % len(bordas)], 'switch': f's_access{n}',
+                        'subrede': str(redes_acesso[n]), 'hosts': {f'h_uRLLC{n}': 10, f'h_eMBB{n}': 20}})
+    return {
+        'roteadores': {nome: i for i, nome in enumerate(nomes, 1)},
+        'acessos': acessos,
+        'enlaces': enlaces,
+        'nuvem': {'roteador': nomes[0], 'subrede': subrede_nuvem, 'hosts': {'h_cloud': 100}},
+        'bw': bw_padrao,
+    }
+
+
+def prefixar_espec(espec, prefixo):
+    """
+    Copia a especificação com todos os nomes de nós prefixados (ex.: 'a' -> 'ar_trans1').
+
+    Os switches OVS e as pontas das ligações vivem no namespace raiz, por isso
+    topologias em execução simultânea precisam de nomes distintos.
+    """
+    if not prefixo:
+        return espec
+
+    def sitio(s):
+        novo = dict(s, roteador=prefixo + s['roteador'], hosts={prefixo + h: i for h, i in s['hosts'].items()})
+        if s.get('switch'):
+            novo['switch'] = prefixo + s['switch']
+        if s.get('fatias'):
+            novo['fatias'] = {prefixo + h: fatia for h, fatia in s['fatias'].items()}
+        return novo
+
+    return dict(espec,
+                roteadores={prefixo + r: i for r, i in espec['roteadores'].items()},
+                acessos=[sitio(s) for s in espec.get('acessos', [])],
+                enlaces=[dict(e, a=prefixo + e['a'], b=prefixo + e['b']) for e in espec.get('enlaces', [])],
+                nuvem=sitio(espec['nuvem']))
+
+
+def carregar_espec(caminho):
+    """Lê uma especificação em JSON ou YAML (pela extensão; YAML requer PyYAML)."""
+    with open(caminho) as f:
+        if caminho.endswith(('.yaml', '.yml')):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        topologia = Topologia(carregar_espec(sys.argv[1]))
+    elif len(sys.argv) in (3, 4):
+        topologia = Topologia(gerar_espec(int(sys.argv[1]), int(sys.argv[2]), *sys.argv[3:]))
+    else:
+        print("Uso: python3 topologia_parametrica.py <ESPEC.json|ESPEC.yaml>\n"
+              "     python3 topologia_parametrica.py <N_ROTEADORES> <N_SITIOS> [arvore|anel|linha]")
+        sys.exit(1)
+    print(f"{len(topologia.roteadores)} roteadores, {len(topologia.hosts)} hosts, "
+          f"{len(topologia.ligacoes)} ligações, {sum(map(len, topologia.rotas.values()))} rotas")
+    for roteador, direcoes in topologia.mapa_interfaces().items():
+        print(f"    - {roteador}: forward {direcoes.get('forward', [])}, backward {direcoes.get('backward', [])}")
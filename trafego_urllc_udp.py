@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import heapq
+import json
+import random
+import signal
+import socket
+import struct
+import time
+
+import telemetria
+
+# --- Configurações ---
+janela_reordenacao_s = 0.5    # Um pacote em falta há mais tempo do que isto conta como perdido
+intervalo_relatorio_s = 1.0   # Uma linha de log (e uma amostra de jitter por fluxo) por intervalo
+atraso_maximo_s = 1.0         # Emissor atrasado mais do que isto recomeça a agenda (sem rajada)
+salto_maximo = 100000         # Salto de seq maior do que isto é um emissor reiniciado, não perdas
+origem_receptor = "urllc_rx"  # Origem dos registos do recetor na telemetria
+tamanho_minimo = 14           # Cabeçalho da carga
+max_registos_atraso_hz = 2000  # Por fluxo: acima disto, só o primeiro pacote de cada 1/hz vai para a telemetria
+
+# Constantes do kernel Linux (nem todas são exportadas pelo módulo socket)
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+_TIMESPEC = struct.Struct('@ll')
+
+# Carga: fluxo (16 bits), seq (32 bits), instante de envio em ns (CLOCK_REALTIME, o mesmo relógio
+# do kernel em todos os hosts Mininet e o dos timestamps de receção SO_TIMESTAMPNS)
+_CARGA = struct.Struct('!HIQ')
+
+AGENDAS = ['periodica', 'poisson']
+
+
+def taxa_em_bits(taxa):
+    """Converte uma taxa na sintaxe do iperf3 -b ('100k', '40M', '1G') em bit/s."""
+    multiplicadores = {'k': 1e3, 'm': 1e6, 'g': 1e9}
+    taxa = str(taxa).strip()
+    if taxa[-1].lower() in multiplicadores:
+        return float(taxa[:-1]) * multiplicadores[taxa[-1].lower()]
+    return float(taxa)
+
+
+def _timestamp_kernel(ancdata):
+    """Extrai o instante de receção (SO_TIMESTAMPNS) dos dados auxiliares, em ns."""
+    for nivel, tipo, dados in ancdata:
+        if nivel == socket.SOL_SOCKET and tipo == SO_TIMESTAMPNS and len(dados) >= _TIMESPEC.size:
+            seg, nseg = _TIMESPEC.unpack(dados[:_TIMESPEC.size])
+            return seg * 1_000_000_000 + nseg
+    return None
+
+
+class EmissorUrllc:
+    """
+    Gera o tráfego uRLLC pacote a pacote: vários fluxos num só processo e num só socket.
+
+    Cada fluxo tem a sua agenda ('periodica' ou 'poisson', com taxa_pps pacotes/s de média)
+    e os fluxos são distribuídos pelas portas de destino em alternância. Um único temporizador
+    serve todos os fluxos (heap de próximos envios), com os arranques desfasados ao longo de
+    um período. Cada pacote leva o fluxo, o número de sequência e o instante de envio.
+    """
+
+    def __init__(self, ip_destino, portas, n_fluxos=1, taxa_pps=1000, tamanho=128, agenda='periodica',
+                 primeiro_fluxo=0):
+        if agenda not in AGENDAS:
+            raise ValueError(f"Agenda desconhecida: '{agenda}'. Disponíveis: {', '.join(AGENDAS)}")
+        if tamanho < tamanho_minimo:
+            raise ValueError(f"tamanho deve ser pelo menos {tamanho_minimo} bytes.")
+        self.destinos = [(ip_destino, p) for p in portas]
+        self.fluxos = list(range(primeiro_fluxo, primeiro_fluxo + n_fluxos))
+        self.periodo_s = 1.0 / taxa_pps
+        self.tamanho = tamanho
+        self.agenda = agenda
+        self.enviados = 0
+        self.falhas = 0  # Buffer do socket cheio ou descarte local da qdisc (ENOBUFS)
+        self._seq = {f: 0 for f in self.fluxos}
+        self._enchimento = b'\x00' * (tamanho - _CARGA.size)
+        self._parar = False
+
+    def parar(self):
+        self._parar = True
+
+    def _intervalo(self):
+        if self.agenda == 'poisson':
+            return random.expovariate(1.0 / self.periodo_s)
+        return self.periodo_s
+
+    async def executar(self, duracao_s=None):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        inicio = time.monotonic()
+        desfasamento = self.periodo_s / len(self.fluxos)
+        proximos = [(inicio + n * desfasamento, f) for n, f in enumerate(self.fluxos)]
+        heapq.heapify(proximos)
+        try:
+            while not self._parar:
+                agora = time.monotonic()
+                if duracao_s is not None and agora - inicio >= duracao_s:
+                    break
+                # Envia todos os pacotes já devidos (a taxas altas, pequenas rajadas por volta do loop)
+                while proximos[0][0] <= agora:
+                    instante, fluxo = proximos[0]
+                    seq = self._seq[fluxo]
+                    self._seq[fluxo] = (seq + 1) & 0xffffffff
+                    carga = _CARGA.pack(fluxo, seq, time.time_ns()) + self._enchimento
+                    try:
+                        sock.sendto(carga, self.destinos[fluxo % len(self.destinos)])
+                        self.enviados += 1
+                    except OSError:
+                        self.falhas += 1
+                    seguinte = instante + self._intervalo()
+                    if agora - seguinte > atraso_maximo_s:
+                        seguinte = agora  # Muito atrasado: não tenta recuperar os envios em falta
+                    heapq.heapreplace(proximos, (seguinte, fluxo))
+                await asyncio.sleep(max(0.0, proximos[0][0] - time.monotonic()))
+        finally:
+            sock.close()
+
+
+class EstadoFluxo:
+    """Contadores de um fluxo no recetor."""
+
+    def __init__(self):
+        self.primeira_seq = None
+        self.t_primeira = None  # Instante (monotónico, s) em que chegou a primeira seq
+        self.maior_seq = None
+        self.recebidos = 0
+        self.perdidos = 0
+        self.reordenados = 0
+        self.duplicados = 0
+        self.atrasados = 0   # Chegaram depois de dados como perdidos (já não contam em perdidos)
+        self.reinicios = 0
+        self.em_falta = {}  # seq -> instante (monotónico, s) em que a falta foi detetada
+        self.dados_perdidos = {}  # seq -> None, as faltas expiradas a menos de salto_maximo da maior seq
+        self.ultimo_atraso_ms = None
+        self.t_registo_ns = None  # Último ATRASO_MS escrito na telemetria
+        self.jitter_ms = 0.0
+        self.atraso_min_ms = float('inf')
+        self.atraso_max_ms = 0.0
+        self.soma_atraso_ms = 0.0
+
+    def resumo(self):
+        esperados = self.recebidos + self.perdidos
+        return {
+            'recebidos': self.recebidos, 'perdidos': self.perdidos, 'reordenados': self.reordenados,
+            'duplicados': self.duplicados, 'atrasados': self.atrasados, 'reinicios': self.reinicios,
+            'perda_pct': round(100.0 * self.perdidos / esperados, 3) if esperados else None,
+            'atraso_min_ms': round(self.atraso_min_ms, 3) if self.recebidos else None,
+            'atraso_medio_ms': round(self.soma_atraso_ms / self.recebidos, 3) if self.recebidos else None,
+            'atraso_max_ms': round(self.atraso_max_ms, 3) if self.recebidos else None,
+            'jitter_ms': round(self.jitter_ms, 3),
+        }
+
+
+class ReceptorUrllc:
+    """
+    Recebe o tráfego do EmissorUrllc e mede cada pacote.
+
+    Por pacote: atraso unidirecional (timestamp de receção do kernel menos o instante de
+    envio da carga). Por fluxo: jitter (RFC 3550, sobre a variação do atraso), pacotes
+    reordenados (seq abaixo da maior já vista), duplicados e perdas (seq em falta há mais
+    de janela_reordenacao_s; as perdas no fim do fluxo, sem pacote seguinte, não são
+    detetáveis). Um pacote dado como perdido que ainda chega conta como atrasado e sai das
+    perdas; uma seq abaixo da primeira do fluxo, ou mais de salto_maximo abaixo da maior,
+    é um emissor reiniciado e o fluxo recomeça. Com escritor, o atraso fica na telemetria
+    (ATRASO_MS, canal = fluxo) para cada pacote até max_registos_atraso_hz e amostrado no tempo
+    acima disso (os contadores e o resumo contam todos), tal como cada perda (PERDA -1.0 num
+    atrasado) e cada reordenação.
+    """
+
+    def __init__(self, portas, escritor=None, endereco='0.0.0.0'):
+        self.portas = portas
+        self.endereco = endereco
+        self.escritor = escritor
+        self.fluxos = {}
+        self._socks = []
+        self._parar = None
+
+    def _registrar(self, metrica, valor, fluxo, t_ns=None):
+        if self.escritor is not None:
+            self.escritor.registrar(metrica, valor, canal=fluxo, t_ns=t_ns)
+
+    def _ao_receber(self, sock):
+        while True:
+            try:
+                dados, ancdata, _, _ = sock.recvmsg(2048, socket.CMSG_SPACE(_TIMESPEC.size))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            t_recepcao = _timestamp_kernel(ancdata) or time.time_ns()
+            if len(dados) < _CARGA.size:
+                continue
+            fluxo, seq, t_envio = _CARGA.unpack_from(dados)
+            self._processar(fluxo, seq, (t_recepcao - t_envio) / 1e6)
+
+    def _processar(self, fluxo, seq, atraso_ms):
+        estado = self.fluxos.get(fluxo)
+        if estado is None:
+            estado = self.fluxos[fluxo] = EstadoFluxo()
+        t_ns = time.monotonic_ns()
+
+        agora = t_ns / 1e9
+        if estado.maior_seq is not None and seq < estado.primeira_seq:
+            # Um dos primeiros pacotes ultrapassado pelos seguintes é reordenação; muito abaixo ou
+            # tarde demais é um emissor que recomeçou a numeração
+            if (agora - estado.t_primeira > janela_reordenacao_s
+                    or estado.primeira_seq - seq > estado.maior_seq - estado.primeira_seq + 1):
+                self._reiniciar(fluxo, estado)
+            else:
+                estado.em_falta.update((s, agora) for s in range(seq, estado.primeira_seq))
+                estado.primeira_seq = seq
+        elif estado.maior_seq is not None and estado.maior_seq - seq > salto_maximo:
+            self._reiniciar(fluxo, estado)
+        if estado.maior_seq is not None and seq <= estado.maior_seq:
+            if estado.em_falta.pop(seq, None) is not None:
+                estado.reordenados += 1
+                self._registrar(telemetria.REORDENADO, estado.maior_seq - seq, fluxo, t_ns)
+            elif seq in estado.dados_perdidos:
+                del estado.dados_perdidos[seq]
+                estado.atrasados += 1
+                estado.perdidos -= 1
+                self._registrar(telemetria.PERDA, -1.0, fluxo, t_ns)
+            else:
+                estado.duplicados += 1
+                return
+        else:
+            if estado.maior_seq is None:
+                estado.primeira_seq, estado.t_primeira = seq, agora
+            elif seq - estado.maior_seq <= salto_maximo:
+                for em_falta in range(estado.maior_seq + 1, seq):
+                    estado.em_falta[em_falta] = agora
+            estado.maior_seq = seq
+
+        estado.recebidos += 1
+        if estado.ultimo_atraso_ms is not None:
+            estado.jitter_ms += (abs(atraso_ms - estado.ultimo_atraso_ms) - estado.jitter_ms) / 16
+        estado.ultimo_atraso_ms = atraso_ms
+        estado.atraso_min_ms = min(estado.atraso_min_ms, atraso_ms)
+        estado.atraso_max_ms = max(estado.atraso_max_ms, atraso_ms)
+        estado.soma_atraso_ms += atraso_ms
+        if estado.t_registo_ns is None or t_ns - estado.t_registo_ns >= 1e9 / max_registos_atraso_hz:
+            estado.t_registo_ns = t_ns
+            self._registrar(telemetria.ATRASO_MS, atraso_ms, fluxo, t_ns)
+
+    def _reiniciar(self, fluxo, estado):
+        """Emissor reiniciado: as faltas pendentes contam como perdidas e a sequência recomeça."""
+        self._expirar_faltas_fluxo(fluxo, estado, None)
+        estado.primeira_seq = estado.maior_seq = None
+        estado.dados_perdidos.clear()
+        estado.reinicios += 1
+
+    def _expirar_faltas_fluxo(self, fluxo, estado, limite):
+        # As faltas são acrescentadas por ordem de deteção: basta olhar o início
+        while estado.em_falta:
+            seq, detetada = next(iter(estado.em_falta.items()))
+            if limite is not None and detetada > limite:
+                break
+            del estado.em_falta[seq]
+            estado.perdidos += 1
+            estado.dados_perdidos[seq] = None
+            self._registrar(telemetria.PERDA, 1.0, fluxo)
+        # Mais de salto_maximo abaixo da maior seq já seria um reinício: não precisa de ser lembrada
+        while estado.dados_perdidos and next(iter(estado.dados_perdidos)) < estado.maior_seq - salto_maximo:
+            del estado.dados_perdidos[next(iter(estado.dados_perdidos))]
+
+    def _expirar_faltas(self, todas=False):
+        limite = None if todas else time.monotonic() - janela_reordenacao_s
+        for fluxo, estado in self.fluxos.items():
+            self._expirar_faltas_fluxo(fluxo, estado, limite)
+
+    def resumo(self):
+        return {fluxo: estado.resumo() for fluxo, estado in sorted(self.fluxos.items())}
+
+    def parar(self):
+        if self._parar is not None:
+            self._parar.set()
+
+    async def executar(self):
+        """Recebe até parar() (ou SIGTERM/SIGINT, ver __main__)."""
+        loop = asyncio.get_running_loop()
+        self._parar = asyncio.Event()
+        for porta in self.portas:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            sock.bind((self.endereco, porta))
+            sock.setblocking(False)
+            loop.add_reader(sock.fileno(), self._ao_receber, sock)
+            self._socks.append(sock)
+        print(f"[uRLLC RX] À escuta em {self.endereco}, portas {', '.join(map(str, self.portas))}")
+        anterior = {}
+        try:
+            while not self._parar.is_set():
+                try:
+                    await asyncio.wait_for(self._parar.wait(), intervalo_relatorio_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._expirar_faltas()
+                anterior = self._relatorio(anterior)
+        finally:
+            for sock in self._socks:
+                loop.remove_reader(sock.fileno())
+                sock.close()
+            self._expirar_faltas(todas=True)
+
+    def _relatorio(self, anterior):
+        """Uma linha por intervalo com os totais de todos os fluxos; regista o jitter de cada fluxo."""
+        atual = {f: (e.recebidos, e.perdidos, e.reordenados, e.soma_atraso_ms) for f, e in self.fluxos.items()}
+        recebidos = perdidos = reordenados = 0
+        soma_atraso = 0.0
+        for fluxo, (r, p, o, s) in atual.items():
+            r0, p0, o0, s0 = anterior.get(fluxo, (0, 0, 0, 0.0))
+            recebidos, perdidos, reordenados = recebidos + r - r0, perdidos + p - p0, reordenados + o - o0
+            soma_atraso += s - s0
+            self._registrar(telemetria.JITTER_MS, self.fluxos[fluxo].jitter_ms, fluxo)
+        if recebidos or perdidos:
+            jitter = max(e.jitter_ms for e in self.fluxos.values())
+            print(f"[{time.strftime('%H:%M:%S')}] {len(atual)} fluxos: {recebidos} pacotes, "
+                  f"atraso médio {soma_atraso / max(recebidos, 1):.3f} ms, jitter máx {jitter:.3f} ms, "
+                  f"{perdidos} perdidos, {reordenados} reordenados")
+        return atual
+
+
+def _portas(texto):
+    """'5202' ou '5202,5203' ou '5202-5209'."""
+    portas = []
+    for parte in texto.split(','):
+        if '-' in parte:
+            a, b = map(int, parte.split('-'))
+            portas += list(range(a, b + 1))
+        else:
+            portas.append(int(parte))
+    return portas
+
+
+async def _receber(args):
+    escritor = telemetria.EscritorTelemetria(args.telemetria, args.origem) if args.telemetria else None
+    receptor = ReceptorUrllc(_portas(args.portas), escritor)
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sinal, receptor.parar)
+    try:
+        await receptor.executar()
+    finally:
+        if escritor is not None:
+            escritor.fechar()
+        resumo = receptor.resumo()
+        for fluxo, r in resumo.items():
+            print(f"    - Fluxo {fluxo}: {r}")
+        if args.resumo:
+            with open(args.resumo, 'w') as f:
+                json.dump(resumo, f, indent=2)
+
+
+async def _enviar(args):
+    taxa_pps = args.taxa_pps
+    if args.taxa:
+        # Taxa agregada na sintaxe do iperf3, repartida pelos fluxos
+        taxa_pps = taxa_em_bits(args.taxa) / (8 * args.tamanho) / args.fluxos
+    emissor = EmissorUrllc(args.destino, _portas(args.portas), args.fluxos, taxa_pps, args.tamanho, args.agenda)
+    print(f"[uRLLC TX] {args.fluxos} fluxos x {taxa_pps:.0f} pacotes/s ({args.agenda}), {args.tamanho} bytes, "
+          f"para {args.destino}:{args.portas}")
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sinal, emissor.parar)
+    inicio = time.monotonic()
+    await emissor.executar(args.duracao)
+    duracao = time.monotonic() - inicio
+    print(f"[uRLLC TX] {emissor.enviados} pacotes enviados em {duracao:.1f} s "
+          f"({emissor.enviados / max(duracao, 1e-9):.0f}/s), {emissor.falhas} falhas de envio")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tráfego uRLLC UDP com medição por pacote")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    enviar = sub.add_parser('enviar', help="Emissor (no host uRLLC)")
+    enviar.add_argument('destino')
+    enviar.add_argument('--portas', default='5202', help="Porta(s) de destino: 5202, 5202,5203 ou 5202-5209")
+    enviar.add_argument('--fluxos', type=int, default=1)
+    enviar.add_argument('--taxa-pps', type=float, default=1000, help="Pacotes/s por fluxo")
+    enviar.add_argument('--taxa', help="Taxa agregada à iperf3 (ex. 40M); sobrepõe --taxa-pps")
+    enviar.add_argument('--tamanho', type=int, default=128, help="Bytes de carga UDP por pacote")
+    enviar.add_argument('--agenda', default='periodica', choices=AGENDAS)
+    enviar.add_argument('--duracao', type=float, help="Segundos (por omissão, até SIGTERM)")
+
+    receber = sub.add_parser('receber', help="Recetor (na nuvem)")
+    receber.add_argument('--portas', default='5202')
+    receber.add_argument('--telemetria', help="Ficheiro de telemetria onde registar cada pacote")
+    receber.add_argument('--origem', default=origem_receptor)
+    receber.add_argument('--resumo', help="JSON com o resumo por fluxo, escrito ao terminar")
+    args = parser.parse_args()
+
+    asyncio.run(_enviar(args) if args.comando == 'enviar' else _receber(args))